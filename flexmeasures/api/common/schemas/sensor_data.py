@@ -1,11 +1,16 @@
 from __future__ import annotations
 
-from datetime import timedelta
+import base64
+import binascii
+from datetime import datetime, timedelta
+import json
+import math
+from typing import Iterator
 
 from flask_login import current_user
 from isodate import datetime_isoformat
 from marshmallow import fields, post_load, pre_load, validates_schema, ValidationError
-from marshmallow.validate import OneOf, Length
+from marshmallow.validate import OneOf, Length, Range
 from marshmallow_polyfield import PolyField
 from timely_beliefs import BeliefsDataFrame
 import pandas as pd
@@ -21,7 +26,14 @@ from flexmeasures.api.common.schemas.users import AccountIdField
 from flexmeasures.api.common.utils.api_utils import upsample_values
 from flexmeasures.data.models.planning.utils import initialize_index
 from flexmeasures.data.schemas import AwareDateTimeField, DurationField, SourceIdField
+from flexmeasures.data.services.columnar import (
+    COLUMNAR_FORMATS,
+    COLUMNAR_MIMETYPES,
+    pyarrow_is_installed,
+    stream_batches,
+)
 from flexmeasures.data.services.data_sources import get_or_create_source
+from flexmeasures.data.services.sensor_data_cache import make_sensor_data_cache_key
 from flexmeasures.data.services.time_series import simplify_index
 from flexmeasures.utils.time_utils import (
     decide_resolution,
@@ -73,6 +85,46 @@ def select_schema_to_ensure_list_of_floats(
         return SingleValueField()
 
 
+SENSOR_DATA_MIMETYPES = dict(
+    json="application/json",
+    ndjson="application/x-ndjson",
+    csv="text/csv",
+    **COLUMNAR_MIMETYPES,
+)
+
+
+class ResponseFormatField(fields.Str):
+    """Field for the format of a response, which checks whether the server supports the columnar formats."""
+
+    def __init__(self, formats: list[str], *args, **kwargs):
+        super().__init__(*args, validate=OneOf(formats), **kwargs)
+
+    def _deserialize(self, value, attr, data, **kwargs) -> str:
+        value = super()._deserialize(value, attr, data, **kwargs)
+        if value in COLUMNAR_FORMATS and not pyarrow_is_installed():
+            raise ValidationError(
+                f"The {value} format is not supported by this server (it requires the pyarrow package)."
+            )
+        return value
+
+
+class PageCursorField(fields.Str):
+    """Field that de-serializes an opaque page cursor to the start of the page it points to,
+    and serializes a page start back to a cursor."""
+
+    def _deserialize(self, value, attr, data, **kwargs) -> datetime:
+        value = super()._deserialize(value, attr, data, **kwargs)
+        try:
+            return datetime.fromisoformat(
+                base64.urlsafe_b64decode(value.encode()).decode()
+            )
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise ValidationError("Invalid cursor.")
+
+    def _serialize(self, value: datetime, attr, obj, **kwargs) -> str:
+        return base64.urlsafe_b64encode(value.isoformat().encode()).decode()
+
+
 class SensorDataTimingDescriptionSchema(ma.Schema):
     """
     Schema describing sensor data (specifically, the timing of the data).
@@ -185,6 +237,36 @@ class GetSensorDataFilterSchemaMixin:
             example="forecaster",
         ),
     )
+    format = ResponseFormatField(
+        formats=["json", "ndjson", "csv", *COLUMNAR_FORMATS],
+        required=False,
+        metadata=dict(
+            description="Format of the response. NDJSON (one JSON object per event) and CSV (one line per event) responses are always streamed, as are the columnar formats: an Apache Arrow IPC stream (arrow) and a Parquet file (parquet), which require the server to have pyarrow installed.",
+            example="ndjson",
+        ),
+    )
+    stream = fields.Bool(
+        required=False,
+        metadata=dict(
+            description="Stream the (JSON) response, which is written while loading the data chunk by chunk. Recommended for long time windows.",
+            example=True,
+        ),
+    )
+    page_size = fields.Int(
+        data_key="page-size",
+        required=False,
+        validate=Range(min=1),
+        metadata=dict(
+            description="Paginate the (JSON) response, with at most this many values per page. Each page but the last comes with a next-cursor, to request the next page.",
+            example=1440,
+        ),
+    )
+    cursor = PageCursorField(
+        required=False,
+        metadata=dict(
+            description="Cursor pointing to the page to get, as returned (as next-cursor) with the previous page.",
+        ),
+    )
 
     @pre_load
     def support_legacy_field_name(self, data, **kwargs):
@@ -225,6 +307,24 @@ class GetSensorDataSchema(GetSensorDataFilterSchemaMixin, SensorDataDescriptionS
                 f"The unit requested for this message type should be convertible from an energy price unit, got incompatible unit: {requested_unit}"
             )
 
+    @validates_schema
+    def check_streaming_and_pagination(self, data, **kwargs):
+        streamed = data.get("stream") or data.get("format", "json") != "json"
+        if streamed and "page_size" in data:
+            raise ValidationError(
+                "Streamed responses cannot be paginated.", field_name="page_size"
+            )
+        if "cursor" in data:
+            if "page_size" not in data:
+                raise ValidationError(
+                    "A cursor requires a page size.", field_name="cursor"
+                )
+            if not (data["start"] <= data["cursor"] < data["start"] + data["duration"]):
+                raise ValidationError(
+                    "Cursor lies outside of the requested time window.",
+                    field_name="cursor",
+                )
+
     @validates_schema
     def source_type_must_exist_on_sensor(self, data, **kwargs):
         source_type = data.get("source_type")
@@ -240,8 +340,48 @@ class GetSensorDataSchema(GetSensorDataFilterSchemaMixin, SensorDataDescriptionS
             )
 
     @staticmethod
-    def load_data_and_make_response(sensor_data_description: dict) -> dict:
-        """Turn the de-serialized and validated data description into a response.
+    def make_cache_key(sensor_data_description: dict) -> str:
+        """Derive the key under which the response to the data description is cached.
+
+        The key covers all fields that load_data_and_make_response uses to make the response.
+        """
+        source = sensor_data_description.get("source")
+        source_account = sensor_data_description.get("source_account")
+        return make_sensor_data_cache_key(
+            sensor_data_description["sensor"].id,
+            start=sensor_data_description["start"],
+            duration=sensor_data_description["duration"],
+            unit=sensor_data_description["unit"],
+            resolution=sensor_data_description.get("resolution"),
+            horizon=sensor_data_description.get("horizon"),
+            prior=sensor_data_description.get("prior"),
+            type=sensor_data_description.get("type"),
+            source=source.id if source is not None else None,
+            source_account=source_account.id if source_account is not None else None,
+            source_type=sensor_data_description.get("source_type"),
+        )
+
+    @staticmethod
+    def get_resolution(sensor_data_description: dict) -> timedelta:
+        """Post-load configuration of event frequency."""
+        resolution = sensor_data_description.get("resolution")
+        if resolution is not None:
+            return resolution
+        sensor: Sensor = sensor_data_description["sensor"]
+        if sensor.event_resolution != timedelta(hours=0):
+            return sensor.event_resolution
+        # For instantaneous sensors, choose a default resolution given the requested time window
+        start = sensor_data_description["start"]
+        return decide_resolution(start, start + sensor_data_description["duration"])
+
+    @staticmethod
+    def load_values(
+        sensor_data_description: dict,
+        start: datetime,
+        end: datetime,
+        resolution: timedelta,
+    ) -> pd.Series:
+        """Load the values for events in [start, end), in the requested unit and resolution.
 
         Specifically, this function:
         - queries data according to the given description
@@ -249,25 +389,15 @@ class GetSensorDataSchema(GetSensorDataFilterSchemaMixin, SensorDataDescriptionS
         - ensures the response respects the requested time frame
         - converts values to the requested unit
         - converts values to the requested resolution
+
+        :returns: the values indexed by event start, with None for missing values
         """
         sensor: Sensor = sensor_data_description["sensor"]
-        start = sensor_data_description["start"]
-        duration = sensor_data_description["duration"]
-        end = sensor_data_description["start"] + duration
         unit = sensor_data_description["unit"]
-        resolution = sensor_data_description.get("resolution")
         source = sensor_data_description.get("source")
         source_account = sensor_data_description.get("source_account")
         source_type = sensor_data_description.get("source_type")
 
-        # Post-load configuration of event frequency
-        if resolution is None:
-            if sensor.event_resolution != timedelta(hours=0):
-                resolution = sensor.event_resolution
-            else:
-                # For instantaneous sensors, choose a default resolution given the requested time window
-                resolution = decide_resolution(start, end)
-
         # Post-load configuration of belief timing against message type
         horizons_at_least = sensor_data_description.get("horizon", None)
         horizons_at_most = None
@@ -309,19 +439,141 @@ class GetSensorDataSchema(GetSensorDataFilterSchemaMixin, SensorDataDescriptionS
         )
 
         # Convert NaN to None, which JSON dumps as null values
-        values = values.astype(object).where(pd.notnull(values), None)
+        return values.astype(object).where(pd.notnull(values), None)
+
+    @staticmethod
+    def load_data_and_make_response(sensor_data_description: dict) -> dict:
+        """Turn the de-serialized and validated data description into a response."""
+        start = sensor_data_description["start"]
+        duration = sensor_data_description["duration"]
+        resolution = GetSensorDataSchema.get_resolution(sensor_data_description)
+        values = GetSensorDataSchema.load_values(
+            sensor_data_description,
+            start=start,
+            end=start + duration,
+            resolution=resolution,
+        )
 
         # Form the response
         response = dict(
             values=values.tolist(),
             start=datetime_isoformat(start),
             duration=duration_isoformat(duration),
-            unit=unit,
-            resolution=duration_isoformat(df.event_resolution),
+            unit=sensor_data_description["unit"],
+            resolution=duration_isoformat(resolution),
         )
 
         return response
 
+    @staticmethod
+    def iterate_values(
+        sensor_data_description: dict, chunk_size: int
+    ) -> Iterator[pd.Series]:
+        """Load the values in time chunks of (about) chunk_size events each, so that memory use does not grow with the requested duration.
+
+        Chunk boundaries are aligned with both the requested resolution and the sensor resolution,
+        so that no event is cut in two and resampling gives the same values as loading all data at once.
+        """
+        sensor: Sensor = sensor_data_description["sensor"]
+        start = sensor_data_description["start"]
+        end = start + sensor_data_description["duration"]
+        resolution = GetSensorDataSchema.get_resolution(sensor_data_description)
+        step = pd.Timedelta(resolution).value
+        if sensor.event_resolution != timedelta(hours=0):
+            step = math.lcm(step, pd.Timedelta(sensor.event_resolution).value)
+        chunk_duration = pd.Timedelta(
+            max(1, round(chunk_size * pd.Timedelta(resolution).value / step)) * step
+        )
+        chunk_start = start
+        while chunk_start < end:
+            chunk_end = min(chunk_start + chunk_duration, end)
+            yield GetSensorDataSchema.load_values(
+                sensor_data_description,
+                start=chunk_start,
+                end=chunk_end,
+                resolution=resolution,
+            )
+            chunk_start = chunk_end
+
+    @staticmethod
+    def stream_response(
+        sensor_data_description: dict, chunk_size: int, trailer: dict | None = None
+    ) -> Iterator[str]:
+        """Write the response in parts, in the requested format, while loading the values chunk by chunk.
+
+        - json: the same response as load_data_and_make_response makes, with the values array written incrementally
+        - ndjson: a JSON object per line, with the event start and value of each event
+        - csv: a header line, followed by a line with the event start and value of each event
+
+        :param trailer: additional fields (e.g. the status) for the end of the JSON response
+        """
+        output_format = sensor_data_description.get("format", "json")
+        values_chunks = GetSensorDataSchema.iterate_values(
+            sensor_data_description, chunk_size=chunk_size
+        )
+        if output_format == "json":
+            start = sensor_data_description["start"]
+            head = dict(
+                start=datetime_isoformat(start),
+                duration=duration_isoformat(sensor_data_description["duration"]),
+                unit=sensor_data_description["unit"],
+                resolution=duration_isoformat(
+                    GetSensorDataSchema.get_resolution(sensor_data_description)
+                ),
+            )
+            yield json.dumps(head)[:-1] + ', "values": ['
+            separator = ""
+            for values in values_chunks:
+                if values.empty:
+                    continue
+                yield separator + json.dumps(values.tolist())[1:-1]
+                separator = ", "
+            yield "]" + "".join(
+                f", {json.dumps(key)}: {json.dumps(value)}"
+                for key, value in (trailer or {}).items()
+            ) + "}"
+        elif output_format == "ndjson":
+            for values in values_chunks:
+                yield "".join(
+                    json.dumps(
+                        dict(event_start=event_start.isoformat(), event_value=value)
+                    )
+                    + "\n"
+                    for event_start, value in values.items()
+                )
+        else:
+            yield "event_start,event_value\n"
+            for values in values_chunks:
+                yield "".join(
+                    f"{event_start.isoformat()},{'' if value is None else value}\n"
+                    for event_start, value in values.items()
+                )
+
+    @staticmethod
+    def select_page(sensor_data_description: dict) -> tuple[dict, str | None]:
+        """Narrow down the data description to the page of events starting at the cursor (or at the start, if no cursor is given).
+
+        :returns: the data description of the page, and the cursor to the next page (or None for the last page)
+        """
+        start = sensor_data_description["start"]
+        end = start + sensor_data_description["duration"]
+        resolution = GetSensorDataSchema.get_resolution(sensor_data_description)
+        page_start = sensor_data_description.get("cursor") or start
+        page_end = min(
+            page_start + sensor_data_description["page_size"] * resolution, end
+        )
+        page_description = dict(
+            sensor_data_description,
+            start=page_start,
+            duration=page_end - page_start,
+            resolution=resolution,
+        )
+        if page_end == end:
+            return page_description, None
+        return page_description, PageCursorField().serialize(
+            "cursor", dict(cursor=page_end)
+        )
+
 
 class GetSensorDataQuerySchema(
     GetSensorDataFilterSchemaMixin, SensorDataTimingDescriptionSchema
@@ -18,6 +18,7 @@ from flexmeasures.data.services.scheduling import create_scheduling_job
 from flexmeasures.data.services.sensors import (
     get_stalenesses,
     get_statuses,
+    get_statuses_for_sensors,
     build_asset_jobs_data,
     get_asset_sensors_metadata,
 )
@@ -361,6 +362,41 @@ def test_get_status_no_status_specs(
             assert expected_stale_reason in sensor_status["reason"]
 
 
+@pytest.mark.parametrize(
+    "now",
+    [
+        "2015-01-02T08:29+01",
+        "2015-01-02T08:31+01",
+        "2016-01-01T07:00+01",
+        "2016-01-02T13:00+01",
+        "2016-01-03T12:00+01",
+    ],
+)
+def test_get_statuses_for_sensors(
+    db, add_market_prices, capacity_sensors, add_weather_sensors, now
+):
+    """Check that looking up the statuses of many sensors at once gives the same results as one by one.
+
+    The capacity sensors (ex-post knowledge horizons) are looked up in bulk,
+    whereas the day-ahead prices (knowledge horizon depending on the event) are looked up one by one.
+    The wind sensor has no data.
+    """
+    sensors = [
+        capacity_sensors["production"],
+        capacity_sensors["consumption"],
+        add_market_prices["epex_da"],
+        add_weather_sensors["wind"],
+    ]
+    db.session.flush()
+    now = pd.Timestamp(now)
+
+    statuses = get_statuses_for_sensors(sensors, now=now)
+
+    assert list(statuses.keys()) == [sensor.id for sensor in sensors]
+    for sensor in sensors:
+        assert statuses[sensor.id] == get_statuses(sensor=sensor, now=now)
+
+
 def test_asset_sensors_metadata_old_sensors_to_show_format(db, add_weather_sensors):
     """
     Regression test: asset status page crashed with KeyError 'sensors' when sensors_to_show
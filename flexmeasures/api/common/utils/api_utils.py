@@ -216,8 +216,9 @@ def catch_timed_belief_replacements(error: IntegrityError):
 
     Return a more informative message.
     """
-    if isinstance(error.orig, UniqueViolation) and "timed_belief_pkey" in str(
-        error.orig
+    # The primary key of each partition of the timed_belief table is named after the partition, e.g. timed_belief_default_pkey
+    if isinstance(error.orig, UniqueViolation) and re.fullmatch(
+        r"timed_belief(_\w+)?_pkey", error.orig.diag.constraint_name or ""
     ):
         # Some beliefs represented replacements, which was forbidden
         return invalid_replacement()
@@ -25,6 +25,7 @@ from flexmeasures.data.services.generic_assets import (
 from flexmeasures.data.services.sensors import (
     build_asset_jobs_data,
     get_sensor_stats,
+    serialize_asset_sensors_status_data,
 )
 from flexmeasures.api.common.schemas.scheduling import (
     flex_context_schema_openAPI,
@@ -1288,6 +1289,69 @@ class AssetAPI(FlaskView):
             "redis_connection_err": redis_connection_err,
         }, 200
 
+    @route("/<id>/sensors/status", methods=["GET"])
+    @use_kwargs(
+        {"asset": AssetIdField(data_key="id")},
+        location="path",
+    )
+    @permission_required_for_context("read", ctx_arg_name="asset")
+    @as_json
+    def get_sensors_status(self, id: int, asset: GenericAsset):
+        """
+        .. :quickref: Assets; Get the status of all sensors relevant to an asset.
+        ---
+        get:
+          summary: Get the status of all sensors relevant to an asset.
+          description: |
+            This endpoint fetches the current status of data for the sensors under or relevant to the specified asset,
+            i.e. its sensors to show and the sensors in its flex-context.
+            Per sensor, the response contains one status per data source type, like the `/sensors/<id>/status` endpoint.
+            The statuses of all sensors are computed at once, which is much faster than fetching them one by one.
+          security:
+            - ApiKeyAuth: []
+          parameters:
+            - in: path
+              name: id
+              required: true
+              description: ID of the asset to get the sensor statuses for.
+              schema:
+                type: integer
+          responses:
+            200:
+              description: PROCESSED
+              content:
+                application/json:
+                  examples:
+                    successful_response:
+                      summary: Successful response
+                      description: A successful response with sensor status data
+                      value:
+                        sensors_data:
+                          - staleness: "PT2H"
+                            stale: true
+                            staleness_since: "2024-01-15T14:30:00+00:00"
+                            reason: "most recent data is 2 hours old, but should not be more than 10 minutes old"
+                            source_type: "user"
+                            id: 64907
+                            name: "temperature"
+                            resolution: "PT5M"
+                            asset_name: "Building A"
+                            relation: "sensor belongs to this asset"
+            400:
+              description: INVALID_REQUEST, REQUIRED_INFO_MISSING, UNEXPECTED_PARAMS
+            401:
+              description: UNAUTHORIZED
+            403:
+              description: INVALID_SENDER
+            422:
+              description: UNPROCESSABLE_ENTITY
+          tags:
+            - Assets
+        """
+        status_data = serialize_asset_sensors_status_data(asset)
+
+        return {"sensors_data": status_data}, 200
+
     @route("/default_asset_view", methods=["POST"])
     @as_json
     @use_kwargs(DefaultAssetViewJSONSchema, location="json")
@@ -8,7 +8,8 @@ from flexmeasures.data.services.sensors import (
 )
 
 from werkzeug.exceptions import Unauthorized
-from flask import current_app, url_for, request
+from werkzeug.http import quote_etag
+from flask import current_app, url_for, request, Response, stream_with_context
 from flask_classful import FlaskView, route
 from flask_json import as_json
 from flask_security import auth_required, current_user
@@ -28,6 +29,7 @@ from flexmeasures.api.common.responses import (
 )
 from flexmeasures.api.common.schemas.utils import make_openapi_compatible
 from flexmeasures.api.common.schemas.sensor_data import (  # noqa F401
+    SENSOR_DATA_MIMETYPES,
     SensorDataDescriptionSchema,
     GetSensorDataSchema,
     GetSensorDataQuerySchema,
@@ -71,6 +73,14 @@ from flexmeasures.data.schemas.scheduling import (
 )
 from flexmeasures.data.schemas.units import UnitField
 from flexmeasures.data.services.sensors import get_sensor_stats
+from flexmeasures.data.services.sensor_data_cache import (
+    cache_response,
+    get_cache_generation,
+    get_cached_etag,
+    get_cached_response,
+    invalidate_sensor_data_cache,
+    sensor_data_cache_is_enabled,
+)
 from flexmeasures.data.services.sensors import delete_sensor as delete_sensor_and_data
 from flexmeasures.data.services.scheduling import (
     create_scheduling_job,
@@ -756,6 +766,10 @@ class SensorAPI(FlaskView):
             - "source" (filter by data source ID, read [the docs about sources](https://flexmeasures.readthedocs.io/latest/api/notation.html#sources))
             - "source-account" (filter by the account ID linked to data sources)
             - "source-type" (filter by data source type)
+            - "format" (one of "json", "ndjson" or "csv"; NDJSON and CSV responses list one event per line and are always streamed)
+            - "stream" (stream the JSON response, which is written while the data is loaded chunk by chunk; recommended for long time windows)
+            - "page-size" (paginate the JSON response, with at most this many values per page)
+            - "cursor" (the page to get, as given by the "next-cursor" field of the previous page; the last page has no "next-cursor")
 
             An example query to fetch data for sensor with ID=1, for one hour starting June 7th 2021 at midnight, in 15 minute intervals, in m³/h:
 
@@ -788,11 +802,65 @@ class SensorAPI(FlaskView):
           tags:
             - Sensors
         """
-        response = GetSensorDataSchema.load_data_and_make_response(
-            sensor_data_description
-        )
+        # Write streamed responses while loading the data, rather than building them in memory (and in the cache)
+        output_format = sensor_data_description.get("format", "json")
+        if sensor_data_description.get("stream") or output_format != "json":
+            d, s = request_processed()
+            return Response(
+                stream_with_context(
+                    GetSensorDataSchema.stream_response(
+                        sensor_data_description,
+                        chunk_size=current_app.config[
+                            "FLEXMEASURES_SENSOR_DATA_STREAM_CHUNK_SIZE"
+                        ],
+                        trailer=d,
+                    )
+                ),
+                status=s,
+                mimetype=SENSOR_DATA_MIMETYPES[output_format],
+            )
+
+        # A page is loaded (and cached) like a request for the time window of the page
+        pagination = {}
+        if "page_size" in sensor_data_description:
+            sensor_data_description, next_cursor = GetSensorDataSchema.select_page(
+                sensor_data_description
+            )
+            if next_cursor is not None:
+                pagination["next-cursor"] = next_cursor
+
+        if not sensor_data_cache_is_enabled():
+            response = GetSensorDataSchema.load_data_and_make_response(
+                sensor_data_description
+            )
+            d, s = request_processed()
+            return dict(**response, **pagination, **d), s
+
+        # Serve unchanged data from the cache, or not at all if the client already has it
+        cache_key = GetSensorDataSchema.make_cache_key(sensor_data_description)
+        etag = get_cached_etag(cache_key)
+        if etag is not None and request.if_none_match.contains(etag):
+            return "", 304, {"ETag": quote_etag(etag)}
+        cached = get_cached_response(cache_key)
+        if cached is not None:
+            response, etag = cached
+        else:
+            # Read the generation before loading, so data changed meanwhile is not cached
+            generation = get_cache_generation(sensor_data_description["sensor"].id)
+            response = GetSensorDataSchema.load_data_and_make_response(
+                sensor_data_description
+            )
+            start = sensor_data_description["start"]
+            etag = cache_response(
+                cache_key,
+                sensor_id=sensor_data_description["sensor"].id,
+                start=start,
+                end=start + sensor_data_description["duration"],
+                response=response,
+                generation=generation,
+            )
         d, s = request_processed()
-        return dict(**response, **d), s
+        return dict(**response, **pagination, **d), s, {"ETag": quote_etag(etag)}
 
     @route("/<id>/schedules/trigger", methods=["POST"])
     @use_kwargs(
@@ -1682,6 +1750,7 @@ class SensorAPI(FlaskView):
             audit_message,
         )
         db.session.commit()
+        invalidate_sensor_data_cache(sensor.id, start=start, end=until)
 
         return {}, 204
 
@@ -1684,3 +1684,68 @@ def test_get_asset_chart_with_annotation_layers(
         if param["name"].startswith("annotation_")
     ]
     assert len(all_param_names) == len(set(all_param_names))
+
+
+@pytest.mark.parametrize("requesting_user", ["test_admin_user@seita.nl"], indirect=True)
+def test_get_asset_sensors_status(db, client, capacity_sensors, requesting_user):
+    """Get the statuses of the sensors of an asset in one call, and compare with the per-sensor endpoint."""
+    sensor = capacity_sensors["production"]
+    asset = sensor.generic_asset
+    asset.sensors_to_show = [sensor.id]
+    db.session.flush()
+
+    response = client.get(url_for("AssetAPI:get_sensors_status", id=asset.id))
+    print("Server responded with:\n%s" % response.json)
+    assert response.status_code == 200
+    sensor_statuses = [s for s in response.json["sensors_data"] if s["id"] == sensor.id]
+    assert [s["source_type"] for s in sensor_statuses] == ["scheduler", "demo script"]
+    for status in sensor_statuses:
+        assert status["name"] == sensor.name
+        assert status["resolution"] == "PT15M"
+        assert status["relation"] == "sensor belongs to this asset"
+
+    response = client.get(url_for("SensorAPI:get_status", id=sensor.id))
+    assert response.status_code == 200
+    assert [
+        (s["source_type"], s["staleness_since"], s["stale"])
+        for s in response.json["sensors_data"]
+    ] == [(s["source_type"], s["staleness_since"], s["stale"]) for s in sensor_statuses]
+
+    # Reset module-scoped fixture state so later tests are not affected.
+    asset.sensors_to_show = []
+
+
+@pytest.mark.parametrize(
+    "requesting_user", ["test_prosumer_user@seita.nl"], indirect=True
+)
+def test_get_asset_sensors_status_leaves_out_unreadable_sensors(
+    db, client, capacity_sensors, setup_generic_assets, requesting_user
+):
+    """The flex-context and sensors to show may refer to sensors of other accounts, whose statuses are not reported."""
+    sensor = capacity_sensors["production"]
+    asset = sensor.generic_asset
+    other_account_sensor = Sensor(
+        name="wind speed",
+        generic_asset=setup_generic_assets["test_wind_turbine"],
+        unit="m/s",
+        event_resolution="PT15M",
+    )
+    db.session.add(other_account_sensor)
+    db.session.flush()
+    assert other_account_sensor.generic_asset.account_id != requesting_user.account_id
+    asset.sensors_to_show = [sensor.id, other_account_sensor.id]
+    flex_context = asset.flex_context
+    asset.flex_context = {"consumption-price": {"sensor": other_account_sensor.id}}
+    db.session.flush()
+
+    response = client.get(url_for("AssetAPI:get_sensors_status", id=asset.id))
+    print("Server responded with:\n%s" % response.json)
+    assert response.status_code == 200
+    sensor_ids = {s["id"] for s in response.json["sensors_data"]}
+    assert sensor.id in sensor_ids
+    assert other_account_sensor.id not in sensor_ids
+
+    # Reset module-scoped fixture state so later tests are not affected.
+    asset.sensors_to_show = []
+    asset.flex_context = flex_context
+    db.session.delete(other_account_sensor)
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
 from datetime import timedelta
+import io
+import json
 from flask import current_app, url_for
 import pandas as pd
 import pytest
@@ -93,6 +95,115 @@ def test_get_sensor_data(
     assert values == expected
 
 
+@pytest.mark.parametrize("resolution", ["PT10M", "PT20M", "PT5M"])
+@pytest.mark.parametrize(
+    "requesting_user", ["test_supplier_user_4@seita.nl"], indirect=True
+)
+def test_get_sensor_data_streamed_and_paginated(
+    client,
+    setup_api_test_data: dict[str, Sensor],
+    requesting_user,
+    resolution,
+    monkeypatch,
+):
+    """Check that streaming (in each format) and paginating the sensor data gives the same values as getting them all at once."""
+    sensor = setup_api_test_data["some gas sensor"]
+    message = {
+        "start": "2021-05-01T23:00:00+02:00",
+        "duration": "PT1H40M",
+        "unit": "m³/h",
+        "resolution": resolution,
+    }
+    url = url_for("SensorAPI:get_data", id=sensor.id)
+    response = client.get(url, query_string=message)
+    assert response.status_code == 200
+    expected = response.json
+    assert any(value is not None for value in expected["values"])
+
+    # Load the data in chunks of (about) 2 events
+    monkeypatch.setitem(
+        current_app.config, "FLEXMEASURES_SENSOR_DATA_STREAM_CHUNK_SIZE", 2
+    )
+    response = client.get(url, query_string={**message, "stream": True})
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.json == expected
+
+    index = pd.date_range(
+        message["start"],
+        periods=len(expected["values"]),
+        freq=pd.Timedelta(resolution),
+    )
+    response = client.get(url, query_string={**message, "format": "ndjson"})
+    assert response.mimetype == "application/x-ndjson"
+    assert [json.loads(line) for line in response.text.splitlines()] == [
+        dict(event_start=event_start.isoformat(), event_value=value)
+        for event_start, value in zip(index, expected["values"])
+    ]
+
+    response = client.get(url, query_string={**message, "format": "csv"})
+    assert response.mimetype == "text/csv"
+    df = pd.read_csv(io.StringIO(response.text), parse_dates=["event_start"])
+    assert df["event_start"].tolist() == index.tolist()
+    assert df["event_value"].tolist() == pytest.approx(
+        [float("nan") if v is None else v for v in expected["values"]], nan_ok=True
+    )
+
+    # Walk through the pages, 3 values at a time
+    values = []
+    cursor = None
+    while True:
+        response = client.get(
+            url,
+            query_string={
+                **message,
+                "page-size": 3,
+                **({"cursor": cursor} if cursor else {}),
+            },
+        )
+        assert response.status_code == 200
+        assert len(response.json["values"]) <= 3
+        values += response.json["values"]
+        cursor = response.json.get("next-cursor")
+        if cursor is None:
+            break
+    assert values == expected["values"]
+
+
+@pytest.mark.parametrize(
+    "message, error_field",
+    [
+        ({"stream": True, "page-size": 3}, "page-size"),
+        ({"format": "csv", "page-size": 3}, "page-size"),
+        ({"cursor": "not a cursor", "page-size": 3}, "cursor"),
+        ({"cursor": "MjAyMS0wNS0wMlQwMDowMDowMCswMjowMA=="}, "cursor"),
+        ({"cursor": "MTk5OS0wMS0wMVQwMDowMDowMCswMDowMA==", "page-size": 3}, "cursor"),
+    ],
+)
+@pytest.mark.parametrize(
+    "requesting_user", ["test_supplier_user_4@seita.nl"], indirect=True
+)
+def test_get_sensor_data_with_invalid_pagination(
+    client,
+    setup_api_test_data: dict[str, Sensor],
+    requesting_user,
+    message,
+    error_field,
+):
+    sensor = setup_api_test_data["some gas sensor"]
+    response = client.get(
+        url_for("SensorAPI:get_data", id=sensor.id),
+        query_string={
+            "start": "2021-05-02T00:00:00+02:00",
+            "duration": "PT1H20M",
+            "unit": "m³/h",
+            **message,
+        },
+    )
+    assert response.status_code == 422
+    assert error_field in response.json["message"]["combined_sensor_data_description"]
+
+
 @pytest.mark.parametrize(
     "requesting_user", ["test_supplier_user_4@seita.nl"], indirect=True
 )
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import pandas as pd
 import pytest
+import timely_beliefs as tb
 from flask import url_for
 from timely_beliefs.tests.utils import equal_lists
 from sqlalchemy import select
@@ -9,6 +10,19 @@ from sqlalchemy import select
 from flexmeasures import Source
 from flexmeasures.api.v3_0.tests.utils import make_sensor_data_request_for_gas_sensor
 from flexmeasures.data.models.time_series import TimedBelief
+from flexmeasures.data.services import data_ingestion
+from flexmeasures.data.services.data_ingestion import IngestionBatchWorker
+from flexmeasures.data.services.sensor_data_cache import (
+    cache_response,
+    get_cache_generation,
+    get_cached_etag,
+    invalidate_sensor_data_cache,
+)
+from flexmeasures.data.utils import (
+    SAVE_TO_DB_SUCCESS,
+    SAVE_TO_DB_SUCCESS_BUT_NOTHING_NEW,
+    save_to_db,
+)
 
 
 @pytest.mark.parametrize(
@@ -198,3 +212,262 @@ def test_post_sensor_data_sets_account_id_on_data_source(
     ).scalar_one_or_none()
     assert data_source is not None
     assert data_source.account_id == setup_user_without_data_source.account_id
+
+
+@pytest.mark.parametrize(
+    "requesting_user", ["test_supplier_user_4@seita.nl"], indirect=True
+)
+def test_get_sensor_data_from_cache(
+    client,
+    app,
+    setup_api_fresh_test_data,
+    requesting_user,
+    monkeypatch,
+):
+    """Unchanged sensor data is served from the cache, with an ETag,
+    until data is posted for an overlapping time window."""
+    monkeypatch.setitem(app.config, "FLEXMEASURES_SENSOR_DATA_CACHE_TTL", 60)
+    sensor = setup_api_fresh_test_data["some gas sensor"]
+    url = url_for("SensorAPI:get_data", id=sensor.id)
+    message = {
+        "start": "2021-06-07T00:00:00+02:00",
+        "duration": "PT1H",
+        "unit": "m³/h",
+    }
+    response = client.get(url, query_string=message)
+    assert response.status_code == 200
+    assert response.json["values"] == [None] * 6
+    etag = response.headers["ETag"]
+
+    # Clients that already have the data get an empty response
+    response = client.get(url, query_string=message, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.data == b""
+
+    # Posting data for another time window keeps the cached response
+    post_data = make_sensor_data_request_for_gas_sensor(unit="m³/h")
+    post_data["start"] = "2021-06-08T00:00:00+02:00"
+    assert (
+        client.post(
+            url_for("SensorAPI:post_data", id=sensor.id), json=post_data
+        ).status_code
+        == 200
+    )
+    response = client.get(url, query_string=message, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+    # Posting data for an overlapping time window invalidates the cached response
+    post_data = make_sensor_data_request_for_gas_sensor(unit="m³/h")
+    assert (
+        client.post(
+            url_for("SensorAPI:post_data", id=sensor.id), json=post_data
+        ).status_code
+        == 200
+    )
+    response = client.get(url, query_string=message, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json["values"] == [-11.28] * 6
+    assert response.headers["ETag"] != etag
+
+
+@pytest.mark.parametrize(
+    "requesting_user", ["test_supplier_user_4@seita.nl"], indirect=True
+)
+def test_sensor_data_cache_is_invalidated_after_commit(
+    client,
+    app,
+    db,
+    setup_api_fresh_test_data,
+    requesting_user,
+    monkeypatch,
+):
+    """Requests that load data while other data is being saved and committed cannot keep the old data cached."""
+    monkeypatch.setitem(app.config, "FLEXMEASURES_SENSOR_DATA_CACHE_TTL", 60)
+    sensor = setup_api_fresh_test_data["some gas sensor"]
+    # Start without responses cached by earlier tests (a fresh database reuses sensor IDs)
+    invalidate_sensor_data_cache(sensor.id)
+    url = url_for("SensorAPI:get_data", id=sensor.id)
+    message = {
+        "start": "2021-06-07T00:00:00+02:00",
+        "duration": "PT1H",
+        "unit": "m³/h",
+    }
+    response = client.get(url, query_string=message)
+    assert response.status_code == 200
+    old_response = response.json
+    etag = response.headers["ETag"]
+
+    (digest,) = app.redis_connection.hkeys(f"sensor-data:{sensor.id}")
+    cache_key = f"sensor-data:{sensor.id}:{digest.decode()}"
+
+    # Another request starts loading the data
+    generation = get_cache_generation(sensor.id)
+
+    # Meanwhile, data is saved, but until it is committed, the cached response is kept
+    bdf = tb.BeliefsDataFrame(
+        pd.DataFrame(
+            {
+                "event_start": pd.date_range(
+                    "2021-06-07T00:00+02:00", periods=6, freq="10min"
+                ),
+                "belief_horizon": pd.Timedelta(0),
+                "event_value": -11.28,
+                "source": db.session.get(Source, 1),
+            }
+        ),
+        sensor=sensor,
+    )
+    assert save_to_db(bdf) == SAVE_TO_DB_SUCCESS
+    assert get_cached_etag(cache_key) == etag.strip('"')
+    db.session.commit()
+    assert get_cached_etag(cache_key) is None
+
+    # The other request, which may have loaded the old data, cannot cache it after the commit
+    start = pd.Timestamp(message["start"])
+    cache_response(
+        cache_key,
+        sensor_id=sensor.id,
+        start=start,
+        end=start + pd.Timedelta(hours=1),
+        response=old_response,
+        generation=generation,
+    )
+    assert get_cached_etag(cache_key) is None
+
+    # After the commit, the new data is served
+    response = client.get(url, query_string=message, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json["values"] == [-11.28] * 6
+    assert response.headers["ETag"] != etag
+
+
+@pytest.mark.parametrize(
+    "requesting_user", ["test_supplier_user_4@seita.nl"], indirect=True
+)
+def test_post_sensor_data_in_ingestion_batch(
+    client,
+    app,
+    setup_api_fresh_test_data,
+    requesting_user,
+    monkeypatch,
+    db,
+):
+    """Ingestion jobs are saved in one batch, while each job reports its own status."""
+    monkeypatch.setattr(
+        "flexmeasures.api.common.utils.api_utils.Worker.all",
+        lambda queue: [object()],
+    )
+    saved_batches = []
+    monkeypatch.setattr(
+        data_ingestion,
+        "save_to_db",
+        lambda data, **kwargs: saved_batches.append(data) or save_to_db(data, **kwargs),
+    )
+    queue = app.queues["ingestion"]
+    queue.empty()
+    sensor = setup_api_fresh_test_data["some gas sensor"]
+    url = url_for("SensorAPI:post_data", id=sensor.id)
+
+    first_hour = make_sensor_data_request_for_gas_sensor(unit="m³/h")
+    second_hour = dict(first_hour, start="2021-06-07T01:00:00+02:00")
+    job_ids = [
+        client.post(url, json=post_data).json["job_id"]
+        for post_data in (first_hour, first_hour, second_hour)
+    ]
+    # A job whose data cannot be loaded is left out of the batch
+    job_ids.append(
+        queue.enqueue(
+            data_ingestion.add_beliefs_to_db_and_enqueue_forecasting_jobs,
+            sensor_id=-1,
+            user_id=requesting_user.id,
+            sensor_data=first_hour,
+        ).id
+    )
+
+    worker = IngestionBatchWorker([queue], connection=queue.connection, batch_size=10)
+    worker.work(burst=True)
+
+    jobs = [queue.fetch_job(job_id) for job_id in job_ids]
+    assert [job.get_status() for job in jobs] == [
+        "finished",
+        "finished",
+        "finished",
+        "failed",
+    ]
+    # The identical second post is attributed to the first job
+    assert [job.return_value() for job in jobs[:3]] == [
+        SAVE_TO_DB_SUCCESS,
+        SAVE_TO_DB_SUCCESS_BUT_NOTHING_NEW,
+        SAVE_TO_DB_SUCCESS,
+    ]
+    # The invalid job fails upon loading its data, before saving anything
+    assert len(saved_batches) == 1
+    beliefs = db.session.scalars(
+        select(TimedBelief).filter(
+            TimedBelief.sensor_id == sensor.id,
+            TimedBelief.event_start >= first_hour["start"],
+        )
+    ).all()
+    assert len(beliefs) == 12
+
+
+@pytest.mark.parametrize(
+    "requesting_user", ["test_supplier_user_4@seita.nl"], indirect=True
+)
+def test_post_reverted_sensor_data_in_ingestion_batch(
+    client,
+    app,
+    setup_api_fresh_test_data,
+    requesting_user,
+    monkeypatch,
+    db,
+):
+    """A value that reverts to an earlier value is saved, as it would be when running the jobs one by one."""
+    monkeypatch.setattr(
+        "flexmeasures.api.common.utils.api_utils.Worker.all",
+        lambda queue: [object()],
+    )
+    queue = app.queues["ingestion"]
+    queue.empty()
+    sensor = setup_api_fresh_test_data["some gas sensor"]
+    url = url_for("SensorAPI:post_data", id=sensor.id)
+
+    job_ids = []
+    for value, prior in (
+        (5, "2021-06-06T10:00:00+02:00"),
+        (6, "2021-06-06T11:00:00+02:00"),
+        (5, "2021-06-06T12:00:00+02:00"),
+    ):
+        post_data = make_sensor_data_request_for_gas_sensor(num_values=1, unit="m³/h")
+        post_data.pop("horizon")
+        post_data.update(values=value, duration="PT10M", prior=prior)
+        job_ids.append(client.post(url, json=post_data).json["job_id"])
+
+    # While the batch is saved, all of its jobs are registered as started
+    started_job_ids = []
+    save_ingestion_batch = data_ingestion.save_ingestion_batch
+    monkeypatch.setattr(
+        data_ingestion,
+        "save_ingestion_batch",
+        lambda jobs: started_job_ids.extend(queue.started_job_registry.get_job_ids())
+        or save_ingestion_batch(jobs),
+    )
+
+    worker = IngestionBatchWorker([queue], connection=queue.connection, batch_size=10)
+    worker.work(burst=True)
+
+    assert sorted(started_job_ids) == sorted(job_ids)
+    assert [queue.fetch_job(job_id).return_value() for job_id in job_ids] == [
+        SAVE_TO_DB_SUCCESS
+    ] * 3
+    beliefs = db.session.scalars(
+        select(TimedBelief)
+        .filter(
+            TimedBelief.sensor_id == sensor.id,
+            TimedBelief.event_start == "2021-06-07T00:00:00+02:00",
+        )
+        .order_by(TimedBelief.belief_horizon.desc())
+    ).all()
+    assert [belief.event_value for belief in beliefs] == [5, 6, 5]
+    # No job is left in the started registry
+    assert queue.started_job_registry.get_job_ids() == []
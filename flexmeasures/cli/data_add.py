@@ -92,7 +92,7 @@ from flexmeasures.utils import flexmeasures_inflection
 from flexmeasures.utils.time_utils import server_now, apply_offset_chain
 from flexmeasures.utils.unit_utils import convert_units, ur
 from flexmeasures.cli.utils import validate_color_cli, validate_url_cli
-from flexmeasures.data.utils import save_to_db
+from flexmeasures.data.utils import copy_beliefs_to_db, save_to_db
 from flexmeasures.data.services.utils import get_asset_or_sensor_ref
 from flexmeasures.data.models.reporting.profit import ProfitOrLossReporter
 
@@ -601,6 +601,14 @@ def add_source(
     help="Allow overwriting possibly already existing data.\n"
     "Not allowing overwriting can be much more efficient",
 )
+@click.option(
+    "--bulk-copy",
+    "bulk_copy",
+    is_flag=True,
+    default=False,
+    help="Stream the data into the database using PostgreSQL's COPY command.\n"
+    "Much more efficient for large files, such as backfills of (tens of) millions of rows.",
+)
 @click.option(
     "--skiprows",
     required=False,
@@ -702,6 +710,7 @@ def add_beliefs(
     cp: float | None = None,
     resample: bool = True,
     allow_overwrite: bool = False,
+    bulk_copy: bool = False,
     skiprows: int = 1,
     na_values: list[str] | None = None,
     keep_default_na: bool = False,
@@ -791,13 +800,17 @@ def add_beliefs(
             event_resolution=sensor.event_resolution,
         )
     try:
-        TimedBelief.add(
-            bdf,
-            expunge_session=True,
-            allow_overwrite=allow_overwrite,
-            bulk_save_objects=True,
-            commit_transaction=True,
-        )
+        if bulk_copy:
+            copy_beliefs_to_db(bdf, allow_overwrite=allow_overwrite)
+            db.session.commit()
+        else:
+            TimedBelief.add(
+                bdf,
+                expunge_session=True,
+                allow_overwrite=allow_overwrite,
+                bulk_save_objects=True,
+                commit_transaction=True,
+            )
         click.secho(f"Successfully created beliefs\n{bdf}", **MsgStyle.SUCCESS)
     except IntegrityError as e:
         db.session.rollback()
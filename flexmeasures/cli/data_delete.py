@@ -418,7 +418,11 @@ def delete_beliefs(  # noqa: C901
     if start is not None:
         event_filters += [TimedBelief.event_start >= start]
     if end is not None:
-        event_filters += [TimedBelief.event_start + Sensor.event_resolution <= end]
+        event_filters += [
+            TimedBelief.event_start + Sensor.event_resolution <= end,
+            # redundant, but lets the database skip the partitions of later months
+            TimedBelief.event_start <= end,
+        ]
 
     # Entity filter
     entity_filters = []
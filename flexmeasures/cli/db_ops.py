@@ -1,5 +1,7 @@
 """CLI commands for saving, resetting, etc of the database"""
 
+from __future__ import annotations
+
 from datetime import datetime
 import subprocess
 
@@ -7,8 +9,18 @@ from flask import current_app as app
 from flask.cli import with_appcontext
 import flask_migrate as migrate
 import click
+import pandas as pd
 
-from flexmeasures.cli.utils import MsgStyle
+from flexmeasures.cli.utils import MsgStyle, abort, done
+from flexmeasures.data import db
+from flexmeasures.data.schemas import AwareDateTimeField
+from flexmeasures.data.services.belief_partitions import (
+    create_belief_partitions,
+    drop_belief_partitions,
+    get_belief_partitions,
+)
+from flexmeasures.utils.flexmeasures_inflection import join_words_into_a_list
+from flexmeasures.utils.time_utils import server_now
 
 
 @click.group("db-ops")
@@ -58,7 +70,7 @@ def dump():
     db_name = db_host_and_db_name.split("/")[-1]
     time_of_saving = datetime.now().strftime("%F-%H%M")
     dump_filename = f"pgbackup_{db_name}_{time_of_saving}.dump"
-    command_for_dumping = f"pg_dump --no-privileges --no-owner --data-only --format=c --file={dump_filename} '{db_uri}'"
+    command_for_dumping = f"pg_dump --no-privileges --no-owner --data-only --load-via-partition-root --format=c --file={dump_filename} '{db_uri}'"
     try:
         subprocess.check_output(command_for_dumping, shell=True)
         click.secho(f"db dump successful: saved to {dump_filename}", **MsgStyle.SUCCESS)
@@ -95,4 +107,83 @@ def restore(file: str):
         click.secho("db restore unsuccessful", **MsgStyle.ERROR)
 
 
+@fm_db_ops.command("create-belief-partitions")
+@with_appcontext
+@click.option(
+    "--start",
+    "start",
+    type=AwareDateTimeField(),
+    required=False,
+    help="Create partitions for beliefs about events starting from this datetime (by default, now). Follow up with a timezone-aware datetime in ISO 6801 format.",
+)
+@click.option(
+    "--end",
+    "end",
+    type=AwareDateTimeField(),
+    required=False,
+    help="Create partitions for beliefs about events starting before this datetime (by default, 3 months after the start). Follow up with a timezone-aware datetime in ISO 6801 format.",
+)
+def create_partitions(start: datetime | None = None, end: datetime | None = None):
+    """Create the monthly partitions of the timed_belief table, for beliefs about events in a given period.
+
+    Run this regularly (e.g. monthly, in a cron job), so that new beliefs do not end up in the default partition.
+    Beliefs in the default partition are moved to the newly created partitions.
+    """
+    if start is None:
+        start = server_now()
+    if end is None:
+        end = pd.Timestamp(start) + pd.DateOffset(months=3)
+    if start > end:
+        abort("Start should not exceed end.")
+    partitions = create_belief_partitions(db.session, start=start, end=end)
+    db.session.commit()
+    if not partitions:
+        done("All partitions already exist.")
+        return
+    done(
+        f"Created partitions {join_words_into_a_list([partition.name for partition in partitions])}."
+    )
+
+
+@fm_db_ops.command("drop-belief-partitions")
+@with_appcontext
+@click.option(
+    "--before",
+    "before",
+    type=AwareDateTimeField(),
+    required=True,
+    help="Drop the partitions holding only beliefs about events starting before this datetime. Follow up with a timezone-aware datetime in ISO 6801 format.",
+)
+@click.option(
+    "--detach",
+    "detach_only",
+    is_flag=True,
+    default=False,
+    help="Detach the partitions rather than dropping them, which keeps their beliefs in standalone tables (e.g. for archiving).",
+)
+@click.option(
+    "--force/--no-force", default=False, help="Skip warning about consequences."
+)
+def drop_partitions(before: datetime, detach_only: bool = False, force: bool = False):
+    """Drop old monthly partitions of the timed_belief table, as a much faster alternative to deleting old beliefs.
+
+    Beliefs in the default partition are left alone (see `flexmeasures delete beliefs`).
+    """
+    partitions = [
+        partition
+        for partition in get_belief_partitions(db.session)
+        if partition.end <= before
+    ]
+    if not partitions:
+        done("No partitions found.")
+        return
+    names = join_words_into_a_list([partition.name for partition in partitions])
+    if not force:
+        action = "Detach" if detach_only else "Drop (and permanently delete)"
+        click.confirm(f"{action} partitions {names}?", abort=True)
+    drop_belief_partitions(db.session, before=before, detach_only=detach_only)
+    db.session.commit()
+    done(f"{'Detached' if detach_only else 'Dropped'} partitions {names}.")
+
+
 app.cli.add_command(fm_db_ops)
@@ -33,6 +33,7 @@ import pandas as pd
 from flexmeasures.data.schemas import AssetIdField, SensorIdField
 from flexmeasures.data.services.scheduling import handle_scheduling_exception
 from flexmeasures.data.services.forecasting import handle_forecasting_exception
+from flexmeasures.data.services.data_ingestion import IngestionBatchWorker
 from flexmeasures.utils.job_utils import work_on_rq
 from flexmeasures.cli.utils import MsgStyle
 from flexmeasures.utils.flexmeasures_inflection import join_words_into_a_list
@@ -373,7 +374,31 @@ def inspect_job(job_id: str):
         "Default: enabled. Use --without-scheduler to disable."
     ),
 )
-def run_worker(queue: str, name: str | None, with_scheduler: bool):
+@click.option(
+    "--batch-size",
+    "batch_size",
+    type=click.IntRange(min=1),
+    default=1,
+    help=(
+        "Save the data of up to this many pending ingestion jobs in one transaction, "
+        "merging the beliefs posted for the same sensor. Jobs are then run within the worker process, "
+        "rather than in a forked work horse. Default: 1 (no batching)."
+    ),
+)
+@click.option(
+    "--fork/--no-fork",
+    "fork",
+    default=True,
+    help=(
+        "Run each job in a forked work horse (the default on Linux), or within the worker process itself. "
+        "Without forking, state kept in memory survives between jobs, such as the scheduling models kept for reuse "
+        "(see FLEXMEASURES_LP_MODEL_CACHE_SIZE), at the expense of isolating jobs from each other. "
+        "On macOS, jobs are never forked."
+    ),
+)
+def run_worker(
+    queue: str, name: str | None, with_scheduler: bool, batch_size: int, fork: bool
+):
     """
     Start a worker process for forecasting, scheduling and/or ingestion jobs.
 
@@ -408,7 +433,15 @@ def run_worker(queue: str, name: str | None, with_scheduler: bool):
     # segmentation fault due to reinitialization of SSL state in forked children.
     # SimpleWorker executes jobs in-process (no fork) and is therefore the correct
     # choice for macOS development environments.
-    if sys.platform == "darwin":
+    if batch_size > 1:
+        worker = IngestionBatchWorker(
+            q_list,
+            connection=connection,
+            name=used_name,
+            exception_handlers=[error_handler],
+            batch_size=batch_size,
+        )
+    elif sys.platform == "darwin" or not fork:
         worker = SimpleWorker(
             q_list,
             connection=connection,
@@ -0,0 +1,42 @@
+from sqlalchemy import func, select
+
+from flexmeasures.cli.tests.utils import check_command_ran_without_error, to_flags
+from flexmeasures.data.models.time_series import TimedBelief
+from flexmeasures.data.services.belief_partitions import get_belief_partitions
+
+
+def test_create_and_drop_belief_partitions(app, fresh_db, setup_dummy_data):
+    from flexmeasures.cli.db_ops import create_partitions, drop_partitions
+
+    runner = app.test_cli_runner()
+    result = runner.invoke(
+        create_partitions,
+        to_flags(
+            {
+                "start": "2023-03-01T00:00+00:00",
+                "end": "2023-05-01T00:00+00:00",
+            }
+        ),
+    )
+    check_command_ran_without_error(result)
+    assert "timed_belief_y2023m03 and timed_belief_y2023m04" in result.output
+    assert [p.name for p in get_belief_partitions(fresh_db.session)] == [
+        "timed_belief_y2023m03",
+        "timed_belief_y2023m04",
+    ]
+
+    # The beliefs (about events in April 2023) are only removed once the April partition is dropped
+    n_beliefs = fresh_db.session.scalar(select(func.count()).select_from(TimedBelief))
+    for before, n_beliefs_left in (
+        ("2023-04-30T00:00+00:00", n_beliefs),
+        ("2023-05-01T00:00+00:00", 0),
+    ):
+        result = runner.invoke(
+            drop_partitions, to_flags({"before": before}) + ["--force"]
+        )
+        check_command_ran_without_error(result)
+        assert (
+            fresh_db.session.scalar(select(func.count()).select_from(TimedBelief))
+            == n_beliefs_left
+        )
+    assert get_belief_partitions(fresh_db.session) == []
@@ -0,0 +1,282 @@
+"""add daily belief summary
+
+Revision ID: 7c3d5e8f9a1b
+Revises: 4b0f2e9c1a6d
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "7c3d5e8f9a1b"
+down_revision = "4b0f2e9c1a6d"
+branch_labels = None
+depends_on = None
+
+# Frozen copy of flexmeasures.data.models.belief_summaries.SUMMARY_FUNCTIONS_AND_TRIGGERS_SQL
+SUMMARY_FUNCTIONS_AND_TRIGGERS_SQL = """
+CREATE OR REPLACE FUNCTION daily_belief_summary_insert() RETURNS trigger AS $$
+BEGIN
+    -- Add the new beliefs to the summaries (min and max are idempotent, so also safe after a recomputation)
+    INSERT INTO daily_belief_summary AS d (sensor_id, source_id, day, belief_count, value_count, value_sum, min_value, max_value, min_event_start, max_event_start, last_recorded)
+
+    SELECT
+        b.sensor_id,
+        b.source_id,
+        date_trunc('day', b.event_start, 'UTC') AS day,
+        count(b.event_value) AS belief_count,
+        count(b.event_value) FILTER (WHERE b.event_value != 'NaN') AS value_count,
+        coalesce(sum(b.event_value) FILTER (WHERE b.event_value != 'NaN'), 0) AS value_sum,
+        min(b.event_value) FILTER (WHERE b.event_value != 'NaN') AS min_value,
+        max(b.event_value) FILTER (WHERE b.event_value != 'NaN') AS max_value,
+        min(b.event_start) AS min_event_start,
+        max(b.event_start) AS max_event_start,
+        max(b.event_start + s.event_resolution - b.belief_horizon) AS last_recorded
+    FROM new_beliefs b
+    JOIN sensor s ON s.id = b.sensor_id
+
+    GROUP BY b.sensor_id, b.source_id, date_trunc('day', b.event_start, 'UTC')
+
+    ON CONFLICT (sensor_id, source_id, day) DO UPDATE SET
+        belief_count = d.belief_count + excluded.belief_count,
+        value_count = d.value_count + excluded.value_count,
+        value_sum = d.value_sum + excluded.value_sum,
+        min_value = least(d.min_value, excluded.min_value),
+        max_value = greatest(d.max_value, excluded.max_value),
+        min_event_start = least(d.min_event_start, excluded.min_event_start),
+        max_event_start = greatest(d.max_event_start, excluded.max_event_start),
+        last_recorded = greatest(d.last_recorded, excluded.last_recorded);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION daily_belief_summary_update() RETURNS trigger AS $$
+BEGIN
+    -- Apply the changes in counts and sums
+    -- (rather than recomputing them, because an INSERT ... ON CONFLICT DO UPDATE statement
+    -- also fires the insert trigger, which adds the inserted beliefs)
+    INSERT INTO daily_belief_summary AS d (sensor_id, source_id, day, belief_count, value_count, value_sum, min_value, max_value, min_event_start, max_event_start, last_recorded)
+    SELECT sensor_id, source_id, day, sum(belief_count), sum(value_count), sum(value_sum),
+        min(min_value), max(max_value), min(min_event_start), max(max_event_start), max(last_recorded)
+    FROM (
+
+    SELECT
+        b.sensor_id,
+        b.source_id,
+        date_trunc('day', b.event_start, 'UTC') AS day,
+        count(b.event_value) AS belief_count,
+        count(b.event_value) FILTER (WHERE b.event_value != 'NaN') AS value_count,
+        coalesce(sum(b.event_value) FILTER (WHERE b.event_value != 'NaN'), 0) AS value_sum,
+        min(b.event_value) FILTER (WHERE b.event_value != 'NaN') AS min_value,
+        max(b.event_value) FILTER (WHERE b.event_value != 'NaN') AS max_value,
+        min(b.event_start) AS min_event_start,
+        max(b.event_start) AS max_event_start,
+        max(b.event_start + s.event_resolution - b.belief_horizon) AS last_recorded
+    FROM new_beliefs b
+    JOIN sensor s ON s.id = b.sensor_id
+
+    GROUP BY b.sensor_id, b.source_id, date_trunc('day', b.event_start, 'UTC')
+
+        UNION ALL
+        SELECT sensor_id, source_id, day, -belief_count, -value_count, -value_sum,
+            min_value, max_value, min_event_start, max_event_start, last_recorded
+        FROM (
+    SELECT
+        b.sensor_id,
+        b.source_id,
+        date_trunc('day', b.event_start, 'UTC') AS day,
+        count(b.event_value) AS belief_count,
+        count(b.event_value) FILTER (WHERE b.event_value != 'NaN') AS value_count,
+        coalesce(sum(b.event_value) FILTER (WHERE b.event_value != 'NaN'), 0) AS value_sum,
+        min(b.event_value) FILTER (WHERE b.event_value != 'NaN') AS min_value,
+        max(b.event_value) FILTER (WHERE b.event_value != 'NaN') AS max_value,
+        min(b.event_start) AS min_event_start,
+        max(b.event_start) AS max_event_start,
+        max(b.event_start + s.event_resolution - b.belief_horizon) AS last_recorded
+    FROM old_beliefs b
+    JOIN sensor s ON s.id = b.sensor_id
+
+    GROUP BY b.sensor_id, b.source_id, date_trunc('day', b.event_start, 'UTC')
+) old_aggregates
+    ) changes
+    GROUP BY sensor_id, source_id, day
+    ON CONFLICT (sensor_id, source_id, day) DO UPDATE SET
+        belief_count = d.belief_count + excluded.belief_count,
+        value_count = d.value_count + excluded.value_count,
+        value_sum = d.value_sum + excluded.value_sum;
+    -- Recompute the other aggregates from the stored beliefs
+    UPDATE daily_belief_summary d SET
+        min_value = r.min_value,
+        max_value = r.max_value,
+        min_event_start = r.min_event_start,
+        max_event_start = r.max_event_start,
+        last_recorded = r.last_recorded
+    FROM (
+    SELECT
+        b.sensor_id,
+        b.source_id,
+        date_trunc('day', b.event_start, 'UTC') AS day,
+        count(b.event_value) AS belief_count,
+        count(b.event_value) FILTER (WHERE b.event_value != 'NaN') AS value_count,
+        coalesce(sum(b.event_value) FILTER (WHERE b.event_value != 'NaN'), 0) AS value_sum,
+        min(b.event_value) FILTER (WHERE b.event_value != 'NaN') AS min_value,
+        max(b.event_value) FILTER (WHERE b.event_value != 'NaN') AS max_value,
+        min(b.event_start) AS min_event_start,
+        max(b.event_start) AS max_event_start,
+        max(b.event_start + s.event_resolution - b.belief_horizon) AS last_recorded
+    FROM timed_belief b
+    JOIN sensor s ON s.id = b.sensor_id
+
+    JOIN (
+    SELECT DISTINCT sensor_id, source_id, date_trunc('day', event_start, 'UTC') AS day
+    FROM new_beliefs
+UNION
+    SELECT DISTINCT sensor_id, source_id, date_trunc('day', event_start, 'UTC') AS day
+    FROM old_beliefs
+) a
+    ON b.sensor_id = a.sensor_id
+    AND b.source_id = a.source_id
+    AND b.event_start >= a.day
+    AND b.event_start < a.day + interval '1 day'
+
+    GROUP BY b.sensor_id, b.source_id, date_trunc('day', b.event_start, 'UTC')
+) r
+    WHERE d.sensor_id = r.sensor_id AND d.source_id = r.source_id AND d.day = r.day;
+    -- Remove summaries of days without beliefs (only possible if the update moved beliefs to another day)
+    DELETE FROM daily_belief_summary d
+    USING (
+    SELECT DISTINCT sensor_id, source_id, date_trunc('day', event_start, 'UTC') AS day
+    FROM old_beliefs
+) a
+    WHERE d.sensor_id = a.sensor_id AND d.source_id = a.source_id AND d.day = a.day
+    AND d.belief_count <= 0;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION daily_belief_summary_delete() RETURNS trigger AS $$
+BEGIN
+    -- Recompute the summaries of the affected days from the remaining beliefs
+    DELETE FROM daily_belief_summary d
+    USING (
+    SELECT DISTINCT sensor_id, source_id, date_trunc('day', event_start, 'UTC') AS day
+    FROM old_beliefs
+) a
+    WHERE d.sensor_id = a.sensor_id AND d.source_id = a.source_id AND d.day = a.day;
+    INSERT INTO daily_belief_summary (sensor_id, source_id, day, belief_count, value_count, value_sum, min_value, max_value, min_event_start, max_event_start, last_recorded)
+
+    SELECT
+        b.sensor_id,
+        b.source_id,
+        date_trunc('day', b.event_start, 'UTC') AS day,
+        count(b.event_value) AS belief_count,
+        count(b.event_value) FILTER (WHERE b.event_value != 'NaN') AS value_count,
+        coalesce(sum(b.event_value) FILTER (WHERE b.event_value != 'NaN'), 0) AS value_sum,
+        min(b.event_value) FILTER (WHERE b.event_value != 'NaN') AS min_value,
+        max(b.event_value) FILTER (WHERE b.event_value != 'NaN') AS max_value,
+        min(b.event_start) AS min_event_start,
+        max(b.event_start) AS max_event_start,
+        max(b.event_start + s.event_resolution - b.belief_horizon) AS last_recorded
+    FROM timed_belief b
+    JOIN sensor s ON s.id = b.sensor_id
+
+    JOIN (
+    SELECT DISTINCT sensor_id, source_id, date_trunc('day', event_start, 'UTC') AS day
+    FROM old_beliefs
+) a
+    ON b.sensor_id = a.sensor_id
+    AND b.source_id = a.source_id
+    AND b.event_start >= a.day
+    AND b.event_start < a.day + interval '1 day'
+
+    GROUP BY b.sensor_id, b.source_id, date_trunc('day', b.event_start, 'UTC')
+;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS daily_belief_summary_insert ON timed_belief;
+CREATE TRIGGER daily_belief_summary_insert
+    AFTER INSERT ON timed_belief
+    REFERENCING NEW TABLE AS new_beliefs
+    FOR EACH STATEMENT EXECUTE FUNCTION daily_belief_summary_insert();
+
+DROP TRIGGER IF EXISTS daily_belief_summary_update ON timed_belief;
+CREATE TRIGGER daily_belief_summary_update
+    AFTER UPDATE ON timed_belief
+    REFERENCING OLD TABLE AS old_beliefs NEW TABLE AS new_beliefs
+    FOR EACH STATEMENT EXECUTE FUNCTION daily_belief_summary_update();
+
+DROP TRIGGER IF EXISTS daily_belief_summary_delete ON timed_belief;
+CREATE TRIGGER daily_belief_summary_delete
+    AFTER DELETE ON timed_belief
+    REFERENCING OLD TABLE AS old_beliefs
+    FOR EACH STATEMENT EXECUTE FUNCTION daily_belief_summary_delete();
+"""
+
+BACKFILL_SQL = """
+INSERT INTO daily_belief_summary (sensor_id, source_id, day, belief_count, value_count, value_sum, min_value, max_value, min_event_start, max_event_start, last_recorded)
+    SELECT
+        b.sensor_id,
+        b.source_id,
+        date_trunc('day', b.event_start, 'UTC') AS day,
+        count(b.event_value) AS belief_count,
+        count(b.event_value) FILTER (WHERE b.event_value != 'NaN') AS value_count,
+        coalesce(sum(b.event_value) FILTER (WHERE b.event_value != 'NaN'), 0) AS value_sum,
+        min(b.event_value) FILTER (WHERE b.event_value != 'NaN') AS min_value,
+        max(b.event_value) FILTER (WHERE b.event_value != 'NaN') AS max_value,
+        min(b.event_start) AS min_event_start,
+        max(b.event_start) AS max_event_start,
+        max(b.event_start + s.event_resolution - b.belief_horizon) AS last_recorded
+    FROM timed_belief b
+    JOIN sensor s ON s.id = b.sensor_id
+
+    GROUP BY b.sensor_id, b.source_id, date_trunc('day', b.event_start, 'UTC')
+"""
+
+
+def upgrade():
+    op.create_table(
+        "daily_belief_summary",
+        sa.Column("sensor_id", sa.Integer(), nullable=False),
+        sa.Column("source_id", sa.Integer(), nullable=False),
+        sa.Column("day", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("belief_count", sa.Integer(), nullable=False),
+        sa.Column("value_count", sa.Integer(), nullable=False),
+        sa.Column("value_sum", sa.Float(), nullable=False),
+        sa.Column("min_value", sa.Float(), nullable=True),
+        sa.Column("max_value", sa.Float(), nullable=True),
+        sa.Column("min_event_start", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("max_event_start", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("last_recorded", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["sensor_id"],
+            ["sensor.id"],
+            name=op.f("daily_belief_summary_sensor_id_sensor_fkey"),
+            ondelete="CASCADE",
+        ),
+        sa.ForeignKeyConstraint(
+            ["source_id"],
+            ["data_source.id"],
+            name=op.f("daily_belief_summary_source_id_data_source_fkey"),
+            ondelete="CASCADE",
+        ),
+        sa.PrimaryKeyConstraint(
+            "sensor_id", "source_id", "day", name=op.f("daily_belief_summary_pkey")
+        ),
+    )
+    op.execute(BACKFILL_SQL)
+    op.execute(SUMMARY_FUNCTIONS_AND_TRIGGERS_SQL)
+
+
+def downgrade():
+    op.execute("DROP TRIGGER IF EXISTS daily_belief_summary_insert ON timed_belief")
+    op.execute("DROP TRIGGER IF EXISTS daily_belief_summary_update ON timed_belief")
+    op.execute("DROP TRIGGER IF EXISTS daily_belief_summary_delete ON timed_belief")
+    op.execute("DROP FUNCTION IF EXISTS daily_belief_summary_insert()")
+    op.execute("DROP FUNCTION IF EXISTS daily_belief_summary_update()")
+    op.execute("DROP FUNCTION IF EXISTS daily_belief_summary_delete()")
+    op.drop_table("daily_belief_summary")
@@ -0,0 +1,634 @@
+"""add belief rollups
+
+Revision ID: 9e4a6b2c8d0f
+Revises: 7c3d5e8f9a1b
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "9e4a6b2c8d0f"
+down_revision = "7c3d5e8f9a1b"
+branch_labels = None
+depends_on = None
+
+# Frozen copy of flexmeasures.data.models.belief_rollups.ROLLUP_FUNCTIONS_AND_TRIGGERS_SQL
+ROLLUP_FUNCTIONS_AND_TRIGGERS_SQL = """
+CREATE OR REPLACE FUNCTION belief_rollup_insert() RETURNS trigger AS $$
+BEGIN
+
+    INSERT INTO belief_rollup AS r (sensor_id, bucket_resolution, bucket_start, source_id, event_count, belief_count, value_count, value_sum, min_value, max_value, cumulative_probability_sum, last_value, min_event_start, max_event_start, max_event_start_less_horizon)
+
+    SELECT
+        sensor_id,
+        interval '1 hour' AS bucket_resolution,
+        date_trunc('hour', event_start, 'UTC') AS bucket_start,
+        source_id,
+        count(DISTINCT event_start) AS event_count,
+        count(*) AS belief_count,
+        count(event_value) FILTER (WHERE event_value != 'NaN') AS value_count,
+        coalesce(sum(event_value) FILTER (WHERE event_value != 'NaN'), 0) AS value_sum,
+        min(event_value) FILTER (WHERE event_value != 'NaN') AS min_value,
+        max(event_value) FILTER (WHERE event_value != 'NaN') AS max_value,
+        sum(cumulative_probability) AS cumulative_probability_sum,
+        (array_agg(event_value ORDER BY event_start DESC))[1] AS last_value,
+        min(event_start) AS min_event_start,
+        max(event_start) AS max_event_start,
+        max(event_start - belief_horizon) AS max_event_start_less_horizon
+    FROM (
+        SELECT
+            b.sensor_id,
+            b.source_id,
+            b.event_start,
+            b.belief_horizon,
+            b.cumulative_probability,
+            b.event_value,
+            rank() OVER (PARTITION BY b.sensor_id, b.source_id, b.event_start ORDER BY b.belief_horizon) AS horizon_rank
+        FROM
+    (
+    SELECT DISTINCT sensor_id, source_id, date_trunc('hour', event_start, 'UTC') AS bucket_start
+    FROM new_beliefs
+) c
+    CROSS JOIN LATERAL (
+        SELECT * FROM timed_belief
+        WHERE sensor_id = c.sensor_id
+        AND source_id = c.source_id
+        AND event_start >= c.bucket_start
+        AND event_start < c.bucket_start + interval '1 hour'
+
+        ORDER BY sensor_id, event_start
+        OFFSET 0
+) b
+
+    ) most_recent_beliefs
+    WHERE horizon_rank = 1
+    GROUP BY sensor_id, source_id, date_trunc('hour', event_start, 'UTC')
+
+    ON CONFLICT (sensor_id, bucket_resolution, bucket_start, source_id) DO UPDATE SET
+        event_count = excluded.event_count,
+        belief_count = excluded.belief_count,
+        value_count = excluded.value_count,
+        value_sum = excluded.value_sum,
+        min_value = excluded.min_value,
+        max_value = excluded.max_value,
+        cumulative_probability_sum = excluded.cumulative_probability_sum,
+        last_value = excluded.last_value,
+        min_event_start = excluded.min_event_start,
+        max_event_start = excluded.max_event_start,
+        max_event_start_less_horizon = excluded.max_event_start_less_horizon;
+
+
+    DELETE FROM belief_rollup r
+    USING (
+    SELECT DISTINCT sensor_id, source_id, date_trunc('hour', event_start, 'UTC') AS bucket_start
+    FROM new_beliefs
+) c
+    LEFT JOIN LATERAL (
+        SELECT 1 AS found FROM timed_belief
+        WHERE sensor_id = c.sensor_id
+        AND source_id = c.source_id
+        AND event_start >= c.bucket_start
+        AND event_start < c.bucket_start + interval '1 hour'
+
+        ORDER BY sensor_id, event_start
+        LIMIT 1
+) b ON true
+    WHERE r.sensor_id = c.sensor_id AND r.source_id = c.source_id
+    AND r.bucket_resolution = interval '1 hour' AND r.bucket_start = c.bucket_start
+    AND b.found IS NULL;
+
+
+    INSERT INTO belief_rollup AS r (sensor_id, bucket_resolution, bucket_start, source_id, event_count, belief_count, value_count, value_sum, min_value, max_value, cumulative_probability_sum, last_value, min_event_start, max_event_start, max_event_start_less_horizon)
+
+    SELECT
+        h.sensor_id,
+        interval '1 day' AS bucket_resolution,
+        date_trunc('day', h.bucket_start, 'UTC') AS bucket_start,
+        h.source_id,
+        sum(h.event_count) AS event_count,
+        sum(h.belief_count) AS belief_count,
+        sum(h.value_count) AS value_count,
+        sum(h.value_sum) AS value_sum,
+        min(h.min_value) AS min_value,
+        max(h.max_value) AS max_value,
+        sum(h.cumulative_probability_sum) AS cumulative_probability_sum,
+        (array_agg(h.last_value ORDER BY h.bucket_start DESC))[1] AS last_value,
+        min(h.min_event_start) AS min_event_start,
+        max(h.max_event_start) AS max_event_start,
+        max(h.max_event_start_less_horizon) AS max_event_start_less_horizon
+    FROM
+    (
+    SELECT DISTINCT sensor_id, source_id, date_trunc('day', event_start, 'UTC') AS bucket_start
+    FROM new_beliefs
+) c
+    CROSS JOIN LATERAL (
+        SELECT * FROM belief_rollup
+        WHERE sensor_id = c.sensor_id
+        AND source_id = c.source_id
+        AND bucket_start >= c.bucket_start
+        AND bucket_start < c.bucket_start + interval '1 day'
+        AND bucket_resolution = interval '1 hour'
+        ORDER BY sensor_id, bucket_start
+        OFFSET 0
+) h
+
+    WHERE h.bucket_resolution = interval '1 hour'
+    GROUP BY h.sensor_id, h.source_id, date_trunc('day', h.bucket_start, 'UTC')
+
+    ON CONFLICT (sensor_id, bucket_resolution, bucket_start, source_id) DO UPDATE SET
+        event_count = excluded.event_count,
+        belief_count = excluded.belief_count,
+        value_count = excluded.value_count,
+        value_sum = excluded.value_sum,
+        min_value = excluded.min_value,
+        max_value = excluded.max_value,
+        cumulative_probability_sum = excluded.cumulative_probability_sum,
+        last_value = excluded.last_value,
+        min_event_start = excluded.min_event_start,
+        max_event_start = excluded.max_event_start,
+        max_event_start_less_horizon = excluded.max_event_start_less_horizon;
+
+
+    DELETE FROM belief_rollup r
+    USING (
+    SELECT DISTINCT sensor_id, source_id, date_trunc('day', event_start, 'UTC') AS bucket_start
+    FROM new_beliefs
+) c
+    LEFT JOIN LATERAL (
+        SELECT 1 AS found FROM belief_rollup
+        WHERE sensor_id = c.sensor_id
+        AND source_id = c.source_id
+        AND bucket_start >= c.bucket_start
+        AND bucket_start < c.bucket_start + interval '1 day'
+        AND bucket_resolution = interval '1 hour'
+        ORDER BY sensor_id, bucket_start
+        LIMIT 1
+) b ON true
+    WHERE r.sensor_id = c.sensor_id AND r.source_id = c.source_id
+    AND r.bucket_resolution = interval '1 day' AND r.bucket_start = c.bucket_start
+    AND b.found IS NULL;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION belief_rollup_update() RETURNS trigger AS $$
+BEGIN
+
+    INSERT INTO belief_rollup AS r (sensor_id, bucket_resolution, bucket_start, source_id, event_count, belief_count, value_count, value_sum, min_value, max_value, cumulative_probability_sum, last_value, min_event_start, max_event_start, max_event_start_less_horizon)
+
+    SELECT
+        sensor_id,
+        interval '1 hour' AS bucket_resolution,
+        date_trunc('hour', event_start, 'UTC') AS bucket_start,
+        source_id,
+        count(DISTINCT event_start) AS event_count,
+        count(*) AS belief_count,
+        count(event_value) FILTER (WHERE event_value != 'NaN') AS value_count,
+        coalesce(sum(event_value) FILTER (WHERE event_value != 'NaN'), 0) AS value_sum,
+        min(event_value) FILTER (WHERE event_value != 'NaN') AS min_value,
+        max(event_value) FILTER (WHERE event_value != 'NaN') AS max_value,
+        sum(cumulative_probability) AS cumulative_probability_sum,
+        (array_agg(event_value ORDER BY event_start DESC))[1] AS last_value,
+        min(event_start) AS min_event_start,
+        max(event_start) AS max_event_start,
+        max(event_start - belief_horizon) AS max_event_start_less_horizon
+    FROM (
+        SELECT
+            b.sensor_id,
+            b.source_id,
+            b.event_start,
+            b.belief_horizon,
+            b.cumulative_probability,
+            b.event_value,
+            rank() OVER (PARTITION BY b.sensor_id, b.source_id, b.event_start ORDER BY b.belief_horizon) AS horizon_rank
+        FROM
+    (
+    SELECT DISTINCT sensor_id, source_id, date_trunc('hour', event_start, 'UTC') AS bucket_start
+    FROM new_beliefs
+UNION
+    SELECT DISTINCT sensor_id, source_id, date_trunc('hour', event_start, 'UTC') AS bucket_start
+    FROM old_beliefs
+) c
+    CROSS JOIN LATERAL (
+        SELECT * FROM timed_belief
+        WHERE sensor_id = c.sensor_id
+        AND source_id = c.source_id
+        AND event_start >= c.bucket_start
+        AND event_start < c.bucket_start + interval '1 hour'
+
+        ORDER BY sensor_id, event_start
+        OFFSET 0
+) b
+
+    ) most_recent_beliefs
+    WHERE horizon_rank = 1
+    GROUP BY sensor_id, source_id, date_trunc('hour', event_start, 'UTC')
+
+    ON CONFLICT (sensor_id, bucket_resolution, bucket_start, source_id) DO UPDATE SET
+        event_count = excluded.event_count,
+        belief_count = excluded.belief_count,
+        value_count = excluded.value_count,
+        value_sum = excluded.value_sum,
+        min_value = excluded.min_value,
+        max_value = excluded.max_value,
+        cumulative_probability_sum = excluded.cumulative_probability_sum,
+        last_value = excluded.last_value,
+        min_event_start = excluded.min_event_start,
+        max_event_start = excluded.max_event_start,
+        max_event_start_less_horizon = excluded.max_event_start_less_horizon;
+
+
+    DELETE FROM belief_rollup r
+    USING (
+    SELECT DISTINCT sensor_id, source_id, date_trunc('hour', event_start, 'UTC') AS bucket_start
+    FROM new_beliefs
+UNION
+    SELECT DISTINCT sensor_id, source_id, date_trunc('hour', event_start, 'UTC') AS bucket_start
+    FROM old_beliefs
+) c
+    LEFT JOIN LATERAL (
+        SELECT 1 AS found FROM timed_belief
+        WHERE sensor_id = c.sensor_id
+        AND source_id = c.source_id
+        AND event_start >= c.bucket_start
+        AND event_start < c.bucket_start + interval '1 hour'
+
+        ORDER BY sensor_id, event_start
+        LIMIT 1
+) b ON true
+    WHERE r.sensor_id = c.sensor_id AND r.source_id = c.source_id
+    AND r.bucket_resolution = interval '1 hour' AND r.bucket_start = c.bucket_start
+    AND b.found IS NULL;
+
+
+    INSERT INTO belief_rollup AS r (sensor_id, bucket_resolution, bucket_start, source_id, event_count, belief_count, value_count, value_sum, min_value, max_value, cumulative_probability_sum, last_value, min_event_start, max_event_start, max_event_start_less_horizon)
+
+    SELECT
+        h.sensor_id,
+        interval '1 day' AS bucket_resolution,
+        date_trunc('day', h.bucket_start, 'UTC') AS bucket_start,
+        h.source_id,
+        sum(h.event_count) AS event_count,
+        sum(h.belief_count) AS belief_count,
+        sum(h.value_count) AS value_count,
+        sum(h.value_sum) AS value_sum,
+        min(h.min_value) AS min_value,
+        max(h.max_value) AS max_value,
+        sum(h.cumulative_probability_sum) AS cumulative_probability_sum,
+        (array_agg(h.last_value ORDER BY h.bucket_start DESC))[1] AS last_value,
+        min(h.min_event_start) AS min_event_start,
+        max(h.max_event_start) AS max_event_start,
+        max(h.max_event_start_less_horizon) AS max_event_start_less_horizon
+    FROM
+    (
+    SELECT DISTINCT sensor_id, source_id, date_trunc('day', event_start, 'UTC') AS bucket_start
+    FROM new_beliefs
+UNION
+    SELECT DISTINCT sensor_id, source_id, date_trunc('day', event_start, 'UTC') AS bucket_start
+    FROM old_beliefs
+) c
+    CROSS JOIN LATERAL (
+        SELECT * FROM belief_rollup
+        WHERE sensor_id = c.sensor_id
+        AND source_id = c.source_id
+        AND bucket_start >= c.bucket_start
+        AND bucket_start < c.bucket_start + interval '1 day'
+        AND bucket_resolution = interval '1 hour'
+        ORDER BY sensor_id, bucket_start
+        OFFSET 0
+) h
+
+    WHERE h.bucket_resolution = interval '1 hour'
+    GROUP BY h.sensor_id, h.source_id, date_trunc('day', h.bucket_start, 'UTC')
+
+    ON CONFLICT (sensor_id, bucket_resolution, bucket_start, source_id) DO UPDATE SET
+        event_count = excluded.event_count,
+        belief_count = excluded.belief_count,
+        value_count = excluded.value_count,
+        value_sum = excluded.value_sum,
+        min_value = excluded.min_value,
+        max_value = excluded.max_value,
+        cumulative_probability_sum = excluded.cumulative_probability_sum,
+        last_value = excluded.last_value,
+        min_event_start = excluded.min_event_start,
+        max_event_start = excluded.max_event_start,
+        max_event_start_less_horizon = excluded.max_event_start_less_horizon;
+
+
+    DELETE FROM belief_rollup r
+    USING (
+    SELECT DISTINCT sensor_id, source_id, date_trunc('day', event_start, 'UTC') AS bucket_start
+    FROM new_beliefs
+UNION
+    SELECT DISTINCT sensor_id, source_id, date_trunc('day', event_start, 'UTC') AS bucket_start
+    FROM old_beliefs
+) c
+    LEFT JOIN LATERAL (
+        SELECT 1 AS found FROM belief_rollup
+        WHERE sensor_id = c.sensor_id
+        AND source_id = c.source_id
+        AND bucket_start >= c.bucket_start
+        AND bucket_start < c.bucket_start + interval '1 day'
+        AND bucket_resolution = interval '1 hour'
+        ORDER BY sensor_id, bucket_start
+        LIMIT 1
+) b ON true
+    WHERE r.sensor_id = c.sensor_id AND r.source_id = c.source_id
+    AND r.bucket_resolution = interval '1 day' AND r.bucket_start = c.bucket_start
+    AND b.found IS NULL;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION belief_rollup_delete() RETURNS trigger AS $$
+BEGIN
+
+    INSERT INTO belief_rollup AS r (sensor_id, bucket_resolution, bucket_start, source_id, event_count, belief_count, value_count, value_sum, min_value, max_value, cumulative_probability_sum, last_value, min_event_start, max_event_start, max_event_start_less_horizon)
+
+    SELECT
+        sensor_id,
+        interval '1 hour' AS bucket_resolution,
+        date_trunc('hour', event_start, 'UTC') AS bucket_start,
+        source_id,
+        count(DISTINCT event_start) AS event_count,
+        count(*) AS belief_count,
+        count(event_value) FILTER (WHERE event_value != 'NaN') AS value_count,
+        coalesce(sum(event_value) FILTER (WHERE event_value != 'NaN'), 0) AS value_sum,
+        min(event_value) FILTER (WHERE event_value != 'NaN') AS min_value,
+        max(event_value) FILTER (WHERE event_value != 'NaN') AS max_value,
+        sum(cumulative_probability) AS cumulative_probability_sum,
+        (array_agg(event_value ORDER BY event_start DESC))[1] AS last_value,
+        min(event_start) AS min_event_start,
+        max(event_start) AS max_event_start,
+        max(event_start - belief_horizon) AS max_event_start_less_horizon
+    FROM (
+        SELECT
+            b.sensor_id,
+            b.source_id,
+            b.event_start,
+            b.belief_horizon,
+            b.cumulative_probability,
+            b.event_value,
+            rank() OVER (PARTITION BY b.sensor_id, b.source_id, b.event_start ORDER BY b.belief_horizon) AS horizon_rank
+        FROM
+    (
+    SELECT DISTINCT sensor_id, source_id, date_trunc('hour', event_start, 'UTC') AS bucket_start
+    FROM old_beliefs
+) c
+    CROSS JOIN LATERAL (
+        SELECT * FROM timed_belief
+        WHERE sensor_id = c.sensor_id
+        AND source_id = c.source_id
+        AND event_start >= c.bucket_start
+        AND event_start < c.bucket_start + interval '1 hour'
+
+        ORDER BY sensor_id, event_start
+        OFFSET 0
+) b
+
+    ) most_recent_beliefs
+    WHERE horizon_rank = 1
+    GROUP BY sensor_id, source_id, date_trunc('hour', event_start, 'UTC')
+
+    ON CONFLICT (sensor_id, bucket_resolution, bucket_start, source_id) DO UPDATE SET
+        event_count = excluded.event_count,
+        belief_count = excluded.belief_count,
+        value_count = excluded.value_count,
+        value_sum = excluded.value_sum,
+        min_value = excluded.min_value,
+        max_value = excluded.max_value,
+        cumulative_probability_sum = excluded.cumulative_probability_sum,
+        last_value = excluded.last_value,
+        min_event_start = excluded.min_event_start,
+        max_event_start = excluded.max_event_start,
+        max_event_start_less_horizon = excluded.max_event_start_less_horizon;
+
+
+    DELETE FROM belief_rollup r
+    USING (
+    SELECT DISTINCT sensor_id, source_id, date_trunc('hour', event_start, 'UTC') AS bucket_start
+    FROM old_beliefs
+) c
+    LEFT JOIN LATERAL (
+        SELECT 1 AS found FROM timed_belief
+        WHERE sensor_id = c.sensor_id
+        AND source_id = c.source_id
+        AND event_start >= c.bucket_start
+        AND event_start < c.bucket_start + interval '1 hour'
+
+        ORDER BY sensor_id, event_start
+        LIMIT 1
+) b ON true
+    WHERE r.sensor_id = c.sensor_id AND r.source_id = c.source_id
+    AND r.bucket_resolution = interval '1 hour' AND r.bucket_start = c.bucket_start
+    AND b.found IS NULL;
+
+
+    INSERT INTO belief_rollup AS r (sensor_id, bucket_resolution, bucket_start, source_id, event_count, belief_count, value_count, value_sum, min_value, max_value, cumulative_probability_sum, last_value, min_event_start, max_event_start, max_event_start_less_horizon)
+
+    SELECT
+        h.sensor_id,
+        interval '1 day' AS bucket_resolution,
+        date_trunc('day', h.bucket_start, 'UTC') AS bucket_start,
+        h.source_id,
+        sum(h.event_count) AS event_count,
+        sum(h.belief_count) AS belief_count,
+        sum(h.value_count) AS value_count,
+        sum(h.value_sum) AS value_sum,
+        min(h.min_value) AS min_value,
+        max(h.max_value) AS max_value,
+        sum(h.cumulative_probability_sum) AS cumulative_probability_sum,
+        (array_agg(h.last_value ORDER BY h.bucket_start DESC))[1] AS last_value,
+        min(h.min_event_start) AS min_event_start,
+        max(h.max_event_start) AS max_event_start,
+        max(h.max_event_start_less_horizon) AS max_event_start_less_horizon
+    FROM
+    (
+    SELECT DISTINCT sensor_id, source_id, date_trunc('day', event_start, 'UTC') AS bucket_start
+    FROM old_beliefs
+) c
+    CROSS JOIN LATERAL (
+        SELECT * FROM belief_rollup
+        WHERE sensor_id = c.sensor_id
+        AND source_id = c.source_id
+        AND bucket_start >= c.bucket_start
+        AND bucket_start < c.bucket_start + interval '1 day'
+        AND bucket_resolution = interval '1 hour'
+        ORDER BY sensor_id, bucket_start
+        OFFSET 0
+) h
+
+    WHERE h.bucket_resolution = interval '1 hour'
+    GROUP BY h.sensor_id, h.source_id, date_trunc('day', h.bucket_start, 'UTC')
+
+    ON CONFLICT (sensor_id, bucket_resolution, bucket_start, source_id) DO UPDATE SET
+        event_count = excluded.event_count,
+        belief_count = excluded.belief_count,
+        value_count = excluded.value_count,
+        value_sum = excluded.value_sum,
+        min_value = excluded.min_value,
+        max_value = excluded.max_value,
+        cumulative_probability_sum = excluded.cumulative_probability_sum,
+        last_value = excluded.last_value,
+        min_event_start = excluded.min_event_start,
+        max_event_start = excluded.max_event_start,
+        max_event_start_less_horizon = excluded.max_event_start_less_horizon;
+
+
+    DELETE FROM belief_rollup r
+    USING (
+    SELECT DISTINCT sensor_id, source_id, date_trunc('day', event_start, 'UTC') AS bucket_start
+    FROM old_beliefs
+) c
+    LEFT JOIN LATERAL (
+        SELECT 1 AS found FROM belief_rollup
+        WHERE sensor_id = c.sensor_id
+        AND source_id = c.source_id
+        AND bucket_start >= c.bucket_start
+        AND bucket_start < c.bucket_start + interval '1 day'
+        AND bucket_resolution = interval '1 hour'
+        ORDER BY sensor_id, bucket_start
+        LIMIT 1
+) b ON true
+    WHERE r.sensor_id = c.sensor_id AND r.source_id = c.source_id
+    AND r.bucket_resolution = interval '1 day' AND r.bucket_start = c.bucket_start
+    AND b.found IS NULL;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS belief_rollup_insert ON timed_belief;
+CREATE TRIGGER belief_rollup_insert
+    AFTER INSERT ON timed_belief
+    REFERENCING NEW TABLE AS new_beliefs
+    FOR EACH STATEMENT EXECUTE FUNCTION belief_rollup_insert();
+
+DROP TRIGGER IF EXISTS belief_rollup_update ON timed_belief;
+CREATE TRIGGER belief_rollup_update
+    AFTER UPDATE ON timed_belief
+    REFERENCING OLD TABLE AS old_beliefs NEW TABLE AS new_beliefs
+    FOR EACH STATEMENT EXECUTE FUNCTION belief_rollup_update();
+
+DROP TRIGGER IF EXISTS belief_rollup_delete ON timed_belief;
+CREATE TRIGGER belief_rollup_delete
+    AFTER DELETE ON timed_belief
+    REFERENCING OLD TABLE AS old_beliefs
+    FOR EACH STATEMENT EXECUTE FUNCTION belief_rollup_delete();
+"""
+
+
+# Hourly rollups from the beliefs, then daily rollups from the hourly rollups
+BACKFILL_SQL = """
+INSERT INTO belief_rollup (sensor_id, bucket_resolution, bucket_start, source_id, event_count, belief_count, value_count, value_sum, min_value, max_value, cumulative_probability_sum, last_value, min_event_start, max_event_start, max_event_start_less_horizon)
+    SELECT
+        sensor_id,
+        interval '1 hour' AS bucket_resolution,
+        date_trunc('hour', event_start, 'UTC') AS bucket_start,
+        source_id,
+        count(DISTINCT event_start) AS event_count,
+        count(*) AS belief_count,
+        count(event_value) FILTER (WHERE event_value != 'NaN') AS value_count,
+        coalesce(sum(event_value) FILTER (WHERE event_value != 'NaN'), 0) AS value_sum,
+        min(event_value) FILTER (WHERE event_value != 'NaN') AS min_value,
+        max(event_value) FILTER (WHERE event_value != 'NaN') AS max_value,
+        sum(cumulative_probability) AS cumulative_probability_sum,
+        (array_agg(event_value ORDER BY event_start DESC))[1] AS last_value,
+        min(event_start) AS min_event_start,
+        max(event_start) AS max_event_start,
+        max(event_start - belief_horizon) AS max_event_start_less_horizon
+    FROM (
+        SELECT
+            b.sensor_id,
+            b.source_id,
+            b.event_start,
+            b.belief_horizon,
+            b.cumulative_probability,
+            b.event_value,
+            rank() OVER (PARTITION BY b.sensor_id, b.source_id, b.event_start ORDER BY b.belief_horizon) AS horizon_rank
+        FROM timed_belief b
+    ) most_recent_beliefs
+    WHERE horizon_rank = 1
+    GROUP BY sensor_id, source_id, date_trunc('hour', event_start, 'UTC')
+;
+INSERT INTO belief_rollup (sensor_id, bucket_resolution, bucket_start, source_id, event_count, belief_count, value_count, value_sum, min_value, max_value, cumulative_probability_sum, last_value, min_event_start, max_event_start, max_event_start_less_horizon)
+    SELECT
+        h.sensor_id,
+        interval '1 day' AS bucket_resolution,
+        date_trunc('day', h.bucket_start, 'UTC') AS bucket_start,
+        h.source_id,
+        sum(h.event_count) AS event_count,
+        sum(h.belief_count) AS belief_count,
+        sum(h.value_count) AS value_count,
+        sum(h.value_sum) AS value_sum,
+        min(h.min_value) AS min_value,
+        max(h.max_value) AS max_value,
+        sum(h.cumulative_probability_sum) AS cumulative_probability_sum,
+        (array_agg(h.last_value ORDER BY h.bucket_start DESC))[1] AS last_value,
+        min(h.min_event_start) AS min_event_start,
+        max(h.max_event_start) AS max_event_start,
+        max(h.max_event_start_less_horizon) AS max_event_start_less_horizon
+    FROM belief_rollup h
+    WHERE h.bucket_resolution = interval '1 hour'
+    GROUP BY h.sensor_id, h.source_id, date_trunc('day', h.bucket_start, 'UTC')
+"""
+
+
+def upgrade():
+    op.create_table(
+        "belief_rollup",
+        sa.Column("sensor_id", sa.Integer(), nullable=False),
+        sa.Column("bucket_resolution", sa.Interval(), nullable=False),
+        sa.Column("bucket_start", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("source_id", sa.Integer(), nullable=False),
+        sa.Column("event_count", sa.Integer(), nullable=False),
+        sa.Column("belief_count", sa.Integer(), nullable=False),
+        sa.Column("value_count", sa.Integer(), nullable=False),
+        sa.Column("value_sum", sa.Float(), nullable=False),
+        sa.Column("min_value", sa.Float(), nullable=True),
+        sa.Column("max_value", sa.Float(), nullable=True),
+        sa.Column("cumulative_probability_sum", sa.Float(), nullable=False),
+        sa.Column("last_value", sa.Float(), nullable=True),
+        sa.Column("min_event_start", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("max_event_start", sa.DateTime(timezone=True), nullable=False),
+        sa.Column(
+            "max_event_start_less_horizon", sa.DateTime(timezone=True), nullable=False
+        ),
+        sa.ForeignKeyConstraint(
+            ["sensor_id"],
+            ["sensor.id"],
+            name=op.f("belief_rollup_sensor_id_sensor_fkey"),
+            ondelete="CASCADE",
+        ),
+        sa.ForeignKeyConstraint(
+            ["source_id"],
+            ["data_source.id"],
+            name=op.f("belief_rollup_source_id_data_source_fkey"),
+            ondelete="CASCADE",
+        ),
+        sa.PrimaryKeyConstraint(
+            "sensor_id",
+            "bucket_resolution",
+            "bucket_start",
+            "source_id",
+            name=op.f("belief_rollup_pkey"),
+        ),
+    )
+    op.execute(BACKFILL_SQL)
+    op.execute(ROLLUP_FUNCTIONS_AND_TRIGGERS_SQL)
+
+
+def downgrade():
+    op.execute("DROP TRIGGER IF EXISTS belief_rollup_insert ON timed_belief")
+    op.execute("DROP TRIGGER IF EXISTS belief_rollup_update ON timed_belief")
+    op.execute("DROP TRIGGER IF EXISTS belief_rollup_delete ON timed_belief")
+    op.execute("DROP FUNCTION IF EXISTS belief_rollup_insert()")
+    op.execute("DROP FUNCTION IF EXISTS belief_rollup_update()")
+    op.execute("DROP FUNCTION IF EXISTS belief_rollup_delete()")
+    op.drop_table("belief_rollup")
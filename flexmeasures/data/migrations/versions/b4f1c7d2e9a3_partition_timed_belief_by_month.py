@@ -0,0 +1,114 @@
+"""partition timed_belief by month
+
+Revision ID: b4f1c7d2e9a3
+Revises: 9e4a6b2c8d0f
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+
+from alembic import op
+import pandas as pd
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "b4f1c7d2e9a3"
+down_revision = "9e4a6b2c8d0f"
+branch_labels = None
+depends_on = None
+
+BELIEF_COLUMNS = "sensor_id, source_id, event_start, belief_horizon, cumulative_probability, event_value"
+
+# Number of monthly partitions to create beyond the current month (or beyond the last month with beliefs)
+MONTHS_AHEAD = 3
+
+
+def upgrade():
+    """Move the beliefs into a table range-partitioned by event start, with a partition per UTC month.
+
+    Beliefs about events outside these months (i.e. further ahead) go to a default partition.
+    Note that this copies all beliefs, so on large databases this migration takes a while.
+    """
+    first_event_start, last_event_start = (
+        op.get_bind()
+        .execute(sa.text("SELECT min(event_start), max(event_start) FROM timed_belief"))
+        .one()
+    )
+    now = pd.Timestamp.now(tz="utc")
+    first_month_start = pd.Timestamp(first_event_start or now).tz_convert("utc")
+    first_month_start = first_month_start.replace(
+        day=1, hour=0, minute=0, second=0, microsecond=0, nanosecond=0
+    )
+    last_event_start = max(now, pd.Timestamp(last_event_start or now))
+    month_starts = pd.date_range(
+        first_month_start,
+        last_event_start + pd.offsets.MonthBegin(MONTHS_AHEAD),
+        freq="MS",
+    )
+
+    def create_partitions():
+        for month_start in month_starts:
+            month_end = month_start + pd.offsets.MonthBegin(1)
+            op.execute(
+                f"CREATE TABLE timed_belief_y{month_start.year:04d}m{month_start.month:02d} "
+                f"PARTITION OF timed_belief_new FOR VALUES FROM ('{month_start.isoformat()}') TO ('{month_end.isoformat()}')"
+            )
+        op.execute(
+            "CREATE TABLE timed_belief_default PARTITION OF timed_belief_new DEFAULT"
+        )
+
+    rebuild_timed_belief("PARTITION BY RANGE (event_start)", create_partitions)
+
+
+def downgrade():
+    """Move the beliefs back into an unpartitioned table (which leaves out beliefs in detached partitions)."""
+    rebuild_timed_belief("", lambda: None)
+
+
+def rebuild_timed_belief(partition_by: str, create_partitions):
+    """Copy the beliefs into a new timed_belief table, with the same constraints, indexes and triggers."""
+    connection = op.get_bind()
+    constraints = connection.execute(
+        sa.text(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = 'timed_belief'::regclass ORDER BY contype = 'p' DESC, conname"
+        )
+    ).all()
+    indexes = (
+        connection.execute(
+            sa.text(
+                "SELECT pg_get_indexdef(indexrelid) FROM pg_index "
+                "WHERE indrelid = 'timed_belief'::regclass AND NOT indisprimary"
+            )
+        )
+        .scalars()
+        .all()
+    )
+    triggers = (
+        connection.execute(
+            sa.text(
+                "SELECT pg_get_triggerdef(oid) FROM pg_trigger "
+                "WHERE tgrelid = 'timed_belief'::regclass AND NOT tgisinternal"
+            )
+        )
+        .scalars()
+        .all()
+    )
+
+    op.execute(
+        f"CREATE TABLE timed_belief_new (LIKE timed_belief INCLUDING DEFAULTS) {partition_by}"
+    )
+    create_partitions()
+    op.execute(
+        f"INSERT INTO timed_belief_new ({BELIEF_COLUMNS}) SELECT {BELIEF_COLUMNS} FROM timed_belief"
+    )
+    op.execute("DROP TABLE timed_belief")
+    op.execute("ALTER TABLE timed_belief_new RENAME TO timed_belief")
+
+    # Constraints and indexes are created after copying the beliefs, which is faster than updating them along the way
+    for name, definition in constraints:
+        op.execute(f"ALTER TABLE timed_belief ADD CONSTRAINT {name} {definition}")
+    for definition in indexes:
+        op.execute(definition.replace(" ON ONLY ", " ON "))
+    for definition in triggers:
+        op.execute(definition)
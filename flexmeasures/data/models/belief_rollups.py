@@ -0,0 +1,281 @@
+"""
+Hourly and daily rollups of the most recent beliefs recorded on each sensor, per data source.
+
+The rollups are maintained by database triggers on the timed_belief table, like the daily belief summaries:
+after each statement that writes beliefs, the hourly rollups of the touched hours are recomputed from the stored beliefs,
+and the daily rollups of the touched days are recomputed from the hourly rollups.
+They allow searching beliefs at a coarse resolution without fetching and resampling all raw beliefs
+(see flexmeasures.data.queries.beliefs.query_rolled_up_beliefs).
+"""
+
+from __future__ import annotations
+
+from datetime import timedelta
+
+from sqlalchemy import DDL, event
+
+from flexmeasures.data import db
+
+
+HOURLY = timedelta(hours=1)
+DAILY = timedelta(days=1)
+ROLLUP_RESOLUTIONS = (DAILY, HOURLY)  # from coarse to fine
+
+
+class BeliefRollup(db.Model):
+    """Aggregates over the most recent beliefs recorded on a sensor by a data source, about events starting in a given (UTC) hour or day.
+
+    Only the most recent belief about each event counts (i.e. the one with the smallest belief horizon).
+    NaN values count towards the number of events, but not towards the value aggregates.
+    """
+
+    __tablename__ = "belief_rollup"
+
+    sensor_id = db.Column(
+        db.Integer,
+        db.ForeignKey("sensor.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    # Duration of the bucket, i.e. 1 hour or 1 day
+    bucket_resolution = db.Column(db.Interval(), primary_key=True)
+    # Start of the UTC hour or day
+    bucket_start = db.Column(db.DateTime(timezone=True), primary_key=True)
+    source_id = db.Column(
+        db.Integer,
+        db.ForeignKey("data_source.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    event_count = db.Column(db.Integer, nullable=False)
+    # Number of most recent beliefs, which exceeds the number of events in case of probabilistic beliefs
+    belief_count = db.Column(db.Integer, nullable=False)
+    # Number of non-NaN values, and aggregates over these values
+    value_count = db.Column(db.Integer, nullable=False)
+    value_sum = db.Column(db.Float, nullable=False)
+    min_value = db.Column(db.Float, nullable=True)
+    max_value = db.Column(db.Float, nullable=True)
+    # Sum of the cumulative probabilities of the most recent beliefs
+    cumulative_probability_sum = db.Column(db.Float, nullable=False)
+    # Value of the last event
+    last_value = db.Column(db.Float, nullable=True)
+    min_event_start = db.Column(db.DateTime(timezone=True), nullable=False)
+    max_event_start = db.Column(db.DateTime(timezone=True), nullable=False)
+    # max(event_start - belief_horizon), from which the most recent belief time follows given the sensor's knowledge horizon
+    max_event_start_less_horizon = db.Column(db.DateTime(timezone=True), nullable=False)
+
+    @property
+    def value_mean(self) -> float | None:
+        return self.value_sum / self.value_count if self.value_count else None
+
+    def __repr__(self) -> str:
+        return f"<BeliefRollup sensor {self.sensor_id}, source {self.source_id}, {self.bucket_resolution} from {self.bucket_start}: {self.event_count} events>"
+
+
+_ROLLUP_COLUMNS = "sensor_id, bucket_resolution, bucket_start, source_id, event_count, belief_count, value_count, value_sum, min_value, max_value, cumulative_probability_sum, last_value, min_event_start, max_event_start, max_event_start_less_horizon"
+
+# Aggregate the most recent beliefs (from the given relation, aliased as b) per sensor, source and UTC hour
+_AGGREGATE_HOURLY_SQL = """
+    SELECT
+        sensor_id,
+        interval '1 hour' AS bucket_resolution,
+        date_trunc('hour', event_start, 'UTC') AS bucket_start,
+        source_id,
+        count(DISTINCT event_start) AS event_count,
+        count(*) AS belief_count,
+        count(event_value) FILTER (WHERE event_value != 'NaN') AS value_count,
+        coalesce(sum(event_value) FILTER (WHERE event_value != 'NaN'), 0) AS value_sum,
+        min(event_value) FILTER (WHERE event_value != 'NaN') AS min_value,
+        max(event_value) FILTER (WHERE event_value != 'NaN') AS max_value,
+        sum(cumulative_probability) AS cumulative_probability_sum,
+        (array_agg(event_value ORDER BY event_start DESC))[1] AS last_value,
+        min(event_start) AS min_event_start,
+        max(event_start) AS max_event_start,
+        max(event_start - belief_horizon) AS max_event_start_less_horizon
+    FROM (
+        SELECT
+            b.sensor_id,
+            b.source_id,
+            b.event_start,
+            b.belief_horizon,
+            b.cumulative_probability,
+            b.event_value,
+            rank() OVER (PARTITION BY b.sensor_id, b.source_id, b.event_start ORDER BY b.belief_horizon) AS horizon_rank
+        FROM {beliefs}
+    ) most_recent_beliefs
+    WHERE horizon_rank = 1
+    GROUP BY sensor_id, source_id, date_trunc('hour', event_start, 'UTC')
+"""
+
+# Aggregate the hourly rollups (from the given relation, aliased as h) per sensor, source and UTC day
+_AGGREGATE_DAILY_SQL = """
+    SELECT
+        h.sensor_id,
+        interval '1 day' AS bucket_resolution,
+        date_trunc('day', h.bucket_start, 'UTC') AS bucket_start,
+        h.source_id,
+        sum(h.event_count) AS event_count,
+        sum(h.belief_count) AS belief_count,
+        sum(h.value_count) AS value_count,
+        sum(h.value_sum) AS value_sum,
+        min(h.min_value) AS min_value,
+        max(h.max_value) AS max_value,
+        sum(h.cumulative_probability_sum) AS cumulative_probability_sum,
+        (array_agg(h.last_value ORDER BY h.bucket_start DESC))[1] AS last_value,
+        min(h.min_event_start) AS min_event_start,
+        max(h.max_event_start) AS max_event_start,
+        max(h.max_event_start_less_horizon) AS max_event_start_less_horizon
+    FROM {rollups}
+    WHERE h.bucket_resolution = interval '1 hour'
+    GROUP BY h.sensor_id, h.source_id, date_trunc('day', h.bucket_start, 'UTC')
+"""
+
+# The buckets (per sensor and source) about which beliefs were changed, according to the given transition tables
+_CHANGED_BUCKETS_SQL = """
+    SELECT DISTINCT sensor_id, source_id, date_trunc('{unit}', event_start, 'UTC') AS bucket_start
+    FROM {transition_table}
+"""
+
+# Look up the stored beliefs or hourly rollups in a changed bucket (c) as an index range
+# (the ORDER BY steers the planner to the index on the sensor and time columns, also without table statistics,
+# and the OFFSET or LIMIT keeps it from flattening the lateral subquery into a join,
+# for which it tends to pick a plan scanning all beliefs of the sensor once per bucket)
+_BUCKET_LOOKUP_SQL = """
+        SELECT {columns} FROM {table}
+        WHERE sensor_id = c.sensor_id
+        AND source_id = c.source_id
+        AND {time_column} >= c.bucket_start
+        AND {time_column} < c.bucket_start + interval '1 {unit}'
+        {filter}
+        ORDER BY sensor_id, {time_column}
+        {limit}
+"""
+
+# Select the stored beliefs or hourly rollups in the changed buckets
+_CHANGED_BUCKETS_LATERAL_SQL = """
+    ({changed_buckets}) c
+    CROSS JOIN LATERAL ({bucket_lookup}) {alias}
+"""
+
+_UPSERT_SQL = f"""
+    INSERT INTO belief_rollup AS r ({_ROLLUP_COLUMNS})
+    {{aggregate}}
+    ON CONFLICT (sensor_id, bucket_resolution, bucket_start, source_id) DO UPDATE SET
+        event_count = excluded.event_count,
+        belief_count = excluded.belief_count,
+        value_count = excluded.value_count,
+        value_sum = excluded.value_sum,
+        min_value = excluded.min_value,
+        max_value = excluded.max_value,
+        cumulative_probability_sum = excluded.cumulative_probability_sum,
+        last_value = excluded.last_value,
+        min_event_start = excluded.min_event_start,
+        max_event_start = excluded.max_event_start,
+        max_event_start_less_horizon = excluded.max_event_start_less_horizon;
+"""
+
+# Remove the rollups of changed buckets that no longer hold any beliefs (or hourly rollups)
+_DELETE_EMPTY_SQL = """
+    DELETE FROM belief_rollup r
+    USING ({changed_buckets}) c
+    LEFT JOIN LATERAL ({bucket_lookup}) b ON true
+    WHERE r.sensor_id = c.sensor_id AND r.source_id = c.source_id
+    AND r.bucket_resolution = interval '1 {unit}' AND r.bucket_start = c.bucket_start
+    AND b.found IS NULL;
+"""
+
+
+def _changed_buckets_sql(unit: str, transition_tables: tuple[str, ...]) -> str:
+    return "UNION".join(
+        _CHANGED_BUCKETS_SQL.format(unit=unit, transition_table=transition_table)
+        for transition_table in transition_tables
+    )
+
+
+def _refresh_rollups_sql(transition_tables: tuple[str, ...]) -> str:
+    """Recompute the hourly rollups of the changed hours, and then the daily rollups of the changed days."""
+    statements = []
+    for unit, table, time_column, alias, aggregate_sql, bucket_filter in (
+        ("hour", "timed_belief", "event_start", "b", _AGGREGATE_HOURLY_SQL, ""),
+        (
+            "day",
+            "belief_rollup",
+            "bucket_start",
+            "h",
+            _AGGREGATE_DAILY_SQL,
+            "AND bucket_resolution = interval '1 hour'",
+        ),
+    ):
+        changed_buckets = _changed_buckets_sql(unit, transition_tables)
+        lookup_kwargs = dict(
+            table=table, time_column=time_column, unit=unit, filter=bucket_filter
+        )
+        relation = _CHANGED_BUCKETS_LATERAL_SQL.format(
+            changed_buckets=changed_buckets,
+            bucket_lookup=_BUCKET_LOOKUP_SQL.format(
+                columns="*", limit="OFFSET 0", **lookup_kwargs
+            ),
+            alias=alias,
+        )
+        statements += [
+            _UPSERT_SQL.format(
+                aggregate=aggregate_sql.format(beliefs=relation, rollups=relation)
+            ),
+            _DELETE_EMPTY_SQL.format(
+                changed_buckets=changed_buckets,
+                bucket_lookup=_BUCKET_LOOKUP_SQL.format(
+                    columns="1 AS found",
+                    limit="LIMIT 1",
+                    **lookup_kwargs,
+                ),
+                unit=unit,
+            ),
+        ]
+    return "\n".join(statements)
+
+
+ROLLUP_FUNCTIONS_AND_TRIGGERS_SQL = f"""
+CREATE OR REPLACE FUNCTION belief_rollup_insert() RETURNS trigger AS $$
+BEGIN
+    {_refresh_rollups_sql(("new_beliefs",))}
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION belief_rollup_update() RETURNS trigger AS $$
+BEGIN
+    {_refresh_rollups_sql(("new_beliefs", "old_beliefs"))}
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION belief_rollup_delete() RETURNS trigger AS $$
+BEGIN
+    {_refresh_rollups_sql(("old_beliefs",))}
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS belief_rollup_insert ON timed_belief;
+CREATE TRIGGER belief_rollup_insert
+    AFTER INSERT ON timed_belief
+    REFERENCING NEW TABLE AS new_beliefs
+    FOR EACH STATEMENT EXECUTE FUNCTION belief_rollup_insert();
+
+DROP TRIGGER IF EXISTS belief_rollup_update ON timed_belief;
+CREATE TRIGGER belief_rollup_update
+    AFTER UPDATE ON timed_belief
+    REFERENCING OLD TABLE AS old_beliefs NEW TABLE AS new_beliefs
+    FOR EACH STATEMENT EXECUTE FUNCTION belief_rollup_update();
+
+DROP TRIGGER IF EXISTS belief_rollup_delete ON timed_belief;
+CREATE TRIGGER belief_rollup_delete
+    AFTER DELETE ON timed_belief
+    REFERENCING OLD TABLE AS old_beliefs
+    FOR EACH STATEMENT EXECUTE FUNCTION belief_rollup_delete();
+"""
+
+# Create the triggers once all tables exist (the timed_belief table may be created after the rollup table)
+event.listen(
+    db.metadata,
+    "after_create",
+    DDL(ROLLUP_FUNCTIONS_AND_TRIGGERS_SQL).execute_if(dialect="postgresql"),
+)
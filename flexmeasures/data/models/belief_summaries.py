@@ -0,0 +1,192 @@
+"""
+Daily summaries of the beliefs recorded on each sensor, per data source.
+
+The summaries are maintained by database triggers on the timed_belief table,
+so they stay up to date regardless of how beliefs are saved or deleted
+(e.g. through save_to_db, a bulk COPY, or a cascading delete of a sensor).
+They allow computing stats, KPIs and time ranges without scanning the raw beliefs.
+"""
+
+from __future__ import annotations
+
+from sqlalchemy import DDL, event
+
+from flexmeasures.data import db
+
+
+class DailyBeliefSummary(db.Model):
+    """Aggregates over all beliefs recorded on a sensor by a data source, about events starting on a given (UTC) day.
+
+    Note that all beliefs count, not just the most recent beliefs about each event.
+    NaN values count towards the number of beliefs, but not towards the value aggregates.
+    """
+
+    __tablename__ = "daily_belief_summary"
+
+    sensor_id = db.Column(
+        db.Integer,
+        db.ForeignKey("sensor.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    source_id = db.Column(
+        db.Integer,
+        db.ForeignKey("data_source.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    # Start of the UTC day
+    day = db.Column(db.DateTime(timezone=True), primary_key=True)
+    belief_count = db.Column(db.Integer, nullable=False)
+    # Number of non-NaN values, and aggregates over these values
+    value_count = db.Column(db.Integer, nullable=False)
+    value_sum = db.Column(db.Float, nullable=False)
+    min_value = db.Column(db.Float, nullable=True)
+    max_value = db.Column(db.Float, nullable=True)
+    min_event_start = db.Column(db.DateTime(timezone=True), nullable=False)
+    max_event_start = db.Column(db.DateTime(timezone=True), nullable=False)
+    # Most recent knowledge time of an ex-post belief, i.e. max(event_start + event_resolution - belief_horizon)
+    last_recorded = db.Column(db.DateTime(timezone=True), nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<DailyBeliefSummary sensor {self.sensor_id}, source {self.source_id}, day {self.day}: {self.belief_count} beliefs>"
+
+
+# Aggregate beliefs (from the given relation, aliased as b) per sensor, source and UTC day
+_AGGREGATE_BELIEFS_SQL = """
+    SELECT
+        b.sensor_id,
+        b.source_id,
+        date_trunc('day', b.event_start, 'UTC') AS day,
+        count(b.event_value) AS belief_count,
+        count(b.event_value) FILTER (WHERE b.event_value != 'NaN') AS value_count,
+        coalesce(sum(b.event_value) FILTER (WHERE b.event_value != 'NaN'), 0) AS value_sum,
+        min(b.event_value) FILTER (WHERE b.event_value != 'NaN') AS min_value,
+        max(b.event_value) FILTER (WHERE b.event_value != 'NaN') AS max_value,
+        min(b.event_start) AS min_event_start,
+        max(b.event_start) AS max_event_start,
+        max(b.event_start + s.event_resolution - b.belief_horizon) AS last_recorded
+    FROM {beliefs} b
+    JOIN sensor s ON s.id = b.sensor_id
+    {join}
+    GROUP BY b.sensor_id, b.source_id, date_trunc('day', b.event_start, 'UTC')
+"""
+
+_SUMMARY_COLUMNS = "sensor_id, source_id, day, belief_count, value_count, value_sum, min_value, max_value, min_event_start, max_event_start, last_recorded"
+
+# The days (per sensor and source) about which beliefs were changed, according to the given transition table
+_CHANGED_DAYS_SQL = """
+    SELECT DISTINCT sensor_id, source_id, date_trunc('day', event_start, 'UTC') AS day
+    FROM {transition_table}
+"""
+
+# Select all stored beliefs about the changed days (as a range condition, so the index on event_start can be used)
+_JOIN_CHANGED_DAYS_SQL = """
+    JOIN ({changed_days}) a
+    ON b.sensor_id = a.sensor_id
+    AND b.source_id = a.source_id
+    AND b.event_start >= a.day
+    AND b.event_start < a.day + interval '1 day'
+"""
+
+_CHANGED_DAYS_AFTER_UPDATE_SQL = (
+    _CHANGED_DAYS_SQL.format(transition_table="new_beliefs")
+    + "UNION"
+    + _CHANGED_DAYS_SQL.format(transition_table="old_beliefs")
+)
+_CHANGED_DAYS_AFTER_DELETE_SQL = _CHANGED_DAYS_SQL.format(
+    transition_table="old_beliefs"
+)
+
+SUMMARY_FUNCTIONS_AND_TRIGGERS_SQL = f"""
+CREATE OR REPLACE FUNCTION daily_belief_summary_insert() RETURNS trigger AS $$
+BEGIN
+    -- Add the new beliefs to the summaries (min and max are idempotent, so also safe after a recomputation)
+    INSERT INTO daily_belief_summary AS d ({_SUMMARY_COLUMNS})
+    {_AGGREGATE_BELIEFS_SQL.format(beliefs="new_beliefs", join="")}
+    ON CONFLICT (sensor_id, source_id, day) DO UPDATE SET
+        belief_count = d.belief_count + excluded.belief_count,
+        value_count = d.value_count + excluded.value_count,
+        value_sum = d.value_sum + excluded.value_sum,
+        min_value = least(d.min_value, excluded.min_value),
+        max_value = greatest(d.max_value, excluded.max_value),
+        min_event_start = least(d.min_event_start, excluded.min_event_start),
+        max_event_start = greatest(d.max_event_start, excluded.max_event_start),
+        last_recorded = greatest(d.last_recorded, excluded.last_recorded);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION daily_belief_summary_update() RETURNS trigger AS $$
+BEGIN
+    -- Apply the changes in counts and sums
+    -- (rather than recomputing them, because an INSERT ... ON CONFLICT DO UPDATE statement
+    -- also fires the insert trigger, which adds the inserted beliefs)
+    INSERT INTO daily_belief_summary AS d ({_SUMMARY_COLUMNS})
+    SELECT sensor_id, source_id, day, sum(belief_count), sum(value_count), sum(value_sum),
+        min(min_value), max(max_value), min(min_event_start), max(max_event_start), max(last_recorded)
+    FROM (
+        {_AGGREGATE_BELIEFS_SQL.format(beliefs="new_beliefs", join="")}
+        UNION ALL
+        SELECT sensor_id, source_id, day, -belief_count, -value_count, -value_sum,
+            min_value, max_value, min_event_start, max_event_start, last_recorded
+        FROM ({_AGGREGATE_BELIEFS_SQL.format(beliefs="old_beliefs", join="")}) old_aggregates
+    ) changes
+    GROUP BY sensor_id, source_id, day
+    ON CONFLICT (sensor_id, source_id, day) DO UPDATE SET
+        belief_count = d.belief_count + excluded.belief_count,
+        value_count = d.value_count + excluded.value_count,
+        value_sum = d.value_sum + excluded.value_sum;
+    -- Recompute the other aggregates from the stored beliefs
+    UPDATE daily_belief_summary d SET
+        min_value = r.min_value,
+        max_value = r.max_value,
+        min_event_start = r.min_event_start,
+        max_event_start = r.max_event_start,
+        last_recorded = r.last_recorded
+    FROM ({_AGGREGATE_BELIEFS_SQL.format(beliefs="timed_belief", join=_JOIN_CHANGED_DAYS_SQL.format(changed_days=_CHANGED_DAYS_AFTER_UPDATE_SQL))}) r
+    WHERE d.sensor_id = r.sensor_id AND d.source_id = r.source_id AND d.day = r.day;
+    -- Remove summaries of days without beliefs (only possible if the update moved beliefs to another day)
+    DELETE FROM daily_belief_summary d
+    USING ({_CHANGED_DAYS_SQL.format(transition_table="old_beliefs")}) a
+    WHERE d.sensor_id = a.sensor_id AND d.source_id = a.source_id AND d.day = a.day
+    AND d.belief_count <= 0;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION daily_belief_summary_delete() RETURNS trigger AS $$
+BEGIN
+    -- Recompute the summaries of the affected days from the remaining beliefs
+    DELETE FROM daily_belief_summary d
+    USING ({_CHANGED_DAYS_AFTER_DELETE_SQL}) a
+    WHERE d.sensor_id = a.sensor_id AND d.source_id = a.source_id AND d.day = a.day;
+    INSERT INTO daily_belief_summary ({_SUMMARY_COLUMNS})
+    {_AGGREGATE_BELIEFS_SQL.format(beliefs="timed_belief", join=_JOIN_CHANGED_DAYS_SQL.format(changed_days=_CHANGED_DAYS_AFTER_DELETE_SQL))};
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS daily_belief_summary_insert ON timed_belief;
+CREATE TRIGGER daily_belief_summary_insert
+    AFTER INSERT ON timed_belief
+    REFERENCING NEW TABLE AS new_beliefs
+    FOR EACH STATEMENT EXECUTE FUNCTION daily_belief_summary_insert();
+
+DROP TRIGGER IF EXISTS daily_belief_summary_update ON timed_belief;
+CREATE TRIGGER daily_belief_summary_update
+    AFTER UPDATE ON timed_belief
+    REFERENCING OLD TABLE AS old_beliefs NEW TABLE AS new_beliefs
+    FOR EACH STATEMENT EXECUTE FUNCTION daily_belief_summary_update();
+
+DROP TRIGGER IF EXISTS daily_belief_summary_delete ON timed_belief;
+CREATE TRIGGER daily_belief_summary_delete
+    AFTER DELETE ON timed_belief
+    REFERENCING OLD TABLE AS old_beliefs
+    FOR EACH STATEMENT EXECUTE FUNCTION daily_belief_summary_delete();
+"""
+
+# Create the triggers once all tables exist (the timed_belief table may be created after the summary table)
+event.listen(
+    db.metadata,
+    "after_create",
+    DDL(SUMMARY_FUNCTIONS_AND_TRIGGERS_SQL).execute_if(dialect="postgresql"),
+)
@@ -184,6 +184,71 @@ def _generate_fixed_value_records_compressed(
     ]
 
 
+def _fixed_value_resolution(
+    real_sensors: list["Sensor"],  # noqa F821
+) -> timedelta:
+    """Derive the finest resolution from real sensors, for spacing fixed-value records.
+
+    Returns timedelta(0) when there are no real sensors with a positive resolution,
+    which _fixed_value_timestamps_ms treats as "two boundary points only".
+    """
+    return determine_minimum_resampling_resolution(
+        [
+            s.event_resolution
+            for s in real_sensors
+            if hasattr(s, "event_resolution") and s.event_resolution > timedelta(0)
+        ]
+    )
+
+
+def _generate_fixed_value_chart_data_compressed(
+    fixed_value_sensors: list["Sensor"],  # noqa F821
+    event_starts_after: datetime,
+    event_ends_before: datetime,
+    resolution: timedelta | None,
+) -> tuple[list[dict], dict, dict]:
+    """Build compressed chart data records for fixed-value sensors, and their sensors and sources metadata.
+
+    :returns: records, and sensors and sources metadata keyed by ID (as string, matching
+              the compress_json format used for real sensors)
+    """
+    records: list[dict] = []
+    sensors_meta: dict = {}
+    sources_meta: dict = {}
+    for sensor in fixed_value_sensors:
+        # Each flex_source (flex-model, flex-context, flex-config) has
+        # its own unique negative ID so chart specs can distinguish them.
+        flex_source = (sensor.attributes or {}).get("flex_source", "flex-config")
+        source_id = _FLEX_SOURCE_IDS.get(flex_source, -3)
+        records.extend(
+            _generate_fixed_value_records_compressed(
+                sensor,
+                event_starts_after,
+                event_ends_before,
+                resolution,
+                source_id=source_id,
+            )
+        )
+        as_dict = getattr(sensor, "_as_dict_override", {}) or {}
+        sensors_meta[str(sensor.id)] = {
+            "name": as_dict.get("name", sensor.name),
+            "unit": as_dict.get("sensor_unit", sensor.unit),
+            # Fixed-value sensors are instantaneous (0), so the chart
+            # renders their row with linear interpolation like Vega-Lite.
+            "event_resolution": as_dict.get(
+                "event_resolution",
+                sensor.event_resolution.total_seconds(),
+            ),
+            "description": as_dict.get("description", sensor.name),
+            "asset_id": as_dict.get("asset_id"),
+            "asset_description": as_dict.get("asset_description", ""),
+        }
+        # Register source metadata once per unique flex_source.
+        if str(source_id) not in sources_meta:
+            sources_meta[str(source_id)] = _fixed_value_source_dict(flex_source)
+    return records, sensors_meta, sources_meta
+
+
 class GenericAssetType(db.Model):
     """An asset type defines what type an asset belongs to.
 
@@ -1045,7 +1110,7 @@ class GenericAsset(db.Model, AuthModelMixin):
 
         This method is the single place where both the ``chart()`` method (when
         ``include_data=True``) and the ``GET …/chart_data`` API endpoint should
-        obtain chart data.
+        obtain chart data (see ``chart_data_table`` for columnar formats).
 
         :param sensors:            Sensors to include; defaults to ``validate_sensors_to_show()``.
         :param event_starts_after: Start of the chart window.
@@ -1053,17 +1118,7 @@ class GenericAsset(db.Model, AuthModelMixin):
         :param kwargs:             Passed through to ``search_beliefs``.
         :returns:                  JSON string of chart data records.
         """
-        from flexmeasures.data.schemas.generic_assets import SensorsToShowSchema
-
-        if sensors is None:
-            sensors = SensorsToShowSchema.flatten(self.validate_sensors_to_show())
-
-        real_sensors = [
-            s for s in sensors if getattr(s, "id", None) is None or s.id >= 0
-        ]
-        fixed_value_sensors = [
-            s for s in sensors if getattr(s, "id", None) is not None and s.id < 0
-        ]
+        real_sensors, fixed_value_sensors = self._split_chart_data_sensors(sensors)
 
         data = self.search_beliefs(
             sensors=real_sensors,
@@ -1074,67 +1129,23 @@ class GenericAsset(db.Model, AuthModelMixin):
         )
 
         if fixed_value_sensors and event_starts_after and event_ends_before:
-            # Derive the finest resolution from real sensors. Returns timedelta(0)
-            # when there are no real sensors with a positive resolution, which
-            # _fixed_value_timestamps_ms treats as "two boundary points only".
-            resolution: timedelta | None = determine_minimum_resampling_resolution(
-                [
-                    s.event_resolution
-                    for s in real_sensors
-                    if hasattr(s, "event_resolution")
-                    and s.event_resolution > timedelta(0)
-                ]
-            )
+            resolution = _fixed_value_resolution(real_sensors)
             parsed = json.loads(data)
 
             if isinstance(parsed, dict):
                 # compress_json=True path: {"data": [...], "sensors": {...}, "sources": {...}}
-                # The UI always uses this path (compress_json=true in the fetch URL).
-                records_list = parsed.get("data", [])
-                sensors_meta = parsed.get("sensors", {})
-                sources_meta = parsed.get("sources", {})
-
-                for sensor in fixed_value_sensors:
-                    # Each flex_source (flex-model, flex-context, flex-config) has
-                    # its own unique negative ID so chart specs can distinguish them.
-                    flex_source = (sensor.attributes or {}).get(
-                        "flex_source", "flex-config"
+                # The UI uses this path (compress_json=true in the fetch URL), unless it reads Arrow data.
+                records, sensors_meta, sources_meta = (
+                    _generate_fixed_value_chart_data_compressed(
+                        fixed_value_sensors,
+                        event_starts_after,
+                        event_ends_before,
+                        resolution,
                     )
-                    source_id = _FLEX_SOURCE_IDS.get(flex_source, -3)
-                    records_list.extend(
-                        _generate_fixed_value_records_compressed(
-                            sensor,
-                            event_starts_after,
-                            event_ends_before,
-                            resolution,
-                            source_id=source_id,
-                        )
-                    )
-                    # Add sensor metadata keyed by sensor id (as string, matching
-                    # the compress_json format used for real sensors).
-                    as_dict = getattr(sensor, "_as_dict_override", {}) or {}
-                    sensors_meta[str(sensor.id)] = {
-                        "name": as_dict.get("name", sensor.name),
-                        "unit": as_dict.get("sensor_unit", sensor.unit),
-                        # Fixed-value sensors are instantaneous (0), so the chart
-                        # renders their row with linear interpolation like Vega-Lite.
-                        "event_resolution": as_dict.get(
-                            "event_resolution",
-                            sensor.event_resolution.total_seconds(),
-                        ),
-                        "description": as_dict.get("description", sensor.name),
-                        "asset_id": as_dict.get("asset_id"),
-                        "asset_description": as_dict.get("asset_description", ""),
-                    }
-                    # Register source metadata once per unique flex_source.
-                    if str(source_id) not in sources_meta:
-                        sources_meta[str(source_id)] = _fixed_value_source_dict(
-                            flex_source
-                        )
-
-                parsed["data"] = records_list
-                parsed["sensors"] = sensors_meta
-                parsed["sources"] = sources_meta
+                )
+                parsed["data"] = parsed.get("data", []) + records
+                parsed["sensors"] = {**parsed.get("sensors", {}), **sensors_meta}
+                parsed["sources"] = {**parsed.get("sources", {}), **sources_meta}
                 return json.dumps(parsed)
             else:
                 # compress_json=False path: plain list of records
@@ -1148,6 +1159,78 @@ class GenericAsset(db.Model, AuthModelMixin):
 
         return data
 
+    def chart_data_table(
+        self,
+        sensors: list["Sensor"] | None = None,  # noqa F821
+        event_starts_after: datetime | None = None,
+        event_ends_before: datetime | None = None,
+        **kwargs,
+    ) -> "pa.Table":  # noqa F821
+        """Return chart data as a pyarrow Table, including rows for fixed-value sensors.
+
+        The columnar counterpart of ``chart_data_json`` (with ``compress_json=True``):
+        the table has the same columns as the keys of the compressed records,
+        and the sensors and sources lookup data in its schema metadata
+        (see ``flexmeasures.data.services.columnar``). Requires pyarrow.
+
+        :param sensors:            Sensors to include; defaults to ``validate_sensors_to_show()``.
+        :param event_starts_after: Start of the chart window.
+        :param event_ends_before:  End of the chart window.
+        :param kwargs:             Passed through to ``search_beliefs``.
+        :returns:                  pyarrow Table of chart data.
+        """
+        from flexmeasures.data.services.columnar import (
+            belief_records_to_batch,
+            make_chart_data_table,
+            read_table_metadata,
+        )
+
+        real_sensors, fixed_value_sensors = self._split_chart_data_sensors(sensors)
+        kwargs.pop("compress_json", None)
+
+        table = self.search_beliefs(
+            sensors=real_sensors,
+            as_arrow=True,
+            event_starts_after=event_starts_after,
+            event_ends_before=event_ends_before,
+            **kwargs,
+        )
+
+        if fixed_value_sensors and event_starts_after and event_ends_before:
+            records, sensors_meta, sources_meta = (
+                _generate_fixed_value_chart_data_compressed(
+                    fixed_value_sensors,
+                    event_starts_after,
+                    event_ends_before,
+                    _fixed_value_resolution(real_sensors),
+                )
+            )
+            metadata = read_table_metadata(table)
+            table = make_chart_data_table(
+                table.to_batches() + [belief_records_to_batch(records)],
+                sensors={**metadata["sensors"], **sensors_meta},
+                sources={**metadata["sources"], **sources_meta},
+            )
+
+        return table
+
+    def _split_chart_data_sensors(
+        self, sensors: list["Sensor"] | None  # noqa F821
+    ) -> tuple[list["Sensor"], list["Sensor"]]:  # noqa F821
+        """Split the sensors to chart into real sensors and fixed-value sensors (negative IDs)."""
+        from flexmeasures.data.schemas.generic_assets import SensorsToShowSchema
+
+        if sensors is None:
+            sensors = SensorsToShowSchema.flatten(self.validate_sensors_to_show())
+
+        real_sensors = [
+            s for s in sensors if getattr(s, "id", None) is None or s.id >= 0
+        ]
+        fixed_value_sensors = [
+            s for s in sensors if getattr(s, "id", None) is not None and s.id < 0
+        ]
+        return real_sensors, fixed_value_sensors
+
     def search_beliefs(  # noqa C901
         self,
         sensors: list["Sensor"] | None = None,  # noqa F821
@@ -1166,8 +1249,9 @@ class GenericAsset(db.Model, AuthModelMixin):
         most_recent_events_only: bool = False,
         as_json: bool = False,
         compress_json: bool = False,
+        as_arrow: bool = False,
         resolution: timedelta | None = None,
-    ) -> BeliefsDataFrame | str:
+    ) -> BeliefsDataFrame | str | "pa.Table":  # noqa F821
         """Search all beliefs about events for all sensors of this asset
 
         If you don't set any filters, you get the most recent beliefs about all events.
@@ -1185,8 +1269,9 @@ class GenericAsset(db.Model, AuthModelMixin):
         :param most_recent_events_only: only return (post knowledge time) beliefs for the most recent event (maximum event start)
         :param as_json: return beliefs in JSON format (e.g. for use in charts) rather than as BeliefsDataFrame
         :param compress_json: return beliefs, sensors and sources as separate datasets to be used for lookups
+        :param as_arrow: return beliefs as a pyarrow Table with the columns of the compressed JSON data, and sensors and sources as lookup data in its schema metadata (requires pyarrow)
         :param resolution: optionally set the resolution of data being displayed
-        :returns: dictionary of BeliefsDataFrames or JSON string (if as_json is True)
+        :returns: dictionary of BeliefsDataFrames, JSON string (if as_json is True) or pyarrow Table (if as_arrow is True)
         """
         from flexmeasures.data.models.time_series import TimedBelief
 
@@ -1285,7 +1370,11 @@ class GenericAsset(db.Model, AuthModelMixin):
             )
 
             return df.to_json(orient="records")
-        elif as_json and compress_json:
+        elif (as_json and compress_json) or as_arrow:
+            from flexmeasures.data.services.columnar import (
+                belief_columns,
+                make_chart_data_table,
+            )
             from flexmeasures.data.services.time_series import simplify_index
 
             if sensors:
@@ -1326,6 +1415,7 @@ class GenericAsset(db.Model, AuthModelMixin):
                         }
 
                 all_records = []
+                batches = []
 
                 for sensor, bdf in bdf_dict.items():
                     if bdf.empty:
@@ -1358,6 +1448,17 @@ class GenericAsset(db.Model, AuthModelMixin):
                         ),
                     ).reset_index()
 
+                    if as_arrow:
+                        # Columns are built from the underlying arrays, without records per belief
+                        batches.append(
+                            belief_columns(
+                                df,
+                                sensor.id,
+                                scale_factor=factors.get(sensor.unit, 1.0),
+                            )
+                        )
+                        continue
+
                     # VECTORIZED PROCESSING instead of for loops for speed
                     # Convert timestamps to milliseconds vectorized
                     event_start_ms = (
@@ -1414,6 +1515,10 @@ class GenericAsset(db.Model, AuthModelMixin):
                     for row_values in zip(*base_records.values()):
                         all_records.append(dict(zip(record_keys, row_values)))
 
+                if as_arrow:
+                    return make_chart_data_table(
+                        batches, sensors=sensors_metadata, sources=sources_metadata
+                    )
                 return json.dumps(
                     {
                         "data": all_records,
@@ -1421,6 +1526,8 @@ class GenericAsset(db.Model, AuthModelMixin):
                         "sources": sources_metadata,
                     }
                 )
+            elif as_arrow:
+                return make_chart_data_table([], sensors={}, sources={})
             else:
                 return json.dumps({"data": [], "sensors": {}, "sources": {}})
 
@@ -1,8 +1,14 @@
 from __future__ import annotations
 
 import math
-
-from flask import current_app
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from collections import OrderedDict
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Any, Hashable
+
+from flask import Flask, current_app
 import pandas as pd
 import numpy as np
 from pandas.tseries.frequencies import to_offset
@@ -22,12 +28,16 @@ from pyomo.core import (
 )
 from pyomo.environ import UnknownSolver  # noqa F401
 from pyomo.environ import value
-from pyomo.opt import SolverFactory, SolverResults
+from pyomo.opt import SolverFactory, SolverResults, TerminationCondition
 
 from flexmeasures.data.models.planning import (
     Commitment,
     FlowCommitment,
     StockCommitment,
+    extract_devices,
+)
+from flexmeasures.data.models.planning.linear_optimization_matrix import (
+    solve_with_highspy,
 )
 from flexmeasures.data.models.planning.utils import initialize_series, initialize_df
 
@@ -73,546 +83,208 @@ def validate_highs_options(options: dict) -> None:
         )
 
 
-def device_scheduler(  # noqa C901
-    device_constraints: list[pd.DataFrame],
-    ems_constraints: pd.DataFrame | list[pd.DataFrame],
-    commitment_quantities: list[pd.Series] | None = None,
-    commitment_downwards_deviation_price: list[pd.Series] | list[float] | None = None,
-    commitment_upwards_deviation_price: list[pd.Series] | list[float] | None = None,
-    commitments: list[pd.DataFrame] | list[Commitment] | None = None,
-    initial_stock: float | list[float] = 0,
-    stock_groups: dict[int, list[int]] | None = None,
-    ems_constraint_groups: list[list[int]] | None = None,
-) -> tuple[list[pd.Series], float, SolverResults, ConcreteModel]:
-    """This generic device scheduler is able to handle an EMS with multiple devices,
-    with various types of constraints on the EMS level and on the device level,
-    and with multiple market commitments on the EMS level.
-    A typical example is a house with many devices.
-    The commitments are assumed to be with regard to the flow of energy to the device (positive for consumption,
-    negative for production). The solver minimises the costs of deviating from the commitments.
+# Models kept for reuse, keyed by their structure (see FLEXMEASURES_LP_MODEL_CACHE_SIZE)
+_model_cache: OrderedDict[tuple, tuple[ConcreteModel, Any]] = OrderedDict()
 
-    :param device_constraints:  Device constraints are on a device level. Handled constraints (listed by column name):
-                                    max: maximum stock assuming an initial stock of zero (e.g. in MWh or boxes)
-                                    min: minimum stock assuming an initial stock of zero
-                                    equal: exact amount of stock (we do this by clamping min and max)
-                                    efficiency: amount of stock left at the next datetime (the rest is lost)
-                                    derivative max: maximum flow (e.g. in MW or boxes/h)
-                                    derivative min: minimum flow
-                                    derivative equals: exact amount of flow (we do this by clamping derivative min and derivative max)
-                                    derivative down efficiency: conversion efficiency of flow out of a device (flow out : stock decrease)
-                                    derivative up efficiency: conversion efficiency of flow into a device (stock increase : flow in)
-                                    stock delta: predefined stock delta to apply to the storage device. Positive values cause an increase and negative values a decrease
-    :param ems_constraints:     EMS constraints are on an EMS level. Handled constraints (listed by column name):
-                                    derivative max: maximum flow
-                                    derivative min: minimum flow
-                                May be a single DataFrame (the constraint is applied to the summed flow of all devices),
-                                or a list of DataFrames (one per device group). In the latter case, ``ems_constraint_groups``
-                                lists the device indices each DataFrame applies to. The StorageScheduler uses one device
-                                group per commodity, so each commodity gets its own EMS-level capacity constraint.
-    :param ems_constraint_groups: For each EMS constraint DataFrame, the list of device indices it applies to. When omitted,
-                                each EMS constraint is applied to the summed flow of all devices (legacy behaviour). A device
-                                may appear in more than one group.
-    :param commitments:         Commitments are on an EMS level by default. Handled parameters (listed by column name):
-                                    quantity:                   for example, 5.5
-                                    downwards deviation price:  10.1
-                                    upwards deviation price:    10.2
-                                    group:                      1 (defaults to the enumerate time step j)
-                                    device:                     0 (corresponds to device d; if not set, commitment is on an EMS level)
-    :param initial_stock:       initial stock for each device. Use a list with the same number of devices as device_constraints,
-                                or use a single value to set the initial stock to be the same for all devices.
 
-    Potentially deprecated arguments:
-        commitment_quantities: amounts of flow specified in commitments (both previously ordered and newly requested)
-            - e.g. in MW or boxes/h
-        commitment_downwards_deviation_price: penalty for downwards deviations of the flow
-            - e.g. in EUR/MW or EUR/(boxes/h)
-            - either a single value (same value for each flow value) or a Series (different value for each flow value)
-        commitment_upwards_deviation_price: penalty for upwards deviations of the flow
+def _constraint_values(
+    df: pd.DataFrame, column: str, default: float | None = None
+) -> np.ndarray:
+    """Values of a constraint column as floats, or the default if the column is missing (if a default is given)."""
+    if default is not None and column not in df.columns:
+        return np.full(len(df.index), float(default))
+    return df[column].to_numpy(dtype=float)
 
-    Separate costs for each commitment are stored in a dictionary under `model.commitment_costs` (indexed by commitment).
 
-    All Series and DataFrames should have the same resolution.
+def _indexed_values(values: np.ndarray) -> dict[tuple[int, int], float]:
+    """Map a 2D array to initial values of a Param indexed by (row, column)."""
+    return {
+        (i, j): v for i, row in enumerate(values.tolist()) for j, v in enumerate(row)
+    }
 
-    For now, we pass in the various constraints and prices as separate variables, from which we make a MultiIndex
-    DataFrame. Later we could pass in a MultiIndex DataFrame directly.
-    """
 
-    model = ConcreteModel()
+def _stock_change_coefficient(efficiency: float) -> float:
+    """Coefficient b of one step of the stock recursion, for `how="linear"`.
 
-    # If the EMS has no devices, don't bother
-    if len(device_constraints) == 0:
-        return [], 0, SolverResults(), model
+    stock[j] = a * stock[j-1] + b * change[j], with a being the storage efficiency.
 
-    # Get timing from first device
-    start = device_constraints[0].index.to_pydatetime()[0]
-    # Workaround for https://github.com/pandas-dev/pandas/issues/53643. Was: resolution = pd.to_timedelta(device_constraints[0].index.freq)
-    resolution = pd.to_timedelta(device_constraints[0].index.freq).to_pytimedelta()
-    end = device_constraints[0].index.to_pydatetime()[-1] + resolution
+    Mirrors :func:`apply_stock_changes_and_losses`, which we cannot call in the model
+    because it expects numbers, while `change[j]` is a Pyomo expression.
+    """
+    if efficiency == 1:
+        return 1.0
+    return (efficiency - 1) / math.log(efficiency)
+
+
+def _commitment_structure(df: pd.DataFrame) -> tuple:
+    """The parts of a (sub)commitment that shape the model, rather than set its Params."""
+    return (
+        tuple(df.columns),
+        tuple(df["j"]),
+        df["quantity"].isna().to_numpy().tobytes(),
+        tuple(df["class"]),
+        repr(df["commodity"].iloc[0]) if "commodity" in df.columns else None,
+    )
 
-    # Normalise EMS constraints to a list of (DataFrame, device-group) pairs.
-    # A single DataFrame (legacy behaviour) applies to the summed flow of all devices;
-    # a list of DataFrames applies one EMS-level constraint per device group, as set up
-    # per commodity by the StorageScheduler.
-    all_devices = list(range(len(device_constraints)))
-    if isinstance(ems_constraints, pd.DataFrame):
-        ems_constraints_list = [ems_constraints]
-        ems_constraint_device_groups = [all_devices]
-    else:
-        ems_constraints_list = ems_constraints
-        if ems_constraint_groups is None:
-            if len(ems_constraints_list) > 1:
-                raise ValueError(
-                    "When passing multiple EMS constraint DataFrames, you must also specify ems_constraint_groups."
-                )
-            ems_constraint_device_groups = [all_devices for _ in ems_constraints_list]
-        else:
-            ems_constraint_device_groups = ems_constraint_groups
 
-    # map device -> primary stock group (used for per-device stock bounds)
-    # and map stock group -> all member devices (used for stock accumulation).
-    device_to_group = {}
+def _normalize_ems_constraints(
+    ems_constraints: pd.DataFrame | list[pd.DataFrame],
+    ems_constraint_groups: list[list[int]] | None,
+    n_devices: int,
+) -> tuple[list[pd.DataFrame], list[list[int]]]:
+    """Normalise EMS constraints to a list of DataFrames and a list of the device groups they apply to.
+
+    A single DataFrame (legacy behaviour) applies to the summed flow of all devices;
+    a list of DataFrames applies one EMS-level constraint per device group, as set up
+    per commodity by the StorageScheduler.
+    """
+    all_devices = list(range(n_devices))
+    if isinstance(ems_constraints, pd.DataFrame):
+        return [ems_constraints], [all_devices]
+    if ems_constraint_groups is None:
+        if len(ems_constraints) > 1:
+            raise ValueError(
+                "When passing multiple EMS constraint DataFrames, you must also specify ems_constraint_groups."
+            )
+        return ems_constraints, [all_devices for _ in ems_constraints]
+    return ems_constraints, ems_constraint_groups
+
+
+def _build_model(  # noqa C901
+    model: ConcreteModel,
+    param_values: dict[str, np.ndarray | dict | float],
+    mutable: bool,
+    n_steps: int,
+    commitments: list[pd.DataFrame],
+    device_group_lookup: dict[int, dict],
+    commodity_devices: dict[str, set[int]],
+    group_to_devices: dict[str, list[int]],
+    device_to_group: dict[int, str],
+    ems_constraint_device_groups: list[list[int]],
+    convex_cost_curve: bool,
+):
+    """Add the sets, parameters, variables, constraints and objective of the device scheduler to the model.
+
+    Params are initialized with the given values. If mutable, the values of the Params
+    can be updated later, to solve the same model again for another set of values.
+    """
 
-    # Group keys are namespaced strings: a declared stock group's key (a state-of-charge
-    # sensor id) could otherwise collide with the device index of an ungrouped device,
-    # silently merging that device into the stock group.
-    if stock_groups:
-        for g, devices in stock_groups.items():
-            for d in devices:
-                device_to_group[d] = f"stock:{g}"
-    # Devices not in any stock group (e.g. inflexible devices) form individual groups.
-    for d in range(len(device_constraints)):
-        if d not in device_to_group:
-            device_to_group[d] = f"device:{d}"
+    # Add indices for devices (d), datetimes (j) and commitments (c)
+    model.d = RangeSet(0, len(param_values["initial_stock"]) - 1, doc="Set of devices")
+    model.j = RangeSet(0, n_steps - 1, doc="Set of datetimes")
+    model.c = RangeSet(0, len(commitments) - 1, doc="Set of commitments")
 
-    group_to_devices: dict[int, list[int]] = {}
-    for d, g in device_to_group.items():
-        group_to_devices.setdefault(g, []).append(d)
+    # Add 2D indices for commitment device groups (cg)
+    def commitment_device_groups_init(m):
+        return ((c, g) for c, groups in device_group_lookup.items() for g in groups)
 
-    # The stock recursion is modelled once per stock group, using the group's shared
-    # storage efficiency, so devices sharing a stock may not declare different ones.
-    for g, group_devices in group_to_devices.items():
-        if len(group_devices) > 1:
-            # A missing efficiency column means the default (no losses) applies.
-            group_efficiency = device_constraints[group_devices[0]].get("efficiency")
-            for d in group_devices[1:]:
-                efficiency = device_constraints[d].get("efficiency")
-                if (
-                    (efficiency is None) != (group_efficiency is None)
-                    or efficiency is not None
-                    and not efficiency.equals(group_efficiency)
-                ):
-                    raise ValueError(
-                        f"Devices {group_devices} share stock group {g} but have different"
-                        " storage efficiencies. The storage efficiency is a property of the"
-                        " shared stock, so define it once per stock group."
-                    )
-            if isinstance(initial_stock, list):
-                group_initial_stocks = {
-                    initial_stock[d] if d < len(initial_stock) else 0
-                    for d in group_devices
-                }
-                if len(group_initial_stocks) > 1:
-                    raise ValueError(
-                        f"Devices {group_devices} share stock group {g} but have different"
-                        " initial stocks. The initial stock is a property of the shared"
-                        " stock, so define it once per stock group."
-                    )
+    model.cg = Set(dimen=2, initialize=commitment_device_groups_init)
 
-    # Move commitments from old structure to new
-    if commitments is None:
-        commitments = []
-    else:
-        commitments = [
-            c.to_frame() if isinstance(c, Commitment) else c for c in commitments
-        ]
-    if commitment_quantities is not None:
-        for quantity, down, up in zip(
-            commitment_quantities,
-            commitment_downwards_deviation_price,
-            commitment_upwards_deviation_price,
-        ):
+    # Add 2D indices for commitment datetimes (cj)
+    def commitments_init(m):
+        return ((c, j) for c in m.c for j in commitments[c]["j"])
 
-            # Turn prices per commitment into prices per commitment flow
-            if all(isinstance(price, float) for price in down) or isinstance(
-                down, float
-            ):
-                down = initialize_series(down, start, end, resolution)
-            if all(isinstance(price, float) for price in up) or isinstance(up, float):
-                up = initialize_series(up, start, end, resolution)
+    model.cj = Set(dimen=2, initialize=commitments_init)
 
-            group = initialize_series(list(range(len(down))), start, end, resolution)
-            df = initialize_df(
-                ["quantity", "downwards deviation price", "upwards deviation price"],
-                start,
-                end,
-                resolution,
-            )
-            df["quantity"] = quantity
-            df["downwards deviation price"] = down
-            df["upwards deviation price"] = up
-            df["group"] = group
-            commitments.append(df)
+    # Add 3D indices for commitment datetime device groups (cjg)
+    def commitment_time_device_groups_init(m):
+        return ((c, j, g) for (c, j) in m.cj for (_, g) in m.cg if _ == c)
 
-    # commodity → set(device indices)
-    commodity_devices = {}
+    model.cjg = Set(dimen=3, initialize=commitment_time_device_groups_init)
 
-    for df in commitments:
-        if "commodity" not in df.columns or "device" not in df.columns:
-            continue
+    def grouped_commitment_equalities(m, c, j, g):
+        """
+        Enforce a commitment deviation constraint on the aggregate of devices in a group.
 
-        for _, row in df[["commodity", "device"]].dropna().iterrows():
-            devices = row["device"]
-            if not isinstance(devices, (list, tuple, set)):
-                devices = [devices]
+        For commitment ``c`` at time index ``j``, this constraint couples the commitment
+        baseline (plus deviation variables) to the summed flow or stock of all devices
+        belonging to device group ``g``. StockCommitments aggregate device stocks, while
+        FlowCommitments aggregate device flows. Constraints are skipped if the commitment
+        is inactive at ``(c, j)`` or if the group contains no devices.
+        """
+        if value(m.commitment_quantity[c, j]) == -infinity:
+            return Constraint.Skip
 
-            commodity_devices.setdefault(row["commodity"], set()).update(devices)
+        devices_in_group = device_group_lookup.get(c, {}).get(g, set())
+        if not devices_in_group:
+            return Constraint.Skip
 
-    # Check if commitments have the same time window and resolution as the constraints
-    for commitment in commitments:
-        start_c = commitment.index.to_pydatetime()[0]
-        resolution_c = pd.to_timedelta(commitment.index.freq)
-        end_c = commitment.index.to_pydatetime()[-1] + resolution
-        if not (start_c == start and end_c == end):
-            raise Exception(
-                "Not implemented for different time windows.\n(%s,%s)\n(%s,%s)"
-                % (start, end, start_c, end_c)
-            )
-        if resolution_c != resolution:
-            raise Exception(
-                "Not implemented for different resolutions.\n%s\n%s"
-                % (resolution, resolution_c)
-            )
+        center = (
+            m.commitment_quantity[c, j]
+            + m.commitment_downwards_deviation[c]
+            + m.commitment_upwards_deviation[c]
+        )
 
-    def convert_commitments_to_subcommitments(
-        dfs: list[pd.DataFrame],
-    ) -> tuple[list[pd.DataFrame], dict[int, int]]:
-        """Transform commitments, each specifying a group for each time step, to sub-commitments, one per group.
+        if commitments[c]["class"].apply(lambda cl: cl == StockCommitment).all():
+            center -= sum(_get_stock_change(m, d, j) for d in devices_in_group)
+        else:
+            center -= sum(m.ems_power[d, j] for d in devices_in_group)
 
-        'Groups' are a commitment concept (grouping time slots of a commitment),
-        making it possible that deviations/breaches can be accounted for properly within this group
-        (e.g. highest breach per calendar month defines the penalty).
-        Here, we define sub-commitments, by separating commitments by group and by direction of deviation (up, down).
+        return (
+            0 if "upwards deviation price" in commitments[c].columns else None,
+            center,
+            0 if "downwards deviation price" in commitments[c].columns else None,
+        )
 
-        We also enumerate the time steps in a new column "j".
-
-        For example, given contracts A and B (represented by 2 DataFrames), each with 3 groups,
-        we return (sub)commitments A1, A2, A3, B1, B2 and B3,
-        where A,B,C is the enumerated contract and 1,2,3 is the enumerated group.
-        """
-        commitment_mapping = {}
-        sub_commitments = []
-        for c, df in enumerate(dfs):
-            # Make sure each commitment has "device" (default NaN) and "class" (default FlowCommitment) columns
-            if "device" not in df.columns:
-                df["device"] = np.nan
-            if "class" not in df.columns:
-                df["class"] = FlowCommitment
-
-            df["j"] = range(len(df.index))
-            groups = list(df["group"].unique())
-            for group in groups:
-                sub_commitment = df[df["group"] == group].drop(columns=["group"])
-
-                # Catch non-uniqueness
-                if len(sub_commitment["upwards deviation price"].unique()) > 1:
-                    raise ValueError(
-                        "Commitment groups cannot have non-unique upwards deviation prices."
-                    )
-                if len(sub_commitment["downwards deviation price"].unique()) > 1:
-                    raise ValueError(
-                        "Commitment groups cannot have non-unique downwards deviation prices."
-                    )
-                if len(sub_commitment) == 1:
-                    commitment_mapping[len(sub_commitments)] = c
-                    sub_commitments.append(sub_commitment)
-                else:
-                    down_commitment = sub_commitment.copy().drop(
-                        columns="upwards deviation price"
-                    )
-                    up_commitment = sub_commitment.copy().drop(
-                        columns="downwards deviation price"
-                    )
-                    commitment_mapping[len(sub_commitments)] = c
-                    commitment_mapping[len(sub_commitments) + 1] = c
-                    sub_commitments.extend([down_commitment, up_commitment])
-        return sub_commitments, commitment_mapping
-
-    commitments, commitment_mapping = convert_commitments_to_subcommitments(commitments)
-
-    device_group_lookup = {}
-
-    for c, df in enumerate(commitments):
-        # Stock-scoped commitments couple to their stock group as a whole, regardless
-        # of which device index they name: the group's first device carries the group's
-        # stock, so a single-member group suffices (also avoiding double-counting the
-        # shared stock when the commitment names multiple members).
-        if "stock" in df.columns and pd.notna(df["stock"].iloc[0]):
-            stock_group_key = f"stock:{int(df['stock'].iloc[0])}"
-            if stock_group_key in group_to_devices:
-                device_group_lookup[c] = {
-                    stock_group_key: {group_to_devices[stock_group_key][0]}
-                }
-                continue
-
-        if "device" not in df.columns:
-            # EMS-level commitment: no device grouping needed here;
-            # handled by ems_flow_commitment_equalities.
-            continue
-
-        has_device_group = "device_group" in df.columns
-        if has_device_group:
-            rows = df[["device", "device_group"]].dropna()
-        else:
-            # Backwards-compatible default: each device is its own group.
-            # This preserves the behaviour of old-style DataFrame commitments that
-            # pre-date the device_group feature (e.g. from initialize_device_commitment).
-            rows = df[["device"]].dropna()
-
-        device_group_lookup[c] = {}
-
-        for _, row in rows.iterrows():
-            d = row["device"]
-            # When no device_group column is present, use the device id itself as
-            # the group label so that each device forms an independent group.
-            g = row["device_group"] if has_device_group else d
-
-            if isinstance(d, (list, tuple, set, np.ndarray)):
-                devices = set(d)
-            else:
-                devices = {d}
-
-            device_group_lookup[c].setdefault(g, set()).update(devices)
-
-    # Oversimplified check for a convex cost curve
-    df = pd.concat(commitments)[
-        ["upwards deviation price", "downwards deviation price"]
-    ]
-    df = df.groupby(level=0).sum()
-    if len(df[df["upwards deviation price"] < df["downwards deviation price"]]) == 0:
-        convex_cost_curve = True
-    else:
-        convex_cost_curve = False
-
-    bigM_columns = ["derivative max", "derivative min", "derivative equals"]
-    # Compute a good value for our Big-Ms
-    # Md is used to constrain the search space for device power
-    # Mc is used to constrain the search space for commitment deviations
-    Md = np.nanmax([np.nanmax(d[bigM_columns].abs()) for d in device_constraints])
-    Mc = np.nansum([np.nansum(d[bigM_columns].abs()) for d in device_constraints])
-
-    # Both Md and Mc have to be 1 MW, at least
-    Md = max(Md, 1)
-    Mc = max(Mc, 1)
-
-    for d in range(len(device_constraints)):
-        if "stock delta" not in device_constraints[d].columns:
-            device_constraints[d]["stock delta"] = 0
-        else:
-            device_constraints[d]["stock delta"] = (
-                device_constraints[d]["stock delta"].astype(float).fillna(0)
-            )
-
-    # Add indices for devices (d), datetimes (j) and commitments (c)
-    model.d = RangeSet(0, len(device_constraints) - 1, doc="Set of devices")
-    model.j = RangeSet(
-        0, len(device_constraints[0].index.to_pydatetime()) - 1, doc="Set of datetimes"
-    )
-    model.c = RangeSet(0, len(commitments) - 1, doc="Set of commitments")
-
-    # Add 2D indices for commitment device groups (cg)
-    def commitment_device_groups_init(m):
-        return ((c, g) for c, groups in device_group_lookup.items() for g in groups)
-
-    model.cg = Set(dimen=2, initialize=commitment_device_groups_init)
-
-    # Add 2D indices for commitment datetimes (cj)
-    def commitments_init(m):
-        return ((c, j) for c in m.c for j in commitments[c]["j"])
-
-    model.cj = Set(dimen=2, initialize=commitments_init)
-
-    # Add 3D indices for commitment datetime device groups (cjg)
-    def commitment_time_device_groups_init(m):
-        return ((c, j, g) for (c, j) in m.cj for (_, g) in m.cg if _ == c)
-
-    model.cjg = Set(dimen=3, initialize=commitment_time_device_groups_init)
-
-    # Add parameters
-    def price_down_select(m, c):
-        if "downwards deviation price" not in commitments[c].columns:
-            return 0
-        price = commitments[c]["downwards deviation price"].iloc[0]
-        if np.isnan(price):
-            return 0
-        return price
-
-    def price_up_select(m, c):
-        if "upwards deviation price" not in commitments[c].columns:
-            return 0
-        price = commitments[c]["upwards deviation price"].iloc[0]
-        if np.isnan(price):
-            return 0
-        return price
-
-    def commitment_quantity_select(m, c, j):
-        quantity = commitments[c][commitments[c]["j"] == j]["quantity"].values[0]
-        if np.isnan(quantity):
-            return -infinity
-        return quantity
-
-    def device_max_select(m, d, j):
-        min_v = device_constraints[d]["min"].iloc[j]
-        max_v = device_constraints[d]["max"].iloc[j]
-        equal_v = device_constraints[d]["equals"].iloc[j]
-        if np.isnan(max_v) and np.isnan(equal_v):
-            return infinity
-        else:
-            if not np.isnan(equal_v):
-                # make min_v < equal_v
-                equal_v = np.nanmax([equal_v, min_v])
-
-            return np.nanmin([max_v, equal_v])
-
-    def device_min_select(m, d, j):
-        min_v = device_constraints[d]["min"].iloc[j]
-        max_v = device_constraints[d]["max"].iloc[j]
-        equal_v = device_constraints[d]["equals"].iloc[j]
-        if np.isnan(min_v) and np.isnan(equal_v):
-            return -infinity
-        else:
-            if not np.isnan(equal_v):
-                # make equal_v <= max_v
-                equal_v = np.nanmin([equal_v, max_v])
-
-            return np.nanmax([min_v, equal_v])
-
-    def device_derivative_max_select(m, d, j):
-        max_v = device_constraints[d]["derivative max"].iloc[j]
-        equal_v = device_constraints[d]["derivative equals"].iloc[j]
-        if np.isnan(max_v) and np.isnan(equal_v):
-            return infinity
-        else:
-            return np.nanmin([max_v, equal_v])
-
-    def device_derivative_min_select(m, d, j):
-        min_v = device_constraints[d]["derivative min"].iloc[j]
-        equal_v = device_constraints[d]["derivative equals"].iloc[j]
-        if np.isnan(min_v) and np.isnan(equal_v):
-            return -infinity
-        else:
-            return np.nanmax([min_v, equal_v])
-
-    def ems_derivative_max_select(m, g, j):
-        v = ems_constraints_list[g]["derivative max"].iloc[j]
-        if np.isnan(v):
-            return infinity
-        else:
-            return v
-
-    def ems_derivative_min_select(m, g, j):
-        v = ems_constraints_list[g]["derivative min"].iloc[j]
-        if np.isnan(v):
-            return -infinity
-        else:
-            return v
-
-    def device_efficiency(m, d, j):
-        """Assume perfect efficiency if no efficiency information is available."""
-        try:
-            eff = device_constraints[d]["efficiency"].iloc[j]
-        except KeyError:
-            return 1
-        if np.isnan(eff):
-            return 1
-        return eff
-
-    def device_derivative_down_efficiency(m, d, j):
-        """Assume perfect efficiency if no efficiency information is available."""
-        try:
-            eff = device_constraints[d]["derivative down efficiency"].iloc[j]
-        except KeyError:
-            return 1
-        if np.isnan(eff):
-            return 1
-        return eff
-
-    def device_derivative_up_efficiency(m, d, j):
-        """Assume perfect efficiency if no efficiency information is available."""
-        try:
-            eff = device_constraints[d]["derivative up efficiency"].iloc[j]
-        except KeyError:
-            return 1
-        if np.isnan(eff):
-            return 1
-        return eff
-
-    def device_stock_delta(m, d, j):
-        return device_constraints[d]["stock delta"].iloc[j]
-
-    def grouped_commitment_equalities(m, c, j, g):
-        """
-        Enforce a commitment deviation constraint on the aggregate of devices in a group.
-
-        For commitment ``c`` at time index ``j``, this constraint couples the commitment
-        baseline (plus deviation variables) to the summed flow or stock of all devices
-        belonging to device group ``g``. StockCommitments aggregate device stocks, while
-        FlowCommitments aggregate device flows. Constraints are skipped if the commitment
-        is inactive at ``(c, j)`` or if the group contains no devices.
-        """
-        if m.commitment_quantity[c, j] == -infinity:
-            return Constraint.Skip
-
-        devices_in_group = device_group_lookup.get(c, {}).get(g, set())
-        if not devices_in_group:
-            return Constraint.Skip
-
-        center = (
-            m.commitment_quantity[c, j]
-            + m.commitment_downwards_deviation[c]
-            + m.commitment_upwards_deviation[c]
-        )
-
-        if commitments[c]["class"].apply(lambda cl: cl == StockCommitment).all():
-            center -= sum(_get_stock_change(m, d, j) for d in devices_in_group)
-        else:
-            center -= sum(m.ems_power[d, j] for d in devices_in_group)
-
-        return (
-            0 if "upwards deviation price" in commitments[c].columns else None,
-            center,
-            0 if "downwards deviation price" in commitments[c].columns else None,
-        )
-
-    model.up_price = Param(model.c, initialize=price_up_select)
-    model.down_price = Param(model.c, initialize=price_down_select)
-    model.commitment_quantity = Param(
-        model.cj, domain=Reals, initialize=commitment_quantity_select
-    )
-    model.device_max = Param(model.d, model.j, initialize=device_max_select)
-    model.device_min = Param(model.d, model.j, initialize=device_min_select)
-    model.device_derivative_max = Param(
-        model.d, model.j, initialize=device_derivative_max_select
-    )
-    model.device_derivative_min = Param(
-        model.d, model.j, initialize=device_derivative_min_select
-    )
-    model.eg = RangeSet(
-        0, len(ems_constraints_list) - 1, doc="Set of EMS constraint (device) groups"
-    )
-    model.ems_derivative_max = Param(
-        model.eg, model.j, initialize=ems_derivative_max_select
-    )
-    model.ems_derivative_min = Param(
-        model.eg, model.j, initialize=ems_derivative_min_select
-    )
-    model.device_efficiency = Param(model.d, model.j, initialize=device_efficiency)
-    model.device_derivative_down_efficiency = Param(
-        model.d, model.j, initialize=device_derivative_down_efficiency
-    )
-    model.device_derivative_up_efficiency = Param(
-        model.d, model.j, initialize=device_derivative_up_efficiency
-    )
-    model.stock_delta = Param(model.d, model.j, initialize=device_stock_delta)
+    # Add parameters
+    model.up_price = Param(
+        model.c, initialize=param_values["up_price"], mutable=mutable
+    )
+    model.down_price = Param(
+        model.c, initialize=param_values["down_price"], mutable=mutable
+    )
+    model.commitment_quantity = Param(
+        model.cj,
+        domain=Reals,
+        initialize=param_values["commitment_quantity"],
+        mutable=mutable,
+    )
+    model.eg = RangeSet(
+        0,
+        len(ems_constraint_device_groups) - 1,
+        doc="Set of EMS constraint (device) groups",
+    )
+    for name in (
+        "device_max",
+        "device_min",
+        "device_derivative_max",
+        "device_derivative_min",
+        "device_derivative_up_max",
+        "device_derivative_down_min",
+        "device_efficiency",
+        "device_stock_change_coefficient",
+        "device_derivative_down_efficiency",
+        "device_derivative_up_efficiency",
+        "stock_delta",
+    ):
+        model.add_component(
+            name,
+            Param(
+                model.d,
+                model.j,
+                initialize=_indexed_values(param_values[name]),
+                mutable=mutable,
+            ),
+        )
+    model.ems_derivative_max = Param(
+        model.eg,
+        model.j,
+        initialize=_indexed_values(param_values["ems_derivative_max"]),
+        mutable=mutable,
+    )
+    model.ems_derivative_min = Param(
+        model.eg,
+        model.j,
+        initialize=_indexed_values(param_values["ems_derivative_min"]),
+        mutable=mutable,
+    )
+    model.initial_stock = Param(
+        model.d, initialize=param_values["initial_stock"], mutable=mutable
+    )
+    # Big-Ms: Md is used to constrain the search space for device power,
+    # and Mc is used to constrain the search space for commitment deviations
+    model.Md = Param(initialize=param_values["Md"], mutable=mutable)
+    model.Mc = Param(initialize=param_values["Mc"], mutable=mutable)
 
     # Add variables
     model.ems_power = Var(model.d, model.j, domain=Reals, initialize=0)
@@ -642,12 +314,6 @@ def device_scheduler(  # noqa C901
     )
     model.commitment_sign = Var(model.c, domain=Binary, initialize=0)
 
-    def _initial_stock_of(d):
-        if isinstance(initial_stock, list):
-            # No initial stock defined for inflexible device
-            return initial_stock[d] if d < len(initial_stock) else 0
-        return initial_stock
-
     def _stock_change_at(m, g, j):
         """Stock change of stock group g during time step j (before losses)."""
         return sum(
@@ -657,19 +323,6 @@ def device_scheduler(  # noqa C901
             for dev in group_to_devices[g]
         )
 
-    def _loss_coefficients(efficiency: float) -> tuple[float, float]:
-        """Coefficients (a, b) of one step of the stock recursion, for `how="linear"`.
-
-        stock[j] = a * stock[j-1] + b * change[j]
-
-        Mirrors :func:`apply_stock_changes_and_losses`, which we cannot call here
-        because it expects numbers, while `change[j]` is a Pyomo expression. The
-        storage efficiency is a Param, so `a` and `b` are plain floats.
-        """
-        if efficiency == 1:
-            return 1.0, 1.0
-        return efficiency, (efficiency - 1) / math.log(efficiency)
-
     def group_stock_balance(m, g, j):
         """Recursively couple a stock group's stock to the previous step's stock.
 
@@ -681,13 +334,14 @@ def device_scheduler(  # noqa C901
         (validated above), so the first device can represent the group here.
         """
         d0 = group_to_devices[g][0]
-        a, b = _loss_coefficients(m.device_efficiency[d0, j])
-        previous = m.group_stock[g, j - 1] if j > 0 else _initial_stock_of(d0)
+        a = m.device_efficiency[d0, j]
+        b = m.device_stock_change_coefficient[d0, j]
+        previous = m.group_stock[g, j - 1] if j > 0 else m.initial_stock[d0]
         return m.group_stock[g, j] == a * previous + b * _stock_change_at(m, g, j)
 
     def _get_stock_change(m, d, j):
         """Stock change of the stock group of device d, from the start until time j."""
-        return m.group_stock[device_to_group[d], j] - _initial_stock_of(d)
+        return m.group_stock[device_to_group[d], j] - m.initial_stock[d]
 
     # Add constraints as a tuple of (lower bound, value, upper bound)
     def device_bounds(m, d, j):
@@ -708,7 +362,7 @@ def device_scheduler(  # noqa C901
     def device_down_derivative_bounds(m, d, j):
         """Strictly non-positive."""
         return (
-            min(m.device_derivative_min[d, j], 0),
+            m.device_derivative_down_min[d, j],
             m.device_power_down[d, j],
             0,
         )
@@ -718,16 +372,16 @@ def device_scheduler(  # noqa C901
         return (
             0,
             m.device_power_up[d, j],
-            max(0, m.device_derivative_max[d, j]),
+            m.device_derivative_up_max[d, j],
         )
 
     def device_up_derivative_sign(m, d, j):
         """Derivative up if sign points up, derivative not up if sign points down."""
-        return m.device_power_up[d, j] <= Md * m.device_power_sign[d, j]
+        return m.device_power_up[d, j] <= m.Md * m.device_power_sign[d, j]
 
     def device_down_derivative_sign(m, d, j):
         """Derivative down if sign points down, derivative not down if sign points up."""
-        return -m.device_power_down[d, j] <= Md * (1 - m.device_power_sign[d, j])
+        return -m.device_power_down[d, j] <= m.Md * (1 - m.device_power_sign[d, j])
 
     def ems_derivative_bounds(m, g, j):
         devices = ems_constraint_device_groups[g]
@@ -741,11 +395,11 @@ def device_scheduler(  # noqa C901
 
     def commitment_up_derivative_sign(m, c):
         """Up deviation active only if sign points up."""
-        return m.commitment_upwards_deviation[c] <= Mc * m.commitment_sign[c]
+        return m.commitment_upwards_deviation[c] <= m.Mc * m.commitment_sign[c]
 
     def commitment_down_derivative_sign(m, c):
         """Down deviation active only if sign points down."""
-        return -m.commitment_downwards_deviation[c] <= Mc * (1 - m.commitment_sign[c])
+        return -m.commitment_downwards_deviation[c] <= m.Mc * (1 - m.commitment_sign[c])
 
     def ems_flow_commitment_equalities(m, c, j):
         """Couple EMS flow commitments to device flows, optionally filtered by commodity."""
@@ -822,62 +476,532 @@ def device_scheduler(  # noqa C901
     # Add objective
     def cost_function(m):
         costs = 0
-        m.commitment_costs = {
+        m.subcommitment_costs = {
             c: m.commitment_downwards_deviation[c] * m.down_price[c]
             + m.commitment_upwards_deviation[c] * m.up_price[c]
             for c in m.c
         }
         for c in m.c:
-            costs += m.commitment_costs[c]
+            costs += m.subcommitment_costs[c]
         return costs
 
     model.costs = Objective(rule=cost_function, sense=minimize)
 
-    # Solve
-    solver_name = current_app.config.get("FLEXMEASURES_LP_SOLVER")
-
-    solver = SolverFactory(solver_name)
-
-    # Temporary fix for https://github.com/Pyomo/pyomo/issues/3841
-    if solver_name == "cbc":
-        import shutil
-
-        cbc_path = shutil.which("cbc") or shutil.which("Cbc")
-        if cbc_path is not None:
-            solver.set_executable(cbc_path)
-
-    # Set tight tolerance for HiGHS solver
-    profile = {}
-    if "highs" in solver_name.lower():
-        profile = {
-            "mip_rel_gap": "0",
-            "mip_abs_gap": "0",
-            "primal_feasibility_tolerance": "1e-9",
-            "dual_feasibility_tolerance": "1e-9",
-            "mip_feasibility_tolerance": "1e-9",
-        }
-        # disable logs for the HiGHS solver in case that LOGGING_LEVEL is INFO
-        if current_app.config["LOGGING_LEVEL"] == "INFO":
-            profile["output_flag"] = "false"
 
-    # Apply operator-configured options last, so they override the defaults above.
-    configured_options = current_app.config.get("FLEXMEASURES_LP_SOLVER_OPTIONS") or {}
-    if configured_options and "highs" in solver_name.lower():
-        validate_highs_options(configured_options)
-    profile.update(configured_options)
+def _has_convex_cost_curve(commitments: list[pd.DataFrame]) -> bool:
+    """Oversimplified check for a convex cost curve: summed over all commitments,
+    the upwards deviation price is never lower than the downwards deviation price."""
+    df = pd.concat(commitments)[
+        ["upwards deviation price", "downwards deviation price"]
+    ]
+    df = df.groupby(level=0).sum()
+    return len(df[df["upwards deviation price"] < df["downwards deviation price"]]) == 0
 
-    for option_name, option_value in profile.items():
-        solver.options[option_name] = option_value
 
-    # load_solutions=False to avoid a RuntimeError exception in appsi solvers when solving an infeasible problem.
-    results = solver.solve(model, load_solutions=False)
+def device_scheduler(  # noqa C901
+    device_constraints: list[pd.DataFrame],
+    ems_constraints: pd.DataFrame | list[pd.DataFrame],
+    commitment_quantities: list[pd.Series] | None = None,
+    commitment_downwards_deviation_price: list[pd.Series] | list[float] | None = None,
+    commitment_upwards_deviation_price: list[pd.Series] | list[float] | None = None,
+    commitments: list[pd.DataFrame] | list[Commitment] | None = None,
+    initial_stock: float | list[float] = 0,
+    stock_groups: dict[int, list[int]] | None = None,
+    ems_constraint_groups: list[list[int]] | None = None,
+    convex_cost_curve: bool | None = None,
+) -> tuple[list[pd.Series], float, SolverResults, ConcreteModel]:
+    """This generic device scheduler is able to handle an EMS with multiple devices,
+    with various types of constraints on the EMS level and on the device level,
+    and with multiple market commitments on the EMS level.
+    A typical example is a house with many devices.
+    The commitments are assumed to be with regard to the flow of energy to the device (positive for consumption,
+    negative for production). The solver minimises the costs of deviating from the commitments.
 
-    # load the results only if a feasible solution has been found
-    if len(results.solution) > 0:
-        model.solutions.load_from(results)
+    :param device_constraints:  Device constraints are on a device level. Handled constraints (listed by column name):
+                                    max: maximum stock assuming an initial stock of zero (e.g. in MWh or boxes)
+                                    min: minimum stock assuming an initial stock of zero
+                                    equal: exact amount of stock (we do this by clamping min and max)
+                                    efficiency: amount of stock left at the next datetime (the rest is lost)
+                                    derivative max: maximum flow (e.g. in MW or boxes/h)
+                                    derivative min: minimum flow
+                                    derivative equals: exact amount of flow (we do this by clamping derivative min and derivative max)
+                                    derivative down efficiency: conversion efficiency of flow out of a device (flow out : stock decrease)
+                                    derivative up efficiency: conversion efficiency of flow into a device (stock increase : flow in)
+                                    stock delta: predefined stock delta to apply to the storage device. Positive values cause an increase and negative values a decrease
+    :param ems_constraints:     EMS constraints are on an EMS level. Handled constraints (listed by column name):
+                                    derivative max: maximum flow
+                                    derivative min: minimum flow
+                                May be a single DataFrame (the constraint is applied to the summed flow of all devices),
+                                or a list of DataFrames (one per device group). In the latter case, ``ems_constraint_groups``
+                                lists the device indices each DataFrame applies to. The StorageScheduler uses one device
+                                group per commodity, so each commodity gets its own EMS-level capacity constraint.
+    :param ems_constraint_groups: For each EMS constraint DataFrame, the list of device indices it applies to. When omitted,
+                                each EMS constraint is applied to the summed flow of all devices (legacy behaviour). A device
+                                may appear in more than one group.
+    :param commitments:         Commitments are on an EMS level by default. Handled parameters (listed by column name):
+                                    quantity:                   for example, 5.5
+                                    downwards deviation price:  10.1
+                                    upwards deviation price:    10.2
+                                    group:                      1 (defaults to the enumerate time step j)
+                                    device:                     0 (corresponds to device d; if not set, commitment is on an EMS level)
+    :param initial_stock:       initial stock for each device. Use a list with the same number of devices as device_constraints,
+                                or use a single value to set the initial stock to be the same for all devices.
+    :param convex_cost_curve:   whether to treat the cost curve as convex, in which case no binary variables are needed
+                                to prevent simultaneous upwards and downwards deviations. By default, this is derived
+                                from the commitments (see _has_convex_cost_curve). Subproblems of a decomposed problem
+                                get the value derived for the whole problem, so they are modelled like the whole problem.
+
+    Potentially deprecated arguments:
+        commitment_quantities: amounts of flow specified in commitments (both previously ordered and newly requested)
+            - e.g. in MW or boxes/h
+        commitment_downwards_deviation_price: penalty for downwards deviations of the flow
+            - e.g. in EUR/MW or EUR/(boxes/h)
+            - either a single value (same value for each flow value) or a Series (different value for each flow value)
+        commitment_upwards_deviation_price: penalty for upwards deviations of the flow
+
+    Separate costs for each commitment are stored in a dictionary under `model.commitment_costs` (indexed by commitment).
+    If models are kept for reuse (see FLEXMEASURES_LP_MODEL_CACHE_SIZE), the returned model may be a cached model,
+    which the next call with the same model structure overwrites. In that case, read what you need from the model
+    before calling the device scheduler again. The returned schedules and costs are not affected.
+
+    All Series and DataFrames should have the same resolution.
+
+    For now, we pass in the various constraints and prices as separate variables, from which we make a MultiIndex
+    DataFrame. Later we could pass in a MultiIndex DataFrame directly.
+    """
+
+    model = ConcreteModel()
+
+    # If the EMS has no devices, don't bother
+    if len(device_constraints) == 0:
+        return [], 0, SolverResults(), model
+
+    # Get timing from first device
+    start = device_constraints[0].index.to_pydatetime()[0]
+    # Workaround for https://github.com/pandas-dev/pandas/issues/53643. Was: resolution = pd.to_timedelta(device_constraints[0].index.freq)
+    resolution = pd.to_timedelta(device_constraints[0].index.freq).to_pytimedelta()
+    end = device_constraints[0].index.to_pydatetime()[-1] + resolution
+
+    # Normalise EMS constraints to a list of (DataFrame, device-group) pairs.
+    ems_constraints_list, ems_constraint_device_groups = _normalize_ems_constraints(
+        ems_constraints, ems_constraint_groups, len(device_constraints)
+    )
+
+    # map device -> primary stock group (used for per-device stock bounds)
+    # and map stock group -> all member devices (used for stock accumulation).
+    device_to_group = {}
+
+    # Group keys are namespaced strings: a declared stock group's key (a state-of-charge
+    # sensor id) could otherwise collide with the device index of an ungrouped device,
+    # silently merging that device into the stock group.
+    if stock_groups:
+        for g, devices in stock_groups.items():
+            for d in devices:
+                device_to_group[d] = f"stock:{g}"
+    # Devices not in any stock group (e.g. inflexible devices) form individual groups.
+    for d in range(len(device_constraints)):
+        if d not in device_to_group:
+            device_to_group[d] = f"device:{d}"
+
+    group_to_devices: dict[int, list[int]] = {}
+    for d, g in device_to_group.items():
+        group_to_devices.setdefault(g, []).append(d)
+
+    # The stock recursion is modelled once per stock group, using the group's shared
+    # storage efficiency, so devices sharing a stock may not declare different ones.
+    for g, group_devices in group_to_devices.items():
+        if len(group_devices) > 1:
+            # A missing efficiency column means the default (no losses) applies.
+            group_efficiency = device_constraints[group_devices[0]].get("efficiency")
+            for d in group_devices[1:]:
+                efficiency = device_constraints[d].get("efficiency")
+                if (
+                    (efficiency is None) != (group_efficiency is None)
+                    or efficiency is not None
+                    and not efficiency.equals(group_efficiency)
+                ):
+                    raise ValueError(
+                        f"Devices {group_devices} share stock group {g} but have different"
+                        " storage efficiencies. The storage efficiency is a property of the"
+                        " shared stock, so define it once per stock group."
+                    )
+            if isinstance(initial_stock, list):
+                group_initial_stocks = {
+                    initial_stock[d] if d < len(initial_stock) else 0
+                    for d in group_devices
+                }
+                if len(group_initial_stocks) > 1:
+                    raise ValueError(
+                        f"Devices {group_devices} share stock group {g} but have different"
+                        " initial stocks. The initial stock is a property of the shared"
+                        " stock, so define it once per stock group."
+                    )
+
+    # Move commitments from old structure to new
+    if commitments is None:
+        commitments = []
+    else:
+        commitments = [
+            c.to_frame() if isinstance(c, Commitment) else c for c in commitments
+        ]
+    if commitment_quantities is not None:
+        for quantity, down, up in zip(
+            commitment_quantities,
+            commitment_downwards_deviation_price,
+            commitment_upwards_deviation_price,
+        ):
 
-    planned_costs = value(model.costs)
-    subcommitment_costs = {g: value(cost) for g, cost in model.commitment_costs.items()}
+            # Turn prices per commitment into prices per commitment flow
+            if all(isinstance(price, float) for price in down) or isinstance(
+                down, float
+            ):
+                down = initialize_series(down, start, end, resolution)
+            if all(isinstance(price, float) for price in up) or isinstance(up, float):
+                up = initialize_series(up, start, end, resolution)
+
+            group = initialize_series(list(range(len(down))), start, end, resolution)
+            df = initialize_df(
+                ["quantity", "downwards deviation price", "upwards deviation price"],
+                start,
+                end,
+                resolution,
+            )
+            df["quantity"] = quantity
+            df["downwards deviation price"] = down
+            df["upwards deviation price"] = up
+            df["group"] = group
+            commitments.append(df)
+
+    # commodity → set(device indices)
+    commodity_devices = {}
+
+    for df in commitments:
+        if "commodity" not in df.columns or "device" not in df.columns:
+            continue
+
+        for _, row in df[["commodity", "device"]].dropna().iterrows():
+            devices = row["device"]
+            if not isinstance(devices, (list, tuple, set)):
+                devices = [devices]
+
+            commodity_devices.setdefault(row["commodity"], set()).update(devices)
+
+    # Check if commitments have the same time window and resolution as the constraints
+    for commitment in commitments:
+        start_c = commitment.index.to_pydatetime()[0]
+        resolution_c = pd.to_timedelta(commitment.index.freq)
+        end_c = commitment.index.to_pydatetime()[-1] + resolution
+        if not (start_c == start and end_c == end):
+            raise Exception(
+                "Not implemented for different time windows.\n(%s,%s)\n(%s,%s)"
+                % (start, end, start_c, end_c)
+            )
+        if resolution_c != resolution:
+            raise Exception(
+                "Not implemented for different resolutions.\n%s\n%s"
+                % (resolution, resolution_c)
+            )
+
+    def convert_commitments_to_subcommitments(
+        dfs: list[pd.DataFrame],
+    ) -> tuple[list[pd.DataFrame], dict[int, int]]:
+        """Transform commitments, each specifying a group for each time step, to sub-commitments, one per group.
+
+        'Groups' are a commitment concept (grouping time slots of a commitment),
+        making it possible that deviations/breaches can be accounted for properly within this group
+        (e.g. highest breach per calendar month defines the penalty).
+        Here, we define sub-commitments, by separating commitments by group and by direction of deviation (up, down).
+
+        We also enumerate the time steps in a new column "j".
+
+        For example, given contracts A and B (represented by 2 DataFrames), each with 3 groups,
+        we return (sub)commitments A1, A2, A3, B1, B2 and B3,
+        where A,B,C is the enumerated contract and 1,2,3 is the enumerated group.
+        """
+        commitment_mapping = {}
+        sub_commitments = []
+        for c, df in enumerate(dfs):
+            # Make sure each commitment has "device" (default NaN) and "class" (default FlowCommitment) columns
+            if "device" not in df.columns:
+                df["device"] = np.nan
+            if "class" not in df.columns:
+                df["class"] = FlowCommitment
+
+            df["j"] = range(len(df.index))
+            groups = list(df["group"].unique())
+            for group in groups:
+                sub_commitment = df[df["group"] == group].drop(columns=["group"])
+
+                # Catch non-uniqueness
+                if len(sub_commitment["upwards deviation price"].unique()) > 1:
+                    raise ValueError(
+                        "Commitment groups cannot have non-unique upwards deviation prices."
+                    )
+                if len(sub_commitment["downwards deviation price"].unique()) > 1:
+                    raise ValueError(
+                        "Commitment groups cannot have non-unique downwards deviation prices."
+                    )
+                if len(sub_commitment) == 1:
+                    commitment_mapping[len(sub_commitments)] = c
+                    sub_commitments.append(sub_commitment)
+                else:
+                    down_commitment = sub_commitment.copy().drop(
+                        columns="upwards deviation price"
+                    )
+                    up_commitment = sub_commitment.copy().drop(
+                        columns="downwards deviation price"
+                    )
+                    commitment_mapping[len(sub_commitments)] = c
+                    commitment_mapping[len(sub_commitments) + 1] = c
+                    sub_commitments.extend([down_commitment, up_commitment])
+        return sub_commitments, commitment_mapping
+
+    commitments, commitment_mapping = convert_commitments_to_subcommitments(commitments)
+
+    device_group_lookup = {}
+
+    for c, df in enumerate(commitments):
+        # Stock-scoped commitments couple to their stock group as a whole, regardless
+        # of which device index they name: the group's first device carries the group's
+        # stock, so a single-member group suffices (also avoiding double-counting the
+        # shared stock when the commitment names multiple members).
+        if "stock" in df.columns and pd.notna(df["stock"].iloc[0]):
+            stock_group_key = f"stock:{int(df['stock'].iloc[0])}"
+            if stock_group_key in group_to_devices:
+                device_group_lookup[c] = {
+                    stock_group_key: {group_to_devices[stock_group_key][0]}
+                }
+                continue
+
+        if "device" not in df.columns:
+            # EMS-level commitment: no device grouping needed here;
+            # handled by ems_flow_commitment_equalities.
+            continue
+
+        has_device_group = "device_group" in df.columns
+        if has_device_group:
+            rows = df[["device", "device_group"]].dropna()
+        else:
+            # Backwards-compatible default: each device is its own group.
+            # This preserves the behaviour of old-style DataFrame commitments that
+            # pre-date the device_group feature (e.g. from initialize_device_commitment).
+            rows = df[["device"]].dropna()
+
+        device_group_lookup[c] = {}
+
+        for _, row in rows.iterrows():
+            d = row["device"]
+            # When no device_group column is present, use the device id itself as
+            # the group label so that each device forms an independent group.
+            g = row["device_group"] if has_device_group else d
+
+            if isinstance(d, (list, tuple, set, np.ndarray)):
+                devices = set(d)
+            else:
+                devices = {d}
+
+            device_group_lookup[c].setdefault(g, set()).update(devices)
+
+    if convex_cost_curve is None:
+        convex_cost_curve = _has_convex_cost_curve(commitments)
+
+    bigM_columns = ["derivative max", "derivative min", "derivative equals"]
+    # Compute a good value for our Big-Ms
+    # Md is used to constrain the search space for device power
+    # Mc is used to constrain the search space for commitment deviations
+    Md = np.nanmax([np.nanmax(d[bigM_columns].abs()) for d in device_constraints])
+    Mc = np.nansum([np.nansum(d[bigM_columns].abs()) for d in device_constraints])
+
+    # Both Md and Mc have to be 1 MW, at least
+    Md = max(Md, 1)
+    Mc = max(Mc, 1)
+
+    for d in range(len(device_constraints)):
+        if "stock delta" not in device_constraints[d].columns:
+            device_constraints[d]["stock delta"] = 0
+        else:
+            device_constraints[d]["stock delta"] = (
+                device_constraints[d]["stock delta"].astype(float).fillna(0)
+            )
+
+    n_devices = len(device_constraints)
+    n_steps = len(device_constraints[0].index)
+
+    def _initial_stock_of(d):
+        if isinstance(initial_stock, list):
+            # No initial stock defined for inflexible device
+            return initial_stock[d] if d < len(initial_stock) else 0
+        return initial_stock
+
+    def price_down_select(c):
+        if "downwards deviation price" not in commitments[c].columns:
+            return 0
+        price = commitments[c]["downwards deviation price"].iloc[0]
+        if np.isnan(price):
+            return 0
+        return price
+
+    def price_up_select(c):
+        if "upwards deviation price" not in commitments[c].columns:
+            return 0
+        price = commitments[c]["upwards deviation price"].iloc[0]
+        if np.isnan(price):
+            return 0
+        return price
+
+    def commitment_quantity_select(c):
+        return {
+            (c, j): -infinity if np.isnan(quantity) else quantity
+            for j, quantity in zip(
+                commitments[c]["j"], commitments[c]["quantity"].astype(float)
+            )
+        }
+
+    def device_values(column: str, default: float | None = None) -> np.ndarray:
+        """Values of a device constraint, with shape (devices, datetimes)."""
+        return np.vstack(
+            [_constraint_values(df, column, default) for df in device_constraints]
+        )
+
+    # Stock bounds (make min_v <= equal_v <= max_v)
+    min_v, max_v, equal_v = (device_values(col) for col in ("min", "max", "equals"))
+    device_max = np.where(
+        np.isnan(max_v) & np.isnan(equal_v),
+        infinity,
+        np.fmin(max_v, np.where(np.isnan(equal_v), np.nan, np.fmax(equal_v, min_v))),
+    )
+    device_min = np.where(
+        np.isnan(min_v) & np.isnan(equal_v),
+        -infinity,
+        np.fmax(min_v, np.where(np.isnan(equal_v), np.nan, np.fmin(equal_v, max_v))),
+    )
+
+    # Flow bounds
+    min_v, max_v, equal_v = (
+        device_values(col)
+        for col in ("derivative min", "derivative max", "derivative equals")
+    )
+    device_derivative_max = np.where(
+        np.isnan(max_v) & np.isnan(equal_v), infinity, np.fmin(max_v, equal_v)
+    )
+    device_derivative_min = np.where(
+        np.isnan(min_v) & np.isnan(equal_v), -infinity, np.fmax(min_v, equal_v)
+    )
+    ems_derivative_max = np.vstack(
+        [_constraint_values(df, "derivative max") for df in ems_constraints_list]
+    )
+    ems_derivative_max[np.isnan(ems_derivative_max)] = infinity
+    ems_derivative_min = np.vstack(
+        [_constraint_values(df, "derivative min") for df in ems_constraints_list]
+    )
+    ems_derivative_min[np.isnan(ems_derivative_min)] = -infinity
+
+    # Assume perfect efficiency if no efficiency information is available
+    efficiencies = {}
+    for column in (
+        "efficiency",
+        "derivative down efficiency",
+        "derivative up efficiency",
+    ):
+        efficiency = device_values(column, default=1)
+        efficiency[np.isnan(efficiency)] = 1
+        efficiencies[column] = efficiency
+
+    # Values of all Params (indexed by device or EMS constraint group, and datetime, in case of 2D arrays),
+    # which are mutable in case the model is kept for reuse
+    param_values = {
+        "up_price": {c: price_up_select(c) for c in range(len(commitments))},
+        "down_price": {c: price_down_select(c) for c in range(len(commitments))},
+        "commitment_quantity": {
+            cj: quantity
+            for c in range(len(commitments))
+            for cj, quantity in commitment_quantity_select(c).items()
+        },
+        "device_max": device_max,
+        "device_min": device_min,
+        "device_derivative_max": device_derivative_max,
+        "device_derivative_min": device_derivative_min,
+        "device_derivative_up_max": np.maximum(0, device_derivative_max),
+        "device_derivative_down_min": np.minimum(device_derivative_min, 0),
+        "ems_derivative_max": ems_derivative_max,
+        "ems_derivative_min": ems_derivative_min,
+        "device_efficiency": efficiencies["efficiency"],
+        "device_stock_change_coefficient": np.array(
+            [
+                [_stock_change_coefficient(e) for e in row]
+                for row in efficiencies["efficiency"].tolist()
+            ]
+        ),
+        "device_derivative_down_efficiency": efficiencies["derivative down efficiency"],
+        "device_derivative_up_efficiency": efficiencies["derivative up efficiency"],
+        "stock_delta": device_values("stock delta"),
+        "initial_stock": {d: _initial_stock_of(d) for d in range(n_devices)},
+        "Md": Md,
+        "Mc": Mc,
+    }
+
+    # The structure of the problem, which determines which constraints apply to which variables
+    structure = dict(
+        n_steps=n_steps,
+        commitments=commitments,
+        device_group_lookup=device_group_lookup,
+        commodity_devices=commodity_devices,
+        group_to_devices=group_to_devices,
+        device_to_group=device_to_group,
+        ems_constraint_device_groups=ems_constraint_device_groups,
+        convex_cost_curve=convex_cost_curve,
+    )
+
+    # Solver settings
+    backend = current_app.config.get("FLEXMEASURES_LP_BACKEND", "pyomo")
+    if backend not in ("pyomo", "highspy"):
+        raise ValueError(
+            f"Unknown FLEXMEASURES_LP_BACKEND '{backend}'. Choose 'pyomo' or 'highspy'."
+        )
+    solver_name = current_app.config.get("FLEXMEASURES_LP_SOLVER")
+    uses_highs = backend == "highspy" or "highs" in solver_name.lower()
+
+    # Set tight tolerance for HiGHS solver
+    profile = {}
+    if uses_highs:
+        profile = {
+            "mip_rel_gap": "0",
+            "mip_abs_gap": "0",
+            "primal_feasibility_tolerance": "1e-9",
+            "dual_feasibility_tolerance": "1e-9",
+            "mip_feasibility_tolerance": "1e-9",
+        }
+        # disable logs for the HiGHS solver in case that LOGGING_LEVEL is INFO
+        if current_app.config["LOGGING_LEVEL"] == "INFO":
+            profile["output_flag"] = "false"
+
+    # Apply operator-configured options last, so they override the defaults above.
+    configured_options = current_app.config.get("FLEXMEASURES_LP_SOLVER_OPTIONS") or {}
+    if configured_options and uses_highs:
+        validate_highs_options(configured_options)
+    profile.update(configured_options)
+
+    if backend == "highspy":
+        # Assemble the problem as sparse matrices and pass it to HiGHS directly
+        planned_power, planned_costs, subcommitment_costs, results = solve_with_highspy(
+            param_values, options=profile, **structure
+        )
+    else:
+        model, results = _solve_with_pyomo(
+            model,
+            param_values=param_values,
+            structure=structure,
+            resolution=resolution,
+            solver_name=solver_name,
+            options=profile,
+        )
+        planned_costs = value(model.costs)
+        subcommitment_costs = {
+            c: value(cost) for c, cost in model.subcommitment_costs.items()
+        }
+        planned_power = [
+            [model.ems_power[d, j].value for j in model.j] for d in model.d
+        ]
     commitment_costs = {}
 
     # Map subcommitment costs to commitments
@@ -886,8 +1010,7 @@ def device_scheduler(  # noqa C901
         commitment_costs[c] = commitment_costs.get(c, 0) + v
 
     planned_power_per_device = []
-    for d in model.d:
-        planned_device_power = [model.ems_power[d, j].value for j in model.j]
+    for planned_device_power in planned_power:
         planned_power_per_device.append(
             initialize_series(
                 data=planned_device_power,
@@ -899,18 +1022,16 @@ def device_scheduler(  # noqa C901
 
     model.commitment_costs = commitment_costs
     commodity_costs = {}
-    for c in model.c:
+    for c in range(len(commitments)):
         commodity = None
         if "commodity" in commitments[c].columns:
             commodity = commitments[c]["commodity"].iloc[0]
         if commodity is None or (isinstance(commodity, float) and np.isnan(commodity)):
             continue
 
-        cost = value(
-            model.commitment_downwards_deviation[c] * model.down_price[c]
-            + model.commitment_upwards_deviation[c] * model.up_price[c]
+        commodity_costs[commodity] = (
+            commodity_costs.get(commodity, 0) + subcommitment_costs[c]
         )
-        commodity_costs[commodity] = commodity_costs.get(commodity, 0) + cost
 
     model.commodity_costs = commodity_costs
 
@@ -919,3 +1040,435 @@ def device_scheduler(  # noqa C901
     # print(results.solver.termination_condition)
     # print(planned_costs)
     return planned_power_per_device, planned_costs, results, model
+
+
+def _solve_with_pyomo(
+    model: ConcreteModel,
+    param_values: dict[str, np.ndarray | dict | float],
+    structure: dict,
+    resolution: timedelta,
+    solver_name: str,
+    options: dict,
+) -> tuple[ConcreteModel, SolverResults]:
+    """Build the Pyomo model (or update a cached model with the same structure) and solve it.
+
+    Returns the solved model, which is the given (empty) model, unless a cached model was reused.
+    """
+    # Look up a model with the same structure, which we only need to update with the new Param values
+    model_key = None
+    if current_app.config.get("FLEXMEASURES_LP_MODEL_CACHE_SIZE", 0) > 0:
+        model_key = (
+            solver_name,
+            tuple(sorted(options.items())),
+            len(param_values["initial_stock"]),
+            structure["n_steps"],
+            resolution,
+            repr(structure["ems_constraint_device_groups"]),
+            repr(structure["device_to_group"]),
+            repr(structure["commodity_devices"]),
+            repr(structure["device_group_lookup"]),
+            structure["convex_cost_curve"],
+            tuple(_commitment_structure(df) for df in structure["commitments"]),
+            # Pyomo leaves out infinite bounds when setting up the solver, so they cannot be updated later
+            tuple(
+                np.isfinite(param_values[name]).tobytes()
+                for name in (
+                    "device_max",
+                    "device_min",
+                    "device_derivative_max",
+                    "device_derivative_min",
+                    "ems_derivative_max",
+                    "ems_derivative_min",
+                )
+            ),
+        )
+    if model_key is not None and model_key in _model_cache:
+        _model_cache.move_to_end(model_key)
+        model, solver = _model_cache[model_key]
+        for name, values in param_values.items():
+            if isinstance(values, np.ndarray):
+                getattr(model, name).store_values(_indexed_values(values))
+            elif isinstance(values, dict):
+                getattr(model, name).store_values(values)
+            else:
+                getattr(model, name).set_value(values)
+        # Start from the same state as a freshly built model
+        model.solutions.clear()
+        for var in model.component_data_objects(Var):
+            var.set_value(0)
+    else:
+        _build_model(
+            model, param_values=param_values, mutable=model_key is not None, **structure
+        )
+        solver = SolverFactory(solver_name)
+
+        # Temporary fix for https://github.com/Pyomo/pyomo/issues/3841
+        if solver_name == "cbc":
+            import shutil
+
+            cbc_path = shutil.which("cbc") or shutil.which("Cbc")
+            if cbc_path is not None:
+                solver.set_executable(cbc_path)
+
+        for option_name, option_value in options.items():
+            solver.options[option_name] = option_value
+
+        if model_key is not None:
+            _model_cache[model_key] = (model, solver)
+            while (
+                len(_model_cache)
+                > current_app.config["FLEXMEASURES_LP_MODEL_CACHE_SIZE"]
+            ):
+                _model_cache.popitem(last=False)
+
+    # load_solutions=False to avoid a RuntimeError exception in appsi solvers when solving an infeasible problem.
+    results = solver.solve(model, load_solutions=False)
+
+    # load the results only if a feasible solution has been found
+    if len(results.solution) > 0:
+        model.solutions.load_from(results)
+
+    return model, results
+
+
+@dataclass
+class DeviceSchedulerSubproblem:
+    """A part of a device scheduling problem that can be solved independently of the other parts.
+
+    See decompose_device_scheduler_problem.
+    """
+
+    #: Indices of the devices in the original problem (in order of their index in the subproblem)
+    devices: list[int]
+    #: Indices of the commitments in the original problem (in order of their index in the subproblem)
+    commitments: list[int]
+    #: Keyword arguments for the device_scheduler, to solve the subproblem
+    kwargs: dict
+
+
+def find_independent_device_groups(
+    device_constraints: list[pd.DataFrame],
+    ems_constraints: pd.DataFrame | list[pd.DataFrame],
+    commitments: list[pd.DataFrame] | list[Commitment] | None = None,
+    ems_constraint_groups: list[list[int]] | None = None,
+    stock_groups: dict[int, list[int]] | None = None,
+    **kwargs,
+) -> list[list[int]]:
+    """Find the groups of devices that can be scheduled independently of each other.
+
+    These are the connected components of the graph in which devices are coupled if they
+    share a stock group, are subject to the same EMS constraint (unless it sets no bounds at all),
+    or are referenced by the same commitment. Commitments that reference no device at all
+    (EMS-level commitments) couple all devices.
+    Takes the same arguments as the device_scheduler.
+
+    :returns: groups of device indices, ordered by their first device
+    """
+    n_devices = len(device_constraints)
+    parent = list(range(n_devices))
+
+    def find(d: int) -> int:
+        while parent[d] != d:
+            parent[d] = parent[parent[d]]
+            d = parent[d]
+        return d
+
+    def couple(devices):
+        devices = [int(d) for d in devices]
+        for d in devices[1:]:
+            parent[find(d)] = find(devices[0])
+
+    for devices in (stock_groups or {}).values():
+        couple(devices)
+
+    ems_constraints_list, ems_constraint_device_groups = _normalize_ems_constraints(
+        ems_constraints, ems_constraint_groups, n_devices
+    )
+    for df, devices in zip(ems_constraints_list, ems_constraint_device_groups):
+        bounds = df.reindex(columns=["derivative max", "derivative min"])
+        if bounds.notna().any().any():
+            couple(devices)
+
+    for commitment in commitments or []:
+        df = commitment.to_frame() if isinstance(commitment, Commitment) else commitment
+        devices = extract_devices(df["device"]) if "device" in df.columns else []
+        couple(devices if devices else range(n_devices))
+
+    groups: dict[int, list[int]] = {}
+    for d in range(n_devices):
+        groups.setdefault(find(d), []).append(d)
+    return list(groups.values())
+
+
+def decompose_device_scheduler_problem(
+    device_constraints: list[pd.DataFrame],
+    ems_constraints: pd.DataFrame | list[pd.DataFrame],
+    commitments: list[pd.DataFrame] | list[Commitment] | None = None,
+    initial_stock: float | list[float] = 0,
+    ems_constraint_groups: list[list[int]] | None = None,
+    stock_groups: dict[int, list[int]] | None = None,
+) -> list[DeviceSchedulerSubproblem]:
+    """Split a device scheduling problem into subproblems, one per group of independent devices.
+
+    Takes the same arguments as the device_scheduler. Solve each subproblem with the device_scheduler,
+    and merge the solutions with merge_device_scheduler_solutions.
+    If the devices cannot be scheduled independently, the only subproblem is the original problem.
+    """
+    commitments = [
+        c.to_frame() if isinstance(c, Commitment) else c.copy()
+        for c in (commitments or [])
+    ]
+    commitment_devices = [
+        set(extract_devices(df["device"])) if "device" in df.columns else set()
+        for df in commitments
+    ]
+    groups = find_independent_device_groups(
+        device_constraints=device_constraints,
+        ems_constraints=ems_constraints,
+        commitments=commitments,
+        ems_constraint_groups=ems_constraint_groups,
+        stock_groups=stock_groups,
+    )
+
+    # The device_scheduler expects at least one commitment, so devices without any commitment join another group
+    groups_with_commitments = [
+        group
+        for group in groups
+        if any(devices & set(group) for devices in commitment_devices)
+    ]
+    if len(groups_with_commitments) <= 1:
+        groups = [list(range(len(device_constraints)))]
+    else:
+        for group in groups:
+            if group not in groups_with_commitments:
+                groups_with_commitments[0].extend(group)
+        groups = [sorted(group) for group in groups_with_commitments]
+    if len(groups) == 1:
+        return [
+            DeviceSchedulerSubproblem(
+                devices=groups[0],
+                commitments=list(range(len(commitments))),
+                kwargs=dict(
+                    device_constraints=device_constraints,
+                    ems_constraints=ems_constraints,
+                    commitments=commitments,
+                    initial_stock=initial_stock,
+                    ems_constraint_groups=ems_constraint_groups,
+                    stock_groups=stock_groups,
+                ),
+            )
+        ]
+
+    ems_constraints_list, ems_constraint_device_groups = _normalize_ems_constraints(
+        ems_constraints, ems_constraint_groups, len(device_constraints)
+    )
+    # Model each subproblem like the whole problem, rather than checking the convexity of each part
+    convex_cost_curve = _has_convex_cost_curve(commitments)
+    subproblems = []
+    for group in groups:
+        new_index = {d: i for i, d in enumerate(group)}
+
+        def remap(devices):
+            if isinstance(devices, (list, tuple, set, np.ndarray)):
+                return type(devices)(new_index[d] for d in devices)
+            if pd.isna(devices):
+                return devices
+            return new_index[devices]
+
+        group_commitments = [
+            c for c, devices in enumerate(commitment_devices) if devices & set(group)
+        ]
+        sub_commitments = []
+        for c in group_commitments:
+            df = commitments[c].copy()
+            df["device"] = df["device"].apply(remap)
+            sub_commitments.append(df)
+
+        sub_ems_constraints = []
+        sub_ems_constraint_groups = []
+        for df, devices in zip(ems_constraints_list, ems_constraint_device_groups):
+            if set(devices) & set(group):
+                sub_ems_constraints.append(df)
+                sub_ems_constraint_groups.append(
+                    [new_index[d] for d in devices if d in new_index]
+                )
+        if not sub_ems_constraints:
+            sub_ems_constraints.append(
+                pd.DataFrame(
+                    index=device_constraints[0].index,
+                    columns=["derivative max", "derivative min"],
+                    dtype=float,
+                )
+            )
+            sub_ems_constraint_groups.append(list(range(len(group))))
+
+        subproblems.append(
+            DeviceSchedulerSubproblem(
+                devices=group,
+                commitments=group_commitments,
+                kwargs=dict(
+                    device_constraints=[device_constraints[d] for d in group],
+                    ems_constraints=sub_ems_constraints,
+                    commitments=sub_commitments,
+                    initial_stock=(
+                        [
+                            initial_stock[d] if d < len(initial_stock) else 0
+                            for d in group
+                        ]
+                        if isinstance(initial_stock, list)
+                        else initial_stock
+                    ),
+                    ems_constraint_groups=sub_ems_constraint_groups,
+                    stock_groups={
+                        g: [new_index[d] for d in devices]
+                        for g, devices in (stock_groups or {}).items()
+                        if devices[0] in new_index
+                    },
+                    convex_cost_curve=convex_cost_curve,
+                ),
+            )
+        )
+    return subproblems
+
+
+def merge_device_scheduler_solutions(
+    subproblems: list[DeviceSchedulerSubproblem],
+    solutions: list[tuple],
+) -> tuple[list[pd.Series], float, SolverResults, SimpleNamespace]:
+    """Merge the solutions to the subproblems of a device scheduling problem (see decompose_device_scheduler_problem).
+
+    :param subproblems: the subproblems
+    :param solutions:   the solution to each subproblem, as returned by the device_scheduler
+    :returns:           the solution to the original problem, like the device_scheduler returns it,
+                        except that the model is replaced by a namespace holding only the costs
+                        per commitment (commitment_costs) and per commodity (commodity_costs)
+    """
+    planned_power = [None] * sum(len(subproblem.devices) for subproblem in subproblems)
+    planned_costs = 0
+    commitment_costs = {}
+    commodity_costs = {}
+    results = None
+    for subproblem, (power, costs, sub_results, model) in zip(subproblems, solutions):
+        for d, device_power in zip(subproblem.devices, power):
+            planned_power[d] = device_power
+        planned_costs += costs
+        for c, cost in model.commitment_costs.items():
+            commitment_costs[subproblem.commitments[c]] = cost
+        for commodity, cost in getattr(model, "commodity_costs", {}).items():
+            commodity_costs[commodity] = commodity_costs.get(commodity, 0) + cost
+        # Report the results of the first subproblem that was not solved to optimality, if any
+        if results is None or (
+            results.solver.termination_condition == TerminationCondition.optimal
+            and sub_results.solver.termination_condition != TerminationCondition.optimal
+        ):
+            results = sub_results
+    return (
+        planned_power,
+        planned_costs,
+        results,
+        SimpleNamespace(
+            commitment_costs=dict(sorted(commitment_costs.items())),
+            commodity_costs=commodity_costs,
+        ),
+    )
+
+
+def decomposed_device_scheduler(
+    **kwargs,
+) -> tuple[list[pd.Series], float, SolverResults, ConcreteModel | SimpleNamespace]:
+    """Solve a device scheduling problem by solving its independent subproblems.
+
+    The subproblems are solved in parallel, in up to FLEXMEASURES_LP_DECOMPOSE_PROCESSES processes.
+
+    Takes the same arguments as the device_scheduler. If the problem cannot be decomposed,
+    it is passed to the device_scheduler as a whole, and the full model is returned.
+    Otherwise, see merge_device_scheduler_solutions for what is returned.
+    """
+    subproblems = decompose_device_scheduler_problem(**kwargs)
+    if len(subproblems) == 1:
+        return device_scheduler(**kwargs)
+    solutions = solve_device_scheduler_problems(
+        {k: subproblem.kwargs for k, subproblem in enumerate(subproblems)},
+        processes=current_app.config.get("FLEXMEASURES_LP_DECOMPOSE_PROCESSES", 1),
+    )
+    for solution in solutions.values():
+        if isinstance(solution, Exception):
+            raise solution
+    return merge_device_scheduler_solutions(
+        subproblems, [solutions[k] for k in range(len(subproblems))]
+    )
+
+
+def solve_device_scheduler_problems(
+    problems: dict[Hashable, dict], processes: int
+) -> dict[Hashable, tuple | Exception]:
+    """Solve independent scheduling problems, in a process pool if more than 1 process is allowed.
+
+    :param problems:    keyword arguments for the device_scheduler, per scheduling problem
+    :param processes:   maximum number of processes
+    :returns:           the solution (or the exception raised) per scheduling problem,
+                        like the device_scheduler returns it, except that the model is replaced by a namespace
+                        holding only the costs per commitment (commitment_costs) and per commodity (commodity_costs)
+    """
+    solutions = {}
+    if processes <= 1 or len(problems) <= 1:
+        for i, problem in problems.items():
+            try:
+                solutions[i] = _solve_device_scheduler_problem(problem)
+            except Exception as exc:
+                solutions[i] = exc
+        return solutions
+
+    # The device_scheduler reads the LP settings from the app config
+    config = {
+        key: value
+        for key, value in current_app.config.items()
+        if key.startswith("FLEXMEASURES_LP_") or key == "LOGGING_LEVEL"
+    }
+    with ProcessPoolExecutor(
+        max_workers=min(processes, len(problems)),
+        initializer=_init_solver_process,
+        initargs=(config,),
+    ) as executor:
+        futures = {
+            i: executor.submit(
+                _solve_device_scheduler_problem,
+                # Unpickled BeliefsSeries are broken, so send the commitments as the plain frames they become anyway
+                dict(
+                    problem,
+                    commitments=[
+                        c.to_frame() if isinstance(c, Commitment) else c
+                        for c in problem["commitments"]
+                    ],
+                ),
+            )
+            for i, problem in problems.items()
+        }
+        for i, future in futures.items():
+            try:
+                solutions[i] = future.result()
+            except Exception as exc:
+                solutions[i] = exc
+    return solutions
+
+
+def _init_solver_process(config: dict):
+    """Give a solver process an app context with the given config, which lasts as long as the process."""
+    app = Flask(__name__)
+    app.config.update(config)
+    app.app_context().push()
+
+
+def _solve_device_scheduler_problem(problem: dict) -> tuple:
+    """Solve a scheduling problem, and return the solution in a form that can be sent between processes."""
+    ems_schedule, expected_costs, scheduler_results, model = device_scheduler(**problem)
+    return (
+        # Unpickled BeliefsSeries are broken, so return plain Series
+        [pd.Series(schedule) for schedule in ems_schedule],
+        expected_costs,
+        scheduler_results,
+        SimpleNamespace(
+            commitment_costs=model.commitment_costs,
+            commodity_costs=getattr(model, "commodity_costs", {}),
+        ),
+    )
@@ -0,0 +1,360 @@
+"""Assemble the device scheduler's problem as sparse matrices and solve it with HiGHS directly.
+
+This is an alternative backend for :func:`flexmeasures.data.models.planning.linear_optimization.device_scheduler`,
+selected with the FLEXMEASURES_LP_BACKEND setting. Building the Pyomo model means evaluating Python rule
+callbacks for every index, which, for sites with many devices, can take longer than solving the problem.
+Here, each kind of constraint is assembled for all devices and datetimes at once, using NumPy and SciPy.
+
+The variables and constraints mirror those of the Pyomo model (see `_build_model`), so both backends solve the same problem.
+Some constraints on a single variable are set as bounds on that variable instead, which is equivalent.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+from pyomo.opt import SolverResults, SolverStatus, TerminationCondition
+from scipy import sparse
+
+from flexmeasures.data.models.planning import StockCommitment
+
+
+# Pyomo's solver status and termination condition per HiGHS model status, as mapped by Pyomo's appsi_highs interface
+SOLVER_STATUSES = {
+    "kOptimal": (SolverStatus.ok, TerminationCondition.optimal),
+    "kInfeasible": (SolverStatus.error, TerminationCondition.infeasible),
+    "kUnboundedOrInfeasible": (
+        SolverStatus.error,
+        TerminationCondition.infeasibleOrUnbounded,
+    ),
+    "kUnbounded": (SolverStatus.error, TerminationCondition.unbounded),
+    "kTimeLimit": (SolverStatus.aborted, TerminationCondition.maxTimeLimit),
+    "kIterationLimit": (SolverStatus.aborted, TerminationCondition.maxIterations),
+    "kObjectiveBound": (SolverStatus.aborted, TerminationCondition.minFunctionValue),
+    "kObjectiveTarget": (SolverStatus.aborted, TerminationCondition.minFunctionValue),
+    "kLoadError": (SolverStatus.error, TerminationCondition.error),
+    "kModelError": (SolverStatus.error, TerminationCondition.error),
+    "kPresolveError": (SolverStatus.error, TerminationCondition.error),
+    "kSolveError": (SolverStatus.error, TerminationCondition.error),
+    "kPostsolveError": (SolverStatus.error, TerminationCondition.error),
+}
+
+
+class _Constraints:
+    """Collect the rows of the constraint matrix (in coordinate format), with their lower and upper bounds."""
+
+    def __init__(self):
+        self.n_rows = 0
+        self.rows, self.columns, self.coefficients = [], [], []
+        self.lower, self.upper = [], []
+
+    def add(
+        self,
+        lower: float | np.ndarray,
+        upper: float | np.ndarray,
+        terms: list[tuple[np.ndarray, np.ndarray, float | np.ndarray]],
+        n: int | None = None,
+    ):
+        """Add rows with the given bounds.
+
+        Each term is a tuple of (row offsets, column indices, coefficients), in which the row offsets count from the first added row.
+        Rows without finite bounds do not constrain anything, so they are left out.
+        """
+        if n is None:
+            n = max(np.size(lower), np.size(upper))
+        lower = np.broadcast_to(np.asarray(lower, dtype=float), (n,))
+        upper = np.broadcast_to(np.asarray(upper, dtype=float), (n,))
+        keep = np.isfinite(lower) | np.isfinite(upper)
+        row_of_offset = self.n_rows + np.cumsum(keep) - 1
+        for offsets, columns, coefficients in terms:
+            offsets, columns, coefficients = np.broadcast_arrays(
+                offsets, columns, np.asarray(coefficients, dtype=float)
+            )
+            kept = keep[offsets]
+            self.rows.append(row_of_offset[offsets[kept]])
+            self.columns.append(columns[kept])
+            self.coefficients.append(coefficients[kept])
+        self.lower.append(lower[keep])
+        self.upper.append(upper[keep])
+        self.n_rows += int(keep.sum())
+
+    def to_csc(self, n_columns: int) -> sparse.csc_matrix:
+        """Assemble the constraint matrix, summing the coefficients of the same variable within a row."""
+        matrix = sparse.coo_matrix(
+            (
+                np.concatenate(self.coefficients),
+                (np.concatenate(self.rows), np.concatenate(self.columns)),
+            ),
+            shape=(self.n_rows, n_columns),
+        ).tocsc()
+        matrix.sum_duplicates()
+        matrix.eliminate_zeros()
+        return matrix
+
+
+def solve_with_highspy(  # noqa C901
+    param_values: dict[str, np.ndarray | dict | float],
+    options: dict,
+    n_steps: int,
+    commitments: list[pd.DataFrame],
+    device_group_lookup: dict[int, dict],
+    commodity_devices: dict[str, set[int]],
+    group_to_devices: dict[str, list[int]],
+    device_to_group: dict[int, str],
+    ems_constraint_device_groups: list[list[int]],
+    convex_cost_curve: bool,
+) -> tuple[list[list[float]], float, dict[int, float], SolverResults]:
+    """Assemble the problem of the device scheduler as sparse matrices, and solve it with HiGHS.
+
+    Takes the same parameter values and problem structure as the Pyomo model of the device scheduler.
+    EMS flow commitments without devices are left out, because in the Pyomo model they lack bounds,
+    so `commodity_devices` is not needed here.
+
+    :returns: planned power per device (as a list with a value per datetime), planned costs,
+              costs per sub-commitment, and the solver results.
+    """
+    import highspy
+
+    initial_stock = param_values["initial_stock"]
+    n_devices = len(initial_stock)
+    n_commitments = len(commitments)
+    stock_groups = sorted(group_to_devices)
+    stock_group_index = {g: i for i, g in enumerate(stock_groups)}
+    steps = np.arange(n_steps)
+
+    # Allocate columns for the variables, with their bounds
+    col_lower, col_upper, integer_columns = [], [], []
+
+    def add_variables(shape, lower=-np.inf, upper=np.inf, binary=False):
+        first = sum(len(bounds) for bounds in col_lower)
+        n = int(np.prod(shape))
+        col_lower.append(np.broadcast_to(np.asarray(lower, dtype=float), shape).ravel())
+        col_upper.append(np.broadcast_to(np.asarray(upper, dtype=float), shape).ravel())
+        columns = np.arange(first, first + n).reshape(shape)
+        if binary:
+            integer_columns.append(columns.ravel())
+        return columns
+
+    shape = (n_devices, n_steps)
+    ems_power = add_variables(shape)
+    # The device_power_down_bounds and device_power_up_bounds constraints of the Pyomo model are set as variable bounds
+    device_power_down = add_variables(
+        shape, lower=param_values["device_derivative_down_min"], upper=0
+    )
+    device_power_up = add_variables(
+        shape, lower=0, upper=param_values["device_derivative_up_max"]
+    )
+    device_power_sign = add_variables(shape, lower=0, upper=1, binary=True)
+    group_stock = add_variables((len(stock_groups), n_steps))
+    commitment_downwards_deviation = add_variables((n_commitments,), upper=0)
+    commitment_upwards_deviation = add_variables((n_commitments,), lower=0)
+    if not convex_cost_curve:
+        commitment_sign = add_variables((n_commitments,), lower=0, upper=1, binary=True)
+    n_columns = sum(len(bounds) for bounds in col_lower)
+
+    # Objective
+    up_price = np.array([param_values["up_price"][c] for c in range(n_commitments)])
+    down_price = np.array([param_values["down_price"][c] for c in range(n_commitments)])
+    col_cost = np.zeros(n_columns)
+    col_cost[commitment_downwards_deviation] = down_price
+    col_cost[commitment_upwards_deviation] = up_price
+
+    constraints = _Constraints()
+    device_steps = np.arange(n_devices * n_steps)
+    device_stock = group_stock[
+        [stock_group_index[device_to_group[d]] for d in range(n_devices)]
+    ]
+
+    # grouped_commitment_equalities
+    for c, groups in device_group_lookup.items():
+        js = commitments[c]["j"].to_numpy()
+        quantity = np.array([param_values["commitment_quantity"][c, j] for j in js])
+        js, quantity = js[quantity != -np.inf], quantity[quantity != -np.inf]
+        offsets = np.arange(len(js))
+        lower = 0 if "upwards deviation price" in commitments[c].columns else -np.inf
+        upper = 0 if "downwards deviation price" in commitments[c].columns else np.inf
+        is_stock_commitment = (
+            commitments[c]["class"].apply(lambda cl: cl == StockCommitment).all()
+        )
+        for devices in groups.values():
+            devices = [int(d) for d in devices]
+            if not devices or len(js) == 0:
+                continue
+            terms = [
+                (offsets, commitment_downwards_deviation[c], 1),
+                (offsets, commitment_upwards_deviation[c], 1),
+            ]
+            if is_stock_commitment:
+                terms += [(offsets, device_stock[d, js], -1) for d in devices]
+                constant = quantity + sum(initial_stock[d] for d in devices)
+            else:
+                terms += [(offsets, ems_power[d, js], -1) for d in devices]
+                constant = quantity
+            constraints.add(lower - constant, upper - constant, terms, n=len(js))
+
+    # group_stock_balance
+    for g, devices in group_to_devices.items():
+        d0 = devices[0]
+        a = param_values["device_efficiency"][d0]
+        b = param_values["device_stock_change_coefficient"][d0]
+        stock = group_stock[stock_group_index[g]]
+        terms = [
+            (steps, stock, 1),
+            (steps[1:], stock[:-1], -a[1:]),
+        ]
+        for d in devices:
+            terms += [
+                (
+                    steps,
+                    device_power_down[d],
+                    -b * (1 / param_values["device_derivative_down_efficiency"][d]),
+                ),
+                (
+                    steps,
+                    device_power_up[d],
+                    -b * param_values["device_derivative_up_efficiency"][d],
+                ),
+            ]
+        constant = b * sum(param_values["stock_delta"][d] for d in devices)
+        constant[0] += a[0] * initial_stock[d0]
+        constraints.add(constant, constant, terms)
+
+    # device_energy_bounds
+    device_initial_stock = np.array(
+        [initial_stock[d] for d in range(n_devices)], dtype=float
+    )[:, np.newaxis]
+    constraints.add(
+        (param_values["device_min"] + device_initial_stock).ravel(),
+        (param_values["device_max"] + device_initial_stock).ravel(),
+        [(device_steps, device_stock.ravel(), 1)],
+    )
+
+    # device_power_bounds
+    constraints.add(
+        param_values["device_derivative_min"].ravel(),
+        param_values["device_derivative_max"].ravel(),
+        [
+            (device_steps, device_power_down.ravel(), 1),
+            (device_steps, device_power_up.ravel(), 1),
+        ],
+    )
+
+    # device_power_up_sign and device_power_down_sign
+    Md = param_values["Md"]
+    constraints.add(
+        -np.inf,
+        0,
+        [
+            (device_steps, device_power_up.ravel(), 1),
+            (device_steps, device_power_sign.ravel(), -Md),
+        ],
+        n=len(device_steps),
+    )
+    constraints.add(
+        -np.inf,
+        Md,
+        [
+            (device_steps, device_power_down.ravel(), -1),
+            (device_steps, device_power_sign.ravel(), Md),
+        ],
+        n=len(device_steps),
+    )
+
+    # ems_power_bounds
+    for g, devices in enumerate(ems_constraint_device_groups):
+        if not devices:
+            continue
+        constraints.add(
+            param_values["ems_derivative_min"][g],
+            param_values["ems_derivative_max"][g],
+            [(steps, ems_power[d], 1) for d in devices],
+        )
+
+    # commitment_up_derivative_sign_con and commitment_down_derivative_sign_con
+    if not convex_cost_curve:
+        Mc = param_values["Mc"]
+        offsets = np.arange(n_commitments)
+        constraints.add(
+            -np.inf,
+            0,
+            [
+                (offsets, commitment_upwards_deviation, 1),
+                (offsets, commitment_sign, -Mc),
+            ],
+            n=n_commitments,
+        )
+        constraints.add(
+            -np.inf,
+            Mc,
+            [
+                (offsets, commitment_downwards_deviation, -1),
+                (offsets, commitment_sign, Mc),
+            ],
+            n=n_commitments,
+        )
+
+    # device_power_equalities
+    constraints.add(
+        0,
+        0,
+        [
+            (device_steps, device_power_up.ravel(), 1),
+            (device_steps, device_power_down.ravel(), 1),
+            (device_steps, ems_power.ravel(), -1),
+        ],
+        n=len(device_steps),
+    )
+
+    # Pass the problem to HiGHS
+    matrix = constraints.to_csc(n_columns)
+    lp = highspy.HighsLp()
+    lp.num_col_ = n_columns
+    lp.num_row_ = constraints.n_rows
+    lp.col_cost_ = col_cost
+    lp.col_lower_ = np.concatenate(col_lower)
+    lp.col_upper_ = np.concatenate(col_upper)
+    lp.row_lower_ = np.concatenate(constraints.lower)
+    lp.row_upper_ = np.concatenate(constraints.upper)
+    lp.a_matrix_.format_ = highspy.MatrixFormat.kColwise
+    lp.a_matrix_.start_ = matrix.indptr
+    lp.a_matrix_.index_ = matrix.indices
+    lp.a_matrix_.value_ = matrix.data
+    integrality = np.full(n_columns, highspy.HighsVarType.kContinuous)
+    integrality[np.concatenate(integer_columns)] = highspy.HighsVarType.kInteger
+    lp.integrality_ = integrality.tolist()
+
+    highs = highspy.Highs()
+    for option_name, option_value in options.items():
+        if highs.setOptionValue(option_name, option_value) != highspy.HighsStatus.kOk:
+            raise ValueError(
+                f"HiGHS rejected solver option {option_name}={option_value!r} (see FLEXMEASURES_LP_SOLVER_OPTIONS)."
+            )
+    highs.passModel(lp)
+    highs.run()
+
+    model_status = highs.getModelStatus()
+    results = SolverResults()
+    results.solver.status, results.solver.termination_condition = SOLVER_STATUSES.get(
+        model_status.name, (SolverStatus.unknown, TerminationCondition.unknown)
+    )
+    results.solver.termination_message = highs.modelStatusToString(model_status)
+
+    # Like the variables of the Pyomo model, the solution stays at zero if no feasible solution has been found
+    solution = np.zeros(n_columns)
+    if (
+        highs.getInfo().primal_solution_status
+        == highspy.SolutionStatus.kSolutionStatusFeasible
+    ):
+        solution = np.asarray(highs.getSolution().col_value)
+
+    subcommitment_costs = (
+        solution[commitment_downwards_deviation] * down_price
+        + solution[commitment_upwards_deviation] * up_price
+    )
+    planned_power = solution[ems_power].tolist()
+    return (
+        planned_power,
+        float(subcommitment_costs.sum()),
+        dict(enumerate(subcommitment_costs.tolist())),
+        results,
+    )
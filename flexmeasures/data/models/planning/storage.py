@@ -23,7 +23,10 @@ from flexmeasures.data.models.planning.devices import (
     _resolve_stock_key,
     group_key_label,
 )
-from flexmeasures.data.models.planning.linear_optimization import device_scheduler
+from flexmeasures.data.models.planning.linear_optimization import (
+    decomposed_device_scheduler,
+    device_scheduler,
+)
 from flexmeasures.data.models.planning.utils import (
     add_tiny_price_slope,
     ensure_prices_are_not_empty,
@@ -3142,7 +3145,20 @@ class StorageScheduler(MetaStorageScheduler):
         :param skip_validation: If True, skip validation of constraints specified in the data.
         :returns:               The computed schedule.
         """
+        problem = self.prepare_problem(skip_validation=skip_validation)
+        if current_app.config.get("FLEXMEASURES_LP_DECOMPOSE", False):
+            return self.compute_from_solution(*decomposed_device_scheduler(**problem))
+        return self.compute_from_solution(*device_scheduler(**problem))
+
+    def prepare_problem(self, skip_validation: bool = False) -> dict:
+        """Prepare the optimization problem, without solving it.
 
+        Together with compute_from_solution, this lets the problem be solved elsewhere,
+        for example, in a separate process (see flexmeasures.data.services.scheduling.make_batch_schedule).
+
+        :param skip_validation: If True, skip validation of constraints specified in the data.
+        :returns:               Keyword arguments for the device_scheduler.
+        """
         (
             sensors,
             start,
@@ -3165,7 +3181,16 @@ class StorageScheduler(MetaStorageScheduler):
             for d in devices:
                 initial_stock[d] = value
 
-        ems_schedule, expected_costs, scheduler_results, model = device_scheduler(
+        self._prepared = (
+            sensors,
+            start,
+            end,
+            resolution,
+            soc_at_start,
+            device_constraints,
+            commitments,
+        )
+        return dict(
             device_constraints=device_constraints,
             ems_constraints=ems_constraints,
             ems_constraint_groups=self.ems_constraint_groups,
@@ -3173,6 +3198,32 @@ class StorageScheduler(MetaStorageScheduler):
             initial_stock=initial_stock,
             stock_groups=self.stock_groups,
         )
+
+    def compute_from_solution(
+        self,
+        ems_schedule: list[pd.Series],
+        expected_costs: float,
+        scheduler_results,
+        model,
+    ) -> SchedulerOutputType:
+        """Compute the schedule from the solution to the problem prepared by prepare_problem.
+
+        :param ems_schedule:        Device schedules, as returned by the device_scheduler.
+        :param expected_costs:      Costs of the solution, as returned by the device_scheduler.
+        :param scheduler_results:   Solver results, as returned by the device_scheduler.
+        :param model:               Solved model, as returned by the device_scheduler
+                                    (only its commitment_costs are used).
+        :returns:                   The computed schedule.
+        """
+        (
+            sensors,
+            start,
+            end,
+            resolution,
+            soc_at_start,
+            device_constraints,
+            commitments,
+        ) = self._prepared
         if "infeasible" in (tc := scheduler_results.solver.termination_condition):
             raise InfeasibleProblemException(tc)
 
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from collections import OrderedDict
 from datetime import datetime, timedelta
 import pytest
 import pytz
@@ -14,7 +15,11 @@ from flexmeasures.data.models.data_sources import DataSource
 from flexmeasures.data.models.generic_assets import GenericAsset
 from flexmeasures.data.models.time_series import TimedBelief
 from flexmeasures.data.models.time_series import Sensor
-from flexmeasures.data.models.planning import Scheduler
+from flexmeasures.data.models.planning import (
+    FlowCommitment,
+    Scheduler,
+    StockCommitment,
+)
 from flexmeasures.data.models.planning.exceptions import InfeasibleProblemException
 from flexmeasures.data.models.planning.storage import (
     StorageScheduler,
@@ -22,7 +27,12 @@ from flexmeasures.data.models.planning.storage import (
     validate_storage_constraints,
     build_device_soc_values,
 )
-from flexmeasures.data.models.planning.linear_optimization import device_scheduler
+from flexmeasures.data.models.planning.linear_optimization import (
+    decompose_device_scheduler_problem,
+    decomposed_device_scheduler,
+    device_scheduler,
+    find_independent_device_groups,
+)
 from flexmeasures.data.models.planning.tests.utils import (
     check_constraints,
     get_sensors_from_db,
@@ -4215,3 +4225,515 @@ def test_multi_device_battery_fails_on_unresolvable_soc_sensor(
     )
     with pytest.raises(ValueError, match="No recent state-of-charge value"):
         scheduler.compute()
+
+
+def test_device_scheduler_reuses_model_for_shifted_windows(app, monkeypatch):
+    """Rescheduling with a shifted window updates the cached model, with the same results as building a new model."""
+    monkeypatch.setattr(
+        "flexmeasures.data.models.planning.linear_optimization._model_cache",
+        OrderedDict(),
+    )
+    resolution = timedelta(minutes=15)
+    rng = np.random.default_rng(42)
+    prices = pd.Series(
+        rng.uniform(-50, 150, 200),
+        index=initialize_index(
+            start=pd.Timestamp("2025-06-01T00:00+02"),
+            end=pd.Timestamp("2025-06-03T02:00+02"),
+            resolution=resolution,
+        ),
+    )
+
+    def schedule(start: pd.Timestamp, soc_max: float = 5):
+        index = initialize_index(
+            start=start, end=start + timedelta(hours=12), resolution=resolution
+        )
+        equals = pd.Series(np.nan, index=index)
+        equals.iloc[-1] = 2
+        device_constraints = [
+            pd.DataFrame(
+                {
+                    "min": 0,
+                    "max": soc_max,
+                    "equals": equals,
+                    "derivative min": -2,
+                    "derivative max": 2,
+                    "derivative equals": np.nan,
+                    "efficiency": 0.999,
+                    "derivative down efficiency": 0.95,
+                    "derivative up efficiency": 0.95,
+                },
+                index=index,
+            ),
+            # An inflexible device, whose flow shifts along with the window
+            pd.DataFrame(
+                {
+                    "min": np.nan,
+                    "max": np.nan,
+                    "equals": np.nan,
+                    "derivative min": np.nan,
+                    "derivative max": np.nan,
+                    "derivative equals": prices[index] / 100,
+                },
+                index=index,
+            ),
+        ]
+        ems_constraints = pd.DataFrame(
+            {"derivative min": -2.5, "derivative max": 2.5}, index=index
+        )
+        commitments = [
+            FlowCommitment(
+                name="energy",
+                index=index,
+                quantity=0,
+                upwards_deviation_price=prices[index],
+                downwards_deviation_price=prices[index] - 10,
+                device=pd.Series(0, index=index),
+            ),
+            StockCommitment(
+                name="prefer a full battery",
+                index=index,
+                quantity=5,
+                upwards_deviation_price=0,
+                downwards_deviation_price=-0.001,
+                device=pd.Series(0, index=index),
+            ),
+        ]
+        return device_scheduler(
+            device_constraints=device_constraints,
+            ems_constraints=ems_constraints,
+            commitments=commitments,
+            initial_stock=[1 + (start.minute / 15) % 3, 0],
+        )
+
+    starts = pd.date_range("2025-06-01T00:00+02", periods=4, freq="15min")
+    monkeypatch.setitem(app.config, "FLEXMEASURES_LP_MODEL_CACHE_SIZE", 0)
+    expected = [schedule(start) for start in starts]
+
+    monkeypatch.setitem(app.config, "FLEXMEASURES_LP_MODEL_CACHE_SIZE", 2)
+    models = []
+    schedules = []
+    for start, (expected_power, expected_costs, _, _) in zip(starts, expected):
+        power, costs, results, model = schedule(start)
+        assert results.solver.termination_condition == "optimal"
+        assert costs == pytest.approx(expected_costs)
+        for d in range(2):
+            pd.testing.assert_series_equal(power[d], expected_power[d], atol=1e-6)
+        models.append(model)
+        schedules.append((power, value(model.costs)))
+
+    # Only the first schedule built a model
+    assert all(model is models[0] for model in models)
+
+    # So the returned model only holds the results of the last schedule, while the returned schedules stay intact
+    assert value(models[0].costs) == pytest.approx(schedules[-1][1])
+    for (power, _), (expected_power, _, _, _) in zip(schedules, expected):
+        for d in range(2):
+            pd.testing.assert_series_equal(power[d], expected_power[d], atol=1e-6)
+
+    # Dropping the upper stock bound changes the model structure, so that needs a new model
+    _, _, _, model = schedule(starts[0], soc_max=np.nan)
+    assert model is not models[0]
+
+
+def test_highspy_backend_matches_pyomo_schedules(app, monkeypatch):
+    """Both LP backends yield the same schedules and commitment costs, for a problem with a unique optimum.
+
+    Includes two feeders of a shared stock, with distinct conversion efficiencies, and an inflexible device.
+    """
+    resolution = timedelta(hours=1)
+    index = initialize_index(
+        start=pd.Timestamp("2025-06-01T00:00+02"),
+        end=pd.Timestamp("2025-06-02T00:00+02"),
+        resolution=resolution,
+    )
+    prices = pd.Series(np.random.default_rng(7).uniform(0, 100, len(index)), index)
+    equals = pd.Series(np.nan, index=index)
+    equals.iloc[-1] = 3
+
+    def schedule():
+        device_constraints = [
+            pd.DataFrame(
+                {
+                    "min": 0,
+                    "max": 6,
+                    "equals": equals,
+                    "derivative min": -1,
+                    "derivative max": 1,
+                    "derivative equals": np.nan,
+                    "efficiency": 0.99,
+                    "derivative down efficiency": efficiency,
+                    "derivative up efficiency": efficiency,
+                },
+                index=index,
+            )
+            for efficiency in (0.9, 0.8)
+        ] + [
+            pd.DataFrame(
+                {
+                    "min": np.nan,
+                    "max": np.nan,
+                    "equals": np.nan,
+                    "derivative min": np.nan,
+                    "derivative max": np.nan,
+                    "derivative equals": 0.5,
+                },
+                index=index,
+            )
+        ]
+        ems_constraints = pd.DataFrame(
+            {"derivative min": -1.5, "derivative max": 1.5}, index=index
+        )
+        commitments = [
+            FlowCommitment(
+                name="energy",
+                index=index,
+                quantity=0,
+                upwards_deviation_price=prices,
+                downwards_deviation_price=prices * 0.9,
+                device=pd.Series([[0, 1, 2]] * len(index), index=index),
+                device_group=pd.Series({0: "site", 1: "site", 2: "site"}),
+            ),
+            StockCommitment(
+                name="buffer",
+                index=index,
+                quantity=5,
+                upwards_deviation_price=1000,
+                downwards_deviation_price=0,
+                device=pd.Series(0, index=index),
+            ),
+        ]
+        return device_scheduler(
+            device_constraints=device_constraints,
+            ems_constraints=ems_constraints,
+            commitments=commitments,
+            initial_stock=[1, 1, 0],
+            stock_groups={0: [0, 1]},
+        )
+
+    pyomo_power, pyomo_costs, pyomo_results, pyomo_model = schedule()
+    monkeypatch.setitem(app.config, "FLEXMEASURES_LP_BACKEND", "highspy")
+    power, costs, results, model = schedule()
+
+    assert pyomo_results.solver.termination_condition == "optimal"
+    assert results.solver.termination_condition == "optimal"
+    assert costs == pytest.approx(pyomo_costs)
+    for d in range(3):
+        pd.testing.assert_series_equal(power[d], pyomo_power[d], atol=1e-6)
+    assert model.commitment_costs == pytest.approx(pyomo_model.commitment_costs)
+
+
+def _battery_problem(
+    index: pd.DatetimeIndex, convex: bool = True, final_stock: float = np.nan
+):
+    """A battery behind a site connection, with an energy commitment.
+
+    Unless the cost curve is convex, selling pays more than buying costs, which needs binary variables.
+    """
+    prices = pd.Series(np.random.default_rng(5).uniform(0, 100, len(index)), index)
+    equals = pd.Series(np.nan, index=index)
+    equals.iloc[-1] = final_stock
+    device_constraints = [
+        pd.DataFrame(
+            {
+                "min": 0,
+                "max": 4,
+                "equals": equals,
+                "derivative min": -1,
+                "derivative max": 1,
+                "derivative equals": np.nan,
+            },
+            index=index,
+        )
+    ]
+    ems_constraints = pd.DataFrame(
+        {"derivative min": -0.8, "derivative max": 0.8}, index=index
+    )
+    commitments = [
+        FlowCommitment(
+            name="energy",
+            index=index,
+            quantity=0,
+            upwards_deviation_price=prices,
+            downwards_deviation_price=prices * (0.9 if convex else 1.1),
+            device=pd.Series(0, index=index),
+        )
+    ]
+    return dict(
+        device_constraints=device_constraints,
+        ems_constraints=ems_constraints,
+        commitments=commitments,
+        initial_stock=2,
+    )
+
+
+@pytest.mark.parametrize(
+    "make_problem, periods, expected_termination_condition",
+    [
+        (_battery_problem, 24, "optimal"),
+        (lambda index: _battery_problem(index, convex=False), 24, "optimal"),
+        (lambda index: _battery_problem(index, final_stock=10), 4, "infeasible"),
+        (lambda index: _two_site_problem(index, site_capacity=1.5), 24, "optimal"),
+    ],
+    ids=["battery", "non-convex costs", "infeasible", "shared stock"],
+)
+def test_lp_backends_agree(
+    app, monkeypatch, make_problem, periods, expected_termination_condition
+):
+    """Both LP backends reach the same outcome and costs.
+
+    Alternative optima can differ in their schedules, so we only compare the costs.
+    """
+    index = initialize_index(
+        start=pd.Timestamp("2025-06-01T00:00+02"),
+        end=pd.Timestamp("2025-06-01T00:00+02") + periods * timedelta(hours=1),
+        resolution=timedelta(hours=1),
+    )
+
+    _, pyomo_costs, pyomo_results, _ = device_scheduler(**make_problem(index))
+    monkeypatch.setitem(app.config, "FLEXMEASURES_LP_BACKEND", "highspy")
+    _, costs, results, model = device_scheduler(**make_problem(index))
+
+    assert pyomo_results.solver.termination_condition == expected_termination_condition
+    assert results.solver.termination_condition == expected_termination_condition
+    if expected_termination_condition == "optimal":
+        assert costs == pytest.approx(pyomo_costs, rel=1e-6, abs=1e-6)
+        assert sum(model.commitment_costs.values()) == pytest.approx(
+            costs, rel=1e-6, abs=1e-6
+        )
+
+
+def test_highspy_backend_raises_on_rejected_solver_option(app, monkeypatch):
+    """Options that HiGHS rejects are not ignored, even if they made it past validate_highs_options."""
+    monkeypatch.setattr(
+        "flexmeasures.data.models.planning.linear_optimization.validate_highs_options",
+        lambda options: None,
+    )
+    monkeypatch.setitem(app.config, "FLEXMEASURES_LP_SOLVER_OPTIONS", {"bogus": 1})
+    monkeypatch.setitem(app.config, "FLEXMEASURES_LP_BACKEND", "highspy")
+    index = initialize_index(
+        start=pd.Timestamp("2025-06-01T00:00+02"),
+        end=pd.Timestamp("2025-06-01T04:00+02"),
+        resolution=timedelta(hours=1),
+    )
+    with pytest.raises(ValueError, match="HiGHS rejected solver option bogus=1"):
+        device_scheduler(**_battery_problem(index))
+
+
+def _two_site_problem(index: pd.DatetimeIndex, site_capacity: float | None = None):
+    """Two sites behind one EMS: a pair of feeders of a shared stock, and a single battery,
+    each with their own energy commitment, plus an inflexible device without any commitment.
+    """
+    rng = np.random.default_rng(3)
+    storage = dict(
+        min=0,
+        max=6,
+        equals=np.nan,
+        efficiency=0.99,
+        **{"derivative min": -1, "derivative max": 1, "derivative equals": np.nan},
+    )
+    # Distinct conversion efficiencies make the optimum unique
+    device_constraints = [
+        pd.DataFrame(
+            {
+                **storage,
+                "derivative down efficiency": efficiency,
+                "derivative up efficiency": efficiency,
+            },
+            index=index,
+        )
+        for efficiency in (0.9, 0.8, 0.95)
+    ] + [
+        pd.DataFrame(
+            {
+                "min": np.nan,
+                "max": np.nan,
+                "equals": np.nan,
+                "derivative min": np.nan,
+                "derivative max": np.nan,
+                "derivative equals": 0.5,
+            },
+            index=index,
+        ),
+    ]
+    ems_constraints = pd.DataFrame(
+        {"derivative min": np.nan, "derivative max": np.nan}, index=index
+    )
+    if site_capacity is not None:
+        ems_constraints[:] = [-site_capacity, site_capacity]
+    commitments = []
+    for name, devices in (("site A", [0, 1]), ("site B", [2])):
+        prices = pd.Series(rng.uniform(0, 100, len(index)), index)
+        commitments.append(
+            FlowCommitment(
+                name=name,
+                index=index,
+                quantity=0,
+                upwards_deviation_price=prices,
+                downwards_deviation_price=prices * 0.9,
+                device=pd.Series([devices] * len(index), index=index),
+                device_group=pd.Series({d: name for d in devices}),
+            )
+        )
+    commitments.append(
+        StockCommitment(
+            name="buffer",
+            index=index,
+            quantity=5,
+            upwards_deviation_price=1000,
+            downwards_deviation_price=0,
+            device=pd.Series(2, index=index),
+        )
+    )
+    return dict(
+        device_constraints=device_constraints,
+        ems_constraints=ems_constraints,
+        commitments=commitments,
+        initial_stock=[1, 1, 2, 0],
+        stock_groups={0: [0, 1], 1: [2]},
+    )
+
+
+@pytest.mark.parametrize(
+    "site_capacity, expected_groups",
+    [
+        (None, [[0, 1], [2], [3]]),
+        (10, [[0, 1, 2, 3]]),
+    ],
+)
+def test_find_independent_device_groups(site_capacity, expected_groups):
+    """Devices are coupled by stock groups, commitments and EMS constraints with finite bounds."""
+    index = initialize_index(
+        start=pd.Timestamp("2025-06-01T00:00+02"),
+        end=pd.Timestamp("2025-06-01T04:00+02"),
+        resolution=timedelta(hours=1),
+    )
+    problem = _two_site_problem(index, site_capacity=site_capacity)
+    assert find_independent_device_groups(**problem) == expected_groups
+
+    # The inflexible device has no commitment, so it joins the first subproblem
+    subproblems = decompose_device_scheduler_problem(**problem)
+    assert [subproblem.devices for subproblem in subproblems] == (
+        [[0, 1, 3], [2]] if site_capacity is None else [[0, 1, 2, 3]]
+    )
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_decomposed_device_scheduler_matches_device_scheduler(
+    app, monkeypatch, processes
+):
+    """Solving independent device groups separately (and in parallel) yields the same schedules and costs."""
+    monkeypatch.setitem(app.config, "FLEXMEASURES_LP_DECOMPOSE_PROCESSES", processes)
+    index = initialize_index(
+        start=pd.Timestamp("2025-06-01T00:00+02"),
+        end=pd.Timestamp("2025-06-02T00:00+02"),
+        resolution=timedelta(hours=1),
+    )
+    problem = _two_site_problem(index)
+    power, costs, results, model = device_scheduler(**problem)
+    (
+        decomposed_power,
+        decomposed_costs,
+        decomposed_results,
+        decomposed_model,
+    ) = decomposed_device_scheduler(**problem)
+
+    assert decomposed_results.solver.termination_condition == "optimal"
+    assert decomposed_costs == pytest.approx(costs)
+    for d in range(4):
+        pd.testing.assert_series_equal(decomposed_power[d], power[d], atol=1e-6)
+    assert list(decomposed_model.commitment_costs) == list(model.commitment_costs)
+    assert decomposed_model.commitment_costs == pytest.approx(model.commitment_costs)
+
+
+def test_decomposed_device_scheduler_with_shared_commitment(app):
+    """A commitment shared by devices of otherwise independent sites keeps them in one problem."""
+    index = initialize_index(
+        start=pd.Timestamp("2025-06-01T00:00+02"),
+        end=pd.Timestamp("2025-06-02T00:00+02"),
+        resolution=timedelta(hours=1),
+    )
+    problem = _two_site_problem(index)
+    problem["commitments"].append(
+        FlowCommitment(
+            name="peak",
+            index=index,
+            quantity=1,
+            upwards_deviation_price=50,
+            downwards_deviation_price=0,
+            device=pd.Series([[0, 1, 2]] * len(index), index=index),
+            device_group=pd.Series({0: "peak", 1: "peak", 2: "peak"}),
+        )
+    )
+    assert find_independent_device_groups(**problem) == [[0, 1, 2], [3]]
+    subproblems = decompose_device_scheduler_problem(**problem)
+    assert [subproblem.devices for subproblem in subproblems] == [[0, 1, 2, 3]]
+
+    power, costs, results, model = device_scheduler(**problem)
+    decomposed_power, decomposed_costs, decomposed_results, _ = (
+        decomposed_device_scheduler(**problem)
+    )
+    assert decomposed_results.solver.termination_condition == "optimal"
+    assert decomposed_costs == pytest.approx(costs)
+    for d in range(4):
+        pd.testing.assert_series_equal(decomposed_power[d], power[d], atol=1e-6)
+
+
+def test_decomposed_device_scheduler_models_parts_like_the_whole_problem(app):
+    """Whether the cost curve is convex is checked for the whole problem, not per subproblem.
+
+    Here, only the commitment of the second battery pays more for selling than it costs to buy,
+    which is not enough to make the cost curve of the whole problem non-convex.
+    """
+    index = initialize_index(
+        start=pd.Timestamp("2025-06-01T00:00+02"),
+        end=pd.Timestamp("2025-06-01T06:00+02"),
+        resolution=timedelta(hours=1),
+    )
+    rng = np.random.default_rng(1)
+    prices = [
+        pd.Series(rng.uniform(50, 100, len(index)), index),
+        pd.Series(rng.uniform(0, 10, len(index)), index),
+    ]
+    problem = dict(
+        device_constraints=[
+            pd.DataFrame(
+                {
+                    "min": 0,
+                    "max": 4,
+                    "equals": np.nan,
+                    "derivative min": -1,
+                    "derivative max": 1,
+                    "derivative equals": np.nan,
+                },
+                index=index,
+            )
+            for _ in range(2)
+        ],
+        ems_constraints=pd.DataFrame(
+            {"derivative min": np.nan, "derivative max": np.nan}, index=index
+        ),
+        commitments=[
+            FlowCommitment(
+                name=f"battery {d}",
+                index=index,
+                quantity=0,
+                upwards_deviation_price=prices[d],
+                downwards_deviation_price=prices[d] * price_ratio,
+                device=pd.Series(d, index=index),
+            )
+            for d, price_ratio in enumerate((0.5, 1.5))
+        ],
+        initial_stock=[2, 2],
+    )
+    subproblems = decompose_device_scheduler_problem(**problem)
+    assert [subproblem.devices for subproblem in subproblems] == [[0], [1]]
+    assert all(subproblem.kwargs["convex_cost_curve"] for subproblem in subproblems)
+
+    _, costs, results, _ = device_scheduler(**problem)
+    _, decomposed_costs, decomposed_results, _ = decomposed_device_scheduler(**problem)
+    assert (
+        decomposed_results.solver.termination_condition
+        == results.solver.termination_condition
+    )
+    assert decomposed_costs == pytest.approx(costs)
@@ -1,4 +1,5 @@
 import pandas as pd
+import pytest
 from datetime import timedelta
 
 from flexmeasures.data.models.generic_assets import GenericAsset, GenericAssetType
@@ -6,7 +7,12 @@ from flexmeasures.data.models.time_series import Sensor, TimedBelief
 from flexmeasures.data.models.data_sources import DataSource
 from flexmeasures.data.services.utils import get_or_create_model
 import timely_beliefs as tb
-from flexmeasures.data.models.planning.utils import get_series_from_quantity_or_sensor
+from flexmeasures.data.models.planning.utils import (
+    get_series_from_quantity_or_sensor,
+    prefetch_beliefs,
+    search_most_recent_beliefs,
+    use_prefetched_beliefs,
+)
 
 
 def test_get_series_from_quantity_or_sensor(
@@ -55,3 +61,46 @@ def test_get_series_from_quantity_or_sensor(
         unit="kW",
     )
     assert isinstance(result, pd.Series)
+
+
+@pytest.mark.parametrize(
+    "query_window, resolution",
+    [
+        (("2015-01-01T12:00+01", "2015-01-02T12:00+01"), None),
+        (("2015-01-02T00:00+01", "2015-01-03T00:00+01"), timedelta(minutes=15)),
+        (("2015-01-02T06:30+01", "2015-01-03T18:00+01"), timedelta(hours=2)),
+        (("2015-01-02T06:00+01", "2015-01-02T10:00+01"), "15min"),
+    ],
+)
+def test_search_most_recent_beliefs_from_prefetched_beliefs(
+    db, add_market_prices, monkeypatch, query_window, resolution
+):
+    """Searching within prefetched beliefs gives the same beliefs as searching the database, without querying it."""
+    sensor = add_market_prices["epex_da"]
+    query_window = tuple(pd.Timestamp(dt) for dt in query_window)
+    beliefs_before = pd.Timestamp("2015-01-05T00:00+01")
+    expected_bdf = search_most_recent_beliefs(
+        sensor,
+        query_window=query_window,
+        resolution=resolution,
+        beliefs_before=beliefs_before,
+    )
+    assert not expected_bdf.empty
+
+    prefetched_beliefs = prefetch_beliefs(
+        [sensor],
+        query_window=(
+            pd.Timestamp("2015-01-01T00:00+01"),
+            pd.Timestamp("2015-01-04T00:00+01"),
+        ),
+        beliefs_before=beliefs_before,
+    )
+    monkeypatch.setattr(TimedBelief, "search", None)
+    with use_prefetched_beliefs(prefetched_beliefs):
+        bdf = search_most_recent_beliefs(
+            sensor,
+            query_window=query_window,
+            resolution=resolution,
+            beliefs_before=beliefs_before,
+        )
+    pd.testing.assert_frame_equal(bdf, expected_bdf)
@@ -1,8 +1,10 @@
 from __future__ import annotations
 
 from packaging import version
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import date, datetime, timedelta, timezone
-from typing import Literal
+from typing import Iterator, Literal
 
 from flask import current_app
 import pandas as pd
@@ -19,6 +21,11 @@ from flexmeasures.data.schemas.sensors import SensorReference
 from flexmeasures.utils.flexmeasures_inflection import capitalize, pluralize
 from flexmeasures.utils.unit_utils import ur, convert_units
 
+# Beliefs fetched ahead of scheduling, per sensor ID, together with the query window and beliefs_before they answer
+_prefetched_beliefs: ContextVar[
+    dict[int, tuple[tuple[datetime, datetime], datetime | None, tb.BeliefsDataFrame]]
+] = ContextVar("prefetched_beliefs", default={})
+
 
 def initialize_df(
     columns: list[str],
@@ -169,6 +176,98 @@ def extend_to_edges(
     return df
 
 
+def prefetch_beliefs(
+    sensors: list[Sensor],
+    query_window: tuple[datetime, datetime],
+    beliefs_before: datetime | None,
+) -> dict[int, tuple[tuple[datetime, datetime], datetime | None, tb.BeliefsDataFrame]]:
+    """Fetch the most recent beliefs of several sensors in one batch, to be used in scheduling.
+
+    Pass the result to :func:`use_prefetched_beliefs`, to let schedulers look up beliefs
+    within the query window from memory, rather than querying the database per scheduler.
+
+    :param sensors:         sensors whose beliefs are (probably) needed by more than one scheduler
+    :param query_window:    datetime window covering the scheduling windows of all schedulers
+    :param beliefs_before:  datetime used to indicate we are interested in the state of knowledge at that time
+    :returns:               prefetched beliefs per sensor ID
+    """
+    if not sensors:
+        return {}
+    bdf_dict = TimedBelief.search(
+        sensors,
+        event_starts_after=query_window[0],
+        event_ends_before=query_window[1],
+        beliefs_before=beliefs_before,
+        most_recent_beliefs_only=True,
+        one_deterministic_belief_per_event=True,
+        sum_multiple=False,
+    )
+    return {
+        sensor.id: (query_window, beliefs_before, bdf)
+        for sensor, bdf in bdf_dict.items()
+    }
+
+
+@contextmanager
+def use_prefetched_beliefs(
+    prefetched_beliefs: dict[
+        int, tuple[tuple[datetime, datetime], datetime | None, tb.BeliefsDataFrame]
+    ],
+) -> Iterator[None]:
+    """Within this context, look up beliefs from the given prefetched beliefs (see :func:`prefetch_beliefs`)."""
+    token = _prefetched_beliefs.set(prefetched_beliefs)
+    try:
+        yield
+    finally:
+        _prefetched_beliefs.reset(token)
+
+
+def search_most_recent_beliefs(
+    sensor: Sensor,
+    query_window: tuple[datetime, datetime],
+    resolution: str | timedelta | None,
+    beliefs_before: datetime | None,
+) -> tb.BeliefsDataFrame:
+    """Search the most recent beliefs of a sensor, with one deterministic belief per event.
+
+    The beliefs are looked up from prefetched beliefs, if available for the same beliefs_before
+    and a query window that covers the given one, and otherwise queried from the database.
+    In both cases, the results are those of TimedBelief.search with the same arguments.
+    """
+    prefetched = _prefetched_beliefs.get().get(sensor.id)
+    if prefetched is not None:
+        (prefetch_start, prefetch_end), prefetch_beliefs_before, bdf = prefetched
+        start, end = query_window
+        if (
+            prefetch_beliefs_before == beliefs_before
+            and prefetch_start <= start
+            and prefetch_end >= end
+        ):
+            # Select the events that the database query would have selected (see query_beliefs_for_sensors)
+            event_starts = bdf.event_starts
+            if sensor.event_resolution == timedelta(0):
+                bdf = bdf[(event_starts >= start) & (event_starts <= end)]
+            else:
+                bdf = bdf[
+                    (event_starts > start - sensor.event_resolution)
+                    & (event_starts < end)
+                ]
+            if resolution is not None and resolution != bdf.event_resolution:
+                bdf = bdf.resample_events(resolution, keep_only_most_recent_belief=True)
+                bdf = bdf[bdf.event_starts >= start]
+                bdf = bdf[bdf.event_ends <= end]
+            return bdf
+    return TimedBelief.search(
+        sensor,
+        event_starts_after=query_window[0],
+        event_ends_before=query_window[1],
+        resolution=resolution,
+        beliefs_before=beliefs_before,
+        most_recent_beliefs_only=True,
+        one_deterministic_belief_per_event=True,
+    )
+
+
 def get_power_values(
     query_window: tuple[datetime, datetime],
     resolution: timedelta,
@@ -187,14 +286,11 @@ def get_power_values(
     :param sensor:          power sensor representing an energy flow out of the device
     :returns:               power measurements or forecasts (consumption is positive, production is negative)
     """
-    bdf: tb.BeliefsDataFrame = TimedBelief.search(
+    bdf: tb.BeliefsDataFrame = search_most_recent_beliefs(
         sensor,
-        event_starts_after=query_window[0],
-        event_ends_before=query_window[1],
+        query_window=query_window,
         resolution=to_offset(resolution).freqstr,
         beliefs_before=beliefs_before,
-        most_recent_beliefs_only=True,
-        one_deterministic_belief_per_event=True,
     )  # consumption is negative, production is positive
     df = simplify_index(bdf)
     df = df.reindex(initialize_index(query_window[0], query_window[1], resolution))
@@ -377,15 +473,11 @@ def get_series_from_quantity_or_sensor(
             time_series, variable_quantity.unit, unit, resolution
         )
     elif isinstance(variable_quantity, Sensor):
-        bdf: tb.BeliefsDataFrame = TimedBelief.search(
+        bdf: tb.BeliefsDataFrame = search_most_recent_beliefs(
             variable_quantity,
-            event_starts_after=query_window[0],
-            event_ends_before=query_window[1],
+            query_window=query_window,
             resolution=resolution,
-            # frequency=resolution,
             beliefs_before=beliefs_before,
-            most_recent_beliefs_only=True,
-            one_deterministic_belief_per_event=True,
         )
         if as_instantaneous_events:
             bdf = bdf.resample_events(
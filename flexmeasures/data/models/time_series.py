@@ -9,7 +9,7 @@ from flask import current_app
 
 import numpy as np
 import pandas as pd
-from sqlalchemy import exists, select
+from sqlalchemy import DDL, event, exists, select
 from sqlalchemy.ext.declarative import declared_attr
 from sqlalchemy.ext.mutable import MutableDict
 from sqlalchemy.schema import UniqueConstraint
@@ -25,7 +25,17 @@ from flexmeasures.data.models.legacy_migration_utils import upgrade_value
 from flexmeasures.data.models.data_sources import keep_latest_version
 from flexmeasures.data.models.parsing_utils import parse_source_arg
 from flexmeasures.data.services.annotations import prepare_annotations_for_chart
+from flexmeasures.data.services.belief_partitions import (
+    DEFAULT_PARTITION,
+    PARTITIONED_TABLE,
+)
 from flexmeasures.data.services.timerange import get_timerange
+from flexmeasures.data.queries.beliefs import (
+    query_beliefs_for_sensors,
+    query_rolled_up_beliefs,
+    supports_batched_belief_search,
+    supports_rolled_up_belief_search,
+)
 from flexmeasures.data.queries.utils import get_source_criteria
 from flexmeasures.data.services.time_series import aggregate_values
 from flexmeasures.utils.entity_address_utils import (
@@ -38,6 +48,7 @@ from flexmeasures.utils.unit_utils import (
     is_power_unit,
     is_energy_price_unit,
 )
+from flexmeasures.data.models.belief_rollups import BeliefRollup
 from flexmeasures.data.models.annotations import (
     Annotation,
     SensorAnnotationRelationship,
@@ -908,12 +919,33 @@ def _select_latest_version_and_belief_per_event(
     return bdf[mask]
 
 
+def _load_sensors(sensors: list[Sensor | int]) -> list[Sensor]:
+    """Replace any sensor ids by their Sensor, loading all of them in a single query."""
+    sensor_ids = [s for s in sensors if isinstance(s, int)]
+    if not sensor_ids:
+        return sensors
+    sensors_by_id = {
+        s.id: s
+        for s in db.session.scalars(select(Sensor).filter(Sensor.id.in_(sensor_ids)))
+    }
+    if len(sensors_by_id) < len(set(sensor_ids)):
+        raise ValueError("No such sensor")
+    return [sensors_by_id[s] if isinstance(s, int) else s for s in sensors]
+
+
 class TimedBelief(db.Model, tb.TimedBeliefDBMixin):
     """A timed belief holds a precisely timed record of a belief about an event.
 
     It also records the source of the belief, and the sensor that the event pertains to.
     """
 
+    @declared_attr
+    def __table_args__(cls):
+        # Range-partition the beliefs by event start (see flexmeasures.data.services.belief_partitions)
+        return tb.TimedBeliefDBMixin.__dict__["__table_args__"].fget(cls) + (
+            {"postgresql_partition_by": "RANGE (event_start)"},
+        )
+
     @declared_attr
     def source_id(cls):
         return db.Column(db.Integer, db.ForeignKey("data_source.id"), primary_key=True)
@@ -954,7 +986,7 @@ class TimedBelief(db.Model, tb.TimedBeliefDBMixin):
         db.Model.__init__(self, **kwargs)
 
     @classmethod
-    def search(
+    def search(  # noqa: C901
         cls,
         sensors: Sensor | int | str | list[Sensor | int | str],
         sensor: Sensor = None,  # deprecated
@@ -979,6 +1011,7 @@ class TimedBelief(db.Model, tb.TimedBeliefDBMixin):
         one_deterministic_belief_per_event_per_source: bool = False,
         resolution: str | timedelta = None,
         sum_multiple: bool = True,
+        batch_sensors: bool = True,
     ) -> tb.BeliefsDataFrame | dict[str, tb.BeliefsDataFrame]:
         """Search all beliefs about events for the given sensors.
 
@@ -1004,6 +1037,7 @@ class TimedBelief(db.Model, tb.TimedBeliefDBMixin):
         :param one_deterministic_belief_per_event_per_source: only return a single value per event per source (no probabilistic distribution)
         :param resolution: Optional timedelta or pandas freqstr used to resample the results **
         :param sum_multiple: if True, sum over multiple sensors; otherwise, return a dictionary with sensors as key, each holding a BeliefsDataFrame as its value
+        :param batch_sensors: if True (the default), beliefs about multiple sensors are fetched in a single query, as long as the search criteria allow it ***
 
         *  If user_source_ids is specified, the "user" source type is automatically included (and not excluded).
            Somewhat redundant, though still allowed, is to set both source_types and exclude_source_types.
@@ -1011,6 +1045,7 @@ class TimedBelief(db.Model, tb.TimedBeliefDBMixin):
            - timely-beliefs converts string resolutions to datetime.timedelta objects (see https://github.com/SeitaBV/timely-beliefs/issues/13).
            - for sensors recording non-instantaneous data: updates both the event frequency and the event resolution
            - for sensors recording instantaneous data: updates only the event frequency (and event resolution remains 0)
+        *** See flexmeasures.data.queries.beliefs.supports_batched_belief_search for criteria that require one query per sensor.
         """
         # todo: deprecate the 'sensor' argument in favor of 'sensors' (announced v0.8.0)
         sensors = tb_utils.replace_deprecated_argument(
@@ -1051,23 +1086,103 @@ class TimedBelief(db.Model, tb.TimedBeliefDBMixin):
                 most_recent_events_only=most_recent_events_only,
             )
 
-        bdf_dict = {}
-        for sensor in sensors:
-            bdf = cls.search_session(
-                session=db.session,
-                sensor=sensor,
-                # Workaround (1st half) for https://github.com/FlexMeasures/flexmeasures/issues/484
-                event_ends_after=event_starts_after,
-                event_starts_before=event_ends_before,
+        # Read the beliefs from the rollups, if possible, rather than fetching and resampling all raw beliefs
+        rolled_up_bdf_dict = {}
+        if current_app.config.get(
+            "FLEXMEASURES_USE_BELIEF_ROLLUPS"
+        ) and supports_rolled_up_belief_search(
+            resolution,
+            event_starts_after=event_starts_after,
+            event_ends_before=event_ends_before,
+            beliefs_after=beliefs_after,
+            beliefs_before=beliefs_before,
+            horizons_at_least=horizons_at_least,
+            horizons_at_most=horizons_at_most,
+            **most_recent_filters,
+        ):
+            sensors = _load_sensors(sensors)
+            rollup_source_criteria = get_source_criteria(
+                cls=BeliefRollup,
+                user_source_ids=user_source_ids,
+                source_account_ids=source_account_ids,
+                source_types=source_types,
+                exclude_source_types=exclude_source_types,
+            )
+            for sensor in sensors:
+                bdf = query_rolled_up_beliefs(
+                    session=db.session,
+                    sensor=sensor,
+                    resolution=resolution,
+                    event_starts_after=event_starts_after,
+                    event_ends_before=event_ends_before,
+                    sources=parsed_sources,
+                    custom_filter_criteria=rollup_source_criteria,
+                )
+                if bdf is not None:
+                    rolled_up_bdf_dict[sensor] = bdf
+
+        # Fetch the beliefs of all sensors in one query, if possible,
+        # and let the database drop beliefs that lose the selection of one deterministic belief per event
+        raw_bdf_dict = {}
+        select_in_sql = one_deterministic_belief_per_event and most_recent_beliefs_only
+        if (batch_sensors and len(sensors) > 1) or select_in_sql:
+            sensors = _load_sensors(sensors)
+            raw_sensors = [s for s in sensors if s not in rolled_up_bdf_dict]
+            if raw_sensors and supports_batched_belief_search(
+                raw_sensors,
                 beliefs_after=beliefs_after,
                 beliefs_before=beliefs_before,
-                horizons_at_least=horizons_at_least,
-                horizons_at_most=horizons_at_most,
-                source=parsed_sources,
+                sources=parsed_sources,
                 **most_recent_filters,
-                custom_filter_criteria=source_criteria,
-                custom_join_targets=custom_join_targets,
-            )
+            ):
+                sensor_batches = (
+                    [raw_sensors]
+                    if batch_sensors
+                    else [[sensor] for sensor in raw_sensors]
+                )
+                for sensor_batch in sensor_batches:
+                    raw_bdf_dict |= query_beliefs_for_sensors(
+                        cls,
+                        session=db.session,
+                        sensors=sensor_batch,
+                        # Workaround (1st half) for https://github.com/FlexMeasures/flexmeasures/issues/484
+                        event_ends_after=event_starts_after,
+                        event_starts_before=event_ends_before,
+                        beliefs_after=beliefs_after,
+                        beliefs_before=beliefs_before,
+                        horizons_at_least=horizons_at_least,
+                        horizons_at_most=horizons_at_most,
+                        sources=parsed_sources,
+                        **most_recent_filters,
+                        one_deterministic_belief_per_event=select_in_sql,
+                        use_latest_version_per_event=use_latest_version_per_event,
+                        custom_filter_criteria=source_criteria,
+                        custom_join_targets=custom_join_targets,
+                    )
+
+        bdf_dict = {}
+        for sensor in sensors:
+            if sensor in rolled_up_bdf_dict:
+                bdf_dict[sensor] = rolled_up_bdf_dict[sensor]
+                continue
+            if sensor in raw_bdf_dict:
+                bdf = raw_bdf_dict[sensor]
+            else:
+                bdf = cls.search_session(
+                    session=db.session,
+                    sensor=sensor,
+                    # Workaround (1st half) for https://github.com/FlexMeasures/flexmeasures/issues/484
+                    event_ends_after=event_starts_after,
+                    event_starts_before=event_ends_before,
+                    beliefs_after=beliefs_after,
+                    beliefs_before=beliefs_before,
+                    horizons_at_least=horizons_at_least,
+                    horizons_at_most=horizons_at_most,
+                    source=parsed_sources,
+                    **most_recent_filters,
+                    custom_filter_criteria=source_criteria,
+                    custom_join_targets=custom_join_targets,
+                )
             if use_latest_version_per_event:
                 bdf = keep_latest_version(
                     bdf=bdf,
@@ -1168,3 +1283,13 @@ class TimedBelief(db.Model, tb.TimedBeliefDBMixin):
     def __repr__(self) -> str:
         """timely-beliefs representation of timed beliefs."""
         return tb.TimedBelief.__repr__(self)
+
+
+# Beliefs about events outside the monthly partitions go to a default partition
+event.listen(
+    TimedBelief.__table__,
+    "after_create",
+    DDL(
+        f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {PARTITIONED_TABLE} DEFAULT"
+    ).execute_if(dialect="postgresql"),
+)
@@ -0,0 +1,574 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import Type
+
+import numpy as np
+import pandas as pd
+import timely_beliefs as tb
+import timely_beliefs.utils as tb_utils
+from packaging.version import Version
+from sqlalchemy import Select, and_, case, func, literal, or_, select
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import BinaryExpression
+from sqlalchemy.sql.selectable import Subquery
+from timely_beliefs.beliefs import utils as belief_utils
+from timely_beliefs.beliefs.classes import downsample_beliefs_data_frame
+from timely_beliefs.sensors import utils as sensor_utils
+from timely_beliefs.sensors.func_store.knowledge_horizons import ex_ante, ex_post
+
+from flexmeasures.data.models.belief_rollups import BeliefRollup, ROLLUP_RESOLUTIONS
+from flexmeasures.data.models.data_sources import DataSource
+import flexmeasures.data.models.time_series as ts  # noqa: F401
+
+
+def supports_batched_belief_search(
+    sensors: list["ts.Sensor"],
+    beliefs_after: datetime | None = None,
+    beliefs_before: datetime | None = None,
+    most_recent_beliefs_only: bool = False,
+    most_recent_events_only: bool = False,
+    most_recent_only: bool = False,
+    sources: list[DataSource] | None = None,
+) -> bool:
+    """Check whether the search criteria can be served by a single query for all sensors.
+
+    Not supported (i.e. the caller should query each sensor separately):
+    - the most_recent_only fast-track, which limits the result to one row per query
+    - selecting the most recent beliefs and events for a single source, which timely-beliefs turns into that fast-track
+    - selecting the most recent beliefs in combination with belief time filters,
+      for sensors whose knowledge horizon is neither ex-ante nor ex-post (timely-beliefs post-processes these in pandas)
+    """
+    if most_recent_only:
+        return False
+    if (
+        most_recent_beliefs_only
+        and most_recent_events_only
+        and sources is not None
+        and len(sources) == 1
+    ):
+        return False
+    if most_recent_beliefs_only and (
+        beliefs_after is not None or beliefs_before is not None
+    ):
+        return all(
+            sensor.knowledge_horizon_fnc in (ex_ante.__name__, ex_post.__name__)
+            for sensor in sensors
+        )
+    return True
+
+
+def query_beliefs_for_sensors(  # noqa: C901
+    cls: "Type[ts.TimedBelief]",
+    session: Session,
+    sensors: list["ts.Sensor"],
+    event_ends_after: datetime | None = None,
+    event_starts_before: datetime | None = None,
+    beliefs_after: datetime | None = None,
+    beliefs_before: datetime | None = None,
+    horizons_at_least: timedelta | None = None,
+    horizons_at_most: timedelta | None = None,
+    sources: list[DataSource] | None = None,
+    most_recent_beliefs_only: bool = False,
+    most_recent_events_only: bool = False,
+    one_deterministic_belief_per_event: bool = False,
+    use_latest_version_per_event: bool = True,
+    custom_filter_criteria: list[BinaryExpression] | None = None,
+    custom_join_targets: list | None = None,
+) -> dict["ts.Sensor", tb.BeliefsDataFrame]:
+    """Search beliefs for multiple sensors in a single round trip to the database.
+
+    Mirrors TimedBeliefDBMixin.search_session (for the criteria accepted by supports_batched_belief_search),
+    but selects the beliefs of all sensors in one query and splits the result into one BeliefsDataFrame per sensor.
+    The event and rough belief timing filters depend on sensor properties (event resolution and knowledge horizon),
+    so these are applied per group of sensors sharing these properties.
+    The most-recent-X selections are made with window functions rather than (per sensor) aggregate subqueries.
+
+    If one_deterministic_belief_per_event is set (together with most_recent_beliefs_only),
+    the beliefs that cannot win the selection of one belief per event are already dropped in the database
+    (see _select_winning_beliefs_per_event). The caller should still make the final selection in pandas,
+    which is then cheap, and which also takes care of probabilistic beliefs and ties.
+
+    :returns: dictionary with a BeliefsDataFrame per sensor, in the order of the given sensors
+    """
+    empty_result = {sensor: tb.BeliefsDataFrame(sensor=sensor) for sensor in sensors}
+    if not sensors or (sources is not None and len(sources) == 0):
+        return empty_result
+
+    # Like search_session, accept datetime-like arguments, such as ISO strings
+    event_ends_after, event_starts_before, beliefs_after, beliefs_before = (
+        tb_utils.parse_datetime_like(dt, name) if not pd.isnull(dt) else dt
+        for dt, name in (
+            (event_ends_after, "event_ends_after"),
+            (event_starts_before, "event_starts_before"),
+            (beliefs_after, "beliefs_after"),
+            (beliefs_before, "beliefs_before"),
+        )
+    )
+
+    group_criteria = _timing_criteria_per_sensor_group(
+        cls,
+        sensors,
+        event_ends_after=event_ends_after,
+        event_starts_before=event_starts_before,
+        beliefs_after=beliefs_after,
+        beliefs_before=beliefs_before,
+    )
+
+    columns = [
+        cls.sensor_id,
+        cls.event_start,
+        cls.belief_horizon,
+        cls.source_id,
+        cls.cumulative_probability,
+        cls.event_value,
+    ]
+    if most_recent_beliefs_only:
+        # rank() rather than row_number(), so all rows tied at the minimum horizon survive (e.g. probabilistic beliefs)
+        columns.append(
+            func.rank()
+            .over(
+                partition_by=(cls.sensor_id, cls.event_start, cls.source_id),
+                order_by=cls.belief_horizon,
+            )
+            .label("horizon_rank")
+        )
+    if most_recent_events_only:
+        columns.append(
+            func.max(cls.event_start)
+            .over(partition_by=(cls.sensor_id, cls.source_id))
+            .label("most_recent_event_start")
+        )
+
+    def apply_filters(q):
+        """Apply the timing, source and custom filters."""
+        q = q.select_from(cls).filter(or_(*group_criteria))
+        if not pd.isnull(horizons_at_least):
+            q = q.filter(cls.belief_horizon >= horizons_at_least)
+        if not pd.isnull(horizons_at_most):
+            q = q.filter(cls.belief_horizon <= horizons_at_most)
+        if custom_filter_criteria is not None:
+            q = q.filter(*custom_filter_criteria)
+        if custom_join_targets is not None:
+            for target in custom_join_targets:
+                q = q.join(target)
+        if sources is not None:
+            q = q.filter(cls.source_id.in_([s.id for s in sources]))
+        return q
+
+    q = apply_filters(select(*columns))
+
+    # Window functions are evaluated after the WHERE clause, so filter on them in an outer query
+    if most_recent_beliefs_only or most_recent_events_only:
+        subq = q.subquery()
+        q = select(
+            subq.c.sensor_id,
+            subq.c.event_start,
+            subq.c.belief_horizon,
+            subq.c.source_id,
+            subq.c.cumulative_probability,
+            subq.c.event_value,
+        )
+        if most_recent_beliefs_only:
+            q = q.filter(subq.c.horizon_rank == 1)
+        if most_recent_events_only:
+            q = q.filter(subq.c.event_start == subq.c.most_recent_event_start)
+
+    if one_deterministic_belief_per_event and most_recent_beliefs_only:
+        q = _select_winning_beliefs_per_event(
+            q.subquery(), session, use_latest_version_per_event
+        )
+
+    df = pd.DataFrame(
+        session.execute(q).all(),
+        columns=[
+            "sensor_id",
+            "event_start",
+            "belief_horizon",
+            "source",
+            "cumulative_probability",
+            "event_value",
+        ],
+    )
+    if df.empty:
+        return empty_result
+
+    # Fill in sources
+    if sources is None:
+        sources = session.scalars(
+            select(DataSource).filter(DataSource.id.in_(df["source"].unique().tolist()))
+        ).all()
+    df["source"] = df["source"].map({source.id: source for source in sources})
+
+    return _split_beliefs_per_sensor(
+        df, sensors, beliefs_after=beliefs_after, beliefs_before=beliefs_before
+    )
+
+
+def supports_rolled_up_belief_search(
+    resolution: timedelta | str | None,
+    event_starts_after: datetime | None = None,
+    event_ends_before: datetime | None = None,
+    beliefs_after: datetime | None = None,
+    beliefs_before: datetime | None = None,
+    horizons_at_least: timedelta | None = None,
+    horizons_at_most: timedelta | None = None,
+    most_recent_beliefs_only: bool = False,
+    most_recent_events_only: bool = False,
+    most_recent_only: bool = False,
+) -> bool:
+    """Check whether the search criteria could be served by the belief rollups (see query_rolled_up_beliefs).
+
+    The rollups only hold the most recent beliefs about each event, so they cannot serve searches
+    for other beliefs, nor any belief timing filters. The search should also be bounded on both ends.
+    """
+    return (
+        resolution is not None
+        and most_recent_beliefs_only
+        and not most_recent_events_only
+        and not most_recent_only
+        and all(
+            pd.isnull(criterion)
+            for criterion in (
+                beliefs_after,
+                beliefs_before,
+                horizons_at_least,
+                horizons_at_most,
+            )
+        )
+        and not pd.isnull(event_starts_after)
+        and not pd.isnull(event_ends_before)
+    )
+
+
+def query_rolled_up_beliefs(
+    session: Session,
+    sensor: "ts.Sensor",
+    resolution: timedelta | str,
+    event_starts_after: datetime,
+    event_ends_before: datetime,
+    sources: list[DataSource] | None = None,
+    custom_filter_criteria: list[BinaryExpression] | None = None,
+) -> tb.BeliefsDataFrame | None:
+    """Search the most recent beliefs about events of a sensor, downsampled to the given resolution, using the belief rollups.
+
+    Mirrors searching the most recent beliefs and downsampling them with BeliefsDataFrame.resample_events,
+    which takes the mean over consecutive windows of events (starting at the first event),
+    followed by selecting the windows within the search window (as TimedBelief.search does).
+    The coarsest rollup is used whose buckets fit in the requested resolution and are aligned with the search window.
+
+    Returns None if the rollups cannot reproduce that result, in which case the raw beliefs should be searched, e.g.:
+    - for instantaneous sensors, or sensors with a knowledge horizon other than ex-ante or ex-post
+    - if the search window is not aligned with the UTC hours (or days)
+    - if events overlap with the start of the search window, or the first event does not start at a full hour (or day)
+    - if beliefs from more than one source are found, or probabilistic beliefs
+
+    :param custom_filter_criteria: source criteria on BeliefRollup.source_id or DataSource attributes
+    """
+    if sensor.event_resolution == timedelta(0) or sensor.knowledge_horizon_fnc not in (
+        ex_ante.__name__,
+        ex_post.__name__,
+    ):
+        return None
+    resolution = tb_utils.parse_timedelta_like(resolution)
+    event_starts_after = pd.Timestamp(event_starts_after)
+    event_ends_before = pd.Timestamp(event_ends_before)
+    if event_starts_after.tz is None or event_ends_before.tz is None:
+        return None
+
+    def fits(bucket_resolution: timedelta) -> bool:
+        epoch = pd.Timestamp(0, tz="UTC")
+        return (
+            bucket_resolution > sensor.event_resolution
+            and bucket_resolution % sensor.event_resolution == timedelta(0)
+            and resolution % bucket_resolution == timedelta(0)
+            and (event_starts_after - epoch) % bucket_resolution == timedelta(0)
+            and (event_ends_before - epoch) % bucket_resolution == timedelta(0)
+        )
+
+    bucket_resolution = next((r for r in ROLLUP_RESOLUTIONS if fits(r)), None)
+    if bucket_resolution is None:
+        return None
+
+    # Also select the preceding bucket, to find out about events overlapping with the start of the search window
+    q = (
+        select(BeliefRollup)
+        .join(DataSource, DataSource.id == BeliefRollup.source_id)
+        .filter(
+            BeliefRollup.sensor_id == sensor.id,
+            BeliefRollup.bucket_resolution == bucket_resolution,
+            BeliefRollup.bucket_start >= event_starts_after - bucket_resolution,
+            BeliefRollup.bucket_start < event_ends_before,
+        )
+        .order_by(BeliefRollup.bucket_start)
+    )
+    if sources is not None:
+        q = q.filter(BeliefRollup.source_id.in_([s.id for s in sources]))
+    if custom_filter_criteria is not None:
+        q = q.filter(*custom_filter_criteria)
+    rollups = []
+    for rollup in session.scalars(q).all():
+        if rollup.bucket_start >= event_starts_after:
+            rollups.append(rollup)
+        elif rollup.max_event_start + sensor.event_resolution > event_starts_after:
+            return None
+    if (
+        not rollups
+        or len({rollup.source_id for rollup in rollups}) > 1
+        or any(rollup.belief_count != rollup.event_count for rollup in rollups)
+        or rollups[0].min_event_start != rollups[0].bucket_start
+    ):
+        return None
+
+    # For ex-ante and ex-post knowledge horizons, the knowledge horizon is the same for all events
+    knowledge_horizon = sensor.knowledge_horizon(rollups[0].bucket_start)
+    source = session.get(DataSource, rollups[0].source_id)
+    bdf = tb.BeliefsDataFrame(
+        pd.DataFrame(
+            {
+                "event_start": [rollup.bucket_start for rollup in rollups],
+                "belief_time": [
+                    rollup.max_event_start_less_horizon - knowledge_horizon
+                    for rollup in rollups
+                ],
+                "source": source,
+                "cumulative_probability": [
+                    rollup.cumulative_probability_sum / rollup.event_count
+                    for rollup in rollups
+                ],
+                "event_value": [rollup.value_sum for rollup in rollups],
+                "value_count": [rollup.value_count for rollup in rollups],
+                "cumulative_probability_sum": [
+                    rollup.cumulative_probability_sum for rollup in rollups
+                ],
+                "event_count": [rollup.event_count for rollup in rollups],
+            }
+        ),
+        sensor=sensor,
+    )
+    bdf = bdf.convert_timezone_of_belief_timing_index(sensor.timezone)
+    bdf = bdf.convert_timezone_of_event_timing_index(sensor.timezone)
+
+    # Aggregate the buckets in the same windows as resample_events does, and take the means from the sums
+    bdf = downsample_beliefs_data_frame(
+        bdf,
+        resolution,
+        {
+            "event_value": "sum",
+            "value_count": "sum",
+            "cumulative_probability_sum": "sum",
+            "event_count": "sum",
+            "belief_time": "max",
+            "source": "first",
+            "cumulative_probability": "first",  # replaced below
+        },
+    )
+    # Windows without values (or without events) get NaN means, like resample_events gives
+    bdf["event_value"] = bdf["event_value"] / bdf["value_count"].replace(0, np.nan)
+    cumulative_probabilities = bdf["cumulative_probability_sum"] / bdf[
+        "event_count"
+    ].replace(0, np.nan)
+    bdf = bdf[["event_value"]]
+    bdf.index = pd.MultiIndex.from_arrays(
+        [
+            (
+                cumulative_probabilities.to_numpy()
+                if name == "cumulative_probability"
+                else bdf.index.get_level_values(name)
+            )
+            for name in bdf.index.names
+        ],
+        names=bdf.index.names,
+    )
+
+    # Select the windows within the search window, like TimedBelief.search does after resampling
+    bdf = bdf[bdf.event_starts >= event_starts_after]
+    return bdf[bdf.event_ends <= event_ends_before]
+
+
+def _select_winning_beliefs_per_event(
+    subq: Subquery,
+    session: Session,
+    use_latest_version_per_event: bool = True,
+) -> Select:
+    """Select only the beliefs that can win the selection of one deterministic belief per event.
+
+    Mirrors the pandas selection in TimedBelief.search (i.e. keep_latest_version followed by
+    _select_latest_version_and_belief_per_event), using window functions:
+
+    1. If use_latest_version_per_event, keep per event and source group (name, type and model)
+       only the beliefs from the source with the latest version (breaking ties by highest id).
+    2. Keep per event only the beliefs from the latest source version, with the most recent belief time
+       (for a given event, a smaller belief horizon means a more recent belief time).
+
+    We rank rather than pick one row per event, so all rows of a probabilistic belief survive,
+    and so do tied beliefs from different sources (to be resolved in pandas, like before).
+    The sources are joined in the query. Their versions are compared in Python, though:
+    the distinct versions are looked up in the (small) data source table, and passed to the query
+    as a CASE expression ranking them.
+    """
+    column_names = [
+        "sensor_id",
+        "event_start",
+        "belief_horizon",
+        "source_id",
+        "cumulative_probability",
+        "event_value",
+    ]
+
+    versions = {
+        version: Version(version if version else "0.0.0")
+        for version in session.scalars(select(DataSource.version).distinct())
+    }
+    version_ranks = {
+        version: rank
+        for rank, version in enumerate(
+            sorted(set(versions.values()) | {Version("0.0.0")})
+        )
+    }
+    whens = {
+        version: version_ranks[parsed_version]
+        for version, parsed_version in versions.items()
+        if version is not None
+    }
+    default_rank = version_ranks[Version("0.0.0")]
+    version_rank = (
+        case(whens, value=DataSource.version, else_=default_rank)
+        if whens
+        else literal(default_rank)
+    )
+
+    columns = [subq.c[name] for name in column_names] + [
+        version_rank.label("version_rank")
+    ]
+    if use_latest_version_per_event:
+        # All rows of the winning source tie for the first rank
+        columns.append(
+            func.rank()
+            .over(
+                partition_by=(
+                    subq.c.sensor_id,
+                    subq.c.event_start,
+                    DataSource.name,
+                    DataSource.type,
+                    DataSource.model,
+                ),
+                order_by=(version_rank.desc(), subq.c.source_id.desc()),
+            )
+            .label("source_rank")
+        )
+    ranked = (
+        select(*columns)
+        .select_from(subq)
+        .join(DataSource, DataSource.id == subq.c.source_id)
+        .subquery()
+    )
+    q = select(*[ranked.c[name] for name in column_names], ranked.c.version_rank)
+    if use_latest_version_per_event:
+        q = q.filter(ranked.c.source_rank == 1)
+    subq = q.subquery()
+
+    ranked = select(
+        *[subq.c[name] for name in column_names],
+        func.rank()
+        .over(
+            partition_by=(subq.c.sensor_id, subq.c.event_start),
+            order_by=(subq.c.version_rank.desc(), subq.c.belief_horizon),
+        )
+        .label("belief_rank"),
+    ).subquery()
+    return select(*[ranked.c[name] for name in column_names]).filter(
+        ranked.c.belief_rank == 1
+    )
+
+
+def _timing_criteria_per_sensor_group(
+    cls: "Type[ts.TimedBelief]",
+    sensors: list["ts.Sensor"],
+    event_ends_after: datetime | None = None,
+    event_starts_before: datetime | None = None,
+    beliefs_after: datetime | None = None,
+    beliefs_before: datetime | None = None,
+) -> list[BinaryExpression]:
+    """Build the event and rough belief timing filters, for each group of sensors sharing
+    the properties that determine them (event resolution and knowledge horizon bounds).
+    """
+    sensor_groups: dict[tuple, list[int]] = {}
+    for sensor in sensors:
+        knowledge_horizon_bounds = sensor_utils.eval_verified_knowledge_horizon_fnc(
+            sensor.knowledge_horizon_fnc,
+            sensor.knowledge_horizon_par,
+            event_resolution=sensor.event_resolution,
+            get_bounds=True,
+        )
+        sensor_groups.setdefault(
+            (sensor.event_resolution, *knowledge_horizon_bounds), []
+        ).append(sensor.id)
+
+    group_criteria = []
+    for (
+        event_resolution,
+        knowledge_horizon_min,
+        knowledge_horizon_max,
+    ), sensor_ids in sensor_groups.items():
+        criteria = [cls.sensor_id.in_(sensor_ids)]
+        if not pd.isnull(event_ends_after):
+            if event_resolution == timedelta(0):
+                criteria.append(cls.event_start >= event_ends_after)
+            else:
+                criteria.append(cls.event_start > event_ends_after - event_resolution)
+        if not pd.isnull(event_starts_before):
+            if event_resolution == timedelta(0):
+                criteria.append(cls.event_start <= event_starts_before)
+            else:
+                criteria.append(cls.event_start < event_starts_before)
+        if not pd.isnull(beliefs_after) and belief_utils.extreme_timedeltas_not_equal(
+            knowledge_horizon_min, timedelta.min
+        ):
+            criteria.append(
+                cls.event_start - cls.belief_horizon
+                >= beliefs_after + knowledge_horizon_min
+            )
+        if not pd.isnull(beliefs_before) and belief_utils.extreme_timedeltas_not_equal(
+            knowledge_horizon_max, timedelta.max
+        ):
+            criteria.append(
+                cls.event_start - cls.belief_horizon
+                <= beliefs_before + knowledge_horizon_max
+            )
+        group_criteria.append(and_(*criteria))
+
+    return group_criteria
+
+
+def _split_beliefs_per_sensor(
+    df: pd.DataFrame,
+    sensors: list["ts.Sensor"],
+    beliefs_after: datetime | None = None,
+    beliefs_before: datetime | None = None,
+) -> dict["ts.Sensor", tb.BeliefsDataFrame]:
+    """Split the query result into a BeliefsDataFrame per sensor, finishing each like search_session does."""
+    bdf_dict = {}
+    frames_per_sensor_id = {
+        sensor_id: frame.drop(columns="sensor_id")
+        for sensor_id, frame in df.groupby("sensor_id", sort=False)
+    }
+    for sensor in sensors:
+        frame = frames_per_sensor_id.get(sensor.id)
+        if frame is None:
+            bdf_dict[sensor] = tb.BeliefsDataFrame(sensor=sensor)
+            continue
+        bdf = tb.BeliefsDataFrame(frame.reset_index(drop=True), sensor=sensor)
+        bdf = bdf.convert_index_from_belief_horizon_to_time()
+
+        # Actually filter by belief time
+        if beliefs_after is not None:
+            bdf = bdf[bdf.index.get_level_values("belief_time") >= beliefs_after]
+        if beliefs_before is not None:
+            bdf = bdf[bdf.index.get_level_values("belief_time") <= beliefs_before]
+
+        # Convert timezone of beliefs and events to sensor timezone
+        bdf = bdf.convert_timezone_of_belief_timing_index(sensor.timezone)
+        bdf = bdf.convert_timezone_of_event_timing_index(sensor.timezone)
+        bdf_dict[sensor] = bdf
+    return bdf_dict
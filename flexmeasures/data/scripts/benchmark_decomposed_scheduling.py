@@ -0,0 +1,111 @@
+"""Benchmark scheduling independent groups of devices separately, on synthetic problems (no database needed).
+
+Usage:
+
+    python flexmeasures/data/scripts/benchmark_decomposed_scheduling.py
+
+Each problem consists of a number of sites behind one EMS, each with one battery
+and its own energy commitment (and no shared site capacity), so the devices can be scheduled independently.
+Compares solving the problem as a whole with solving the problem per site (see FLEXMEASURES_LP_DECOMPOSE).
+"""
+
+from __future__ import annotations
+
+import time
+from datetime import timedelta
+from statistics import median
+
+import numpy as np
+import pandas as pd
+from flask import Flask
+
+from flexmeasures.data.models.planning import FlowCommitment
+from flexmeasures.data.models.planning.linear_optimization import (
+    decomposed_device_scheduler,
+    device_scheduler,
+)
+from flexmeasures.data.models.planning.utils import initialize_index
+from flexmeasures.utils.config_defaults import Config
+
+SITES = [1, 10, 50]
+REPS = 3
+
+
+def make_problem(n_sites: int, seed: int = 0) -> dict:
+    """Make a day-ahead problem with 15-minute resolution, for one battery per site."""
+    index = initialize_index(
+        start=pd.Timestamp("2025-06-01T00:00+02"),
+        end=pd.Timestamp("2025-06-02T00:00+02"),
+        resolution=timedelta(minutes=15),
+    )
+    rng = np.random.default_rng(seed)
+    device_constraints = [
+        pd.DataFrame(
+            {
+                "min": 0,
+                "max": 4,
+                "equals": np.nan,
+                "derivative min": -1,
+                "derivative max": 1,
+                "derivative equals": np.nan,
+                "efficiency": 0.999,
+            },
+            index=index,
+        )
+        for _ in range(n_sites)
+    ]
+    ems_constraints = pd.DataFrame(
+        {"derivative min": np.nan, "derivative max": np.nan}, index=index
+    )
+    commitments = []
+    for d in range(n_sites):
+        prices = pd.Series(rng.uniform(0, 100, len(index)), index)
+        commitments.append(
+            FlowCommitment(
+                name=f"site {d}",
+                index=index,
+                quantity=0,
+                upwards_deviation_price=prices,
+                downwards_deviation_price=prices * 0.9,
+                device=pd.Series(d, index=index),
+            )
+        )
+    return dict(
+        device_constraints=device_constraints,
+        ems_constraints=ems_constraints,
+        commitments=commitments,
+        initial_stock=[2] * n_sites,
+        stock_groups={d: [d] for d in range(n_sites)},
+    )
+
+
+def timeit(label: str, fn) -> float:
+    times = []
+    result = None
+    for _ in range(REPS):
+        t0 = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - t0)
+    print("{:<60} {:>10.1f} ms".format(label, median(times) * 1000))
+    return result
+
+
+def main():
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    with app.app_context():
+        for n_sites in SITES:
+            print("--- {} sites ---".format(n_sites))
+            problem = make_problem(n_sites)
+            _, costs, _, _ = timeit(
+                "as a whole", lambda problem=problem: device_scheduler(**problem)
+            )
+            _, decomposed_costs, _, _ = timeit(
+                "per site",
+                lambda problem=problem: decomposed_device_scheduler(**problem),
+            )
+            assert np.isclose(costs, decomposed_costs)
+
+
+if __name__ == "__main__":
+    main()
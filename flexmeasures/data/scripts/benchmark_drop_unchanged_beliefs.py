@@ -0,0 +1,153 @@
+"""Benchmark dropping unchanged beliefs on synthetic data (no database needed).
+
+Usage:
+
+    python flexmeasures/data/scripts/benchmark_drop_unchanged_beliefs.py
+
+Compares the vectorized comparison of candidate beliefs against the beliefs already stored,
+with a verbatim copy of the previous implementation, which compared each belief separately.
+The previous implementation scales quadratically, so it is only timed for the smaller sizes.
+"""
+
+from __future__ import annotations
+
+import time
+from datetime import timedelta
+from statistics import median
+
+import numpy as np
+import pandas as pd
+import timely_beliefs as tb
+
+from flexmeasures.data.models.data_sources import DataSource
+from flexmeasures.data.services.time_series import (
+    _drop_unchanged_beliefs_compared_to_db,
+)
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+MAX_SIZE_PER_BELIEF = 1_000
+REPS = 3
+
+
+def make_bdf(
+    n_rows: int,
+    sources: list[DataSource],
+    belief_time_offset: timedelta = timedelta(0),
+    cps: tuple = (0.5,),
+    seed: int = 0,
+) -> tb.BeliefsDataFrame:
+    """Make beliefs about consecutive events, with few distinct values, so that many are unchanged."""
+    sensor = tb.Sensor("bench sensor", event_resolution=timedelta(minutes=15))
+    n_events = max(1, n_rows // (len(sources) * len(cps)))
+    event_starts = pd.date_range("2025-01-01", periods=n_events, freq="15min", tz="UTC")
+    rng = np.random.default_rng(seed)
+    index = pd.MultiIndex.from_product(
+        [event_starts, sources, cps],
+        names=["event_start", "source", "cumulative_probability"],
+    ).to_frame(index=False)
+    index["belief_time"] = index["event_start"] - timedelta(days=1) + belief_time_offset
+    index["event_value"] = rng.integers(0, 4, len(index)).astype(float)
+    return tb.BeliefsDataFrame(index, sensor=sensor)
+
+
+def timeit(label: str, fn) -> None:
+    times = []
+    for _ in range(REPS):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    print("{:<60} {:>10.1f} ms".format(label, median(times) * 1000))
+
+
+def drop_unchanged_per_belief(
+    bdf: tb.BeliefsDataFrame, bdf_db: tb.BeliefsDataFrame
+) -> tb.BeliefsDataFrame:
+    """Previous implementation (from drop_unchanged_beliefs)."""
+    return bdf.groupby(
+        level=["event_start", "belief_time", "source"],
+        group_keys=False,
+    ).apply(_drop_unchanged_belief_compared_to_db, bdf_db=bdf_db)
+
+
+def _drop_unchanged_belief_compared_to_db(
+    bdf: tb.BeliefsDataFrame,
+    bdf_db: tb.BeliefsDataFrame,
+) -> tb.BeliefsDataFrame:
+    """Previous implementation (from _drop_unchanged_beliefs_compared_to_db)."""
+    source = bdf.lineage.sources[0]
+    event_start = bdf.event_starts[0]
+    belief_time = bdf.lineage.belief_times[0]
+    bdf_db_from_source = bdf_db[
+        (bdf_db.sources.map(lambda s: s.id) == source.id)
+        & (bdf_db.event_starts == event_start)
+    ]
+    if bdf_db_from_source.empty:
+        return bdf
+    most_recent_bt = bdf_db_from_source.belief_times[
+        bdf_db_from_source.belief_times <= belief_time
+    ].max()
+    if pd.isna(most_recent_bt):
+        return bdf
+    previous_most_recent_beliefs = bdf_db_from_source[
+        bdf_db_from_source.belief_times == most_recent_bt
+    ]
+    a_df = bdf.reset_index()
+    a_df["source_id"] = a_df["source"].map(lambda s: s.id)
+    b_df = previous_most_recent_beliefs.reset_index()
+    b_df["source_id"] = b_df["source"].map(lambda s: s.id)
+
+    compare_fields = [
+        "event_start",
+        "source_id",
+        "cumulative_probability",
+        "event_value",
+    ]
+    a = a_df.set_index(compare_fields)
+    b = b_df.set_index(compare_fields)
+    dropped = a.drop(b.index, errors="ignore", axis=0)
+
+    c = dropped.reset_index().set_index(["event_start", "source_id"])
+    d = a_df.set_index(["event_start", "source_id"])
+    bdf = d[d.index.isin(c.index)]
+
+    bdf = (
+        bdf.reset_index()
+        .drop(columns=["source_id"], errors="ignore")
+        .set_index(["event_start", "belief_time", "source", "cumulative_probability"])
+    )
+    return bdf
+
+
+def main():
+    sources = [
+        DataSource(id=1, name="s1", model="model 1", type="forecaster"),
+        DataSource(id=2, name="s2", model="model 2", type="scheduler"),
+    ]
+
+    for n_rows in SIZES:
+        print("--- {} rows ---".format(n_rows))
+        for label, cps in [
+            ("deterministic", (0.5,)),
+            ("probabilistic", (0.1587, 0.5, 0.8413)),
+        ]:
+            bdf_db = make_bdf(n_rows, sources, cps=cps, seed=0)
+            bdf = make_bdf(
+                n_rows, sources, belief_time_offset=timedelta(hours=1), cps=cps, seed=1
+            )
+            timeit(
+                "vectorized                    ({})".format(label),
+                lambda bdf=bdf, bdf_db=bdf_db: _drop_unchanged_beliefs_compared_to_db(
+                    bdf, bdf_db=bdf_db
+                ),
+            )
+            if n_rows <= MAX_SIZE_PER_BELIEF:
+                timeit(
+                    "per belief (previous)         ({})".format(label),
+                    lambda bdf=bdf, bdf_db=bdf_db: drop_unchanged_per_belief(
+                        bdf, bdf_db=bdf_db
+                    ),
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Maintenance of the monthly partitions of the timed_belief table.
+
+The timed_belief table is range-partitioned by event_start, with one partition per UTC month
+(named like timed_belief_y2026m01) and a default partition (timed_belief_default) for beliefs about events outside these months.
+Creating partitions ahead of time keeps new beliefs out of the default partition,
+and dropping (or detaching) old partitions removes old beliefs without long-running deletes.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+
+import pandas as pd
+from sqlalchemy import delete, text
+from sqlalchemy.orm import Session
+
+from flexmeasures.data.models.belief_rollups import BeliefRollup
+from flexmeasures.data.models.belief_summaries import DailyBeliefSummary
+
+
+PARTITIONED_TABLE = "timed_belief"
+DEFAULT_PARTITION = "timed_belief_default"
+BELIEF_COLUMNS = "sensor_id, source_id, event_start, belief_horizon, cumulative_probability, event_value"
+
+
+@dataclass(frozen=True)
+class BeliefPartition:
+    """A monthly partition of the timed_belief table, holding beliefs about events starting in [start, end)."""
+
+    name: str
+    start: pd.Timestamp
+    end: pd.Timestamp
+
+
+def partition_name(month_start: pd.Timestamp) -> str:
+    return f"{PARTITIONED_TABLE}_y{month_start.year:04d}m{month_start.month:02d}"
+
+
+def get_month_starts(start: datetime, end: datetime) -> list[pd.Timestamp]:
+    """Return the starts of the UTC months overlapping with [start, end)."""
+    start = pd.Timestamp(start).tz_convert("UTC")
+    first_month_start = start.replace(
+        day=1, hour=0, minute=0, second=0, microsecond=0, nanosecond=0
+    )
+    return list(
+        pd.date_range(
+            first_month_start,
+            pd.Timestamp(end).tz_convert("UTC"),
+            freq="MS",
+            inclusive="left",
+        )
+    )
+
+
+def get_belief_partitions(session: Session) -> list[BeliefPartition]:
+    """List the monthly partitions of the timed_belief table, in chronological order (leaving out the default partition)."""
+    rows = session.execute(
+        text(
+            """
+            SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = CAST(:table AS regclass)
+            """
+        ),
+        dict(table=PARTITIONED_TABLE),
+    ).all()
+    partitions = []
+    for name, bound in rows:
+        if bound == "DEFAULT":
+            continue
+        # e.g. FOR VALUES FROM ('2026-01-01 00:00:00+00') TO ('2026-02-01 00:00:00+00')
+        start, end = bound.split("'")[1::2]
+        partitions.append(
+            BeliefPartition(
+                name=name,
+                start=pd.Timestamp(start).tz_convert("UTC"),
+                end=pd.Timestamp(end).tz_convert("UTC"),
+            )
+        )
+    return sorted(partitions, key=lambda partition: partition.start)
+
+
+def create_belief_partitions(
+    session: Session, start: datetime, end: datetime
+) -> list[BeliefPartition]:
+    """Create the missing monthly partitions of the timed_belief table for events starting in [start, end).
+
+    Beliefs about events in a new partition's month that were stored in the default partition are moved into the new partition.
+    Moving them directly between the partitions does not fire the triggers maintaining the belief summaries and rollups,
+    which stay valid, because the beliefs themselves do not change.
+
+    :returns: the created partitions
+    """
+    existing_partitions = get_belief_partitions(session)
+    created_partitions = []
+    for month_start in get_month_starts(start, end):
+        partition = BeliefPartition(
+            name=partition_name(month_start),
+            start=month_start,
+            end=month_start + pd.offsets.MonthBegin(1),
+        )
+        if any(
+            p.start < partition.end and p.end > partition.start
+            for p in existing_partitions
+        ):
+            continue
+        bounds = (
+            f"FROM ('{partition.start.isoformat()}') TO ('{partition.end.isoformat()}')"
+        )
+        session.execute(
+            text(
+                f"CREATE TABLE {partition.name} (LIKE {PARTITIONED_TABLE} INCLUDING DEFAULTS)"
+            )
+        )
+        session.execute(
+            text(
+                f"""
+                WITH moved_beliefs AS (
+                    DELETE FROM {DEFAULT_PARTITION}
+                    WHERE event_start >= :start AND event_start < :end
+                    RETURNING {BELIEF_COLUMNS}
+                )
+                INSERT INTO {partition.name} ({BELIEF_COLUMNS})
+                SELECT {BELIEF_COLUMNS} FROM moved_beliefs
+                """
+            ),
+            dict(start=partition.start, end=partition.end),
+        )
+        session.execute(
+            text(
+                f"ALTER TABLE {PARTITIONED_TABLE} ATTACH PARTITION {partition.name} FOR VALUES {bounds}"
+            )
+        )
+        created_partitions.append(partition)
+    return created_partitions
+
+
+def drop_belief_partitions(
+    session: Session, before: datetime, detach_only: bool = False
+) -> list[BeliefPartition]:
+    """Drop the monthly partitions of the timed_belief table that only hold beliefs about events starting before the given datetime.
+
+    Unlike deleting beliefs, dropping a partition does not fire the triggers maintaining the belief summaries and rollups,
+    so the summaries and rollups of the dropped months are deleted, too.
+
+    :param detach_only: if True, detach the partitions rather than dropping them,
+                        which keeps their beliefs in a standalone table (e.g. for archiving)
+    :returns: the dropped (or detached) partitions
+    """
+    dropped_partitions = [
+        partition
+        for partition in get_belief_partitions(session)
+        if partition.end <= pd.Timestamp(before)
+    ]
+    for partition in dropped_partitions:
+        session.execute(
+            text(f"ALTER TABLE {PARTITIONED_TABLE} DETACH PARTITION {partition.name}")
+        )
+        if not detach_only:
+            session.execute(text(f"DROP TABLE {partition.name}"))
+        session.execute(
+            delete(DailyBeliefSummary).filter(
+                DailyBeliefSummary.day >= partition.start,
+                DailyBeliefSummary.day < partition.end,
+            )
+        )
+        session.execute(
+            delete(BeliefRollup).filter(
+                BeliefRollup.bucket_start >= partition.start,
+                BeliefRollup.bucket_start < partition.end,
+            )
+        )
+    return dropped_partitions
@@ -0,0 +1,256 @@
+"""
+Logic around serializing belief data to columnar formats (Apache Arrow IPC and Parquet).
+
+Columns are built from the numpy arrays underlying the beliefs frames, rather than from a record per belief,
+so (unlike JSON) the serialization cost hardly grows with the number of beliefs.
+Sensor and source IDs are dictionary-encoded, and lookup data (e.g. sensor and source metadata)
+is stored as JSON in the schema metadata.
+
+pyarrow is an optional dependency (pip install pyarrow): without it, these formats are not supported.
+"""
+
+from __future__ import annotations
+
+import io
+import json
+from typing import TYPE_CHECKING, Iterable, Iterator
+
+import numpy as np
+import pandas as pd
+
+from flexmeasures.utils.time_utils import truncated_integer_epochs
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+COLUMNAR_FORMATS = ("arrow", "parquet")
+COLUMNAR_MIMETYPES = dict(
+    arrow="application/vnd.apache.arrow.stream",
+    parquet="application/vnd.apache.parquet",
+)
+
+# Columns of chart data tables, matching the keys of the records in compressed chart data (see GenericAsset.search_beliefs)
+CHART_DATA_COLUMNS = ("ts", "sid", "val", "sf", "src", "bh", "bt")
+DICTIONARY_ENCODED_COLUMNS = ("sid", "src")
+
+
+def pyarrow_is_installed() -> bool:
+    try:
+        import pyarrow  # noqa F401
+    except ImportError:
+        return False
+    return True
+
+
+def chart_data_schema(metadata: dict | None = None) -> pa.Schema:
+    """Schema of chart data tables, before dictionary encoding (see write_table).
+
+    - ts: event start
+    - sid: sensor ID
+    - val: event value
+    - sf: scale factor
+    - src: source ID
+    - bh: belief horizon in ms
+    - bt: belief time (only set when not just the most recent beliefs are searched for)
+
+    :param metadata: lookup data, e.g. dict(sensors={...}, sources={...}), stored as JSON
+    """
+    import pyarrow as pa
+
+    return pa.schema(
+        [
+            ("ts", pa.timestamp("ms", tz="UTC")),
+            ("sid", pa.int32()),
+            ("val", pa.float64()),
+            ("sf", pa.float64()),
+            ("src", pa.int32()),
+            ("bh", pa.int64()),
+            ("bt", pa.timestamp("ms", tz="UTC")),
+        ],
+        metadata=(
+            {key: json.dumps(value) for key, value in metadata.items()}
+            if metadata
+            else None
+        ),
+    )
+
+
+def _epoch_ms_array(values: pd.Series, arrow_type: pa.DataType) -> pa.Array:
+    """Array of integer epoch milliseconds (truncated toward zero), with nulls for missing values."""
+    import pyarrow as pa
+
+    ns = values.to_numpy(
+        dtype=(
+            "timedelta64[ns]"
+            if pd.api.types.is_timedelta64_dtype(values.dtype)
+            else "datetime64[ns]"
+        )
+    ).view("int64")
+    return pa.array(
+        truncated_integer_epochs(ns, 10**6),
+        mask=values.isna().to_numpy(),
+        type=pa.int64(),
+    ).cast(arrow_type)
+
+
+def belief_columns(
+    df: pd.DataFrame,
+    sensor_id: int,
+    scale_factor: float = 1.0,
+) -> pa.RecordBatch:
+    """Build a record batch of chart data from a reset-index beliefs frame of a single sensor.
+
+    The frame should have event_start, event_value and source columns,
+    and optionally belief_horizon and belief_time columns.
+    """
+    import pyarrow as pa
+
+    n = len(df)
+    columns = dict(
+        ts=_epoch_ms_array(df["event_start"], pa.timestamp("ms", tz="UTC")),
+        sid=pa.array(np.full(n, sensor_id, dtype="int32")),
+        val=pa.array(
+            df["event_value"].to_numpy(dtype="float64", na_value=np.nan),
+            from_pandas=True,
+        ),
+        sf=pa.array(np.full(n, scale_factor, dtype="float64")),
+    )
+
+    # Source IDs, via the unique sources (rather than an attribute lookup per row)
+    source_codes, unique_sources = pd.factorize(df["source"])
+    unique_source_ids = np.array(
+        [getattr(source, "id", -1) for source in unique_sources] + [-1],
+        dtype="int32",
+    )
+    source_ids = unique_source_ids[source_codes]  # code -1 (no source) maps to -1
+    columns["src"] = pa.array(source_ids, mask=source_ids == -1)
+
+    columns["bh"] = (
+        _epoch_ms_array(df["belief_horizon"], pa.int64())
+        if "belief_horizon" in df.columns
+        else pa.nulls(n, pa.int64())
+    )
+    columns["bt"] = (
+        _epoch_ms_array(df["belief_time"], pa.timestamp("ms", tz="UTC"))
+        if "belief_time" in df.columns
+        else pa.nulls(n, pa.timestamp("ms", tz="UTC"))
+    )
+    return pa.RecordBatch.from_pydict(columns, schema=chart_data_schema())
+
+
+def belief_records_to_batch(records: list[dict]) -> pa.RecordBatch:
+    """Build a record batch of chart data from compressed chart data records (with ms epoch timestamps)."""
+    import pyarrow as pa
+
+    schema = chart_data_schema()
+    return pa.RecordBatch.from_pydict(
+        {
+            column: pa.array(
+                [record.get(column) for record in records],
+                type=(
+                    pa.int64()
+                    if pa.types.is_timestamp(schema.field(column).type)
+                    else schema.field(column).type
+                ),
+            ).cast(schema.field(column).type)
+            for column in CHART_DATA_COLUMNS
+        },
+        schema=schema,
+    )
+
+
+def make_chart_data_table(
+    batches: Iterable[pa.RecordBatch], sensors: dict, sources: dict
+) -> pa.Table:
+    """Combine record batches of chart data into a table, with the sensors and sources metadata as lookup data."""
+    import pyarrow as pa
+
+    return pa.Table.from_batches(
+        list(batches),
+        schema=chart_data_schema(dict(sensors=sensors, sources=sources)),
+    )
+
+
+def read_table_metadata(table: pa.Table) -> dict:
+    """Load the lookup data stored in the schema metadata of a table."""
+    return {
+        key.decode(): json.loads(value)
+        for key, value in (table.schema.metadata or {}).items()
+    }
+
+
+def _dictionary_encode(table: pa.Table) -> pa.Table:
+    """Dictionary-encode the sensor and source IDs, which are repeated for many rows."""
+    table = table.combine_chunks()
+    for column in DICTIONARY_ENCODED_COLUMNS:
+        if column in table.column_names:
+            i = table.schema.get_field_index(column)
+            table = table.set_column(i, column, table.column(i).dictionary_encode())
+    return table
+
+
+class _ChunkSink(io.RawIOBase):
+    """Writable file that hands out what was written to it so far, so the output can be streamed while it is written.
+
+    Unlike a BytesIO that is emptied along the way, it keeps track of the position in the whole output,
+    which writers use to compute offsets and padding.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: list[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        data = bytes(b)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_batches(
+    batches: Iterable[pa.RecordBatch],
+    schema: pa.Schema,
+    output_format: str,
+) -> Iterator[bytes]:
+    """Write record batches in the given columnar format, yielding the output written for each batch.
+
+    - arrow: an Arrow IPC stream, with a message per batch
+    - parquet: a Parquet file, with a row group per (non-empty) batch; it can only be read once complete
+    """
+    import pyarrow as pa
+
+    sink = _ChunkSink()
+    if output_format == "arrow":
+        writer = pa.ipc.new_stream(sink, schema)
+    elif output_format == "parquet":
+        import pyarrow.parquet as pq
+
+        writer = pq.ParquetWriter(sink, schema)
+    else:
+        raise ValueError(f"Unsupported columnar format: {output_format}")
+    with writer:
+        for batch in batches:
+            if batch.num_rows > 0 or output_format == "arrow":
+                writer.write_batch(batch)
+            yield sink.drain()
+    yield sink.drain()
+
+
+def write_table(table: pa.Table, output_format: str) -> bytes:
+    """Write a chart data table in the given columnar format, with dictionary-encoded sensor and source IDs."""
+    table = _dictionary_encode(table)
+    return b"".join(
+        stream_batches(table.to_batches(), table.schema, output_format=output_format)
+    )
@@ -7,19 +7,32 @@ from __future__ import annotations
 from io import BytesIO
 
 from flask import current_app
+import numpy as np
+import pandas as pd
+from redis.client import Pipeline
+from rq import Queue, SimpleWorker, get_current_job
+from rq.executions import Execution
 from rq.job import Job
 from rq.job import NoSuchJobError
+from rq.timeouts import JobTimeoutException
 import timely_beliefs as tb
 from werkzeug.datastructures import FileStorage
 
 from flexmeasures.data import db
 from flexmeasures.data.models.time_series import Sensor
 from flexmeasures.data.models.user import User
+from flexmeasures.data.services.time_series import drop_unchanged_beliefs
 from flexmeasures.data.utils import (
+    SAVE_TO_DB_SUCCESS,
+    SAVE_TO_DB_SUCCESS_BUT_NOTHING_NEW,
     SAVE_TO_DB_SUCCESS_WITH_CHANGES_STATUSES,
+    SAVE_TO_DB_SUCCESS_WITH_UNCHANGED_BELIEFS_SKIPPED,
     save_to_db,
 )
 
+# Statuses of ingestion jobs whose data was already saved in a batch, by job ID (see IngestionBatchWorker)
+_batched_job_statuses: dict[str, str] = {}
+
 
 def _get_ingestion_context(sensor_id: int, user_id: int) -> tuple[Sensor, User]:
     sensor = db.session.get(Sensor, sensor_id)
@@ -86,6 +99,7 @@ def add_beliefs_to_db_and_enqueue_forecasting_jobs(
     forecasting_jobs: list[Job] | None = None,
     forecasting_job_ids: list[str] | None = None,
     save_changed_beliefs_only: bool = True,
+    bulk_copy: bool | None = None,
 ) -> str:
     """Save sensor data to the database and optionally enqueue forecasting jobs.
 
@@ -101,8 +115,40 @@ def add_beliefs_to_db_and_enqueue_forecasting_jobs(
     :param forecasting_jobs:            Optional list of forecasting Jobs to enqueue after saving.
     :param forecasting_job_ids:         Optional list of forecasting Job ids to enqueue after saving.
     :param save_changed_beliefs_only:   If True, skip saving beliefs whose value hasn't changed.
+    :param bulk_copy:                   If True, stream the beliefs into the database with PostgreSQL's COPY command.
+                                        Defaults to the FLEXMEASURES_BULK_COPY_SENSOR_DATA_INGESTION setting.
     :returns:                           Status string as returned by ``save_to_db``.
     """
+    job = get_current_job()
+    if job is not None and job.id in _batched_job_statuses:
+        # The data was already saved, together with other jobs in the same batch
+        status = _batched_job_statuses.pop(job.id)
+        _enqueue_forecasting_jobs(status, forecasting_jobs, forecasting_job_ids)
+        return status
+
+    data = _load_sensor_data(
+        data, sensor_id, user_id, sensor_data, uploaded_files, upload_data
+    )
+    status = save_to_db(
+        data,
+        save_changed_beliefs_only=save_changed_beliefs_only,
+        bulk_copy=_use_bulk_copy(bulk_copy),
+    )
+    db.session.commit()
+
+    _enqueue_forecasting_jobs(status, forecasting_jobs, forecasting_job_ids)
+    return status
+
+
+def _load_sensor_data(
+    data: tb.BeliefsDataFrame | list[tb.BeliefsDataFrame] | None = None,
+    sensor_id: int | None = None,
+    user_id: int | None = None,
+    sensor_data: dict | None = None,
+    uploaded_files: list[dict] | None = None,
+    upload_data: dict | None = None,
+) -> tb.BeliefsDataFrame | list[tb.BeliefsDataFrame]:
+    """Load the data to be ingested (see add_beliefs_to_db_and_enqueue_forecasting_jobs)."""
     if sensor_data is not None:
         if sensor_id is None or user_id is None:
             raise ValueError("Expected sensor_id and user_id for raw sensor data.")
@@ -118,11 +164,21 @@ def add_beliefs_to_db_and_enqueue_forecasting_jobs(
         )
     if data is None:
         raise ValueError("Expected data, sensor_data, or uploaded_files.")
+    return data
 
-    status = save_to_db(data, save_changed_beliefs_only=save_changed_beliefs_only)
-    db.session.commit()
 
-    # Only enqueue forecasting jobs upon successfully saving new data
+def _use_bulk_copy(bulk_copy: bool | None) -> bool:
+    if bulk_copy is not None:
+        return bulk_copy
+    return current_app.config.get("FLEXMEASURES_BULK_COPY_SENSOR_DATA_INGESTION", False)
+
+
+def _enqueue_forecasting_jobs(
+    status: str,
+    forecasting_jobs: list[Job] | None = None,
+    forecasting_job_ids: list[str] | None = None,
+):
+    """Only enqueue forecasting jobs upon successfully saving new data."""
     if status in SAVE_TO_DB_SUCCESS_WITH_CHANGES_STATUSES:
         if forecasting_jobs is not None:
             for job in forecasting_jobs:
@@ -140,4 +196,276 @@ def add_beliefs_to_db_and_enqueue_forecasting_jobs(
                     continue
                 current_app.queues["forecasting"].enqueue_job(job)
 
-    return status
+
+def save_ingestion_batch(jobs: list[Job]) -> dict[str, str]:
+    """Save the data of a batch of ingestion jobs in a single transaction.
+
+    The beliefs of all jobs are merged per sensor, so that unchanged beliefs are looked up
+    in the database only once per sensor, rather than once per job.
+
+    Jobs whose data cannot be loaded are left out of the batch, as are all jobs for a sensor
+    whose jobs contain conflicting beliefs (same event, belief time and source, but a different value).
+    If saving the batch fails, the transaction is rolled back and no job is considered saved.
+    Either way, the jobs that were not saved can be run as usual, to report their own error.
+
+    :param jobs:    jobs calling add_beliefs_to_db_and_enqueue_forecasting_jobs
+    :returns:       the status (as returned by save_to_db) per saved job, by job ID
+    """
+    groups, loaded_job_ids = _load_batched_beliefs(jobs)
+
+    # Merge the beliefs per sensor, and drop unchanged beliefs
+    num_beliefs: dict[str, tuple[int, int]] = {
+        job_id: (0, 0) for job_id in loaded_job_ids
+    }
+    new_bdfs: dict[bool, list[tb.BeliefsDataFrame]] = {}
+    for (_, save_changed_beliefs_only, bulk_copy), job_bdfs in groups.items():
+        merged = _merge_batched_beliefs(job_bdfs, save_changed_beliefs_only)
+        if merged is None:
+            for job_id, _ in job_bdfs:
+                num_beliefs.pop(job_id, None)
+            continue
+        new_bdf, num_beliefs_per_job = merged
+        new_bdfs.setdefault(bulk_copy, []).append(new_bdf)
+        for job_id, (n, n_new) in num_beliefs_per_job.items():
+            if job_id in num_beliefs:
+                num_beliefs[job_id] = (
+                    num_beliefs[job_id][0] + n,
+                    num_beliefs[job_id][1] + n_new,
+                )
+
+    # Save the new beliefs of all jobs in one transaction
+    try:
+        for bulk_copy, bdfs in new_bdfs.items():
+            save_to_db(bdfs, save_changed_beliefs_only=False, bulk_copy=bulk_copy)
+        db.session.commit()
+    except Exception as exc:
+        current_app.logger.warning(
+            f"Failed to save ingestion batch of {len(jobs)} jobs, so the jobs will be run separately: {exc}"
+        )
+        db.session.rollback()
+        return {}
+
+    statuses = {}
+    for job_id, (n, n_new) in num_beliefs.items():
+        if n_new == 0:
+            statuses[job_id] = SAVE_TO_DB_SUCCESS_BUT_NOTHING_NEW
+        elif n_new < n:
+            statuses[job_id] = SAVE_TO_DB_SUCCESS_WITH_UNCHANGED_BELIEFS_SKIPPED
+        else:
+            statuses[job_id] = SAVE_TO_DB_SUCCESS
+    return statuses
+
+
+def _load_batched_beliefs(
+    jobs: list[Job],
+) -> tuple[dict[tuple, list[tuple[str, tb.BeliefsDataFrame]]], list[str]]:
+    """Load the beliefs of each job, and group them by sensor and by how they are to be saved.
+
+    :returns: the beliefs per group, and the IDs of the jobs whose data could be loaded
+    """
+    groups: dict[tuple, list[tuple[str, tb.BeliefsDataFrame]]] = {}
+    loaded_job_ids = []
+    for job in jobs:
+        kwargs = job.kwargs
+        try:
+            data = _load_sensor_data(
+                **{
+                    key: kwargs.get(key)
+                    for key in (
+                        "data",
+                        "sensor_id",
+                        "user_id",
+                        "sensor_data",
+                        "uploaded_files",
+                        "upload_data",
+                    )
+                }
+            )
+        except Exception as exc:
+            current_app.logger.info(
+                f"Leaving job {job.id} out of the ingestion batch: {exc}"
+            )
+            continue
+        loaded_job_ids.append(job.id)
+        for bdf in data if isinstance(data, list) else [data]:
+            # Like save_to_db, don't save NaN event values
+            bdf = bdf.dropna(subset=["event_value"])
+            if bdf.empty:
+                continue
+            bdf = bdf.convert_index_from_belief_horizon_to_time().reorder_levels(
+                ["event_start", "belief_time", "source", "cumulative_probability"]
+            )
+            key = (
+                bdf.sensor.id,
+                kwargs.get("save_changed_beliefs_only", True),
+                _use_bulk_copy(kwargs.get("bulk_copy")),
+            )
+            groups.setdefault(key, []).append((job.id, bdf))
+    return groups, loaded_job_ids
+
+
+def _merge_batched_beliefs(
+    job_bdfs: list[tuple[str, tb.BeliefsDataFrame]],
+    save_changed_beliefs_only: bool,
+) -> tuple[tb.BeliefsDataFrame, dict[str, tuple[int, int]]] | None:
+    """Merge the beliefs of several jobs about the same sensor, and drop unchanged beliefs.
+
+    Like when the jobs are run one by one, the beliefs of each job are compared to the beliefs
+    stored before it, which include the new beliefs of earlier jobs in the batch (in queue order).
+    The stored beliefs are looked up in the database only once, though.
+
+    :returns:   the new beliefs, and per job, its number of beliefs and its number of new beliefs,
+                or None if the jobs contain conflicting beliefs
+    """
+    bdf = pd.concat([bdf for _, bdf in job_bdfs])
+
+    # Identical beliefs posted by several jobs are attributed to the first job
+    duplicated = bdf.index.duplicated(keep="first")
+    if duplicated.any() and not np.array_equal(
+        bdf["event_value"][duplicated].to_numpy(),
+        bdf[~duplicated]["event_value"].reindex(bdf.index[duplicated]).to_numpy(),
+    ):
+        current_app.logger.info(
+            "Leaving jobs %s out of the ingestion batch, due to conflicting beliefs."
+            % [job_id for job_id, _ in job_bdfs]
+        )
+        return None
+
+    if save_changed_beliefs_only:
+        bdf_db = job_bdfs[0][1].sensor.search_beliefs(
+            event_starts_after=bdf.event_starts.min(),
+            event_ends_before=bdf.event_ends.max(),
+            most_recent_beliefs_only=False,  # all beliefs
+        )
+        new_job_bdfs = []
+        for _, job_bdf in job_bdfs:
+            new_job_bdf = drop_unchanged_beliefs(job_bdf, bdf_db=bdf_db)
+            # Work around bug in which groupby still introduces an index level (see save_to_db)
+            if None in new_job_bdf.index.names:
+                new_job_bdf.index = new_job_bdf.index.droplevel(None)
+            new_job_bdf = new_job_bdf.reorder_levels(job_bdf.index.names)
+            new_job_bdfs.append(new_job_bdf)
+            # Later jobs compare their beliefs to the new beliefs of this job, too
+            bdf_db = pd.concat([bdf_db, new_job_bdf.reorder_levels(bdf_db.index.names)])
+    else:
+        new_job_bdfs = []
+        offset = 0
+        for _, job_bdf in job_bdfs:
+            new_job_bdfs.append(job_bdf[~duplicated[offset : offset + len(job_bdf)]])
+            offset += len(job_bdf)
+
+    num_beliefs_per_job: dict[str, tuple[int, int]] = {}
+    for (job_id, job_bdf), new_job_bdf in zip(job_bdfs, new_job_bdfs):
+        n, n_new = num_beliefs_per_job.get(job_id, (0, 0))
+        num_beliefs_per_job[job_id] = (n + len(job_bdf), n_new + len(new_job_bdf))
+    return pd.concat(new_job_bdfs), num_beliefs_per_job
+
+
+class IngestionBatchWorker(SimpleWorker):
+    """Worker that saves the data of pending ingestion jobs in batches.
+
+    Upon picking up an ingestion job, the worker also claims up to batch_size - 1 further
+    ingestion jobs waiting in the same queue, and saves the data of all of them in one transaction
+    (see save_ingestion_batch). Then it runs each job as usual, which reports its own status
+    (and enqueues its own forecasting jobs), without saving its data again.
+    Other jobs are run as usual, too.
+
+    Like the SimpleWorker, it runs jobs in its own process, rather than in a forked work horse.
+    While the batch is being saved, its jobs are registered as started, and the batch is saved
+    within the timeout of the job that the worker picked up.
+    """
+
+    def __init__(self, *args, batch_size: int = 100, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.batch_size = batch_size
+
+    def execute_job(self, job: Job, queue: Queue):
+        if job.func_name != _INGESTION_FUNC_NAME:
+            return super().execute_job(job, queue)
+        executions = {job.id: self._register_as_started(job)}
+        executions.update(self._claim_ingestion_jobs(queue, self.batch_size - 1))
+        jobs = [job] + [
+            claimed_job
+            for claimed_job, _ in executions.values()
+            if claimed_job.id != job.id
+        ]
+        _batched_job_statuses.update(self._save_ingestion_batch(jobs))
+        try:
+            for batched_job in jobs:
+                # Make way for the execution that the job gets when it is run as usual
+                _, execution = executions.pop(batched_job.id)
+                with self.connection.pipeline() as pipeline:
+                    execution.delete(batched_job, pipeline=pipeline)
+                    pipeline.execute()
+                super().execute_job(batched_job, queue)
+        finally:
+            for batched_job in jobs:
+                _batched_job_statuses.pop(batched_job.id, None)
+
+    def _save_ingestion_batch(self, jobs: list[Job]) -> dict[str, str]:
+        """Save the batch within the timeout of its first job, like the job itself would be saved."""
+        job = jobs[0]
+        timeout = job.timeout or self.queue_class.DEFAULT_TIMEOUT
+        self.heartbeat(self.get_heartbeat_ttl(job))
+        try:
+            with self.death_penalty_class(timeout, JobTimeoutException, job_id=job.id):
+                return save_ingestion_batch(jobs)
+        except JobTimeoutException:
+            current_app.logger.warning(
+                f"Saving ingestion batch of {len(jobs)} jobs timed out, so the jobs will be run separately."
+            )
+            db.session.rollback()
+            return {}
+
+    def _register_as_started(
+        self, job: Job, pipeline: Pipeline | None = None
+    ) -> tuple[Job, Execution]:
+        """Register the job in the queue's StartedJobRegistry, for as long as the batch is being saved.
+
+        Should the worker die in the meantime, the registry's cleanup marks the job as failed,
+        rather than it getting lost.
+        """
+        if pipeline is not None:
+            return job, Execution.create(
+                job, self.get_heartbeat_ttl(job), pipeline=pipeline
+            )
+        with self.connection.pipeline() as pipeline:
+            execution = Execution.create(
+                job, self.get_heartbeat_ttl(job), pipeline=pipeline
+            )
+            pipeline.execute()
+        return job, execution
+
+    def _claim_ingestion_jobs(
+        self, queue: Queue, max_jobs: int
+    ) -> dict[str, tuple[Job, Execution]]:
+        """Take up to max_jobs ingestion jobs from the front of the queue.
+
+        Removing a job from the queue succeeds for only one worker, which thereby claims the job.
+        Claimed jobs are registered as started in the same transaction (see _register_as_started).
+
+        :returns: the claimed jobs and their executions, by job ID
+        """
+        if max_jobs <= 0:
+            return {}
+        job_ids = queue.get_job_ids(0, max_jobs - 1)
+        claimed_jobs = {}
+        for job in Job.fetch_many(job_ids, connection=self.connection):
+            if job is None or job.func_name != _INGESTION_FUNC_NAME:
+                continue
+            with self.connection.pipeline() as pipeline:
+                pipeline.lrem(queue.key, 1, job.id)
+                _, execution = self._register_as_started(job, pipeline=pipeline)
+                num_removed = pipeline.execute()[0]
+                if not num_removed:
+                    # Another worker claimed the job
+                    execution.delete(job, pipeline=pipeline)
+                    pipeline.execute()
+                    continue
+            claimed_jobs[job.id] = (job, execution)
+        return claimed_jobs
+
+
+_INGESTION_FUNC_NAME = (
+    f"{__name__}.{add_beliefs_to_db_and_enqueue_forecasting_jobs.__name__}"
+)
@@ -23,7 +23,7 @@ from rq.exceptions import InvalidJobOperation
 from rq.job import Job
 import timely_beliefs as tb
 import pandas as pd
-from sqlalchemy import select
+from sqlalchemy import inspect as sa_inspect, select
 
 from flexmeasures.data import db
 from flexmeasures.data.models.planning import Scheduler, SchedulerOutputType
@@ -32,9 +32,18 @@ from flexmeasures.data.models.planning.storage import (
     SCHEDULING_RESULT_KEY,
 )
 from flexmeasures.data.models.planning.exceptions import InfeasibleProblemException
+from flexmeasures.data.models.planning.linear_optimization import (
+    decompose_device_scheduler_problem,
+    merge_device_scheduler_solutions,
+    solve_device_scheduler_problems,
+)
+from flexmeasures.data.models.planning.utils import (
+    prefetch_beliefs,
+    use_prefetched_beliefs,
+)
 from flexmeasures.data.models.planning.process import ProcessScheduler
 from flexmeasures.data.services.scheduling_result import SchedulingJobResult
-from flexmeasures.data.models.time_series import Sensor, TimedBelief
+from flexmeasures.data.models.time_series import Sensor
 from flexmeasures.data.models.generic_assets import GenericAsset as Asset
 from flexmeasures.data.models.data_sources import DataSource
 from flexmeasures.data.schemas.scheduling import MultiSensorFlexModelSchema
@@ -239,28 +248,7 @@ def create_scheduling_job(
     :returns:                       The job.
 
     """
-    # We first create a scheduler and check if deserializing works, so the flex config is checked
-    # and errors are raised before the job is enqueued (so users get a meaningful response right away).
-    # Note: We should put only serializable scheduler_kwargs into the job!
-
-    if scheduler_specs:
-        scheduler_class: Type[Scheduler] = load_custom_scheduler(scheduler_specs)
-    else:
-        scheduler_class: Type[Scheduler] = find_scheduler_class(asset_or_sensor)
-
-    scheduler = get_scheduler_instance(
-        scheduler_class=scheduler_class,
-        asset_or_sensor=asset_or_sensor,
-        scheduler_params=scheduler_kwargs,
-    )
-    scheduler.collect_flex_config()
-    scheduler_kwargs["flex_context"] = scheduler.flex_context
-    scheduler_kwargs["flex_model"] = scheduler.flex_model
-    scheduler.deserialize_config()
-
-    # Set consumption_is_positive on output sensors now (at trigger time) so that any
-    # attribute conflict raises an error immediately, before the job is enqueued.
-    _set_flex_model_output_sensors_consumption_is_positive(scheduler.flex_model)
+    _check_flex_config(asset_or_sensor, scheduler_specs, scheduler_kwargs)
 
     asset_or_sensor = get_asset_or_sensor_ref(asset_or_sensor)
     job = Job.create(
@@ -329,6 +317,36 @@ def create_scheduling_job(
     return job
 
 
+def _check_flex_config(
+    asset_or_sensor: Asset | Sensor,
+    scheduler_specs: dict | None,
+    scheduler_kwargs: dict,
+):
+    """Collect the flex config into the scheduler kwargs, and check it before a job is created."""
+    # We first create a scheduler and check if deserializing works, so the flex config is checked
+    # and errors are raised before the job is enqueued (so users get a meaningful response right away).
+    # Note: We should put only serializable scheduler_kwargs into the job!
+
+    if scheduler_specs:
+        scheduler_class: Type[Scheduler] = load_custom_scheduler(scheduler_specs)
+    else:
+        scheduler_class: Type[Scheduler] = find_scheduler_class(asset_or_sensor)
+
+    scheduler = get_scheduler_instance(
+        scheduler_class=scheduler_class,
+        asset_or_sensor=asset_or_sensor,
+        scheduler_params=scheduler_kwargs,
+    )
+    scheduler.collect_flex_config()
+    scheduler_kwargs["flex_context"] = scheduler.flex_context
+    scheduler_kwargs["flex_model"] = scheduler.flex_model
+    scheduler.deserialize_config()
+
+    # Set consumption_is_positive on output sensors now (at trigger time) so that any
+    # attribute conflict raises an error immediately, before the job is enqueued.
+    _set_flex_model_output_sensors_consumption_is_positive(scheduler.flex_model)
+
+
 def cb_done_sequential_scheduling_job(jobs_ids: list[str]):
     """
     TODO: maybe check if any of the subjobs used a fallback scheduler or accrued a relaxation penalty.
@@ -530,6 +548,87 @@ def create_simultaneous_scheduling_job(
     return job
 
 
+def create_batch_scheduling_job(
+    scheduling_requests: list[dict],
+    job_id: str | None = None,
+    enqueue: bool = True,
+    belief_time: datetime | None = None,
+    processes: int | None = None,
+    depends_on: Job | list[Job] | None = None,
+) -> Job:
+    """Create a single job to compute the schedules of many assets (or sensors), for example, many sites.
+
+    Each scheduling request describes an independent scheduling problem, with the same arguments as
+    create_scheduling_job takes (asset_or_sensor, start, end, flex_model, flex_context, etc.).
+    The job is run in make_batch_schedule, which shares the work that the separate jobs would repeat.
+
+    :param scheduling_requests: Scheduling arguments per asset or sensor, each including its asset_or_sensor.
+    :param job_id:              Optionally, set a job id explicitly.
+    :param enqueue:             If True, enqueues the job in case it is new.
+    :param belief_time:         Optionally, set the belief time of all schedules (by default, the time the job runs).
+    :param processes:           Number of processes to solve the scheduling problems with
+                                (by default, the FLEXMEASURES_BATCH_SCHEDULING_PROCESSES setting).
+    :returns:                   The job.
+    """
+    job_requests = []
+    for scheduling_request in scheduling_requests:
+        scheduler_kwargs = dict(scheduling_request)
+        asset_or_sensor = scheduler_kwargs.pop("asset_or_sensor")
+        scheduler_specs = scheduler_kwargs.pop("scheduler_specs", None)
+        _check_flex_config(asset_or_sensor, scheduler_specs, scheduler_kwargs)
+        job_requests.append(
+            dict(
+                asset_or_sensor=get_asset_or_sensor_ref(asset_or_sensor),
+                scheduler_specs=scheduler_specs,
+                **scheduler_kwargs,
+            )
+        )
+
+    job = Job.create(
+        make_batch_schedule,
+        kwargs=dict(
+            scheduling_requests=job_requests,
+            belief_time=belief_time,
+            processes=processes,
+        ),
+        id=job_id,
+        connection=current_app.queues["scheduling"].connection,
+        ttl=int(
+            current_app.config.get(
+                "FLEXMEASURES_JOB_TTL", timedelta(-1)
+            ).total_seconds()
+        ),
+        result_ttl=int(
+            current_app.config.get(
+                "FLEXMEASURES_PLANNING_TTL", timedelta(-1)
+            ).total_seconds()
+        ),  # NB job.cleanup docs says a negative number of seconds means persisting forever
+        depends_on=depends_on,
+    )
+    job.meta["asset_or_sensors"] = [
+        job_request["asset_or_sensor"] for job_request in job_requests
+    ]
+    job.save_meta()
+
+    try:
+        job_status = job.get_status(refresh=True)
+    except InvalidJobOperation:
+        job_status = None
+
+    # with job_status=None, we ensure that only fresh new jobs are enqueued (otherwise, they should be requeued instead)
+    if enqueue and not job_status:
+        current_app.queues["scheduling"].enqueue_job(job)
+        for asset_or_sensor in job.meta["asset_or_sensors"]:
+            current_app.job_cache.add(
+                asset_or_sensor["id"],
+                job.id,
+                queue="scheduling",
+                asset_or_sensor_type=asset_or_sensor["class"].lower(),
+            )
+
+    return job
+
+
 def _is_consumption_production_output(
     result: dict, asset_or_sensor: Asset | Sensor
 ) -> bool:
@@ -775,18 +874,6 @@ def make_schedule(  # noqa: C901
 
     consumption_schedule: SchedulerOutputType = scheduler.compute()
 
-    # in case we are getting a custom Scheduler that hasn't implemented the multiple output return
-    # this should only be called whenever the Scheduler applies to the Sensor.
-    if isinstance(consumption_schedule, pd.Series):
-        assert isinstance(asset_or_sensor, Sensor), ""
-        consumption_schedule = [
-            {
-                "name": "consumption_schedule",
-                "data": consumption_schedule,
-                "sensor": asset_or_sensor,
-            }
-        ]
-
     if rq_job:
         click.echo("Job %s made schedule." % rq_job.id)
         rq_job.meta["scheduler_info"] = scheduler.info
@@ -804,15 +891,68 @@ def make_schedule(  # noqa: C901
         rq_job.meta["data_source_info"] = data_source_info
         rq_job.save_meta()
 
-    # Save any result that specifies a sensor to save it to
-    scheduling_result_dict: dict = SchedulingJobResult().to_dict()
+    bdfs, scheduling_result_dict, commitment_costs = _convert_schedule_to_beliefs(
+        consumption_schedule,
+        asset_or_sensor=asset_or_sensor,
+        data_source=data_source,
+        belief_time=belief_time,
+        resolution=resolution,
+    )
+    if rq_job and commitment_costs is not None:
+        rq_job.meta["scheduler_info"]["commitment_costs"] = commitment_costs
+
     num_beliefs_created = 0
+    for bdf in bdfs:
+        if not dry_run:
+            save_to_db(bdf, bulk_copy=True)
+            num_beliefs_created += len(bdf)
+        else:
+            print(
+                f"\nNot saving schedule for sensor `{bdf.sensor}` to the database (because of dry-run), but this is what I computed:\n{bdf}"
+            )
+
+    # num_beliefs_created counts beliefs actually saved; in dry_run mode this is always 0
+    scheduling_result_dict["num-beliefs"] = num_beliefs_created
+
+    if not dry_run:
+        scheduler.persist_flex_model()
+        db.session.commit()
+
+    return scheduling_result_dict
+
+
+def _convert_schedule_to_beliefs(
+    consumption_schedule: SchedulerOutputType,
+    asset_or_sensor: Asset | Sensor,
+    data_source: DataSource,
+    belief_time: datetime,
+    resolution: timedelta | None,
+) -> tuple[list[tb.BeliefsDataFrame], dict, dict | None]:
+    """Turn the scheduler output into beliefs, for each result that specifies a sensor to save it to.
+
+    :returns: the beliefs per sensor, the scheduling result (as a dict) and the commitment costs (if any)
+    """
+    # in case we are getting a custom Scheduler that hasn't implemented the multiple output return
+    # this should only be called whenever the Scheduler applies to the Sensor.
+    if isinstance(consumption_schedule, pd.Series):
+        assert isinstance(asset_or_sensor, Sensor), ""
+        consumption_schedule = [
+            {
+                "name": "consumption_schedule",
+                "data": consumption_schedule,
+                "sensor": asset_or_sensor,
+            }
+        ]
+
+    scheduling_result_dict: dict = SchedulingJobResult().to_dict()
+    commitment_costs = None
+    bdfs = []
     for result in consumption_schedule:
         if result.get("name") == SCHEDULING_RESULT_KEY:
             scheduling_result_dict = result["data"].to_dict()
             continue
-        if rq_job and result.get("name") == "commitment_costs":
-            rq_job.meta["scheduler_info"]["commitment_costs"] = result["data"]
+        if result.get("name") == "commitment_costs":
+            commitment_costs = result["data"]
             continue
         if "sensor" not in result:
             continue
@@ -825,17 +965,14 @@ def make_schedule(  # noqa: C901
 
         sign = _resolve_schedule_output_sign(result, asset_or_sensor)
 
-        ts_value_schedule = [
-            TimedBelief(
-                event_start=dt,
-                belief_time=belief_time,
-                event_value=sign * value,
-                sensor=result["sensor"],
-                source=data_source,
-            )
-            for dt, value in result["data"].items()
-        ]  # For consumption schedules, positive values denote consumption. For the db, consumption is negative
-        bdf = tb.BeliefsDataFrame(ts_value_schedule)
+        # Convert the scheduled values to beliefs in one go, rather than creating a TimedBelief per value
+        # For consumption schedules, positive values denote consumption. For the db, consumption is negative
+        bdf = tb.BeliefsDataFrame(
+            sign * result["data"],
+            sensor=_get_attached_sensor(result["sensor"]),
+            source=data_source,
+            belief_time=belief_time,
+        )
 
         # Set the correct event resolution
         if resolution is not None and bdf.event_resolution != timedelta(0):
@@ -845,22 +982,232 @@ def make_schedule(  # noqa: C901
             # todo: move this into save_to_db
             bdf = bdf.resample_events(bdf.sensor.event_resolution)
 
-        if not dry_run:
-            save_to_db(bdf)
-            num_beliefs_created += len(bdf)
-        else:
-            print(
-                f"\nNot saving schedule for sensor `{bdf.sensor}` to the database (because of dry-run), but this is what I computed:\n{bdf}"
+        bdfs.append(bdf)
+    return bdfs, scheduling_result_dict, commitment_costs
+
+
+def make_batch_schedule(  # noqa: C901
+    scheduling_requests: list[dict],
+    belief_time: datetime | None = None,
+    processes: int | None = None,
+    dry_run: bool = False,
+) -> list[dict]:
+    """
+    This function computes the schedules of many assets (or sensors) at once.
+    It returns a list with the result of each scheduling request, like make_schedule returns,
+    or, in case that request failed, a dict with the error message under an ``error`` key.
+
+    It can be queued as a job (see create_batch_scheduling_job).
+
+    Compared to running make_schedule for each request separately, this function:
+    - Sets up database connections once.
+    - Prefetches the beliefs of all sensors referenced in the flex-contexts, in one batch,
+      so sensors shared among many sites (like a day-ahead price sensor) are fetched only once.
+    - Solves the (independent) scheduling problems in a process pool (for the StorageScheduler;
+      other schedulers compute their schedule within the job's own process).
+    - Saves all schedules in one transaction.
+
+    :param scheduling_requests: Scheduling arguments per asset or sensor, each including its asset_or_sensor,
+                                with a serialized flex-model and flex-context (see create_batch_scheduling_job).
+    :param belief_time:         Belief time of all schedules (by default, now).
+    :param processes:           Number of processes to solve the scheduling problems with
+                                (by default, the FLEXMEASURES_BATCH_SCHEDULING_PROCESSES setting,
+                                which defaults to the number of CPUs).
+    :param dry_run:             If True, nothing is saved to the database.
+    """
+    # https://docs.sqlalchemy.org/en/13/faq/connections.html#how-do-i-use-engines-connections-sessions-with-python-multiprocessing-or-os-fork
+    db.engine.dispose()
+
+    rq_job = get_current_job()
+    if rq_job:
+        click.echo(
+            "Running Batch Scheduling Job %s: %d scheduling requests"
+            % (rq_job.id, len(scheduling_requests))
+        )
+
+    if belief_time is None:
+        belief_time = server_now()
+    if processes is None:
+        processes = (
+            current_app.config.get("FLEXMEASURES_BATCH_SCHEDULING_PROCESSES")
+            or os.cpu_count()
+        )
+
+    results: list[dict | None] = [None] * len(scheduling_requests)
+
+    def record_error(i: int, exc: Exception):
+        current_app.logger.warning(
+            f"Batch scheduling request {i} ({scheduling_requests[i]['asset_or_sensor']}) failed: {exc}"
+        )
+        results[i] = {"error": str(exc)}
+
+    # Set up a scheduler for each scheduling request
+    schedulers: dict[int, Scheduler] = {}
+    for i, scheduling_request in enumerate(scheduling_requests):
+        try:
+            schedulers[i] = _get_deserialized_scheduler(
+                scheduling_request, belief_time=belief_time
             )
+        except Exception as exc:
+            record_error(i, exc)
+
+    # Prefetch the beliefs of sensors referenced in the flex-contexts, such as price sensors
+    prefetched_beliefs = {}
+    if schedulers:
+        sensors = {
+            sensor.id: sensor
+            for scheduler in schedulers.values()
+            for sensor in _find_sensors(scheduler.flex_context)
+        }
+        prefetched_beliefs = prefetch_beliefs(
+            list(sensors.values()),
+            query_window=(
+                min(scheduler.start for scheduler in schedulers.values()),
+                max(scheduler.end for scheduler in schedulers.values()),
+            ),
+            beliefs_before=belief_time,
+        )
 
-    # num_beliefs_created counts beliefs actually saved; in dry_run mode this is always 0
-    scheduling_result_dict["num-beliefs"] = num_beliefs_created
+    schedules: dict[int, SchedulerOutputType] = {}
+    with use_prefetched_beliefs(prefetched_beliefs):
+        problems = {}
+        for i, scheduler in schedulers.items():
+            try:
+                if isinstance(scheduler, StorageScheduler):
+                    problems[i] = scheduler.prepare_problem()
+                else:
+                    schedules[i] = scheduler.compute()
+            except Exception as exc:
+                record_error(i, exc)
+
+        # Independent parts of a scheduling problem can be solved in parallel, too
+        subproblems = {}
+        if current_app.config.get("FLEXMEASURES_LP_DECOMPOSE", False):
+            for i in list(problems):
+                try:
+                    subproblems[i] = decompose_device_scheduler_problem(**problems[i])
+                except Exception as exc:
+                    record_error(i, exc)
+                    del problems[i]
+                    continue
+                if len(subproblems[i]) > 1:
+                    del problems[i]
+                    for k, subproblem in enumerate(subproblems[i]):
+                        problems[(i, k)] = subproblem.kwargs
+        solutions = solve_device_scheduler_problems(problems, processes)
+        for i, subproblems_i in subproblems.items():
+            if len(subproblems_i) > 1:
+                sub_solutions = [
+                    solutions.pop((i, k)) for k in range(len(subproblems_i))
+                ]
+                errors = [s for s in sub_solutions if isinstance(s, Exception)]
+                solutions[i] = (
+                    errors[0]
+                    if errors
+                    else merge_device_scheduler_solutions(subproblems_i, sub_solutions)
+                )
+
+        for i, solution in solutions.items():
+            try:
+                if isinstance(solution, Exception):
+                    raise solution
+                schedules[i] = schedulers[i].compute_from_solution(*solution)
+            except Exception as exc:
+                record_error(i, exc)
+
+    # Turn all schedules into beliefs, and save them in one transaction
+    data_sources = {}
+    all_bdfs = []
+    for i in sorted(schedules):
+        scheduler = schedulers[i]
+        data_source_info = type(scheduler).get_data_source_info()
+        data_source_key = tuple(data_source_info.values())
+        if data_source_key not in data_sources:
+            data_sources[data_source_key] = get_data_source(
+                data_source_name=data_source_info["name"],
+                data_source_model=data_source_info["model"],
+                data_source_version=data_source_info["version"],
+                data_source_type="scheduler",
+            )
+        try:
+            bdfs, scheduling_result_dict, _ = _convert_schedule_to_beliefs(
+                schedules[i],
+                asset_or_sensor=(
+                    scheduler.sensor
+                    if scheduler.sensor is not None
+                    else scheduler.asset
+                ),
+                data_source=data_sources[data_source_key],
+                belief_time=belief_time,
+                resolution=scheduling_requests[i].get("resolution"),
+            )
+        except Exception as exc:
+            record_error(i, exc)
+            continue
+        scheduling_result_dict["num-beliefs"] = (
+            sum(len(bdf) for bdf in bdfs) if not dry_run else 0
+        )
+        results[i] = scheduling_result_dict
+        all_bdfs.extend(bdfs)
 
     if not dry_run:
-        scheduler.persist_flex_model()
+        save_to_db(all_bdfs, bulk_copy=True)
+        for i in schedules:
+            if "error" not in results[i]:
+                schedulers[i].persist_flex_model()
         db.session.commit()
 
-    return scheduling_result_dict
+    if rq_job:
+        click.echo(
+            "Job %s made %d schedules."
+            % (rq_job.id, sum("error" not in result for result in results))
+        )
+    return results
+
+
+def _get_deserialized_scheduler(
+    scheduling_request: dict, belief_time: datetime
+) -> Scheduler:
+    """Set up the scheduler for a scheduling request of a batch, and deserialize its flex config."""
+    scheduler_kwargs = dict(scheduling_request)
+    asset_or_sensor = get_asset_or_sensor_from_ref(
+        scheduler_kwargs.pop("asset_or_sensor")
+    )
+    scheduler_specs = scheduler_kwargs.pop("scheduler_specs", None)
+    if scheduler_specs:
+        scheduler_class: Type[Scheduler] = load_custom_scheduler(scheduler_specs)
+    else:
+        scheduler_class: Type[Scheduler] = find_scheduler_class(asset_or_sensor)
+    scheduler = get_scheduler_instance(
+        scheduler_class=scheduler_class,
+        asset_or_sensor=asset_or_sensor,
+        scheduler_params=dict(
+            belief_time=belief_time,
+            return_multiple=True,
+            **scheduler_kwargs,
+        ),
+    )
+    scheduler.deserialize_config()
+    return scheduler
+
+
+def _find_sensors(flex_config) -> list[Sensor]:
+    """Find the sensors referenced in a (deserialized) flex config."""
+    if isinstance(flex_config, Sensor):
+        return [flex_config]
+    if isinstance(flex_config, dict):
+        flex_config = list(flex_config.values())
+    if isinstance(flex_config, (list, tuple)):
+        return [sensor for value in flex_config for sensor in _find_sensors(value)]
+    return []
+
+
+def _get_attached_sensor(sensor: Sensor) -> Sensor:
+    """Get a Sensor instance attached to the database session (see Issue #683)."""
+    inspection_obj = sa_inspect(sensor, raiseerr=False)
+    if inspection_obj and inspection_obj.detached:
+        return db.session.get(Sensor, sensor.id)
+    return sensor
 
 
 def find_scheduler_class(asset_or_sensor: Asset | Sensor) -> type:
@@ -0,0 +1,224 @@
+"""
+Logic around caching sensor data responses in redis.
+
+Cached responses are stored per sensor, under a key derived from the request parameters, e.g.:
+    - sensor-data:1:<digest> (a hash holding the response and its ETag)
+Each sensor also has an index of its cached responses and the time windows they cover,
+and a generation counter, which is incremented whenever its cached responses are invalidated:
+    - sensor-data:1 (a hash mapping each digest to a time window)
+    - sensor-data-generation:1
+Saving beliefs (see flexmeasures.data.utils.save_to_db) invalidates the cached responses
+for that sensor whose window overlaps with the events described by the beliefs,
+once the transaction is committed (before that, other requests still read the old data).
+A response is only cached if the generation counter did not change while the response was loaded,
+so responses loaded before a commit cannot end up in the cache after its invalidation.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+import hashlib
+import json
+
+from flask import current_app
+from redis.exceptions import RedisError, WatchError
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from timely_beliefs import BeliefsDataFrame
+
+from flexmeasures.data import db
+
+SENSOR_DATA_CACHE_PREFIX = "sensor-data"
+SENSOR_DATA_CACHE_GENERATION_PREFIX = "sensor-data-generation"
+
+# Key under which a session holds the invalidations to carry out after its transaction is committed
+_PENDING_INVALIDATIONS_KEY = "pending_sensor_data_cache_invalidations"
+
+
+def sensor_data_cache_is_enabled() -> bool:
+    return current_app.config.get("FLEXMEASURES_SENSOR_DATA_CACHE_TTL", 0) > 0
+
+
+def make_sensor_data_cache_key(sensor_id: int, **parameters) -> str:
+    """Derive the cache key for a sensor data response from the parameters that determine the response.
+
+    Parameters with a value of None are left out, so adding a parameter keeps the existing keys valid.
+    """
+    parameters = {k: v for k, v in parameters.items() if v is not None}
+    digest = hashlib.sha1(
+        json.dumps(parameters, sort_keys=True, default=str).encode()
+    ).hexdigest()
+    return f"{_get_index_key(sensor_id)}:{digest}"
+
+
+def make_etag(response: dict) -> str:
+    return hashlib.sha1(json.dumps(response, sort_keys=True).encode()).hexdigest()
+
+
+def get_cached_etag(key: str) -> str | None:
+    """Get the ETag of a cached response, without loading the response itself."""
+    try:
+        etag = current_app.redis_connection.hget(key, "etag")
+    except RedisError as e:
+        current_app.logger.warning(f"Could not read sensor data cache: {e}")
+        return None
+    return etag.decode() if etag is not None else None
+
+
+def get_cache_generation(sensor_id: int) -> bytes | None:
+    """Get the generation of the cached responses for a sensor, to be passed to cache_response.
+
+    Call this before loading the response, so that a response loaded from outdated data is not cached.
+    """
+    try:
+        return current_app.redis_connection.get(_get_generation_key(sensor_id))
+    except RedisError as e:
+        current_app.logger.warning(f"Could not read sensor data cache: {e}")
+        return None
+
+
+def get_cached_response(key: str) -> tuple[dict, str] | None:
+    """Get a cached response and its ETag, if the response is cached."""
+    try:
+        cached = current_app.redis_connection.hmget(key, "response", "etag")
+    except RedisError as e:
+        current_app.logger.warning(f"Could not read sensor data cache: {e}")
+        return None
+    response, etag = cached
+    if response is None or etag is None:
+        return None
+    return json.loads(response), etag.decode()
+
+
+def cache_response(
+    key: str,
+    sensor_id: int,
+    start: datetime,
+    end: datetime,
+    response: dict,
+    generation: bytes | None,
+) -> str:
+    """Cache a response, which describes the given time window of the given sensor.
+
+    The response is not cached if the sensor's cached responses were invalidated since the given generation,
+    because the response may then have been loaded from outdated data.
+
+    :returns: the ETag of the response
+    """
+    etag = make_etag(response)
+    ttl = current_app.config["FLEXMEASURES_SENSOR_DATA_CACHE_TTL"]
+    index_key = _get_index_key(sensor_id)
+    generation_key = _get_generation_key(sensor_id)
+    try:
+        with current_app.redis_connection.pipeline() as pipeline:
+            pipeline.watch(generation_key)
+            if pipeline.get(generation_key) != generation:
+                return etag
+            pipeline.multi()
+            pipeline.hset(key, mapping={"response": json.dumps(response), "etag": etag})
+            pipeline.expire(key, ttl)
+            pipeline.hset(
+                index_key,
+                key.rsplit(":", 1)[-1],
+                f"{start.timestamp()} {end.timestamp()}",
+            )
+            # The index lives as long as its most recent entry
+            pipeline.expire(index_key, ttl)
+            pipeline.execute()
+    except WatchError:
+        # The cached responses were invalidated in the meantime
+        pass
+    except RedisError as e:
+        current_app.logger.warning(f"Could not write sensor data cache: {e}")
+    return etag
+
+
+def invalidate_sensor_data_cache(
+    sensor_id: int, start: datetime | None = None, end: datetime | None = None
+):
+    """Invalidate the cached responses for a sensor that overlap with the given time window.
+
+    Call this after committing the change, or use invalidate_sensor_data_cache_after_commit.
+
+    :param sensor_id:   the sensor whose data changed
+    :param start:       start of the time window in which data changed (if None, the window is unbounded)
+    :param end:         end of the time window in which data changed (if None, the window is unbounded)
+    """
+    if not sensor_data_cache_is_enabled():
+        return
+    start = start.timestamp() if start is not None else float("-inf")
+    end = end.timestamp() if end is not None else float("inf")
+    index_key = _get_index_key(sensor_id)
+    generation_key = _get_generation_key(sensor_id)
+    try:
+        connection = current_app.redis_connection
+
+        # Keep responses that are being loaded right now from being cached (see cache_response)
+        pipeline = connection.pipeline()
+        pipeline.incr(generation_key)
+        pipeline.expire(
+            generation_key, current_app.config["FLEXMEASURES_SENSOR_DATA_CACHE_TTL"]
+        )
+        pipeline.execute()
+
+        stale_digests = []
+        for digest, window in connection.hgetall(index_key).items():
+            cached_start, cached_end = map(float, window.split())
+            # Inclusive bounds, to also catch instantaneous events on the edge of a window
+            if cached_start <= end and cached_end >= start:
+                stale_digests.append(digest.decode())
+        if stale_digests:
+            pipeline = connection.pipeline()
+            pipeline.delete(*[f"{index_key}:{digest}" for digest in stale_digests])
+            pipeline.hdel(index_key, *stale_digests)
+            pipeline.execute()
+    except RedisError as e:
+        current_app.logger.warning(f"Could not invalidate sensor data cache: {e}")
+
+
+def invalidate_sensor_data_cache_after_commit(
+    sensor_id: int, start: datetime | None = None, end: datetime | None = None
+):
+    """Invalidate the cached responses for a sensor that overlap with the given time window,
+    once the current transaction of the database session is committed.
+
+    Invalidating right away would let requests that come in before the commit
+    cache the old data again. If the transaction is rolled back, nothing is invalidated.
+    """
+    if not sensor_data_cache_is_enabled():
+        return
+    db.session.info.setdefault(_PENDING_INVALIDATIONS_KEY, []).append(
+        (sensor_id, start, end)
+    )
+
+
+def invalidate_sensor_data_cache_for_beliefs(bdf: BeliefsDataFrame):
+    """Invalidate the cached responses that may contain the events described by the given beliefs,
+    once the current transaction is committed."""
+    if bdf.empty or bdf.sensor is None or not sensor_data_cache_is_enabled():
+        return
+    event_starts = bdf.index.get_level_values("event_start")
+    invalidate_sensor_data_cache_after_commit(
+        bdf.sensor.id,
+        start=event_starts.min(),
+        end=event_starts.max() + bdf.event_resolution,
+    )
+
+
+def _get_index_key(sensor_id: int) -> str:
+    return f"{SENSOR_DATA_CACHE_PREFIX}:{sensor_id}"
+
+
+def _get_generation_key(sensor_id: int) -> str:
+    return f"{SENSOR_DATA_CACHE_GENERATION_PREFIX}:{sensor_id}"
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session):
+    for sensor_id, start, end in session.info.pop(_PENDING_INVALIDATIONS_KEY, []):
+        invalidate_sensor_data_cache(sensor_id, start=start, end=end)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_invalidations_after_rollback(session: Session):
+    session.info.pop(_PENDING_INVALIDATIONS_KEY, None)
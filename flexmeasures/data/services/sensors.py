@@ -7,9 +7,11 @@ from datetime import datetime, timedelta
 from typing import Any
 from flask import current_app
 from sqlalchemy import delete
+from werkzeug.exceptions import Forbidden, Unauthorized
 
 from isodate import duration_isoformat
 from timely_beliefs import BeliefsDataFrame
+from timely_beliefs.sensors import utils as sensor_utils
 import pandas as pd
 
 from humanize.time import precisedelta
@@ -21,11 +23,17 @@ import sqlalchemy as sa
 
 from flexmeasures.data import db
 from flexmeasures import Sensor, Account, Asset
+from flexmeasures.auth.policy import check_access
 from flexmeasures.data.models.audit_log import AssetAuditLog
+from flexmeasures.data.models.belief_summaries import DailyBeliefSummary
 from flexmeasures.data.models.data_sources import DataSource, DEFAULT_DATASOURCE_TYPES
 from flexmeasures.data.models.generic_assets import GenericAsset
+from flexmeasures.data.queries.beliefs import _timing_criteria_per_sensor_group
 from flexmeasures.data.schemas.generic_assets import SensorsToShowSchema
 from flexmeasures.data.schemas.reporting import StatusSchema
+from flexmeasures.data.services.sensor_data_cache import (
+    invalidate_sensor_data_cache_after_commit,
+)
 from flexmeasures.utils.time_utils import server_now
 
 
@@ -485,6 +493,140 @@ def get_staleness_start_times(
     return start_times
 
 
+def get_latest_event_starts_by_source_type(
+    sensors: list[Sensor], beliefs_before: datetime
+) -> dict[int, dict[str, datetime]]:
+    """Get the start of the most recent event per sensor and source type, in one grouped query.
+
+    We only look for the default data source types!
+    Only sensors for which the belief time follows exactly from the event start and belief horizon
+    (see _supports_bulk_staleness_search) yield the same results as searching per sensor.
+
+    The daily belief summaries are read first.
+    Only sensors with beliefs formed after beliefs_before are then looked up in the beliefs themselves.
+
+    :param sensors:         The sensors to look up the most recent events for.
+    :param beliefs_before:  Only consider beliefs formed before this datetime (inclusive).
+    :returns:               Dict mapping sensor IDs to dicts mapping source types to event starts
+                            (ordered like DEFAULT_DATASOURCE_TYPES). Sensors without data are left out.
+    """
+    if not sensors:
+        return {}
+    summary = DailyBeliefSummary
+    summary_rows = db.session.execute(
+        sa.select(
+            summary.sensor_id,
+            DataSource.type,
+            sa.func.max(summary.max_event_start),
+            sa.func.max(summary.last_recorded),
+        )
+        .join(DataSource, summary.source_id == DataSource.id)
+        .filter(summary.sensor_id.in_([sensor.id for sensor in sensors]))
+        .filter(DataSource.type.in_(DEFAULT_DATASOURCE_TYPES))
+        .group_by(summary.sensor_id, DataSource.type)
+    ).all()
+
+    # The summaries record the most recent knowledge time of ex-post beliefs, from which we derive the most recent belief time
+    sensors_by_id = {sensor.id: sensor for sensor in sensors}
+    rows = []
+    sensors_with_later_beliefs = set()
+    for sensor_id, source_type, max_event_start, last_recorded in summary_rows:
+        sensor = sensors_by_id[sensor_id]
+        knowledge_horizon, _ = sensor_utils.eval_verified_knowledge_horizon_fnc(
+            sensor.knowledge_horizon_fnc,
+            sensor.knowledge_horizon_par,
+            event_resolution=sensor.event_resolution,
+            get_bounds=True,
+        )
+        last_belief_time = last_recorded - sensor.event_resolution - knowledge_horizon
+        if last_belief_time > beliefs_before:
+            sensors_with_later_beliefs.add(sensor_id)
+        rows.append((sensor_id, source_type, max_event_start))
+    if sensors_with_later_beliefs:
+        rows = [row for row in rows if row[0] not in sensors_with_later_beliefs]
+        rows += _get_latest_event_starts_from_beliefs(
+            [sensors_by_id[sensor_id] for sensor_id in sensors_with_later_beliefs],
+            beliefs_before,
+        )
+
+    latest_event_starts = {sensor_id: dict() for sensor_id, _, _ in rows}
+    for source_type in DEFAULT_DATASOURCE_TYPES:
+        for sensor_id, row_source_type, event_start in rows:
+            if row_source_type == source_type:
+                latest_event_starts[sensor_id][source_type] = pd.Timestamp(event_start)
+    return latest_event_starts
+
+
+def _get_latest_event_starts_from_beliefs(
+    sensors: list[Sensor], beliefs_before: datetime
+) -> list[tuple[int, str, datetime]]:
+    """Get the start of the most recent event per sensor and source type, from the beliefs formed before the given time."""
+    q = (
+        sa.select(
+            TimedBelief.sensor_id,
+            DataSource.type,
+            sa.func.max(TimedBelief.event_start),
+        )
+        .join(DataSource, TimedBelief.source_id == DataSource.id)
+        .filter(
+            sa.or_(
+                *_timing_criteria_per_sensor_group(
+                    TimedBelief, sensors, beliefs_before=beliefs_before
+                )
+            )
+        )
+        .filter(DataSource.type.in_(DEFAULT_DATASOURCE_TYPES))
+        .group_by(TimedBelief.sensor_id, DataSource.type)
+    )
+    return [tuple(row) for row in db.session.execute(q).all()]
+
+
+def get_staleness_start_times_for_sensors(
+    sensors: list[Sensor], now: datetime
+) -> dict[int, dict[str, tuple[bool, datetime]]]:
+    """Get staleness start times by source, for each of the given sensors, using one query.
+
+    This is the bulk counterpart of get_staleness_start_times, for an empty staleness search.
+    Sensors without data are left out.
+    """
+    latest_event_starts = get_latest_event_starts_by_source_type(
+        sensors, beliefs_before=now
+    )
+    sensors_by_id = {sensor.id: sensor for sensor in sensors}
+    start_times = dict()
+    for sensor_id, event_starts in latest_event_starts.items():
+        sensor = sensors_by_id[sensor_id]
+        start_times[sensor_id] = dict()
+        for source_type, event_start in event_starts.items():
+            if source_type in ("scheduler", "forecaster"):
+                start_times[sensor_id][source_type] = (event_start > now, event_start)
+            else:
+                start_times[sensor_id][source_type] = (
+                    True,
+                    sensor.knowledge_time(event_start, sensor.event_resolution),
+                )
+    return start_times
+
+
+def _supports_bulk_staleness_search(sensor: Sensor, staleness_search: dict) -> bool:
+    """Whether the staleness of this sensor can be looked up in bulk.
+
+    That requires the default (empty) staleness search, and a knowledge horizon that does not vary per event
+    (otherwise, the rough belief time filter in the database query differs from the actual belief time filter).
+    """
+    if staleness_search:
+        return False
+    knowledge_horizon_min, knowledge_horizon_max = (
+        sensor_utils.eval_verified_knowledge_horizon_fnc(
+            sensor.knowledge_horizon_fnc,
+            sensor.knowledge_horizon_par,
+            event_resolution=sensor.event_resolution,
+            get_bounds=True,
+        )
+    )
+    return knowledge_horizon_min == knowledge_horizon_max
+
+
 def get_stalenesses(
     sensor: Sensor, staleness_search: dict, now: datetime
 ) -> dict[str, timedelta] | None:
@@ -565,7 +707,63 @@ def get_statuses(
         staleness_search=staleness_search,
         now=now,
     )
+    return _build_statuses(
+        stalenesses,
+        now=now,
+        max_staleness=max_staleness,
+        max_future_staleness=max_future_staleness,
+    )
 
+
+def get_statuses_for_sensors(
+    sensors: list[Sensor],
+    now: datetime,
+) -> dict[int, list[dict]]:
+    """Get the status of each of the given sensors by source type (see get_statuses).
+
+    Sensors using the default staleness search are looked up in one grouped query,
+    rather than in one query per source type per sensor.
+    Other sensors (e.g. with a custom staleness search in their status specs) are looked up one by one.
+
+    :returns: Dict mapping sensor IDs to their statuses.
+    """
+    bulk_sensors = []
+    status_specs_by_sensor = dict()
+    statuses = dict()
+    for sensor in sensors:
+        status_specs = StatusSchema().load(get_status_specs(sensor=sensor))
+        if _supports_bulk_staleness_search(sensor, status_specs["staleness_search"]):
+            bulk_sensors.append(sensor)
+            status_specs_by_sensor[sensor.id] = status_specs
+        else:
+            statuses[sensor.id] = get_statuses(sensor=sensor, now=now)
+
+    start_times = get_staleness_start_times_for_sensors(bulk_sensors, now=now)
+    for sensor in bulk_sensors:
+        status_specs = status_specs_by_sensor[sensor.id]
+        stalenesses = {
+            source_type: (has_relevant_data, now - start_time)
+            for source_type, (has_relevant_data, start_time) in start_times.get(
+                sensor.id, {}
+            ).items()
+        }
+        statuses[sensor.id] = _build_statuses(
+            stalenesses or None,
+            now=now,
+            max_staleness=status_specs["max_staleness"],
+            max_future_staleness=status_specs["max_future_staleness"],
+        )
+
+    return {sensor.id: statuses[sensor.id] for sensor in sensors}
+
+
+def _build_statuses(
+    stalenesses: dict[str, tuple[bool, timedelta | None]] | None,
+    now: datetime,
+    max_staleness: timedelta,
+    max_future_staleness: timedelta,
+) -> list[dict]:
+    """Build the statuses of a sensor, one per source type, from its stalenesses by source type."""
     statuses = list()
     for source_type, (has_relevant_data, staleness) in (
         stalenesses or {None: (True, None)}
@@ -628,23 +826,10 @@ def _get_sensor_asset_relation(
     return ";".join(relations)
 
 
-def get_asset_sensors_metadata(
+def _get_asset_context_sensors(
     asset: Asset,
-    now: datetime = None,
-) -> list[dict]:
-    """
-    Get the metadata of sensors for a given asset and its children.
-
-    :param asset: Asset to get the sensors for.
-    :param now: Datetime representing now, used to get the status of the sensors.
-    :return: A list of dictionaries, each representing a sensor's metadata.
-    """
-
-    if not now:
-        now = server_now()
-
-    sensors = []
-    sensor_ids = set()
+) -> tuple[list[Sensor], dict[str, Sensor]]:
+    """Get the inflexible device sensors and the other flex-context sensors of an asset."""
     inflexible_device_sensors = asset.get_inflexible_device_sensors()
     context_sensors = {
         field: Sensor.query.get(asset.flex_context[field]["sensor"])
@@ -652,6 +837,21 @@ def get_asset_sensors_metadata(
         if isinstance(asset.flex_context[field], dict)
         and field != "inflexible-device-sensors"
     }
+    return inflexible_device_sensors, context_sensors
+
+
+def _get_asset_status_sensors(
+    asset: Asset,
+    readable_only: bool = False,
+) -> tuple[list[Sensor], list[Sensor], dict[str, Sensor]]:
+    """Get the sensors under or relevant to an asset, for which we report the status.
+
+    :param asset: Asset to get the sensors for.
+    :param readable_only: If True, leave out sensors that the current user may not read
+                          (the flex-context and sensors to show may refer to sensors of other accounts).
+    :return: The sensors (without duplicates), the asset's inflexible device sensors and its flex-context sensors.
+    """
+    inflexible_device_sensors, context_sensors = _get_asset_context_sensors(asset)
 
     # Get sensors to show using the validate_sensors_to_show method
     sensors_to_show = []
@@ -666,37 +866,64 @@ def get_asset_sensors_metadata(
         *sensors_to_show,
     ]
 
+    sensors = []
+    sensor_ids = set()
     for sensor in sensors_list:
         if sensor is None or sensor.id in sensor_ids:
             continue
-        sensor_status = {}
-        sensor_status["id"] = sensor.id
-        sensor_status["name"] = sensor.name
-        sensor_status["asset_name"] = sensor.generic_asset.name
         sensor_ids.add(sensor.id)
-        sensors.append(sensor_status)
+        if readable_only and not _user_can_read(sensor):
+            continue
+        sensors.append(sensor)
 
-    return sensors
+    return sensors, inflexible_device_sensors, context_sensors
 
 
-def serialize_sensor_status_data(
-    sensor: Sensor,
+def _user_can_read(sensor: Sensor) -> bool:
+    try:
+        check_access(sensor, "read")
+        return True
+    except (Forbidden, Unauthorized):
+        return False
+
+
+def get_asset_sensors_metadata(
+    asset: Asset,
+    now: datetime = None,
+    readable_only: bool = False,
 ) -> list[dict]:
     """
-    Serialize the status of a sensor belonging to an asset.
+    Get the metadata of sensors for a given asset and its children.
 
-    :param sensor: Sensor to get the status of
-    :return: A list of dictionaries, each representing the statuses of the sensor - one status per data source type that stored data on that sensor
+    :param asset: Asset to get the sensors for.
+    :param now: Datetime representing now, used to get the status of the sensors.
+    :param readable_only: If True, leave out sensors that the current user may not read.
+    :return: A list of dictionaries, each representing a sensor's metadata.
     """
-    asset = sensor.generic_asset
-    sensor_statuses = get_statuses(sensor=sensor, now=server_now())
-    inflexible_device_sensors = asset.get_inflexible_device_sensors()
-    context_sensors = {
-        field: Sensor.query.get(asset.flex_context[field]["sensor"])
-        for field in asset.flex_context
-        if isinstance(asset.flex_context[field], dict)
-        and field != "inflexible-device-sensors"
-    }
+
+    if not now:
+        now = server_now()
+
+    sensors, _, _ = _get_asset_status_sensors(asset, readable_only=readable_only)
+
+    return [
+        {
+            "id": sensor.id,
+            "name": sensor.name,
+            "asset_name": sensor.generic_asset.name,
+        }
+        for sensor in sensors
+    ]
+
+
+def _serialize_sensor_statuses(
+    sensor: Sensor,
+    sensor_statuses: list[dict],
+    asset: Asset,
+    inflexible_device_sensors: list[Sensor],
+    context_sensors: dict[str, Sensor],
+) -> list[dict]:
+    """Serialize the statuses of a sensor, including its relation to the given asset."""
     sensors = []
     for sensor_status in sensor_statuses:
         sensor_status["id"] = sensor.id
@@ -712,15 +939,61 @@ def serialize_sensor_status_data(
             if sensor_status["staleness_since"] is not None
             else None
         )
-        sensor_status["asset_name"] = asset.name
+        sensor_status["asset_name"] = sensor.generic_asset.name
         sensor_status["relation"] = _get_sensor_asset_relation(
             asset, sensor, inflexible_device_sensors, context_sensors
         )
         sensors.append(sensor_status)
-
     return sensors
 
 
+def serialize_sensor_status_data(
+    sensor: Sensor,
+) -> list[dict]:
+    """
+    Serialize the status of a sensor belonging to an asset.
+
+    :param sensor: Sensor to get the status of
+    :return: A list of dictionaries, each representing the statuses of the sensor - one status per data source type that stored data on that sensor
+    """
+    asset = sensor.generic_asset
+    sensor_statuses = get_statuses_for_sensors([sensor], now=server_now())[sensor.id]
+    inflexible_device_sensors, context_sensors = _get_asset_context_sensors(asset)
+    return _serialize_sensor_statuses(
+        sensor, sensor_statuses, asset, inflexible_device_sensors, context_sensors
+    )
+
+
+def serialize_asset_sensors_status_data(
+    asset: Asset,
+) -> list[dict]:
+    """
+    Serialize the status of the sensors under or relevant to an asset (see get_asset_sensors_metadata).
+
+    The statuses of all sensors are looked up at once (see get_statuses_for_sensors).
+    Sensors that the current user may not read are left out.
+
+    :param asset: Asset to get the sensor statuses for
+    :return: A list of dictionaries, each representing the status of a sensor for one data source type
+    """
+    sensors, inflexible_device_sensors, context_sensors = _get_asset_status_sensors(
+        asset, readable_only=True
+    )
+    statuses = get_statuses_for_sensors(sensors, now=server_now())
+    status_data = []
+    for sensor in sensors:
+        status_data.extend(
+            _serialize_sensor_statuses(
+                sensor,
+                statuses[sensor.id],
+                asset,
+                inflexible_device_sensors,
+                context_sensors,
+            )
+        )
+    return status_data
+
+
 def build_asset_jobs_data(
     asset: Asset,
 ) -> list[dict]:
@@ -815,39 +1088,30 @@ def _get_sensor_stats(
     start_dt = pd.to_datetime(event_start_time) if event_start_time else None
     end_dt = pd.to_datetime(event_end_time) if event_end_time else None
 
-    # In PostgreSQL NaN = NaN is TRUE (unlike IEEE-754), so this predicate correctly excludes NaN rows from value aggregates while keeping them in the row count.
-    # We pass it to aggregate FILTER clauses so that the planner can compute all aggregates in a single pass over the belief rows.
-    not_nan = TimedBelief.event_value != float("nan")
-
-    def filtered_agg(func):
-        return func(TimedBelief.event_value).filter(not_nan)
+    # Whole (UTC) days are read from the daily belief summaries, and partial days at the edges from the beliefs
+    windows = _split_stats_window(start_dt, end_dt)
+    parts = [
+        _select_summarized_stats(sensor, *window) for window in windows["summaries"]
+    ] + [_select_belief_stats(sensor, *window) for window in windows["beliefs"]]
+    part = sa.union_all(*parts).subquery() if len(parts) > 1 else parts[0].subquery()
 
+    # Sum over integers yields a numeric in PostgreSQL
     q = (
         sa.select(
             DataSource,
-            sa.func.min(TimedBelief.event_start).label("min_event_start"),
-            sa.func.max(TimedBelief.event_start).label("max_event_start"),
-            sa.func.max(
-                TimedBelief.event_start
-                + sensor.event_resolution
-                - TimedBelief.belief_horizon
-            ).label("max_belief_time"),
-            filtered_agg(sa.func.min).label("min_event_value"),
-            filtered_agg(sa.func.max).label("max_event_value"),
-            filtered_agg(sa.func.avg).label("avg_event_value"),
-            filtered_agg(sa.func.sum).label("sum_event_value"),
-            sa.func.count(TimedBelief.event_value).label("count_event_value"),
+            sa.func.min(part.c.min_event_start),
+            sa.func.max(part.c.max_event_start),
+            sa.func.max(part.c.last_recorded),
+            sa.func.min(part.c.min_value),
+            sa.func.max(part.c.max_value),
+            sa.func.sum(part.c.value_sum),
+            sa.cast(sa.func.sum(part.c.value_count), sa.Integer),
+            sa.cast(sa.func.sum(part.c.belief_count), sa.Integer),
         )
-        .select_from(TimedBelief)
-        .join(DataSource, DataSource.id == TimedBelief.source_id)
-        .filter(TimedBelief.sensor_id == sensor.id)
+        .select_from(part)
+        .join(DataSource, DataSource.id == part.c.source_id)
     )
 
-    if start_dt:
-        q = q.filter(TimedBelief.event_start >= start_dt)
-    if end_dt:
-        q = q.filter(TimedBelief.event_start < end_dt)
-
     raw_stats = db.session.execute(q.group_by(DataSource.id)).fetchall()
 
     def to_local_iso(ts):
@@ -861,8 +1125,8 @@ def _get_sensor_stats(
         max_belief_time,
         min_value,
         max_value,
-        mean_value,
         sum_values,
+        count_non_nan_values,
         count_values,
     ) in raw_stats:
         data_source = f"{data_source_obj.description} (ID: {data_source_obj.id})"
@@ -873,8 +1137,10 @@ def _get_sensor_stats(
             "Last recorded": to_local_iso(max_belief_time),
             "Min value": min_value,
             "Max value": max_value,
-            "Mean value": mean_value,
-            "Sum over values": sum_values,
+            "Mean value": (
+                sum_values / count_non_nan_values if count_non_nan_values else None
+            ),
+            "Sum over values": sum_values if count_non_nan_values else None,
             "Number of values": count_values,
         }
         if not sort_keys:
@@ -882,6 +1148,85 @@ def _get_sensor_stats(
     return stats
 
 
+def _split_stats_window(
+    start: pd.Timestamp | None, end: pd.Timestamp | None
+) -> dict[str, list[tuple[pd.Timestamp | None, pd.Timestamp | None]]]:
+    """Split the time window for sensor stats into whole UTC days (to be read from the daily belief summaries)
+    and partial days at its edges (to be read from the beliefs).
+
+    Naive datetimes are left to the database to interpret, so windows bounded by them are read from the beliefs only.
+    """
+    if any(dt is not None and dt.tzinfo is None for dt in (start, end)):
+        return dict(summaries=[], beliefs=[(start, end)])
+    first_day = start.tz_convert("UTC").ceil("D") if start is not None else None
+    last_day = end.tz_convert("UTC").floor("D") if end is not None else None
+    if first_day is not None and last_day is not None and first_day >= last_day:
+        return dict(summaries=[], beliefs=[(start, end)])
+    beliefs = []
+    if first_day is not None and start < first_day:
+        beliefs.append((start, first_day))
+    if last_day is not None and last_day < end:
+        beliefs.append((last_day, end))
+    return dict(summaries=[(first_day, last_day)], beliefs=beliefs)
+
+
+def _select_summarized_stats(
+    sensor: Sensor, first_day: datetime | None, last_day: datetime | None
+) -> sa.Select:
+    """Select stats per source from the daily belief summaries of whole days, from the first day up to the last day."""
+    summary = DailyBeliefSummary
+    q = sa.select(
+        summary.source_id.label("source_id"),
+        sa.func.min(summary.min_event_start).label("min_event_start"),
+        sa.func.max(summary.max_event_start).label("max_event_start"),
+        sa.func.max(summary.last_recorded).label("last_recorded"),
+        sa.func.min(summary.min_value).label("min_value"),
+        sa.func.max(summary.max_value).label("max_value"),
+        sa.func.sum(summary.value_sum).label("value_sum"),
+        sa.func.sum(summary.value_count).label("value_count"),
+        sa.func.sum(summary.belief_count).label("belief_count"),
+    ).filter(summary.sensor_id == sensor.id)
+    if first_day is not None:
+        q = q.filter(summary.day >= first_day)
+    if last_day is not None:
+        q = q.filter(summary.day < last_day)
+    return q.group_by(summary.source_id)
+
+
+def _select_belief_stats(
+    sensor: Sensor, start: datetime | None, end: datetime | None
+) -> sa.Select:
+    """Select stats per source from the beliefs about events starting within the given window."""
+
+    # In PostgreSQL NaN = NaN is TRUE (unlike IEEE-754), so this predicate correctly excludes NaN rows from value aggregates while keeping them in the row count.
+    # We pass it to aggregate FILTER clauses so that the planner can compute all aggregates in a single pass over the belief rows.
+    not_nan = TimedBelief.event_value != float("nan")
+
+    def filtered_agg(func):
+        return func(TimedBelief.event_value).filter(not_nan)
+
+    q = sa.select(
+        TimedBelief.source_id.label("source_id"),
+        sa.func.min(TimedBelief.event_start).label("min_event_start"),
+        sa.func.max(TimedBelief.event_start).label("max_event_start"),
+        sa.func.max(
+            TimedBelief.event_start
+            + sensor.event_resolution
+            - TimedBelief.belief_horizon
+        ).label("last_recorded"),
+        filtered_agg(sa.func.min).label("min_value"),
+        filtered_agg(sa.func.max).label("max_value"),
+        sa.func.coalesce(filtered_agg(sa.func.sum), 0).label("value_sum"),
+        filtered_agg(sa.func.count).label("value_count"),
+        sa.func.count(TimedBelief.event_value).label("belief_count"),
+    ).filter(TimedBelief.sensor_id == sensor.id)
+    if start is not None:
+        q = q.filter(TimedBelief.event_start >= start)
+    if end is not None:
+        q = q.filter(TimedBelief.event_start < end)
+    return q.group_by(TimedBelief.source_id)
+
+
 # Per-key TTL cache for sensor stats.
 #
 # Design:
@@ -947,4 +1292,5 @@ def delete_sensor(sensor: Sensor):
         sensor.generic_asset, f"Deleted sensor '{sensor_name}': {sensor.id}"
     )
     db.session.execute(delete(Sensor).filter_by(id=sensor.id))
+    invalidate_sensor_data_cache_after_commit(sensor.id)
     current_app.logger.info("Deleted sensor '%s'." % sensor_name)
@@ -5,6 +5,7 @@ from datetime import timedelta
 
 import inflect
 from flask import current_app
+import numpy as np
 import pandas as pd
 import timely_beliefs as tb
 
@@ -54,7 +55,9 @@ def aggregate_values(bdf_dict: dict[Any, tb.BeliefsDataFrame]) -> tb.BeliefsData
     return data_as_bdf
 
 
-def drop_unchanged_beliefs(bdf: tb.BeliefsDataFrame) -> tb.BeliefsDataFrame:
+def drop_unchanged_beliefs(
+    bdf: tb.BeliefsDataFrame, bdf_db: tb.BeliefsDataFrame | None = None
+) -> tb.BeliefsDataFrame:
     """Drop beliefs that are already stored in the database with an earlier or equal belief time.
 
     Also drop beliefs that are already in the data with an earlier belief time.
@@ -62,6 +65,10 @@ def drop_unchanged_beliefs(bdf: tb.BeliefsDataFrame) -> tb.BeliefsDataFrame:
     Quite useful function to prevent cluttering up your database with beliefs that remain
     unchanged over time, and to prevent duplicate key violations when re-running forecasters
     or reporters with identical data.
+
+    :param bdf:     the beliefs to be saved
+    :param bdf_db:  optionally, the stored beliefs (with any belief horizon) to compare against,
+                    rather than looking them up in the database
     """
     if bdf.empty:
         return bdf
@@ -72,10 +79,10 @@ def drop_unchanged_beliefs(bdf: tb.BeliefsDataFrame) -> tb.BeliefsDataFrame:
     canonical_order = ["event_start", "belief_time", "source", "cumulative_probability"]
     if not ex_ante_bdf.empty and not ex_post_bdf.empty:
         # We treat each part separately to avoid that ex-post knowledge would be lost
-        ex_ante_bdf = drop_unchanged_beliefs(ex_ante_bdf).reorder_levels(
+        ex_ante_bdf = drop_unchanged_beliefs(ex_ante_bdf, bdf_db).reorder_levels(
             canonical_order
         )
-        ex_post_bdf = drop_unchanged_beliefs(ex_post_bdf).reorder_levels(
+        ex_post_bdf = drop_unchanged_beliefs(ex_post_bdf, bdf_db).reorder_levels(
             canonical_order
         )
         bdf = pd.concat([ex_ante_bdf, ex_post_bdf])
@@ -100,26 +107,22 @@ def drop_unchanged_beliefs(bdf: tb.BeliefsDataFrame) -> tb.BeliefsDataFrame:
     else:
         # Look up only ex-post beliefs (horizon <= 0)
         kwargs = dict(horizons_at_most=timedelta(0))
-    bdf_db = bdf.sensor.search_beliefs(
-        event_starts_after=bdf.event_starts[0],
-        event_ends_before=bdf.event_ends[-1],
-        most_recent_beliefs_only=False,  # all beliefs
-        **kwargs,
-    )
+    if bdf_db is None:
+        bdf_db = bdf.sensor.search_beliefs(
+            event_starts_after=bdf.event_starts[0],
+            event_ends_before=bdf.event_ends[-1],
+            most_recent_beliefs_only=False,  # all beliefs
+            **kwargs,
+        )
+    elif "horizons_at_least" in kwargs:
+        bdf_db = bdf_db[bdf_db.belief_horizons >= timedelta(0)]
+    else:
+        bdf_db = bdf_db[bdf_db.belief_horizons <= timedelta(0)]
     if bdf_db.empty:
         return bdf
-    ordered_bdf = (
-        bdf.reorder_levels(canonical_order)
-        .groupby(
-            level=["event_start", "belief_time", "source"],
-            group_keys=False,
-        )
-        .apply(_drop_unchanged_beliefs_compared_to_db, bdf_db=bdf_db)
+    return _drop_unchanged_beliefs_compared_to_db(
+        bdf.reorder_levels(canonical_order), bdf_db=bdf_db
     )
-    # pandas 2.x groupby/apply can lose level names when some groups return empty DataFrames
-    if ordered_bdf.index.names != canonical_order:
-        ordered_bdf.index.names = canonical_order
-    return ordered_bdf
 
 
 def _drop_unchanged_beliefs_compared_to_db(
@@ -128,8 +131,10 @@ def _drop_unchanged_beliefs_compared_to_db(
 ) -> tb.BeliefsDataFrame:
     """Drop beliefs that are already stored in the database with an earlier or equal belief time.
 
-    Assumes a BeliefsDataFrame with a unique belief time and unique source,
-    and either all ex-ante beliefs or all ex-post beliefs.
+    Assumes a BeliefsDataFrame with either all ex-ante beliefs or all ex-post beliefs.
+    Each belief (i.e. each unique event start, belief time and source) is compared
+    against the most recent prior belief in the DB about the same event by the same source
+    (that is, with a belief time earlier than or equal to its own).
 
     Handles two cases:
 
@@ -140,62 +145,94 @@ def _drop_unchanged_beliefs_compared_to_db(
        with the same value: the candidate is dropped to prevent duplicate key violations, which
        is particularly useful when re-running forecasters or reporters with identical data.
 
+    Probabilistic beliefs are kept whole, as soon as any of their rows changed.
+
+    Rather than comparing each belief to the DB separately, the most recent prior belief times
+    are looked up for all beliefs at once (with merge_asof), and the candidate rows are then
+    matched against the DB rows with a single merge, so this scales as O(n log n).
+
     It is preferable to call the public function drop_unchanged_beliefs instead.
     """
-    source = bdf.lineage.sources[0]  # unique source
-    event_start = bdf.event_starts[0]  # unique event_start
-    belief_time = bdf.lineage.belief_times[0]  # unique belief time
-    # Compare by ID rather than object identity: the candidate bdf may have been
-    # deserialized from an RQ job queue (pickled in a different process), so its
-    # DataSource objects are detached and won't be identical to the freshly-loaded
-    # ones in bdf_db even when they represent the same DB row.
-    # Also filter by event_start: bdf_db may contain beliefs for multiple event_starts,
-    # and we must not let a newer belief_time from a different event_start contaminate
-    # the most-recent-belief-time lookup for this candidate's event_start.
-    bdf_db_from_source = bdf_db[
-        (bdf_db.sources.map(lambda s: s.id) == source.id)
-        & (bdf_db.event_starts == event_start)
-    ]
-    if bdf_db_from_source.empty:
+    if bdf.empty or bdf_db.empty:
         return bdf
-    # Use .max() rather than searchsorted: the result is correct regardless of
-    # whether bdf_db happens to be sorted ascending or descending by belief_time.
-    most_recent_bt = bdf_db_from_source.belief_times[
-        bdf_db_from_source.belief_times <= belief_time
-    ].max()
-    if pd.isna(most_recent_bt):
-        # No earlier belief time in db
-        return bdf
-    previous_most_recent_beliefs = bdf_db_from_source[
-        bdf_db_from_source.belief_times == most_recent_bt
-    ]
-    # Use source_id (integer) instead of source (object) for robust cross-session
-    # comparison. Detached ORM instances (for example after serialization boundaries
-    # or different session lifecycles) may represent the same DB row but still fail
-    # object-identity based comparison in pandas indices.
-    a_df = bdf.reset_index()
-    a_df["source_id"] = a_df["source"].map(lambda s: s.id)
-    b_df = previous_most_recent_beliefs.reset_index()
-    b_df["source_id"] = b_df["source"].map(lambda s: s.id)
-
-    compare_fields = [
-        "event_start",
-        "source_id",
-        "cumulative_probability",
-        "event_value",
-    ]
-    a = a_df.set_index(compare_fields)
-    b = b_df.set_index(compare_fields)
-    dropped = a.drop(b.index, errors="ignore", axis=0)
+    belief_keys = ["event_start", "source_id", "belief_time"]
+    row_keys = belief_keys + ["cumulative_probability", "event_value"]
+    candidates = _to_comparable_frame(bdf)
+    in_db = _to_comparable_frame(bdf_db).drop_duplicates(row_keys)
+
+    # Look up the most recent belief time in the DB (not after the candidate's own belief time),
+    # about the same event and by the same source, for each candidate belief.
+    # Sources are compared by ID rather than object identity: the candidate bdf may have been
+    # deserialized from an RQ job queue (pickled in a different process), so its DataSource
+    # objects are detached and won't be identical to the freshly-loaded ones in bdf_db.
+    beliefs = candidates[belief_keys].drop_duplicates().sort_values("belief_time")
+    beliefs_in_db = (
+        in_db[belief_keys]
+        .drop_duplicates()
+        .rename(columns={"belief_time": "most_recent_belief_time"})
+        .sort_values("most_recent_belief_time")
+    )
+    beliefs = pd.merge_asof(
+        beliefs,
+        beliefs_in_db,
+        left_on="belief_time",
+        right_on="most_recent_belief_time",
+        by=["event_start", "source_id"],
+        direction="backward",
+        allow_exact_matches=True,
+    )
 
-    # Keep whole probabilistic beliefs, not just the parts that changed
-    c = dropped.reset_index().set_index(["event_start", "source_id"])
-    d = a_df.set_index(["event_start", "source_id"])
-    bdf = d[d.index.isin(c.index)]
+    # Mark candidate rows that already occur in the most recent prior belief
+    candidates = candidates.merge(beliefs, on=belief_keys, how="left")
+    unchanged = (
+        candidates.merge(
+            in_db.rename(columns={"belief_time": "most_recent_belief_time"}),
+            on=[
+                "event_start",
+                "source_id",
+                "most_recent_belief_time",
+                "cumulative_probability",
+                "event_value",
+            ],
+            how="left",
+            indicator=True,
+        )["_merge"].to_numpy()
+        == "both"
+    )
 
-    bdf = (
-        bdf.reset_index()
-        .drop(columns=["source_id"], errors="ignore")
-        .set_index(["event_start", "belief_time", "source", "cumulative_probability"])
+    # Keep whole probabilistic beliefs, not just the parts that changed
+    belief_codes = candidates.groupby(belief_keys, sort=False).ngroup().to_numpy()
+    changed_per_belief = np.bincount(
+        belief_codes, weights=~unchanged, minlength=belief_codes.max() + 1
     )
-    return bdf
+    return bdf[changed_per_belief[belief_codes] > 0]
+
+
+def _to_comparable_frame(bdf: tb.BeliefsDataFrame) -> pd.DataFrame:
+    """Represent each belief by its UTC timing, source ID, cumulative probability and value,
+    so beliefs can be matched across timezones and sessions."""
+    source_codes, unique_sources = pd.factorize(bdf.index.get_level_values("source"))
+    # Sources not yet stored in the DB (without an ID) get a distinct negative ID
+    source_ids = np.array(
+        [
+            source.id if source.id is not None else -(i + 1)
+            for i, source in enumerate(unique_sources)
+        ],
+        dtype=np.int64,
+    )
+    return pd.DataFrame(
+        {
+            "event_start": _as_utc_ns(bdf.index.get_level_values("event_start")),
+            "source_id": source_ids[source_codes],
+            "belief_time": _as_utc_ns(bdf.index.get_level_values("belief_time")),
+            "cumulative_probability": bdf.index.get_level_values(
+                "cumulative_probability"
+            ).to_numpy(dtype=float),
+            "event_value": bdf["event_value"].to_numpy(dtype=float),
+        }
+    )
+
+
+def _as_utc_ns(index: pd.DatetimeIndex) -> pd.DatetimeIndex:
+    """Express datetimes in UTC and nanoseconds, so they can be compared regardless of their original timezone and unit."""
+    return index.tz_convert("UTC").as_unit("ns")
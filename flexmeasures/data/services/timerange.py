@@ -5,6 +5,7 @@ from datetime import datetime
 from sqlalchemy import func, select
 
 from flexmeasures.data import db
+from flexmeasures.data.models.belief_summaries import DailyBeliefSummary
 from flexmeasures.utils import time_utils
 
 
@@ -12,17 +13,18 @@ def get_timerange(sensor_ids: list[int]) -> tuple[datetime, datetime]:
     """Get the start and end of the least recent and most recent event, respectively.
 
     In case of no data, defaults to (now, now).
+    Reads the daily belief summaries rather than the beliefs themselves.
     """
-    from flexmeasures.data.models.time_series import Sensor, TimedBelief
+    from flexmeasures.data.models.time_series import Sensor
 
     least_recent_event_start_and_most_recent_event_end = db.session.execute(
         select(
-            func.min(TimedBelief.event_start),
-            func.max(TimedBelief.event_start + Sensor.event_resolution),
+            func.min(DailyBeliefSummary.min_event_start),
+            func.max(DailyBeliefSummary.max_event_start + Sensor.event_resolution),
         )
-        .select_from(TimedBelief)
-        .join(Sensor, TimedBelief.sensor_id == Sensor.id)
-        .filter(TimedBelief.sensor_id.in_(sensor_ids))
+        .select_from(DailyBeliefSummary)
+        .join(Sensor, DailyBeliefSummary.sensor_id == Sensor.id)
+        .filter(DailyBeliefSummary.sensor_id.in_(sensor_ids))
     ).one_or_none()
     if least_recent_event_start_and_most_recent_event_end == (None, None):
         # return now in case there is no data for any of the sensors
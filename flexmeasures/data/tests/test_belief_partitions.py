@@ -0,0 +1,137 @@
+import pandas as pd
+from sqlalchemy import event, func, select, text
+
+from flexmeasures.data.models.belief_rollups import BeliefRollup
+from flexmeasures.data.models.belief_summaries import DailyBeliefSummary
+from flexmeasures.data.models.time_series import TimedBelief
+from flexmeasures.data.services.belief_partitions import (
+    DEFAULT_PARTITION,
+    create_belief_partitions,
+    drop_belief_partitions,
+    get_belief_partitions,
+)
+
+
+def count_rows(db, table: str) -> int:
+    return db.session.execute(text(f"SELECT count(*) FROM {table}")).scalar()
+
+
+def test_create_and_drop_belief_partitions(fresh_db, add_market_prices_fresh_db):
+    """Check that creating partitions moves beliefs out of the default partition, and that dropping them removes beliefs, summaries and rollups."""
+    db = fresh_db
+    sensor = add_market_prices_fresh_db["epex_da"]
+    db.session.flush()
+    n_beliefs = count_rows(db, "timed_belief")
+    assert count_rows(db, DEFAULT_PARTITION) == n_beliefs > 0
+    n_later_beliefs = db.session.scalar(
+        select(func.count()).filter(
+            TimedBelief.event_start >= pd.Timestamp("2015-03-01T00:00+00")
+        )
+    )
+    bdf = TimedBelief.search(sensor)
+    summaries = db.session.scalars(select(DailyBeliefSummary)).all()
+
+    # Most market prices are about events from 31 December 2014 (UTC) to 3 January 2015, others are about events in 2016
+    partitions = create_belief_partitions(
+        db.session,
+        start=pd.Timestamp("2014-12-15T00:00+01"),
+        end=pd.Timestamp("2015-03-01T00:00+01"),
+    )
+    assert [partition.name for partition in partitions] == [
+        "timed_belief_y2014m12",
+        "timed_belief_y2015m01",
+        "timed_belief_y2015m02",
+    ]
+    assert get_belief_partitions(db.session) == partitions
+    assert count_rows(db, DEFAULT_PARTITION) == n_later_beliefs
+    assert (
+        count_rows(db, "timed_belief_y2014m12")
+        + count_rows(db, "timed_belief_y2015m01")
+        == n_beliefs - n_later_beliefs
+        > 0
+    )
+    pd.testing.assert_frame_equal(TimedBelief.search(sensor), bdf)
+    assert db.session.scalars(select(DailyBeliefSummary)).all() == summaries
+
+    # Existing partitions are skipped
+    assert (
+        create_belief_partitions(
+            db.session,
+            start=pd.Timestamp("2015-01-01T00:00+00"),
+            end=pd.Timestamp("2015-02-01T00:00+00"),
+        )
+        == []
+    )
+
+    # Only partitions that end before the given datetime are dropped
+    dropped_partitions = drop_belief_partitions(
+        db.session, before=pd.Timestamp("2015-01-31T00:00+00")
+    )
+    assert [partition.name for partition in dropped_partitions] == [
+        "timed_belief_y2014m12"
+    ]
+    assert (
+        count_rows(db, "timed_belief")
+        == count_rows(db, "timed_belief_y2015m01") + n_later_beliefs
+    )
+    start = pd.Timestamp("2015-01-01T00:00+00")
+    assert db.session.scalar(select(func.min(TimedBelief.event_start))) == start
+    assert db.session.scalar(select(func.min(DailyBeliefSummary.day))) == start
+    assert db.session.scalar(select(func.min(BeliefRollup.bucket_start))) == start
+
+    # Detached partitions are kept as standalone tables
+    drop_belief_partitions(
+        db.session, before=pd.Timestamp("2015-02-01T00:00+00"), detach_only=True
+    )
+    assert count_rows(db, "timed_belief") == n_later_beliefs
+    assert count_rows(db, "timed_belief_y2015m01") > 0
+    later = pd.Timestamp("2015-03-01T00:00+00")
+    assert db.session.scalar(select(func.min(DailyBeliefSummary.day))) >= later
+    assert db.session.scalar(select(func.min(BeliefRollup.bucket_start))) >= later
+
+
+def test_search_scans_only_relevant_partitions(fresh_db, add_market_prices_fresh_db):
+    """Check that searching beliefs only scans the partitions of the months in the search window."""
+    db = fresh_db
+    create_belief_partitions(
+        db.session,
+        start=pd.Timestamp("2014-12-01T00:00+00"),
+        end=pd.Timestamp("2015-02-01T00:00+00"),
+    )
+    sensors = [
+        add_market_prices_fresh_db["epex_da"],
+        add_market_prices_fresh_db["epex_da_production"],
+    ]
+
+    queries = []
+
+    def record_belief_queries(conn, cursor, statement, parameters, context, many):
+        if "FROM timed_belief" in statement:
+            queries.append((statement, parameters))
+
+    for search_kwargs in (
+        dict(sensors=sensors[0]),
+        dict(sensors=sensors, batch_sensors=True),
+        dict(sensors=sensors, most_recent_beliefs_only=True),
+    ):
+        queries.clear()
+        event.listen(db.engine, "before_cursor_execute", record_belief_queries)
+        try:
+            TimedBelief.search(
+                event_starts_after=pd.Timestamp("2015-01-02T00:00+01"),
+                event_ends_before=pd.Timestamp("2015-01-03T00:00+01"),
+                **search_kwargs,
+            )
+        finally:
+            event.remove(db.engine, "before_cursor_execute", record_belief_queries)
+        assert queries
+        for statement, parameters in queries:
+            plan = "\n".join(
+                row[0]
+                for row in db.session.connection().exec_driver_sql(
+                    "EXPLAIN " + statement, parameters
+                )
+            )
+            assert "timed_belief_y2015m01" in plan
+            assert "timed_belief_y2014m12" not in plan
+            assert DEFAULT_PARTITION not in plan
@@ -0,0 +1,235 @@
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import delete, select, text
+import timely_beliefs as tb
+
+from flexmeasures.data.models.belief_rollups import (
+    BeliefRollup,
+    _AGGREGATE_DAILY_SQL,
+    _AGGREGATE_HOURLY_SQL,
+)
+from flexmeasures.data.models.data_sources import DataSource
+from flexmeasures.data.models.time_series import Sensor, TimedBelief
+from flexmeasures.data.queries import beliefs as belief_queries
+from flexmeasures.data.utils import copy_beliefs_to_db, save_to_db
+
+
+def get_rollups(db, bucket_resolution: timedelta) -> set[tuple]:
+    return {
+        _round_floats(
+            (
+                r.sensor_id,
+                r.bucket_resolution,
+                r.bucket_start,
+                r.source_id,
+                r.event_count,
+                r.belief_count,
+                r.value_count,
+                r.value_sum,
+                r.min_value,
+                r.max_value,
+                r.cumulative_probability_sum,
+                r.last_value,
+                r.min_event_start,
+                r.max_event_start,
+                r.max_event_start_less_horizon,
+            )
+        )
+        for r in db.session.scalars(
+            select(BeliefRollup).filter(
+                BeliefRollup.bucket_resolution == bucket_resolution
+            )
+        ).all()
+    }
+
+
+def get_expected_rollups(db, aggregate_sql: str) -> set[tuple]:
+    """Roll up the beliefs (or the hourly rollups) from scratch."""
+    rows = db.session.execute(text(aggregate_sql)).all()
+    return {_round_floats(tuple(row)) for row in rows}
+
+
+def assert_rollups_are_up_to_date(db):
+    hourly_rollups = get_rollups(db, timedelta(hours=1))
+    assert hourly_rollups == get_expected_rollups(
+        db, _AGGREGATE_HOURLY_SQL.format(beliefs="timed_belief b")
+    )
+    assert get_rollups(db, timedelta(days=1)) == get_expected_rollups(
+        db, _AGGREGATE_DAILY_SQL.format(rollups="belief_rollup h")
+    )
+    return hourly_rollups
+
+
+def _round_floats(row: tuple) -> tuple:
+    return tuple(round(v, 6) if isinstance(v, float) else v for v in row)
+
+
+def test_rollups_are_maintained_on_write(
+    fresh_db, add_market_prices_fresh_db, setup_sources_fresh_db
+):
+    """Check that the hourly and daily rollups match the most recent beliefs after inserting, overwriting and deleting beliefs."""
+    db = fresh_db
+    sensor = add_market_prices_fresh_db["epex_da"]
+    source = setup_sources_fresh_db["Seita"]
+    assert len(assert_rollups_are_up_to_date(db)) > 0
+
+    # Record more recent beliefs about events spanning two days, including a NaN value
+    event_starts = pd.date_range(
+        "2015-01-01T20:00+01", "2015-01-02T04:00+01", freq="1h"
+    )
+    bdf = tb.BeliefsDataFrame(
+        pd.DataFrame(
+            {
+                "event_start": event_starts,
+                "belief_horizon": timedelta(hours=-1),
+                "source": source,
+                "event_value": [1.0] * (len(event_starts) - 1) + [float("nan")],
+            }
+        ),
+        sensor=sensor,
+    )
+    save_to_db(bdf, save_changed_beliefs_only=False)
+    assert_rollups_are_up_to_date(db)
+
+    # Record less recent beliefs, which should not affect the rollups
+    rollups_before = assert_rollups_are_up_to_date(db)
+    bdf = tb.BeliefsDataFrame(
+        pd.DataFrame(
+            {
+                "event_start": event_starts,
+                "belief_horizon": timedelta(hours=24),
+                "source": source,
+                "event_value": 1000.0,
+            }
+        ),
+        sensor=sensor,
+    )
+    save_to_db(bdf, save_changed_beliefs_only=False)
+    assert assert_rollups_are_up_to_date(db) == rollups_before
+
+    # Overwrite some of the more recent beliefs
+    bdf = tb.BeliefsDataFrame(
+        pd.DataFrame(
+            {
+                "event_start": pd.date_range(
+                    "2015-01-02T03:00+01", "2015-01-02T05:00+01", freq="1h"
+                ),
+                "belief_horizon": timedelta(hours=-1),
+                "source": source,
+                "event_value": [500.0, -500.0, 7.0],
+            }
+        ),
+        sensor=sensor,
+    )
+    copy_beliefs_to_db(bdf, allow_overwrite=True)
+    assert_rollups_are_up_to_date(db)
+
+    # Delete the most recent beliefs about a few hours, and all beliefs about a whole day
+    db.session.execute(
+        delete(TimedBelief).filter(
+            TimedBelief.sensor_id == sensor.id,
+            TimedBelief.event_start >= pd.Timestamp("2015-01-01T20:00+01"),
+            TimedBelief.event_start < pd.Timestamp("2015-01-01T23:00+01"),
+            TimedBelief.belief_horizon == timedelta(hours=-1),
+        )
+    )
+    assert_rollups_are_up_to_date(db)
+    db.session.execute(
+        delete(TimedBelief).filter(
+            TimedBelief.sensor_id == sensor.id,
+            TimedBelief.event_start >= pd.Timestamp("2015-01-03T00:00+00"),
+            TimedBelief.event_start < pd.Timestamp("2015-01-04T00:00+00"),
+        )
+    )
+    assert_rollups_are_up_to_date(db)
+
+
+@pytest.fixture(scope="module")
+def rolled_up_sensor(db, add_market_prices) -> Sensor:
+    """A sensor with two days of 15-minute data, recorded at several horizons, with a gap and NaN values."""
+    sensor = Sensor(
+        name="rolled up power",
+        generic_asset=add_market_prices["epex_da"].generic_asset,
+        unit="kW",
+        event_resolution=timedelta(minutes=15),
+        timezone="Europe/Amsterdam",
+    )
+    source = DataSource(name="meter", type="demo script")
+    db.session.add_all([sensor, source])
+    event_starts = pd.date_range(
+        "2025-01-01T00:00+00", "2025-01-03T00:00+00", freq="15min", inclusive="left"
+    )
+    event_starts = event_starts[
+        (event_starts < "2025-01-01T07:00+00") | (event_starts >= "2025-01-01T12:45+00")
+    ]
+    rng = np.random.default_rng(7)
+    values = rng.random(len(event_starts))
+    values[[5, 100]] = np.nan
+    for horizon, scale in ((timedelta(hours=1), 10), (timedelta(0), 1)):
+        bdf = tb.BeliefsDataFrame(
+            pd.DataFrame(
+                {
+                    "event_start": event_starts,
+                    "belief_horizon": horizon,
+                    "source": source,
+                    "event_value": values * scale,
+                }
+            ),
+            sensor=sensor,
+        )
+        save_to_db(bdf, save_changed_beliefs_only=False)
+    return sensor
+
+
+@pytest.mark.parametrize(
+    "start, end, resolution, uses_rollups",
+    [
+        # Daily rollups
+        ("2025-01-01T00:00+00", "2025-01-03T00:00+00", "P1D", True),
+        ("2025-01-01T00:00+00", "2025-01-03T00:00+00", timedelta(days=2), True),
+        # Hourly rollups (the window is not aligned with UTC days)
+        ("2025-01-01T00:00+01", "2025-01-03T00:00+01", "P1D", True),
+        ("2025-01-01T00:00+00", "2025-01-03T00:00+00", timedelta(hours=6), True),
+        ("2025-01-01T03:00+00", "2025-01-02T09:00+00", timedelta(hours=2), True),
+        # The first event in the window does not start a bucket
+        ("2025-01-01T08:00+00", "2025-01-02T12:00+00", timedelta(hours=6), False),
+        # Window not aligned with the rollups
+        ("2025-01-01T00:30+00", "2025-01-02T12:30+00", timedelta(hours=1), False),
+        # Resolution not a multiple of the rollup resolutions
+        ("2025-01-01T00:00+00", "2025-01-03T00:00+00", timedelta(minutes=30), False),
+    ],
+)
+def test_search_with_rollups_matches_resampling(
+    app, rolled_up_sensor, monkeypatch, start, end, resolution, uses_rollups
+):
+    """Check that searching beliefs at a coarse resolution gives the same result with or without the rollups."""
+    rolled_up_results = []
+
+    def spy(*args, **kwargs):
+        bdf = query_rolled_up_beliefs(*args, **kwargs)
+        rolled_up_results.append(bdf)
+        return bdf
+
+    query_rolled_up_beliefs = belief_queries.query_rolled_up_beliefs
+    monkeypatch.setattr(
+        "flexmeasures.data.models.time_series.query_rolled_up_beliefs", spy
+    )
+    search_kwargs = dict(
+        sensors=rolled_up_sensor,
+        event_starts_after=pd.Timestamp(start),
+        event_ends_before=pd.Timestamp(end),
+        resolution=resolution,
+        one_deterministic_belief_per_event_per_source=True,
+    )
+    bdf = TimedBelief.search(**search_kwargs)
+    assert (rolled_up_results[0] is not None) == uses_rollups
+
+    monkeypatch.setitem(app.config, "FLEXMEASURES_USE_BELIEF_ROLLUPS", False)
+    expected_bdf = TimedBelief.search(**search_kwargs)
+    assert len(rolled_up_results) == 1
+    assert not expected_bdf.empty
+    assert bdf.event_resolution == expected_bdf.event_resolution
+    pd.testing.assert_frame_equal(bdf, expected_bdf, check_freq=False)
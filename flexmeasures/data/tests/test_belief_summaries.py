@@ -0,0 +1,138 @@
+from datetime import timedelta
+
+import pandas as pd
+import pytest
+from sqlalchemy import delete, select, text
+import timely_beliefs as tb
+
+from flexmeasures.data.models.belief_summaries import (
+    DailyBeliefSummary,
+    _AGGREGATE_BELIEFS_SQL,
+)
+from flexmeasures.data.models.time_series import TimedBelief
+from flexmeasures.data.services.sensors import _get_sensor_stats
+from flexmeasures.data.utils import copy_beliefs_to_db, save_to_db
+
+
+def get_summaries(db) -> set[tuple]:
+    return {
+        _round_floats(
+            (
+                s.sensor_id,
+                s.source_id,
+                s.day,
+                s.belief_count,
+                s.value_count,
+                s.value_sum,
+                s.min_value,
+                s.max_value,
+                s.min_event_start,
+                s.max_event_start,
+                s.last_recorded,
+            )
+        )
+        for s in db.session.scalars(select(DailyBeliefSummary)).all()
+    }
+
+
+def get_expected_summaries(db) -> set[tuple]:
+    """Summarize the beliefs from scratch."""
+    rows = db.session.execute(
+        text(_AGGREGATE_BELIEFS_SQL.format(beliefs="timed_belief", join=""))
+    ).all()
+    return {_round_floats(tuple(row)) for row in rows}
+
+
+def _round_floats(row: tuple) -> tuple:
+    return tuple(round(v, 6) if isinstance(v, float) else v for v in row)
+
+
+def test_summaries_are_maintained_on_write(
+    fresh_db, add_market_prices_fresh_db, setup_sources_fresh_db
+):
+    """Check that the daily belief summaries match the beliefs after inserting, overwriting and deleting beliefs."""
+    db = fresh_db
+    sensor = add_market_prices_fresh_db["epex_da"]
+    source = setup_sources_fresh_db["Seita"]
+    assert get_summaries(db) == get_expected_summaries(db)
+    assert len(get_summaries(db)) > 0
+
+    # Record updated beliefs (with a different horizon) about events spanning two days, including a NaN value
+    event_starts = pd.date_range(
+        "2015-01-01T20:00+01", "2015-01-02T04:00+01", freq="1h"
+    )
+    bdf = tb.BeliefsDataFrame(
+        pd.DataFrame(
+            {
+                "event_start": event_starts,
+                "belief_horizon": timedelta(hours=-1),
+                "source": source,
+                "event_value": [1.0] * (len(event_starts) - 1) + [float("nan")],
+            }
+        ),
+        sensor=sensor,
+    )
+    save_to_db(bdf, save_changed_beliefs_only=False)
+    assert get_summaries(db) == get_expected_summaries(db)
+
+    # Overwrite some of these beliefs, and add a new one
+    bdf = tb.BeliefsDataFrame(
+        pd.DataFrame(
+            {
+                "event_start": pd.date_range(
+                    "2015-01-02T03:00+01", "2015-01-02T05:00+01", freq="1h"
+                ),
+                "belief_horizon": timedelta(hours=-1),
+                "source": source,
+                "event_value": [500.0, -500.0, 7.0],
+            }
+        ),
+        sensor=sensor,
+    )
+    copy_beliefs_to_db(bdf, allow_overwrite=True)
+    assert get_summaries(db) == get_expected_summaries(db)
+
+    # Delete the beliefs about a whole day, and about part of another day
+    db.session.execute(
+        delete(TimedBelief).filter(
+            TimedBelief.sensor_id == sensor.id,
+            TimedBelief.event_start >= pd.Timestamp("2015-01-02T00:00+00"),
+            TimedBelief.event_start < pd.Timestamp("2015-01-03T12:00+00"),
+        )
+    )
+    assert get_summaries(db) == get_expected_summaries(db)
+
+
+@pytest.mark.parametrize(
+    "event_start_time, event_end_time",
+    [
+        (None, None),
+        ("2015-01-01T10:00+01:00", None),
+        (None, "2015-01-02T10:00+01:00"),
+        ("2015-01-01T10:00+01:00", "2015-01-03T10:00+01:00"),
+        ("2015-01-02T00:00+00:00", "2015-01-03T00:00+00:00"),
+        ("2015-01-02T10:00+01:00", "2015-01-02T12:00+01:00"),
+        ("2015-01-02T10:00", "2015-01-03T12:00"),
+    ],
+)
+def test_sensor_stats_from_summaries(
+    db, add_market_prices, monkeypatch, event_start_time, event_end_time
+):
+    """Check that sensor stats computed from the daily belief summaries match those computed from the beliefs."""
+    sensor = add_market_prices["epex_da"]
+    stats = _get_sensor_stats(sensor, event_end_time, event_start_time, True)
+    assert stats
+
+    # Compute the stats from the beliefs only
+    monkeypatch.setattr(
+        "flexmeasures.data.services.sensors._split_stats_window",
+        lambda start, end: dict(summaries=[], beliefs=[(start, end)]),
+    )
+    expected_stats = _get_sensor_stats(sensor, event_end_time, event_start_time, True)
+    assert stats.keys() == expected_stats.keys()
+    for source, source_stats in stats.items():
+        for key, value in source_stats.items():
+            if isinstance(value, float):
+                assert value == pytest.approx(expected_stats[source][key])
+            else:
+                assert value == expected_stats[source][key]
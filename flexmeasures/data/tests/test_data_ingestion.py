@@ -1,9 +1,15 @@
 from __future__ import annotations
 
+import pandas as pd
+from timely_beliefs import utils as tb_utils
+
 from flexmeasures.data.services.data_ingestion import (
     add_beliefs_to_db_and_enqueue_forecasting_jobs,
 )
-from flexmeasures.data.utils import SAVE_TO_DB_SUCCESS_BUT_NOTHING_NEW
+from flexmeasures.data.utils import (
+    SAVE_TO_DB_SUCCESS,
+    SAVE_TO_DB_SUCCESS_BUT_NOTHING_NEW,
+)
 from flexmeasures.tests.utils import get_test_sensor
 
 
@@ -19,3 +25,24 @@ def test_ingestion_service_accepts_beliefs_data_frame(setup_beliefs, db):
     )
 
     assert status == SAVE_TO_DB_SUCCESS_BUT_NOTHING_NEW
+
+
+def test_ingestion_service_with_bulk_copy(setup_beliefs, db, app, monkeypatch):
+    monkeypatch.setitem(
+        app.config, "FLEXMEASURES_BULK_COPY_SENSOR_DATA_INGESTION", True
+    )
+    sensor = get_test_sensor(db)
+    bdf = sensor.search_beliefs(source="ENTSO-E", most_recent_beliefs_only=False).iloc[
+        :2
+    ]
+    num_beliefs_before = len(sensor.search_beliefs(most_recent_beliefs_only=False))
+    bdf = tb_utils.replace_multi_index_level(
+        bdf, "belief_time", bdf.belief_times - pd.Timedelta("1h")
+    )
+    bdf["event_value"] += 1
+
+    status = add_beliefs_to_db_and_enqueue_forecasting_jobs(data=bdf)
+
+    assert status == SAVE_TO_DB_SUCCESS
+    num_beliefs_after = len(sensor.search_beliefs(most_recent_beliefs_only=False))
+    assert num_beliefs_after == num_beliefs_before + 2
@@ -15,7 +15,7 @@ from flexmeasures.data.queries.utils import (
     multiply_dataframe_with_deterministic_beliefs,
     simplify_index,
 )
-from flexmeasures.tests.utils import get_test_sensor
+from flexmeasures.tests.utils import QueryCounter, get_test_sensor
 
 
 @pytest.mark.parametrize(
@@ -457,3 +457,117 @@ def test_user_source_ids_criterion(db, setup_markets, setup_roles_users):
     assert user_1 in returned_sources
     assert script in returned_sources, "non-user sources should be unaffected"
     assert user_2 not in returned_sources, "other users' data should be ignored"
+
+
+@pytest.mark.parametrize(
+    "search_kwargs",
+    [
+        dict(most_recent_beliefs_only=False),
+        dict(most_recent_beliefs_only=True),
+        dict(most_recent_beliefs_only=True, most_recent_events_only=True),
+        dict(one_deterministic_belief_per_event=True),
+        dict(horizons_at_least=timedelta(hours=1)),
+        dict(
+            event_starts_after=datetime(2015, 1, 1, 6, tzinfo=pytz.utc),
+            event_ends_before=datetime(2015, 1, 1, 12, tzinfo=pytz.utc),
+            resolution=timedelta(hours=1),
+        ),
+        dict(source_types=["demo script"]),
+    ],
+)
+def test_batched_search_matches_search_per_sensor(
+    db, setup_test_data, setup_beliefs, search_kwargs
+):
+    """Check that searching multiple sensors in one query yields the same beliefs as searching them one by one."""
+    sensors = [
+        get_test_sensor(db),
+        setup_test_data["wind-asset-1"].sensors[0],
+        setup_test_data["solar-asset-1"].sensors[0],
+        *db.session.scalars(
+            select(Sensor).filter(Sensor.name.in_(["irradiance", "wind speed"]))
+        ).all(),
+    ]
+    with QueryCounter(db.session.connection()) as counter_per_sensor:
+        bdfs_per_sensor = TimedBelief.search(
+            sensors, sum_multiple=False, batch_sensors=False, **search_kwargs
+        )
+    with QueryCounter(db.session.connection()) as counter_batched:
+        bdfs_batched = TimedBelief.search(
+            sensors, sum_multiple=False, batch_sensors=True, **search_kwargs
+        )
+    assert counter_batched.count < counter_per_sensor.count
+    assert list(bdfs_batched.keys()) == list(bdfs_per_sensor.keys())
+    for sensor, bdf in bdfs_per_sensor.items():
+        pd.testing.assert_frame_equal(
+            pd.DataFrame(bdfs_batched[sensor]).sort_index(),
+            pd.DataFrame(bdf).sort_index(),
+        )
+        assert bdfs_batched[sensor].event_resolution == bdf.event_resolution
+
+
+@pytest.mark.parametrize("probabilistic", [False, True])
+@pytest.mark.parametrize("use_latest_version_per_event", [True, False])
+def test_one_deterministic_belief_per_event_selected_in_sql(
+    db, setup_test_data, monkeypatch, probabilistic, use_latest_version_per_event
+):
+    """Check that dropping losing beliefs in the database yields the same selection as doing it all in pandas.
+
+    Beliefs come from multiple sources, including several versions of the same source (some tied),
+    and each source forms beliefs at multiple horizons.
+    """
+    rng = np.random.default_rng(3)
+    asset = setup_test_data["wind-asset-1"]
+    sensor = Sensor(
+        name=f"forecasts with many versions {probabilistic} {use_latest_version_per_event}",
+        generic_asset=asset,
+        unit="kW",
+        event_resolution=timedelta(hours=1),
+    )
+    sources = [
+        DataSource(name="forecaster", type="forecaster", model="M", version=version)
+        for version in [None, "0.1.0", "1.0.0", "1.0.0"]
+    ] + [
+        DataSource(name="other forecaster", type="forecaster", version=version)
+        for version in ["0.2.0", "1.0.0"]
+    ]
+    db.session.add_all([sensor, *sources])
+    event_starts = pd.date_range("2025-01-01", periods=24, freq="1h", tz="UTC")
+    cps = [0.1, 0.5, 0.9] if probabilistic else [0.5]
+    for source in sources:
+        for event_start in event_starts[rng.random(len(event_starts)) < 0.7]:
+            for horizon in rng.choice([0, 1, 2, 6, 24], size=2, replace=False):
+                value = float(rng.random())
+                for i, cp in enumerate(cps):
+                    db.session.add(
+                        TimedBelief(
+                            sensor=sensor,
+                            source=source,
+                            event_start=event_start,
+                            belief_horizon=timedelta(hours=int(horizon)),
+                            cumulative_probability=cp,
+                            event_value=value + i,
+                        )
+                    )
+    db.session.flush()
+
+    search_kwargs = dict(
+        sensors=sensor,
+        event_starts_after=event_starts[0],
+        event_ends_before=event_starts[-1] + timedelta(hours=1),
+        one_deterministic_belief_per_event=True,
+        use_latest_version_per_event=use_latest_version_per_event,
+    )
+    bdf_selected_in_sql = TimedBelief.search(**search_kwargs)
+
+    # Skip the selection in the database
+    monkeypatch.setattr(
+        "flexmeasures.data.queries.beliefs._select_winning_beliefs_per_event",
+        lambda subq, *args, **kwargs: select(*subq.c),
+    )
+    bdf_selected_in_pandas = TimedBelief.search(**search_kwargs)
+
+    assert not bdf_selected_in_sql.empty
+    pd.testing.assert_frame_equal(
+        pd.DataFrame(bdf_selected_in_sql).sort_index(),
+        pd.DataFrame(bdf_selected_in_pandas).sort_index(),
+    )
@@ -0,0 +1,117 @@
+from datetime import timedelta
+
+import pandas as pd
+import pytest
+
+from flexmeasures.data.models.planning.storage import StorageScheduler
+from flexmeasures.data.services.scheduling import (
+    create_batch_scheduling_job,
+    make_batch_schedule,
+)
+from flexmeasures.data.tests.utils import exception_reporter
+from flexmeasures.utils.job_utils import work_on_rq
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_batch_scheduling_job(
+    fresh_db,
+    app,
+    add_battery_assets_fresh_db,
+    setup_fresh_test_data,
+    add_market_prices_fresh_db,
+    processes,
+):
+    """Schedule two batteries in one batch job, and check that the saved schedules
+    equal the schedules computed by their own schedulers."""
+    start = pd.Timestamp("2015-01-02").tz_localize("Europe/Amsterdam")
+    end = pd.Timestamp("2015-01-03").tz_localize("Europe/Amsterdam")
+    resolution = timedelta(minutes=15)
+    flex_model = {"roundtrip-efficiency": "98%", "storage-efficiency": 0.999}
+    batteries = [
+        next(s for s in add_battery_assets_fresh_db[name].sensors if s.name == "power")
+        for name in ("Test battery", "Test small battery")
+    ]
+
+    job = create_batch_scheduling_job(
+        [
+            dict(
+                asset_or_sensor=battery,
+                start=start,
+                end=end,
+                resolution=resolution,
+                flex_model=flex_model,
+            )
+            for battery in batteries
+        ],
+        belief_time=start,
+        processes=processes,
+    )
+    assert job.meta["asset_or_sensors"] == [
+        {"id": battery.id, "class": "Sensor"} for battery in batteries
+    ]
+    work_on_rq(app.queues["scheduling"], exc_handler=exception_reporter)
+    assert job.get_status() == "finished"
+    assert [result["num-beliefs"] for result in job.result] == [96, 96]
+
+    for battery in batteries:
+        scheduler = StorageScheduler(
+            asset_or_sensor=battery,
+            start=start,
+            end=end,
+            resolution=resolution,
+            belief_time=start,
+            flex_model=flex_model,
+        )
+        scheduler.collect_flex_config()
+        expected_schedule = scheduler.compute()
+        saved_schedule = battery.search_beliefs(
+            event_starts_after=start,
+            event_ends_before=end,
+            source_types=["scheduler"],
+        )
+        # Consumption is saved as negative values
+        pd.testing.assert_series_equal(
+            -saved_schedule["event_value"].droplevel([1, 2, 3]),
+            expected_schedule,
+            check_names=False,
+            check_freq=False,
+            check_series_type=False,
+        )
+
+
+def test_batch_scheduling_records_failed_requests(
+    db, app, add_battery_assets, add_market_prices
+):
+    """A failing scheduling request does not stop the other requests in the batch."""
+    start = pd.Timestamp("2015-01-02").tz_localize("Europe/Amsterdam")
+    end = pd.Timestamp("2015-01-03").tz_localize("Europe/Amsterdam")
+    battery = next(
+        s for s in add_battery_assets["Test battery"].sensors if s.name == "power"
+    )
+    battery_ref = {"id": battery.id, "class": "Sensor"}
+
+    results = make_batch_schedule(
+        [
+            dict(
+                asset_or_sensor=battery_ref,
+                start=start,
+                end=end,
+                resolution=timedelta(minutes=15),
+                flex_model={"soc-at-start": "0.5 MWh"},
+                flex_context=battery.generic_asset.flex_context,
+            ),
+            dict(
+                asset_or_sensor=battery_ref,
+                start=end,
+                end=start,
+                flex_model={"soc-at-start": "0.5 MWh"},
+                flex_context=battery.generic_asset.flex_context,
+            ),
+        ],
+        belief_time=start,
+        processes=1,
+        dry_run=True,
+    )
+    assert results[0]["num-beliefs"] == 0  # dry run
+    assert "error" not in results[0]
+    assert "cannot be after end" in results[1]["error"]
@@ -1,9 +1,15 @@
+import numpy as np
 import pandas as pd
-from timely_beliefs import BeliefsDataFrame, utils as tb_utils
+from timely_beliefs import BeliefsDataFrame, Sensor, utils as tb_utils
 import pytest
 from sqlalchemy.exc import IntegrityError
 
-from flexmeasures.data.utils import save_to_db
+from flexmeasures.data.utils import (
+    SAVE_TO_DB_SUCCESS,
+    SAVE_TO_DB_SUCCESS_BUT_NOTHING_NEW,
+    copy_beliefs_to_db,
+    save_to_db,
+)
 from flexmeasures.data.models.data_sources import DataSource
 from flexmeasures.data.models.time_series import TimedBelief
 from flexmeasures.data.services.time_series import (
@@ -331,6 +337,230 @@ def test_drop_unchanged_beliefs_preserves_index_names_with_mixed_groups(
     assert result.event_starts[0] == event_start_new
 
 
+def _drop_unchanged_beliefs_per_belief(
+    bdf: BeliefsDataFrame, bdf_db: BeliefsDataFrame
+) -> BeliefsDataFrame:
+    """Reference implementation, comparing each candidate belief to the DB separately."""
+    keep = []
+    for (event_start, belief_time, source), belief in bdf.groupby(
+        level=["event_start", "belief_time", "source"]
+    ):
+        in_db = bdf_db[
+            (bdf_db.sources.map(lambda s: s.id) == source.id)
+            & (bdf_db.event_starts == event_start)
+            & (bdf_db.belief_times <= belief_time)
+        ]
+        rows_in_db = set()
+        if not in_db.empty:
+            in_db = in_db[in_db.belief_times == in_db.belief_times.max()]
+            rows_in_db = set(
+                zip(
+                    in_db.index.get_level_values("cumulative_probability"),
+                    in_db["event_value"],
+                )
+            )
+        rows = set(
+            zip(
+                belief.index.get_level_values("cumulative_probability"),
+                belief["event_value"],
+            )
+        )
+        if not rows <= rows_in_db:
+            keep.extend(belief.index)
+    return bdf[bdf.index.isin(keep)]
+
+
+@pytest.mark.parametrize("probabilistic", [False, True])
+def test_drop_unchanged_beliefs_matches_comparison_per_belief(probabilistic):
+    """Dropping unchanged beliefs in one go should match comparing each belief to the DB separately."""
+    rng = np.random.default_rng(42)
+    sensor = Sensor("test sensor", event_resolution=pd.Timedelta("1h"))
+    sources = [
+        DataSource(id=i, name=f"source {i}", type="demo script") for i in range(1, 4)
+    ]
+    event_starts = pd.date_range("2021-03-28", periods=12, freq="1h", tz="UTC")
+    belief_times = pd.date_range("2021-03-27", periods=4, freq="2h", tz="UTC")
+    cps = [0.1587, 0.5, 0.8413] if probabilistic else [0.5]
+
+    def make_bdf(n_beliefs: int, values: list[float]) -> BeliefsDataFrame:
+        beliefs = {
+            (
+                event_starts[rng.integers(len(event_starts))],
+                belief_times[rng.integers(len(belief_times))],
+                sources[rng.integers(len(sources))],
+            )
+            for _ in range(n_beliefs)
+        }
+        return BeliefsDataFrame(
+            pd.DataFrame(
+                [
+                    (*belief, cp, values[rng.integers(len(values))])
+                    for belief in beliefs
+                    for cp in cps
+                ],
+                columns=[
+                    "event_start",
+                    "belief_time",
+                    "source",
+                    "cumulative_probability",
+                    "event_value",
+                ],
+            ),
+            sensor=sensor,
+        )
+
+    # Few distinct values, so many candidate beliefs are unchanged
+    bdf_db = make_bdf(80, values=[1.0, 2.0])
+    bdf = make_bdf(80, values=[1.0, 2.0])
+    # Express the candidates in another timezone, which should not matter
+    bdf = tb_utils.replace_multi_index_level(
+        bdf, "event_start", bdf.event_starts.tz_convert("Europe/Amsterdam")
+    )
+
+    expected = _drop_unchanged_beliefs_per_belief(bdf, bdf_db)
+    assert 0 < len(expected) < len(bdf)
+    result = _drop_unchanged_beliefs_compared_to_db(bdf, bdf_db=bdf_db)
+    pd.testing.assert_frame_equal(result.sort_index(), expected.sort_index())
+
+
+@pytest.mark.parametrize("allow_overwrite", [False, True])
+def test_save_to_db_with_bulk_copy(
+    setup_beliefs, db, app, monkeypatch, allow_overwrite
+):
+    """Beliefs saved with COPY should be found again exactly as they were, both for new and unchanged beliefs.
+
+    We cover ex-ante and ex-post beliefs, fractional seconds and a DST transition,
+    and a new source, which should be added to the database along the way.
+    """
+    monkeypatch.setitem(
+        app.config, "FLEXMEASURES_ALLOW_DATA_OVERWRITE", allow_overwrite
+    )
+    sensor = get_test_sensor(db)
+    source = DataSource(name="Bulk copy source", type="demo script")
+    event_starts = pd.date_range(
+        "2021-03-28 01:00", periods=3, freq="1h", tz="Europe/Amsterdam"
+    )
+    belief_horizons = [
+        pd.Timedelta(days=1, hours=2),
+        pd.Timedelta(seconds=1.5, microseconds=1),
+        pd.Timedelta(hours=-1),
+        pd.Timedelta(days=-1, hours=-1),
+    ]
+    bdf = BeliefsDataFrame(
+        [
+            TimedBelief(
+                sensor=sensor,
+                source=source,
+                event_start=event_start,
+                belief_horizon=belief_horizon,
+                event_value=i * 10.0 + j + 0.1,
+            )
+            for i, event_start in enumerate(event_starts)
+            for j, belief_horizon in enumerate(belief_horizons)
+        ]
+    )
+
+    status = save_to_db(bdf, save_changed_beliefs_only=False, bulk_copy=True)
+    assert status == SAVE_TO_DB_SUCCESS
+    assert source.id is not None
+
+    bdf_db = sensor.search_beliefs(source=source, most_recent_beliefs_only=False)
+    assert len(bdf_db) == len(bdf)
+    pd.testing.assert_series_equal(
+        bdf_db.convert_index_from_belief_time_to_horizon()
+        .reset_index()
+        .set_index(["event_start", "belief_horizon"])["event_value"]
+        .sort_index(),
+        bdf.convert_index_from_belief_time_to_horizon()
+        .reset_index()
+        .set_index(["event_start", "belief_horizon"])["event_value"]
+        .sort_index(),
+        check_index_type=False,
+    )
+
+    # Saving the ex-ante beliefs once more should honour save_changed_beliefs_only
+    ex_ante_bdf = bdf[bdf.belief_horizons > pd.Timedelta(0)]
+    status = save_to_db(ex_ante_bdf, bulk_copy=True)
+    assert status == SAVE_TO_DB_SUCCESS_BUT_NOTHING_NEW
+
+    # Saving changed values for the same beliefs should overwrite them, if allowed
+    changed_bdf = ex_ante_bdf.copy()
+    changed_bdf["event_value"] += 1
+    if allow_overwrite:
+        status = save_to_db(
+            changed_bdf, save_changed_beliefs_only=False, bulk_copy=True
+        )
+        assert status == SAVE_TO_DB_SUCCESS
+        bdf_db = sensor.search_beliefs(
+            source=source,
+            horizons_at_least=pd.Timedelta(0),
+            most_recent_beliefs_only=False,
+        )
+        assert sorted(bdf_db["event_value"]) == sorted(changed_bdf["event_value"])
+    else:
+        with pytest.raises(IntegrityError):
+            with db.session.begin_nested():
+                save_to_db(changed_bdf, save_changed_beliefs_only=False, bulk_copy=True)
+
+
+def test_save_nan_values_with_bulk_copy(setup_beliefs, db):
+    """Beliefs with NaN values should be stored the same way with COPY as through the ORM."""
+    sensor = get_test_sensor(db)
+    event_starts = pd.date_range(
+        "2021-03-29 00:00", periods=4, freq="1h", tz="Europe/Amsterdam"
+    )
+    values = [1.0, np.nan, 3.0, np.nan]
+    stored_values = {}
+    for bulk_copy in (False, True):
+        sources = {
+            via: DataSource(name=f"NaN source {via} {bulk_copy}", type="demo script")
+            for via in ("save_to_db", "direct")
+        }
+        bdfs = {
+            via: BeliefsDataFrame(
+                [
+                    TimedBelief(
+                        sensor=sensor,
+                        source=source,
+                        event_start=event_start,
+                        belief_horizon=pd.Timedelta(hours=1),
+                        event_value=value,
+                    )
+                    for event_start, value in zip(event_starts, values)
+                ]
+            )
+            for via, source in sources.items()
+        }
+
+        # save_to_db drops NaN values
+        save_to_db(
+            bdfs["save_to_db"], save_changed_beliefs_only=False, bulk_copy=bulk_copy
+        )
+
+        # Saving them directly stores them
+        if bulk_copy:
+            copy_beliefs_to_db(bdfs["direct"])
+        else:
+            TimedBelief.add_to_session(db.session, bdfs["direct"])
+        db.session.flush()
+
+        stored_values[bulk_copy] = {
+            via: sensor.search_beliefs(source=source, most_recent_beliefs_only=False)[
+                "event_value"
+            ].tolist()
+            for via, source in sources.items()
+        }
+
+    assert stored_values[True]["save_to_db"] == [1.0, 3.0]
+    np.testing.assert_array_equal(stored_values[True]["direct"], values)
+    np.testing.assert_array_equal(
+        stored_values[True]["save_to_db"], stored_values[False]["save_to_db"]
+    )
+    np.testing.assert_array_equal(
+        stored_values[True]["direct"], stored_values[False]["direct"]
+    )
+
+
 def test_save_exact_duplicate_deterministic_belief(setup_beliefs, db):
     """Saving an exact duplicate deterministic belief should succeed without errors."""
 
@@ -391,8 +621,9 @@ def test_save_duplicate_probabilistic_belief_with_different_cp(
     assert len(bdf_after) >= len(bdf)
 
 
+@pytest.mark.parametrize("bulk_copy", [False, True])
 def test_save_deterministic_belief_with_different_event_value_raises_error(
-    setup_beliefs, db
+    setup_beliefs, db, bulk_copy
 ):
     """Saving a deterministic belief with same event_start/source/belief_time but different event_value should raise an error.
 
@@ -419,15 +650,16 @@ def test_save_deterministic_belief_with_different_event_value_raises_error(
 
     # Try to save this modified belief - it should raise an IntegrityError, because we're trying to replace an existing belief
     with pytest.raises(IntegrityError):
-        save_to_db(modified_bdf, save_changed_beliefs_only=False)
+        save_to_db(modified_bdf, save_changed_beliefs_only=False, bulk_copy=bulk_copy)
         db.session.flush()  # Force the error to be raised
 
     # Rollback the session to clean up after the failed transaction
     db.session.rollback()
 
 
+@pytest.mark.parametrize("bulk_copy", [False, True])
 def test_save_probabilistic_belief_with_different_event_value_raises_error(
-    db, setup_probabilistic_beliefs
+    db, setup_probabilistic_beliefs, bulk_copy
 ):
     """Saving a probabilistic belief with same event_start/source/belief_time/cp but different event_value should raise an error.
 
@@ -449,7 +681,7 @@ def test_save_probabilistic_belief_with_different_event_value_raises_error(
 
     # Try to save this modified belief - it should raise an IntegrityError
     with pytest.raises(IntegrityError):
-        save_to_db(modified_bdf, save_changed_beliefs_only=False)
+        save_to_db(modified_bdf, save_changed_beliefs_only=False, bulk_copy=bulk_copy)
         db.session.flush()  # Force the error to be raised
 
     # Rollback the session to clean up after the failed transaction
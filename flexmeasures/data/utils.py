@@ -8,13 +8,22 @@ from alembic.config import Config as AlembicConfig
 from alembic.runtime.migration import MigrationContext
 from alembic.script import ScriptDirectory
 from dataclasses import dataclass
+from io import StringIO
+
 from flask import current_app
+import numpy as np
+import pandas as pd
 from timely_beliefs import BeliefsDataFrame, BeliefsSeries
+import sqlalchemy as sa
 from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import INTERVAL, TIMESTAMP, insert
 
 from flexmeasures.data import db
 from flexmeasures.data.models.data_sources import DataSource
 from flexmeasures.data.models.time_series import TimedBelief, Sensor
+from flexmeasures.data.services.sensor_data_cache import (
+    invalidate_sensor_data_cache_for_beliefs,
+)
 from flexmeasures.data.services.time_series import drop_unchanged_beliefs
 
 
@@ -33,6 +42,7 @@ SAVE_TO_DB_SUCCESS_WITH_CHANGES_STATUSES = (
     SAVE_TO_DB_SUCCESS_WITH_UNCHANGED_BELIEFS_SKIPPED,
 )
 TEMPLATE_COPY_GUIDANCE_PREFIX = "Copy this"
+BULK_COPY_CHUNK_SIZE = 100_000  # number of beliefs streamed per COPY call
 
 
 @dataclass(frozen=True)
@@ -149,6 +159,7 @@ def save_to_db(
     data: BeliefsDataFrame | BeliefsSeries | list[BeliefsDataFrame | BeliefsSeries],
     bulk_save_objects: bool = True,
     save_changed_beliefs_only: bool = True,
+    bulk_copy: bool = False,
 ) -> str:
     """Save the timed beliefs to the database.
 
@@ -177,6 +188,8 @@ def save_to_db(
                               https://docs.sqlalchemy.org/orm/persistence_techniques.html#bulk-operations-caveats
     :param save_changed_beliefs_only: if True, unchanged beliefs are skipped (updated beliefs are only stored if they represent changed beliefs)
                                       if False, all updated beliefs are stored
+    :param bulk_copy: if True, beliefs are streamed into the database with PostgreSQL's COPY command (see copy_beliefs_to_db),
+                      which is much faster for large amounts of beliefs, and bypasses the ORM entirely
     :returns: status string, one of the following:
               - SAVE_TO_DB_SUCCESS: all beliefs were saved
               - SAVE_TO_DB_SUCCESS_WITH_UNCHANGED_BELIEFS_SKIPPED: not all beliefs represented a state change
@@ -223,16 +236,21 @@ def save_to_db(
                 continue
 
         current_app.logger.info("SAVING DATA  ...")
-        TimedBelief.add_to_session(
-            session=db.session,
-            beliefs_data_frame=timed_values,
-            bulk_save_objects=bulk_save_objects,
-            allow_overwrite=current_app.config.get(
-                "FLEXMEASURES_ALLOW_DATA_OVERWRITE", False
-            ),
+        allow_overwrite = current_app.config.get(
+            "FLEXMEASURES_ALLOW_DATA_OVERWRITE", False
         )
+        if bulk_copy:
+            copy_beliefs_to_db(timed_values, allow_overwrite=allow_overwrite)
+        else:
+            TimedBelief.add_to_session(
+                session=db.session,
+                beliefs_data_frame=timed_values,
+                bulk_save_objects=bulk_save_objects,
+                allow_overwrite=allow_overwrite,
+            )
         values_saved += len(timed_values)
         current_app.logger.info(f"SAVED {len(timed_values)} values TO DB.")
+        invalidate_sensor_data_cache_for_beliefs(timed_values)
     # Flush to bring up potential unique violations (due to attempting to replace beliefs)
     db.session.flush()
 
@@ -241,6 +259,124 @@ def save_to_db(
     return status
 
 
+def copy_beliefs_to_db(bdf: BeliefsDataFrame, allow_overwrite: bool = False) -> int:
+    """Stream timed beliefs into the database, using PostgreSQL's COPY command.
+
+    The beliefs are first copied into a temporary staging table, in chunks of BULK_COPY_CHUNK_SIZE,
+    and then moved into the timed_belief table with a single INSERT ... SELECT statement.
+    This avoids creating an ORM object (and a bound parameter) per belief,
+    which makes it the preferred way to save (tens of) millions of beliefs.
+
+    Note: This function does not commit, and does not drop unchanged beliefs (see save_to_db for that).
+    Like TimedBelief.add_to_session, it does add new data sources to the session, and flushes them to obtain their IDs.
+
+    :param bdf:             BeliefsDataFrame to be saved
+    :param allow_overwrite: if True, the event values of beliefs that are already stored are updated
+                            if False, attempting to replace a belief raises an IntegrityError
+    :returns:               the number of beliefs that were inserted or updated
+    """
+    if bdf.empty:
+        return 0
+    source_ids = _get_source_ids(bdf)
+    # Express timing in integer microseconds, which PostgreSQL converts back without loss of precision
+    event_starts = bdf.index.get_level_values("event_start").tz_convert("UTC")
+    belief_horizons = bdf.belief_horizons.as_unit("ns").asi8
+    ns_per_day = 24 * 60 * 60 * 10**9
+    belief_horizon_days = (
+        belief_horizons // ns_per_day
+    )  # like timedelta.days, so negative for ex-post beliefs
+    df = pd.DataFrame(
+        {
+            "event_start": event_starts.as_unit("ns").asi8 // 1000,
+            "belief_horizon_days": belief_horizon_days,
+            "belief_horizon_us": (belief_horizons - belief_horizon_days * ns_per_day)
+            // 1000,
+            "cumulative_probability": bdf.index.get_level_values(
+                "cumulative_probability"
+            ).to_numpy(dtype=float),
+            "event_value": bdf["event_value"].to_numpy(dtype=float),
+            "source_id": source_ids,
+        }
+    )
+
+    staging_table = sa.Table(
+        "timed_belief_staging",
+        sa.MetaData(),
+        sa.Column("event_start", sa.BigInteger),
+        sa.Column("belief_horizon_days", sa.Integer),
+        sa.Column("belief_horizon_us", sa.BigInteger),
+        sa.Column("cumulative_probability", sa.Float),
+        sa.Column("event_value", sa.Float),
+        sa.Column("source_id", sa.Integer),
+        prefixes=["TEMPORARY"],
+        postgresql_on_commit="DROP",
+    )
+    connection = db.session.connection()
+    staging_table.create(connection)
+    with connection.connection.cursor() as cursor:
+        for start in range(0, len(df), BULK_COPY_CHUNK_SIZE):
+            buffer = StringIO()
+            # Write NaN explicitly, because COPY reads empty fields as NULL, which event_value does not allow
+            df.iloc[start : start + BULK_COPY_CHUNK_SIZE].to_csv(
+                buffer, header=False, index=False, na_rep="NaN"
+            )
+            buffer.seek(0)
+            cursor.copy_expert(
+                f"COPY {staging_table.name} ({', '.join(df.columns)}) FROM STDIN WITH (FORMAT csv)",
+                buffer,
+            )
+
+    one_day = sa.literal_column("interval '1 day'", INTERVAL)
+    one_microsecond = sa.literal_column("interval '1 microsecond'", INTERVAL)
+    stmt = insert(TimedBelief).from_select(
+        [
+            "event_start",
+            "belief_horizon",
+            "cumulative_probability",
+            "event_value",
+            "sensor_id",
+            "source_id",
+        ],
+        select(
+            sa.literal_column("timestamptz 'epoch'", TIMESTAMP(timezone=True))
+            + staging_table.c.event_start * one_microsecond,
+            staging_table.c.belief_horizon_days * one_day
+            + staging_table.c.belief_horizon_us * one_microsecond,
+            staging_table.c.cumulative_probability,
+            staging_table.c.event_value,
+            sa.literal(bdf.sensor.id),
+            staging_table.c.source_id,
+        ),
+    )
+    if allow_overwrite:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[
+                "event_start",
+                "belief_horizon",
+                "source_id",
+                "sensor_id",
+                "cumulative_probability",
+            ],
+            set_=dict(event_value=stmt.excluded.event_value),
+        )
+    rowcount = db.session.execute(stmt).rowcount
+
+    # Drop the staging table right away, so it can be created again within the same transaction
+    staging_table.drop(connection)
+    return rowcount
+
+
+def _get_source_ids(bdf: BeliefsDataFrame) -> np.ndarray:
+    """Look up the source ID of each belief, adding new data sources to the session."""
+    source_codes, unique_sources = pd.factorize(bdf.index.get_level_values("source"))
+    new_sources = [source for source in unique_sources if source.id is None]
+    if new_sources:
+        db.session.add_all(new_sources)
+        db.session.flush()  # assign IDs
+    source_ids = np.array([source.id for source in unique_sources], dtype=np.int64)
+    return source_ids[source_codes]
+
+
 def get_downsample_function_and_value(
     kpi: dict, sensor: Sensor, sensor_stats: dict
 ) -> tuple:
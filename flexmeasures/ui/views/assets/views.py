@@ -237,7 +237,7 @@ class AssetCrudUI(FlaskView):
         asset = get_asset_by_id_or_raise_notfound(id)
         check_access(asset, "read")
 
-        status_data = get_asset_sensors_metadata(asset)
+        status_data = get_asset_sensors_metadata(asset, readable_only=True)
 
         return render_flexmeasures_template(
             "sensors/status.html",
@@ -156,6 +156,11 @@ class Config(object):
     }  # how to group assets by asset types
     FLEXMEASURES_LP_SOLVER: str = "appsi_highs"
     FLEXMEASURES_LP_SOLVER_OPTIONS: dict[str, str | int | float] = {}
+    FLEXMEASURES_LP_MODEL_CACHE_SIZE: int = 0
+    FLEXMEASURES_LP_BACKEND: str = "pyomo"
+    FLEXMEASURES_LP_DECOMPOSE: bool = False
+    FLEXMEASURES_LP_DECOMPOSE_PROCESSES: int = 1
+    FLEXMEASURES_BATCH_SCHEDULING_PROCESSES: int | None = None
     FLEXMEASURES_DEFAULT_JOB_TIMEOUT: timedelta = timedelta(seconds=180)
     FLEXMEASURES_JOB_TIMEOUT: dict[str, timedelta | str] = {}
     FLEXMEASURES_JOB_TTL: timedelta = timedelta(days=1)
@@ -171,9 +176,17 @@ class Config(object):
     FLEXMEASURES_JOB_CACHE_TTL: int = (
         3600  # Time to live for the job caching keys in seconds. Set a negative timedelta to persist forever.
     )
+    FLEXMEASURES_SENSOR_DATA_CACHE_TTL: int = (
+        0  # Time to live for cached sensor data responses in seconds. Set to 0 to disable caching.
+    )
+    FLEXMEASURES_SENSOR_DATA_STREAM_CHUNK_SIZE: int = (
+        10_000  # Number of events loaded at a time when streaming sensor data
+    )
     FLEXMEASURES_MAX_SENSOR_DATA_INGESTION_BYTES: int | None = (
         3.1 * 1024 * 1024
     )  # up to 3MB are allowed per request
+    FLEXMEASURES_BULK_COPY_SENSOR_DATA_INGESTION: bool = False
+    FLEXMEASURES_USE_BELIEF_ROLLUPS: bool = True
     FLEXMEASURES_TASK_CHECK_AUTH_TOKEN: str | None = None
     FLEXMEASURES_REDIS_URL: str = "localhost"
     FLEXMEASURES_REDIS_PORT: int = 6379